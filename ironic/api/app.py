@@ -28,6 +28,17 @@ from ironic.api.middleware import auth_token
 from ironic.common import exception
 from ironic.conf import CONF
 
+UNEXPECTED_MODULE_PREFIXES = ('ironic.drivers',
+                              'ironic.common.driver_factory',
+                              'ironic.conductor.manager',
+                              'ironic.conductor.base_manager',
+                              'ironic.conductor.task_manager',
+                              'ironic.conductor.utils')
+"""Prefixes of the modules that the API service must not import.
+
+The drivers are only loaded by the API service when a request needs them.
+"""
+
 
 def get_pecan_config():
     # Set up the pecan configuration
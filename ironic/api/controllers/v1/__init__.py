@@ -27,6 +27,7 @@ from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import chassis
 from ironic.api.controllers.v1 import driver
+from ironic.api.controllers.v1 import job
 from ironic.api.controllers.v1 import node
 from ironic.api.controllers.v1 import port
 from ironic.api.controllers.v1 import portgroup
@@ -95,6 +96,9 @@ class V1(base.APIBase):
     heartbeat = [link.Link]
     """Links to the heartbeat resource"""
 
+    jobs = [link.Link]
+    """Links to the jobs resource"""
+
     @staticmethod
     def convert():
         v1 = V1()
@@ -154,6 +158,14 @@ class V1(base.APIBase):
                                     'volume', '',
                                     bookmark=True)
             ]
+        if utils.allow_async_jobs():
+            v1.jobs = [link.Link.make_link('self', pecan.request.public_url,
+                                           'jobs', ''),
+                       link.Link.make_link('bookmark',
+                                           pecan.request.public_url,
+                                           'jobs', '',
+                                           bookmark=True)
+                       ]
         v1.books = [link.Link.make_link('self', pecan.request.public_url,
                                         'books', ''),
                     link.Link.make_link('bookmark',
@@ -190,6 +202,7 @@ class Controller(rest.RestController):
     drivers = driver.DriversController()
     volume = volume.VolumeController()
     books = book.BooksController()
+    jobs = job.JobsController()
     lookup = ramdisk.LookupController()
     heartbeat = ramdisk.HeartbeatController()
 
@@ -39,10 +39,22 @@ class Collection(base.APIBase):
             return wtypes.Unset
 
         resource_url = url or self._type
-        q_args = ''.join(['%s=%s&' % (key, kwargs[key]) for key in kwargs])
-        next_args = '?%(args)slimit=%(limit)d&marker=%(marker)s' % {
-            'args': q_args, 'limit': limit,
-            'marker': self.collection[-1].uuid}
+        return get_next_href(resource_url, limit, self.collection[-1].uuid,
+                             **kwargs)
 
-        return link.Link.make_link('next', pecan.request.public_url,
-                                   resource_url, next_args).href
+
+def get_next_href(resource_url, limit, marker, **kwargs):
+    """Build the URL to retrieve the next subset of a collection.
+
+    :param resource_url: The URL of the collection, relative to the API root.
+    :param limit: Maximum number of resources in a single result.
+    :param marker: UUID of the last resource of the current subset.
+    :param kwargs: Additional query parameters to pass along.
+    :returns: The URL of the next subset.
+    """
+    q_args = ''.join(['%s=%s&' % (key, kwargs[key]) for key in kwargs])
+    next_args = '?%(args)slimit=%(limit)d&marker=%(marker)s' % {
+        'args': q_args, 'limit': limit, 'marker': marker}
+
+    return link.Link.make_link('next', pecan.request.public_url,
+                               resource_url, next_args).href
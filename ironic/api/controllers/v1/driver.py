@@ -25,10 +25,10 @@ from ironic.api.controllers import link
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import expose
+from ironic.common import driver_map
 from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.common import policy
-from ironic.drivers import base as driver_base
 
 
 METRICS = metrics_utils.get_metrics_logger(__name__)
@@ -143,11 +143,14 @@ class Driver(base.APIBase):
             ]
 
         if api_utils.allow_dynamic_drivers():
+            # NOTE: imported here, the API service does not load the drivers
+            # until they are needed.
+            from ironic.drivers import base as driver_base
+
             driver.type = driver_type
             if driver_type == 'dynamic' and detail:
                 if interface_info is None:
-                    # TODO(jroll) objectify this
-                    interface_info = (pecan.request.dbapi
+                    interface_info = (driver_map.DriverMap()
                                       .list_hardware_type_interfaces([name]))
                 for iface_type in driver_base.ALL_INTERFACES:
                     default = None
@@ -176,6 +179,8 @@ class Driver(base.APIBase):
 
     @classmethod
     def sample(cls):
+        from ironic.drivers import base as driver_base
+
         attrs = {
             'name': 'sample-driver',
             'hosts': ['fake-host'],
@@ -217,7 +222,7 @@ class DriverList(base.APIBase):
         # This is checked in Driver.convert_with_links(), however also
         # checking here can save us a DB query.
         if api_utils.allow_dynamic_drivers() and detail:
-            iface_info = pecan.request.dbapi.list_hardware_type_interfaces(
+            iface_info = driver_map.DriverMap().list_hardware_type_interfaces(
                 list(hardware_types))
         else:
             iface_info = []
@@ -368,12 +373,13 @@ class DriversController(rest.RestController):
                 '"type" filter must be one of "classic" or "dynamic", '
                 'if specified.'))
 
+        drivers = driver_map.DriverMap()
         driver_list = {}
         hw_type_dict = {}
         if type is None or type == 'classic':
-            driver_list = pecan.request.dbapi.get_active_driver_dict()
+            driver_list = drivers.get_active_driver_dict()
         if type is None or type == 'dynamic':
-            hw_type_dict = pecan.request.dbapi.get_active_hardware_type_dict()
+            hw_type_dict = drivers.get_active_hardware_type_dict()
         return DriverList.convert_with_links(driver_list, hw_type_dict,
                                              detail=detail)
 
@@ -394,11 +400,12 @@ class DriversController(rest.RestController):
                     return Driver.convert_with_links(name, list(hosts),
                                                      driver_type, detail=True)
 
-        hw_type_dict = pecan.request.dbapi.get_active_hardware_type_dict()
+        drivers = driver_map.DriverMap()
+        hw_type_dict = drivers.get_active_hardware_type_dict()
         driver = _find_driver(hw_type_dict, 'dynamic')
         if driver:
             return driver
-        driver_dict = pecan.request.dbapi.get_active_driver_dict()
+        driver_dict = drivers.get_active_driver_dict()
         driver = _find_driver(driver_dict, 'classic')
         if driver:
             return driver
@@ -0,0 +1,193 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Asynchronous jobs.
+
+Some node actions (getting or setting the boot device, validating the
+driver interfaces, vendor passthru methods, ...) need to talk to the BMC
+before the conductor can answer, which holds an API worker for as long as
+the BMC takes to respond. Starting with API version 1.34, clients can send
+the ``Prefer: respond-async`` header (RFC 7240) with these requests: the
+API then records a job, asks the conductor to run it, and immediately
+returns ``202 Accepted`` with the job, which the client polls with
+``GET /v1/jobs/<uuid>`` to get the result.
+"""
+
+import datetime
+import time
+
+from ironic_lib import metrics_utils
+import pecan
+from pecan import rest
+from six.moves import http_client
+import wsme
+from wsme import types as wtypes
+
+from ironic.api.controllers import base
+from ironic.api.controllers import link
+from ironic.api.controllers.v1 import types
+from ironic.api.controllers.v1 import utils as api_utils
+from ironic.api import expose
+from ironic.common import exception
+from ironic.common import policy
+from ironic.common import states as ir_states
+from ironic.conf import CONF
+from ironic import objects
+
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
+_RESPOND_ASYNC = 'respond-async'
+
+_POLL_INTERVAL = 1
+"""Interval (in seconds) between two checks of a job being waited for."""
+
+_ACTION_POLICIES = {
+    'change_node_power_state': 'baremetal:node:set_power_state',
+    'vendor_passthru': 'baremetal:node:vendor_passthru',
+    'set_boot_device': 'baremetal:node:set_boot_device',
+    'get_boot_device': 'baremetal:node:get_boot_device',
+    'validate_driver_interfaces': 'baremetal:node:validate',
+    'inspect_hardware': 'baremetal:node:set_provision_state',
+}
+"""Policies of the node actions run by jobs.
+
+Retrieving a job also requires the policy of its action, since the result
+of the job is what the synchronous request would have returned.
+"""
+
+
+def async_requested():
+    """Check whether the client asked for the request to be run as a job.
+
+    :returns: True if the API version allows jobs and the request has
+        a ``Prefer: respond-async`` header.
+    """
+    if not api_utils.allow_async_jobs():
+        return False
+    prefer = pecan.request.headers.get('Prefer', '')
+    preferences = (p.split(';')[0].strip().lower() for p in prefer.split(','))
+    return _RESPOND_ASYNC in preferences
+
+
+def submit(rpc_node, topic, action, **arguments):
+    """Record a job and ask the conductor to run it.
+
+    :param rpc_node: RPC Node object the job is run for.
+    :param topic: RPC topic of the conductor managing the node.
+    :param action: name of the conductor RPC method to run, it must be one
+        of :data:`ironic.conductor.manager.JOB_ACTIONS`.
+    :param arguments: arguments of the RPC method, besides the context and
+        the node.
+    :returns: A WSME response with the job, to be returned by the API.
+    """
+    context = pecan.request.context
+    rpc_job = objects.Job(context, node_id=rpc_node.id, action=action,
+                          state=ir_states.JOB_PENDING, arguments=arguments)
+    rpc_job.create()
+    pecan.request.rpcapi.run_job(context, rpc_job.uuid, topic=topic)
+
+    pecan.response.headers['Preference-Applied'] = _RESPOND_ASYNC
+    pecan.response.location = link.build_url('jobs', rpc_job.uuid)
+    api_job = Job.convert_with_links(rpc_job, rpc_node.uuid)
+    return wsme.api.Response(api_job, status_code=http_client.ACCEPTED,
+                             return_type=Job)
+
+
+class Job(base.APIBase):
+    """API representation of an asynchronous job."""
+
+    uuid = types.uuid
+    """Unique UUID for this job"""
+
+    node_uuid = types.uuid
+    """The UUID of the node the job is run for"""
+
+    action = wtypes.text
+    """The action run by the job"""
+
+    state = wtypes.text
+    """The state of the job: pending, running, success or failed"""
+
+    result = {wtypes.text: types.jsontype}
+    """The result of the action, once the job has succeeded"""
+
+    error = wtypes.text
+    """The error message, if the job has failed"""
+
+    links = wsme.wsattr([link.Link], readonly=True)
+    """A list containing a self link and associated job links"""
+
+    def __init__(self, **kwargs):
+        self.fields = []
+        for field in objects.Job.fields:
+            # Skip fields we do not expose.
+            if not hasattr(self, field):
+                continue
+            self.fields.append(field)
+            setattr(self, field, kwargs.get(field, wtypes.Unset))
+        self.fields.append('node_uuid')
+        self.node_uuid = kwargs.get('node_uuid', wtypes.Unset)
+
+    @classmethod
+    def convert_with_links(cls, rpc_job, node_uuid):
+        job = Job(node_uuid=node_uuid, **rpc_job.as_dict())
+        url = pecan.request.public_url
+        job.links = [link.Link.make_link('self', url, 'jobs', job.uuid),
+                     link.Link.make_link('bookmark', url, 'jobs', job.uuid,
+                                         bookmark=True)]
+        return job
+
+    @classmethod
+    def sample(cls):
+        created = datetime.datetime(2000, 1, 1, 12, 0, 0)
+        sample = cls(uuid='2b045129-a906-46af-bc1a-092b294b3428',
+                     node_uuid='7ae81bb3-dec3-4289-8d6c-da80bd8001ae',
+                     action='get_boot_device',
+                     state=ir_states.JOB_SUCCESS,
+                     result={'boot_device': 'pxe', 'persistent': False},
+                     error=None,
+                     created_at=created,
+                     updated_at=created)
+        return sample
+
+
+class JobsController(rest.RestController):
+    """REST controller for jobs."""
+
+    @METRICS.timer('JobsController.get_one')
+    @expose.expose(Job, types.uuid, wtypes.IntegerType(minimum=0))
+    def get_one(self, job_uuid, wait=None):
+        """Retrieve information about the given job.
+
+        :param job_uuid: UUID of a job.
+        :param wait: Optional number of seconds to wait for the job to
+            finish before returning it. It is limited by the
+            [api]job_max_wait configuration option.
+        """
+        if not api_utils.allow_async_jobs():
+            raise exception.NotFound()
+
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('baremetal:job:get', cdict, cdict)
+
+        context = pecan.request.context
+        rpc_job = objects.Job.get_by_uuid(context, job_uuid)
+        policy.authorize(_ACTION_POLICIES[rpc_job.action], cdict, cdict)
+
+        if wait:
+            deadline = time.time() + min(wait, CONF.api.job_max_wait)
+            while not rpc_job.finished and time.time() < deadline:
+                time.sleep(_POLL_INTERVAL)
+                rpc_job.refresh()
+
+        rpc_node = objects.Node.get_by_id(context, rpc_job.node_id)
+        return Job.convert_with_links(rpc_job, rpc_node.uuid)
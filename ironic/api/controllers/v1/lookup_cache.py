@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of the nodes found by the ramdisk lookup.
+
+During a mass deployment thousands of ramdisks look up their nodes by MAC
+addresses within seconds, and keep retrying until their node reaches a
+state in which the lookup is allowed. The cache remembers, for each set of
+MAC addresses, the UUID of the node found, so that repeated lookups only
+load the node by its UUID instead of searching the ports. The provision
+state of the node is always checked on the node loaded, since it changes
+during the deployment.
+
+The cache is local to an ironic-api process. It is invalidated when ports
+are created, updated or deleted through the same process; other changes
+are taken into account once the entries expire, after
+[api]ramdisk_lookup_cache_ttl seconds.
+"""
+
+import collections
+import threading
+import time
+
+from oslo_config import cfg
+
+
+CONF = cfg.CONF
+
+_MAX_SIZE = 10000
+"""Maximum number of entries, the oldest ones are evicted first."""
+
+
+class LookupCache(object):
+    """Time-limited cache of the node found for a set of MAC addresses."""
+
+    def __init__(self, max_size=_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        # NOTE: the cache is shared by the threads of a WSGI server
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(addresses):
+        return tuple(sorted(set(addresses)))
+
+    def get(self, addresses):
+        """Get the node found for the MAC addresses.
+
+        :param addresses: A list of normalized MAC addresses.
+        :returns: The UUID of the node or None if the addresses are not
+                  cached.
+        """
+        key = self._key(addresses)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, node_uuid = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            return node_uuid
+
+    def set(self, addresses, node):
+        """Cache the node found for the MAC addresses.
+
+        :param addresses: A list of normalized MAC addresses.
+        :param node: The Node object found.
+        """
+        ttl = CONF.api.ramdisk_lookup_cache_ttl
+        if not ttl:
+            return
+
+        key = self._key(addresses)
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+            self._entries[key] = (time.time() + ttl, node.uuid)
+
+    def invalidate(self, *addresses):
+        """Remove the entries involving any of the MAC addresses.
+
+        :param addresses: MAC addresses, None values are ignored.
+        """
+        addresses = {address.lower() for address in addresses if address}
+        with self._lock:
+            stale = [key for key in self._entries
+                     if addresses.intersection(key)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+CACHE = LookupCache()
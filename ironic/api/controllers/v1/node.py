@@ -29,9 +29,11 @@ from wsme import types as wtypes
 from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import collection
+from ironic.api.controllers.v1 import job
 from ironic.api.controllers.v1 import notification_utils as notify
 from ironic.api.controllers.v1 import port
 from ironic.api.controllers.v1 import portgroup
+from ironic.api.controllers.v1 import serializer
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api.controllers.v1 import versions
@@ -41,7 +43,6 @@ from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.common import policy
 from ironic.common import states as ir_states
-from ironic.conductor import utils as conductor_utils
 import ironic.conf
 from ironic import objects
 
@@ -49,36 +50,8 @@ from ironic import objects
 CONF = ironic.conf.CONF
 
 LOG = log.getLogger(__name__)
-_CLEAN_STEPS_SCHEMA = {
-    "$schema": "http://json-schema.org/schema#",
-    "title": "Clean steps schema",
-    "type": "array",
-    # list of clean steps
-    "items": {
-        "type": "object",
-        # args is optional
-        "required": ["interface", "step"],
-        "properties": {
-            "interface": {
-                "description": "driver interface",
-                "enum": list(conductor_utils.CLEANING_INTERFACE_PRIORITY)
-                # interface value must be one of the valid interfaces
-            },
-            "step": {
-                "description": "name of clean step",
-                "type": "string",
-                "minLength": 1
-            },
-            "args": {
-                "description": "additional args",
-                "type": "object",
-                "properties": {}
-            },
-        },
-        # interface, step and args are the only expected keys
-        "additionalProperties": False
-    }
-}
+_CLEAN_STEPS_SCHEMA = None
+"""JSON schema of the clean steps, see _get_clean_steps_schema()."""
 
 METRICS = metrics_utils.get_metrics_logger(__name__)
 
@@ -95,6 +68,10 @@ _VENDOR_METHODS = {}
 _DEFAULT_RETURN_FIELDS = ('instance_uuid', 'maintenance', 'power_state',
                           'provision_state', 'uuid', 'name')
 
+# Fields the nodes can be grouped by in the aggregates endpoint
+_AGGREGATE_GROUP_BY_FIELDS = ('driver', 'maintenance', 'power_state',
+                              'provision_state', 'resource_class')
+
 # States where calling do_provisioning_action makes sense
 PROVISION_ACTION_STATES = (ir_states.VERBS['manage'],
                            ir_states.VERBS['provide'],
@@ -188,6 +165,8 @@ class BootDeviceController(rest.RestController):
         if supported:
             return pecan.request.rpcapi.get_supported_boot_devices(
                 pecan.request.context, rpc_node.uuid, topic)
+        elif job.async_requested():
+            return job.submit(rpc_node, topic, 'get_boot_device')
         else:
             return pecan.request.rpcapi.get_boot_device(pecan.request.context,
                                                         rpc_node.uuid, topic)
@@ -213,6 +192,9 @@ class BootDeviceController(rest.RestController):
 
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if job.async_requested():
+            return job.submit(rpc_node, topic, 'set_boot_device',
+                              device=boot_device, persistent=persistent)
         pecan.request.rpcapi.set_boot_device(pecan.request.context,
                                              rpc_node.uuid,
                                              boot_device,
@@ -530,6 +512,9 @@ class NodeStatesController(rest.RestController):
                 action=target, node=node_ident,
                 state=rpc_node.provision_state)
 
+        if job.async_requested():
+            return job.submit(rpc_node, topic, 'change_node_power_state',
+                              new_state=target, timeout=timeout)
         pecan.request.rpcapi.change_node_power_state(pecan.request.context,
                                                      rpc_node.uuid, target,
                                                      timeout=timeout,
@@ -646,6 +631,8 @@ class NodeStatesController(rest.RestController):
             pecan.request.rpcapi.do_node_tear_down(
                 pecan.request.context, rpc_node.uuid, topic)
         elif target == ir_states.VERBS['inspect']:
+            if job.async_requested():
+                return job.submit(rpc_node, topic, 'inspect_hardware')
             pecan.request.rpcapi.inspect_hardware(
                 pecan.request.context, rpc_node.uuid, topic=topic)
         elif target == ir_states.VERBS['clean']:
@@ -670,6 +657,48 @@ class NodeStatesController(rest.RestController):
         pecan.response.location = link.build_url('nodes', url_args)
 
 
+def _get_clean_steps_schema():
+    """Get the JSON schema of the clean steps, built on the first call."""
+    global _CLEAN_STEPS_SCHEMA
+    if _CLEAN_STEPS_SCHEMA is None:
+        # NOTE: imported here, the conductor utilities import the drivers,
+        # which the API service does not load until they are needed.
+        from ironic.conductor import utils as conductor_utils
+
+        _CLEAN_STEPS_SCHEMA = {
+            "$schema": "http://json-schema.org/schema#",
+            "title": "Clean steps schema",
+            "type": "array",
+            # list of clean steps
+            "items": {
+                "type": "object",
+                # args is optional
+                "required": ["interface", "step"],
+                "properties": {
+                    "interface": {
+                        "description": "driver interface",
+                        # interface value must be one of the valid interfaces
+                        "enum": list(
+                            conductor_utils.CLEANING_INTERFACE_PRIORITY)
+                    },
+                    "step": {
+                        "description": "name of clean step",
+                        "type": "string",
+                        "minLength": 1
+                    },
+                    "args": {
+                        "description": "additional args",
+                        "type": "object",
+                        "properties": {}
+                    },
+                },
+                # interface, step and args are the only expected keys
+                "additionalProperties": False
+            }
+        }
+    return _CLEAN_STEPS_SCHEMA
+
+
 def _check_clean_steps(clean_steps):
     """Ensure all necessary keys are present and correct in clean steps.
 
@@ -681,7 +710,7 @@ def _check_clean_steps(clean_steps):
     :raises: InvalidParameterValue if validation of clean steps fails.
     """
     try:
-        jsonschema.validate(clean_steps, _CLEAN_STEPS_SCHEMA)
+        jsonschema.validate(clean_steps, _get_clean_steps_schema())
     except jsonschema.ValidationError as exc:
         raise exception.InvalidParameterValue(_('Invalid clean_steps: %s') %
                                               exc)
@@ -1034,6 +1063,68 @@ class NodeCollection(collection.Collection):
         return sample
 
 
+class NodeSerializer(serializer.ResourceSerializer):
+    """Render nodes the same way Node.convert_with_links() does."""
+
+    resource = 'nodes'
+    api_class = Node
+    object_class = objects.Node
+    api_fields = ('chassis_uuid',)
+    internal_fields = ('chassis_id',)
+    hide_fields_func = staticmethod(hide_fields_in_newer_versions)
+
+    def __init__(self, fields=None):
+        super(NodeSerializer, self).__init__(fields=fields)
+        cdict = pecan.request.context.to_policy_values()
+        self._show_driver_secrets = policy.check("show_password", cdict, cdict)
+        self._show_instance_secrets = policy.check("show_instance_secrets",
+                                                   cdict, cdict)
+        self._rename_available = (pecan.request.version.minor <
+                                  versions.MINOR_2_AVAILABLE_STATE)
+        self.subresources.append('ports')
+        if api_utils.allow_links_node_states_and_driver_properties():
+            self.subresources.append('states')
+        if api_utils.allow_portgroups_subcontrollers():
+            self.subresources.append('portgroups')
+        self._chassis_uuids = {}
+
+    def _get_chassis_uuid(self, chassis_id):
+        try:
+            return self._chassis_uuids[chassis_id]
+        except KeyError:
+            chassis = objects.Chassis.get(pecan.request.context, chassis_id)
+            self._chassis_uuids[chassis_id] = chassis.uuid
+            return chassis.uuid
+
+    def _get_values(self, rpc_node):
+        values = super(NodeSerializer, self)._get_values(rpc_node)
+        if rpc_node.chassis_id is None:
+            values['chassis_uuid'] = None
+        else:
+            values['chassis_uuid'] = self._get_chassis_uuid(
+                rpc_node.chassis_id)
+            values['chassis_id'] = rpc_node.chassis_id
+
+        if not self._show_driver_secrets and 'driver_info' in values:
+            driver_info = strutils.mask_dict_password(values['driver_info'],
+                                                      "******")
+            if driver_info.get('ssh_key_contents'):
+                driver_info['ssh_key_contents'] = "******"
+            values['driver_info'] = driver_info
+
+        if not self._show_instance_secrets and 'instance_info' in values:
+            instance_info = strutils.mask_dict_password(
+                values['instance_info'], "******")
+            if instance_info.get('image_url'):
+                instance_info['image_url'] = "******"
+            values['instance_info'] = instance_info
+
+        if (self._rename_available and
+                values.get('provision_state') == ir_states.AVAILABLE):
+            values['provision_state'] = ir_states.NOSTATE
+        return values
+
+
 class NodeVendorPassthruController(rest.RestController):
     """REST controller for VendorPassthru.
 
@@ -1086,6 +1177,11 @@ class NodeVendorPassthruController(rest.RestController):
         # Raise an exception if node is not found
         rpc_node = api_utils.get_rpc_node(node_ident)
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if method and job.async_requested():
+            return job.submit(rpc_node, topic, 'vendor_passthru',
+                              driver_method=method,
+                              http_method=pecan.request.method.upper(),
+                              info=data or {})
         return api_utils.vendor_passthru(rpc_node.uuid, method, topic,
                                          data=data)
 
@@ -1236,6 +1332,7 @@ class NodesController(rest.RestController):
     from the top-level resource Chassis"""
 
     _custom_actions = {
+        'aggregates': ['GET'],
         'detail': ['GET'],
         'validate': ['GET'],
     }
@@ -1293,20 +1390,9 @@ class NodesController(rest.RestController):
         if instance_uuid:
             nodes = self._get_nodes_by_instance(instance_uuid)
         else:
-            filters = {}
-            if chassis_uuid:
-                filters['chassis_uuid'] = chassis_uuid
-            if associated is not None:
-                filters['associated'] = associated
-            if maintenance is not None:
-                filters['maintenance'] = maintenance
-            if provision_state:
-                filters['provision_state'] = provision_state
-            if driver:
-                filters['driver'] = driver
-            if resource_class is not None:
-                filters['resource_class'] = resource_class
-
+            filters = self._get_nodes_filters(chassis_uuid, associated,
+                                              maintenance, provision_state,
+                                              driver, resource_class)
             nodes = objects.Node.list(pecan.request.context, limit, marker_obj,
                                       sort_key=sort_key, sort_dir=sort_dir,
                                       filters=filters)
@@ -1316,10 +1402,26 @@ class NodesController(rest.RestController):
             parameters['associated'] = associated
         if maintenance:
             parameters['maintenance'] = maintenance
-        return NodeCollection.convert_with_links(nodes, limit,
-                                                 url=resource_url,
-                                                 fields=fields,
-                                                 **parameters)
+        return NodeSerializer(fields=fields).serialize_collection(
+            nodes, limit, url=resource_url, **parameters)
+
+    @staticmethod
+    def _get_nodes_filters(chassis_uuid, associated, maintenance,
+                           provision_state, driver, resource_class):
+        filters = {}
+        if chassis_uuid:
+            filters['chassis_uuid'] = chassis_uuid
+        if associated is not None:
+            filters['associated'] = associated
+        if maintenance is not None:
+            filters['maintenance'] = maintenance
+        if provision_state:
+            filters['provision_state'] = provision_state
+        if driver:
+            filters['driver'] = driver
+        if resource_class is not None:
+            filters['resource_class'] = resource_class
+        return filters
 
     def _get_nodes_by_instance(self, instance_uuid):
         """Retrieve a node by its instance uuid.
@@ -1404,7 +1506,7 @@ class NodesController(rest.RestController):
                 status_code=http_client.CONFLICT)
 
     @METRICS.timer('NodesController.get_all')
-    @expose.expose(NodeCollection, types.uuid, types.uuid, types.boolean,
+    @expose.expose(types.jsontype, types.uuid, types.uuid, types.boolean,
                    types.boolean, wtypes.text, types.uuid, int, wtypes.text,
                    wtypes.text, wtypes.text, types.listtype, wtypes.text)
     def get_all(self, chassis_uuid=None, instance_uuid=None, associated=None,
@@ -1458,7 +1560,7 @@ class NodesController(rest.RestController):
                                           fields=fields)
 
     @METRICS.timer('NodesController.detail')
-    @expose.expose(NodeCollection, types.uuid, types.uuid, types.boolean,
+    @expose.expose(types.jsontype, types.uuid, types.uuid, types.boolean,
                    types.boolean, wtypes.text, types.uuid, int, wtypes.text,
                    wtypes.text, wtypes.text, wtypes.text)
     def detail(self, chassis_uuid=None, instance_uuid=None, associated=None,
@@ -1511,6 +1613,74 @@ class NodesController(rest.RestController):
                                           resource_class=resource_class,
                                           resource_url=resource_url)
 
+    @METRICS.timer('NodesController.aggregates')
+    @expose.expose(types.jsontype, types.uuid, types.listtype, types.boolean,
+                   types.boolean, wtypes.text, wtypes.text, wtypes.text)
+    def aggregates(self, chassis_uuid=None, group_by=None, associated=None,
+                   maintenance=None, provision_state=None, driver=None,
+                   resource_class=None):
+        """Retrieve the number of nodes, grouped by some of their fields.
+
+        :param chassis_uuid: Optional UUID of a chassis, to count only nodes
+                             of that chassis.
+        :param group_by: a list of fields to group the nodes by, any of
+                         "driver", "maintenance", "power_state",
+                         "provision_state" and "resource_class".
+        :param associated: Optional boolean whether to count associated or
+                           unassociated nodes.
+        :param maintenance: Optional boolean value that indicates whether
+                            to count nodes in maintenance mode ("True"), or
+                            not in maintenance mode ("False").
+        :param provision_state: Optional string value to count only nodes in
+                                that provision state.
+        :param driver: Optional string value to count only nodes using that
+                       driver.
+        :param resource_class: Optional string value to count only nodes with
+                               that resource_class.
+        :returns: a json object containing:
+
+            :aggregates: a list with one item per group of nodes, containing
+                the values of the group_by fields and the number of nodes
+                of the group in "count".
+
+        """
+        if not api_utils.allow_node_aggregates():
+            raise exception.NotFound()
+
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('baremetal:node:get', cdict, cdict)
+
+        # /aggregates should only work against collections
+        parent = pecan.request.path.split('/')[:-1][-1]
+        if parent != "nodes":
+            raise exception.HTTPNotFound()
+
+        if self.from_chassis and not chassis_uuid:
+            raise exception.MissingParameterValue(
+                _("Chassis id not specified."))
+
+        if not group_by:
+            raise exception.MissingParameterValue(
+                _("The group_by parameter is required."))
+        invalid = set(group_by) - set(_AGGREGATE_GROUP_BY_FIELDS)
+        if invalid:
+            raise exception.InvalidParameterValue(
+                _('Nodes can not be grouped by "%(fields)s". Valid fields '
+                  'are: %(valid)s.') %
+                {'fields': ', '.join(sorted(invalid)),
+                 'valid': ', '.join(_AGGREGATE_GROUP_BY_FIELDS)})
+        # NOTE: the order of the items returned by types.listtype is not
+        # guaranteed, so sort them to get stable results.
+        group_by = [f for f in _AGGREGATE_GROUP_BY_FIELDS if f in group_by]
+
+        api_utils.check_for_invalid_state_and_allow_filter(provision_state)
+        filters = self._get_nodes_filters(chassis_uuid, associated,
+                                          maintenance, provision_state,
+                                          driver, resource_class)
+        aggregates = objects.Node.get_aggregates(pecan.request.context,
+                                                 group_by, filters=filters)
+        return {'aggregates': aggregates}
+
     @METRICS.timer('NodesController.validate')
     @expose.expose(wtypes.text, types.uuid_or_name, types.uuid)
     def validate(self, node=None, node_uuid=None):
@@ -1535,6 +1705,8 @@ class NodesController(rest.RestController):
         rpc_node = api_utils.get_rpc_node(node_uuid or node)
 
         topic = pecan.request.rpcapi.get_topic_for(rpc_node)
+        if job.async_requested():
+            return job.submit(rpc_node, topic, 'validate_driver_interfaces')
         return pecan.request.rpcapi.validate_driver_interfaces(
             pecan.request.context, rpc_node.uuid, topic)
 
@@ -26,7 +26,9 @@ from wsme import types as wtypes
 from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import collection
+from ironic.api.controllers.v1 import lookup_cache
 from ironic.api.controllers.v1 import notification_utils as notify
+from ironic.api.controllers.v1 import serializer
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import expose
@@ -267,6 +269,55 @@ class PortCollection(collection.Collection):
         return sample
 
 
+class PortSerializer(serializer.ResourceSerializer):
+    """Render ports the same way Port.convert_with_links() does."""
+
+    resource = 'ports'
+    api_class = Port
+    object_class = objects.Port
+    api_fields = ('node_uuid', 'portgroup_uuid')
+    internal_fields = ('node_id', 'portgroup_id')
+    hide_fields_func = staticmethod(hide_fields_in_newer_versions)
+
+    def __init__(self, fields=None):
+        super(PortSerializer, self).__init__(fields=fields)
+        self._node_uuids = {}
+        self._portgroup_uuids = {}
+
+    def _get_node_uuid(self, node_id):
+        try:
+            return self._node_uuids[node_id]
+        except KeyError:
+            node = objects.Node.get(pecan.request.context, node_id)
+            self._node_uuids[node_id] = node.uuid
+            return node.uuid
+
+    def _get_portgroup_uuid(self, portgroup_id):
+        try:
+            return self._portgroup_uuids[portgroup_id]
+        except KeyError:
+            portgroup = objects.Portgroup.get(pecan.request.context,
+                                              portgroup_id)
+            self._portgroup_uuids[portgroup_id] = portgroup.uuid
+            return portgroup.uuid
+
+    def _get_values(self, rpc_port):
+        values = super(PortSerializer, self)._get_values(rpc_port)
+        values['node_uuid'] = self._get_node_uuid(rpc_port.node_id)
+        values['node_id'] = rpc_port.node_id
+        if 'portgroup_uuid' in self.hidden_fields:
+            # NOTE: the portgroup is not looked up at all when its UUID
+            # is not going to be shown.
+            return values
+        if rpc_port.portgroup_id is None:
+            values['portgroup_uuid'] = None
+        else:
+            values['portgroup_uuid'] = self._get_portgroup_uuid(
+                rpc_port.portgroup_id)
+            values['portgroup_id'] = rpc_port.portgroup_id
+        return values
+
+
 class PortsController(rest.RestController):
     """REST controller for Ports."""
 
@@ -334,11 +385,9 @@ class PortsController(rest.RestController):
                                       marker_obj, sort_key=sort_key,
                                       sort_dir=sort_dir)
 
-        return PortCollection.convert_with_links(ports, limit,
-                                                 url=resource_url,
-                                                 fields=fields,
-                                                 sort_key=sort_key,
-                                                 sort_dir=sort_dir)
+        return PortSerializer(fields=fields).serialize_collection(
+            ports, limit, url=resource_url, sort_key=sort_key,
+            sort_dir=sort_dir)
 
     def _get_ports_by_address(self, address):
         """Retrieve a port by its address.
@@ -355,7 +404,7 @@ class PortsController(rest.RestController):
             return []
 
     @METRICS.timer('PortsController.get_all')
-    @expose.expose(PortCollection, types.uuid_or_name, types.uuid,
+    @expose.expose(types.jsontype, types.uuid_or_name, types.uuid,
                    types.macaddress, types.uuid, int, wtypes.text,
                    wtypes.text, types.listtype, types.uuid_or_name)
     def get_all(self, node=None, node_uuid=None, address=None, marker=None,
@@ -416,7 +465,7 @@ class PortsController(rest.RestController):
                                           sort_dir, fields=fields)
 
     @METRICS.timer('PortsController.detail')
-    @expose.expose(PortCollection, types.uuid_or_name, types.uuid,
+    @expose.expose(types.jsontype, types.uuid_or_name, types.uuid,
                    types.macaddress, types.uuid, int, wtypes.text,
                    wtypes.text, types.uuid_or_name)
     def detail(self, node=None, node_uuid=None, address=None, marker=None,
@@ -485,7 +534,7 @@ class PortsController(rest.RestController):
 
         api_utils.check_allow_specify_fields(fields)
 
-        rpc_port = objects.Port.get_by_uuid(pecan.request.context, port_uuid)
+        rpc_port = api_utils.get_rpc_port(port_uuid)
         return Port.convert_with_links(rpc_port, fields=fields)
 
     @METRICS.timer('PortsController.post')
@@ -538,6 +587,7 @@ class PortsController(rest.RestController):
         with notify.handle_error_notification(context, new_port, 'create',
                                               node_uuid=port.node_uuid):
             new_port.create()
+        lookup_cache.CACHE.invalidate(new_port.address)
         notify.emit_end_notification(context, new_port, 'create',
                                      node_uuid=port.node_uuid)
         # Set the HTTP Location Header
@@ -574,7 +624,8 @@ class PortsController(rest.RestController):
                 not api_utils.allow_portgroups_subcontrollers()):
             raise exception.NotAcceptable()
 
-        rpc_port = objects.Port.get_by_uuid(context, port_uuid)
+        rpc_port = api_utils.get_rpc_port(port_uuid)
+        old_address = rpc_port.address
         try:
             port_dict = rpc_port.as_dict()
             # NOTE(lucasagomes):
@@ -614,6 +665,7 @@ class PortsController(rest.RestController):
             topic = pecan.request.rpcapi.get_topic_for(rpc_node)
             new_port = pecan.request.rpcapi.update_port(context, rpc_port,
                                                         topic)
+        lookup_cache.CACHE.invalidate(old_address, new_port.address)
 
         api_port = Port.convert_with_links(new_port)
         notify.emit_end_notification(context, new_port, 'update',
@@ -636,7 +688,7 @@ class PortsController(rest.RestController):
         if self.parent_node_ident or self.parent_portgroup_ident:
             raise exception.OperationNotPermitted()
 
-        rpc_port = objects.Port.get_by_uuid(context, port_uuid)
+        rpc_port = api_utils.get_rpc_port(port_uuid)
         rpc_node = objects.Node.get_by_id(context, rpc_port.node_id)
         notify.emit_start_notification(context, rpc_port, 'delete',
                                        node_uuid=rpc_node.uuid)
@@ -644,5 +696,6 @@ class PortsController(rest.RestController):
                                               node_uuid=rpc_node.uuid):
             topic = pecan.request.rpcapi.get_topic_for(rpc_node)
             pecan.request.rpcapi.destroy_port(context, rpc_port, topic)
+        lookup_cache.CACHE.invalidate(rpc_port.address)
         notify.emit_end_notification(context, rpc_port, 'delete',
                                      node_uuid=rpc_node.uuid)
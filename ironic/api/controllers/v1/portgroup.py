@@ -22,6 +22,7 @@ from ironic.api.controllers import base
 from ironic.api.controllers import link
 from ironic.api.controllers.v1 import collection
 from ironic.api.controllers.v1 import port
+from ironic.api.controllers.v1 import serializer
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
 from ironic.api import expose
@@ -223,6 +224,36 @@ class PortgroupCollection(collection.Collection):
         return sample
 
 
+class PortgroupSerializer(serializer.ResourceSerializer):
+    """Render portgroups the same way Portgroup.convert_with_links() does."""
+
+    resource = 'portgroups'
+    api_class = Portgroup
+    object_class = objects.Portgroup
+    api_fields = ('node_uuid',)
+    internal_fields = ('node_id',)
+
+    def __init__(self, fields=None):
+        super(PortgroupSerializer, self).__init__(
+            fields=fields, url=pecan.request.host_url)
+        self.subresources.append('ports')
+        self._node_uuids = {}
+
+    def _get_node_uuid(self, node_id):
+        try:
+            return self._node_uuids[node_id]
+        except KeyError:
+            node = objects.Node.get(pecan.request.context, node_id)
+            self._node_uuids[node_id] = node.uuid
+            return node.uuid
+
+    def _get_values(self, rpc_portgroup):
+        values = super(PortgroupSerializer, self)._get_values(rpc_portgroup)
+        values['node_uuid'] = self._get_node_uuid(rpc_portgroup.node_id)
+        values['node_id'] = rpc_portgroup.node_id
+        return values
+
+
 class PortgroupsController(pecan.rest.RestController):
     """REST controller for portgroups."""
 
@@ -302,11 +333,9 @@ class PortgroupsController(pecan.rest.RestController):
                                                 marker_obj, sort_key=sort_key,
                                                 sort_dir=sort_dir)
 
-        return PortgroupCollection.convert_with_links(portgroups, limit,
-                                                      url=resource_url,
-                                                      fields=fields,
-                                                      sort_key=sort_key,
-                                                      sort_dir=sort_dir)
+        return PortgroupSerializer(fields=fields).serialize_collection(
+            portgroups, limit, url=resource_url, sort_key=sort_key,
+            sort_dir=sort_dir)
 
     def _get_portgroups_by_address(self, address):
         """Retrieve a portgroup by its address.
@@ -325,7 +354,7 @@ class PortgroupsController(pecan.rest.RestController):
             return []
 
     @METRICS.timer('PortgroupsController.get_all')
-    @expose.expose(PortgroupCollection, types.uuid_or_name, types.macaddress,
+    @expose.expose(types.jsontype, types.uuid_or_name, types.macaddress,
                    types.uuid, int, wtypes.text, wtypes.text, types.listtype)
     def get_all(self, node=None, address=None, marker=None,
                 limit=None, sort_key='id', sort_dir='asc', fields=None):
@@ -362,7 +391,7 @@ class PortgroupsController(pecan.rest.RestController):
                                                fields=fields)
 
     @METRICS.timer('PortgroupsController.detail')
-    @expose.expose(PortgroupCollection, types.uuid_or_name, types.macaddress,
+    @expose.expose(types.jsontype, types.uuid_or_name, types.macaddress,
                    types.uuid, int, wtypes.text, wtypes.text)
     def detail(self, node=None, address=None, marker=None,
                limit=None, sort_key='id', sort_dir='asc'):
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from ironic_lib import metrics_utils
 from oslo_config import cfg
 from oslo_log import log
 import pecan
@@ -20,6 +21,7 @@ from six.moves import http_client
 from wsme import types as wtypes
 
 from ironic.api.controllers import base
+from ironic.api.controllers.v1 import lookup_cache
 from ironic.api.controllers.v1 import node as node_ctl
 from ironic.api.controllers.v1 import types
 from ironic.api.controllers.v1 import utils as api_utils
@@ -34,6 +36,7 @@ from ironic import objects
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
+METRICS = metrics_utils.get_metrics_logger(__name__)
 
 _LOOKUP_RETURN_FIELDS = ('uuid', 'properties', 'instance_info',
                          'driver_internal_info')
@@ -82,6 +85,33 @@ class LookupResult(base.APIBase):
 class LookupController(rest.RestController):
     """Controller handling node lookup for a deploy ramdisk."""
 
+    @staticmethod
+    def _get_node_by_addresses(addresses):
+        """Find a node by MAC addresses, using the lookup cache.
+
+        :param addresses: list of normalized MAC addresses.
+        :raises: NotFound if suitable node was not found.
+        :returns: the Node object.
+        """
+        context = pecan.request.context
+        node_uuid = lookup_cache.CACHE.get(addresses)
+        if node_uuid is not None:
+            METRICS.send_counter('LookupController.cache_hit', 1)
+            try:
+                node = objects.Node.get_by_uuid(context, node_uuid)
+            except exception.NodeNotFound:
+                # The node was deleted, search the ports again.
+                lookup_cache.CACHE.invalidate(*addresses)
+                node = objects.Node.get_by_port_addresses(context,
+                                                          addresses)
+        else:
+            METRICS.send_counter('LookupController.cache_miss', 1)
+            node = objects.Node.get_by_port_addresses(context, addresses)
+
+        lookup_cache.CACHE.set(addresses, node)
+        return node
+
+    @METRICS.timer('LookupController.get_all')
     @expose.expose(LookupResult, types.listtype, types.uuid)
     def get_all(self, addresses=None, node_uuid=None):
         """Look up a node by its MAC addresses and optionally UUID.
@@ -131,8 +161,7 @@ class LookupController(rest.RestController):
                 node = objects.Node.get_by_uuid(
                     pecan.request.context, node_uuid)
             else:
-                node = objects.Node.get_by_port_addresses(
-                    pecan.request.context, valid_addresses)
+                node = self._get_node_by_addresses(valid_addresses)
         except exception.NotFound:
             # NOTE(dtantsur): we are reraising the same exception to make sure
             # we don't disclose the difference between nodes that are not found
@@ -0,0 +1,164 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Fast rendering of API resources for the collection endpoints.
+
+Building the WSME representation of a resource validates every attribute
+on assignment, and builds each link through ``link.Link.make_link``. For
+collections of hundreds of resources that conversion dominates the time
+spent serving the request. The serializers defined here render RPC objects
+straight into the dictionaries WSME would have produced; everything which
+only depends on the request (API version, policy, URL prefixes) is computed
+once when the serializer is created.
+"""
+
+import datetime
+
+import pecan
+import wsme
+
+from ironic.api.controllers import link
+from ironic.api.controllers.v1 import collection
+from ironic.api.controllers.v1 import utils as api_utils
+
+
+class _FieldsProbe(object):
+    """Placeholder object passed to the hide_fields_in_newer_versions()."""
+
+
+def get_hidden_fields(hide_fields_func, fields):
+    """Find out which fields are hidden for the requested API version.
+
+    :param hide_fields_func: The hide_fields_in_newer_versions() function
+        of the resource; it is expected to hide fields by setting them
+        to wsme.Unset.
+    :param fields: The names of the fields exposed by the resource.
+    :returns: A frozenset with the names of the hidden fields.
+    """
+    probe = _FieldsProbe()
+    for field in fields:
+        setattr(probe, field, None)
+    hide_fields_func(probe)
+    return frozenset(field for field in fields
+                     if getattr(probe, field) is wsme.Unset)
+
+
+class ResourceSerializer(object):
+    """Base class for rendering RPC objects of a single resource type.
+
+    A serializer caches request specific information, so an instance
+    must only be used to render the response of a single request.
+    """
+
+    resource = None
+    """The resource name, as used in URLs and collection bodies."""
+
+    api_class = None
+    """The WSME type of the resource, whose output is reproduced."""
+
+    object_class = None
+    """The objects class of the resource."""
+
+    api_fields = ()
+    """API-only fields, which are not part of object_class.fields."""
+
+    internal_fields = ()
+    """Fields which may be requested, but are never shown to the user."""
+
+    hide_fields_func = None
+    """The hide_fields_in_newer_versions() function of the resource,
+    wrapped in a staticmethod."""
+
+    def __init__(self, fields=None, url=None):
+        """Create a serializer.
+
+        :param fields: Optional, a list with a specified set of fields
+                       of the resource to be returned.
+        :param url: Optional, the base URL of the links. Defaults to the
+                    public URL of the request.
+        """
+        if url is None:
+            url = pecan.request.public_url
+        self.fields = fields
+        self.subresources = []
+        self._self_prefix = link.build_url(self.resource, '', base_url=url)
+        self._bookmark_prefix = link.build_url(self.resource, '',
+                                               bookmark=True, base_url=url)
+        self.object_fields = [f for f in self.object_class.fields
+                              if hasattr(self.api_class, f)]
+        self.exposed_fields = self.object_fields + list(self.api_fields)
+        if self.hide_fields_func is None:
+            self.hidden_fields = frozenset()
+        else:
+            self.hidden_fields = get_hidden_fields(self.hide_fields_func,
+                                                   self.exposed_fields)
+
+    def _make_links(self, resource_args):
+        return [{'href': self._self_prefix + resource_args, 'rel': 'self'},
+                {'href': self._bookmark_prefix + resource_args,
+                 'rel': 'bookmark'}]
+
+    def _get_values(self, rpc_obj):
+        """Return the API values of an object, before hiding any of them.
+
+        :param rpc_obj: The RPC object to render.
+        :returns: A dictionary, which may be modified by the caller.
+        """
+        return dict((field, rpc_obj[field]) for field in self.object_fields
+                    if rpc_obj.obj_attr_is_set(field))
+
+    def serialize(self, rpc_obj):
+        """Render a single object.
+
+        :param rpc_obj: The RPC object to render.
+        :returns: A dictionary ready to be encoded as JSON.
+        """
+        values = self._get_values(rpc_obj)
+        if self.fields is not None:
+            api_utils.check_for_invalid_fields(self.fields, values)
+
+        for field in self.internal_fields:
+            values.pop(field, None)
+        for field in self.hidden_fields:
+            values.pop(field, None)
+
+        if self.fields is not None:
+            values = dict((field, value) for field, value in values.items()
+                          if field in self.fields)
+        else:
+            for subresource in self.subresources:
+                values[subresource] = self._make_links(
+                    rpc_obj.uuid + '/' + subresource)
+
+        for field, value in values.items():
+            if isinstance(value, datetime.datetime):
+                values[field] = value.isoformat()
+
+        values['links'] = self._make_links(rpc_obj.uuid)
+        return values
+
+    def serialize_collection(self, rpc_objs, limit, url=None, **kwargs):
+        """Render a collection of objects.
+
+        :param rpc_objs: A list of RPC objects to render.
+        :param limit: Maximum number of resources in a single result.
+        :param url: Optional, URL of the collection. Defaults to the
+                    resource name.
+        :param kwargs: Additional query parameters for the link to the
+                       next subset of the collection.
+        :returns: A dictionary ready to be encoded as JSON.
+        """
+        result = {self.resource: [self.serialize(obj) for obj in rpc_objs]}
+        if rpc_objs and len(rpc_objs) == limit:
+            result['next'] = collection.get_next_href(
+                url or self.resource, limit, rpc_objs[-1].uuid, **kwargs)
+        return result
@@ -141,6 +141,40 @@ def allow_node_logical_names():
     return pecan.request.version.minor >= versions.MINOR_5_NODE_NAME
 
 
+def get_cached_object(cls, loader, ident):
+    """Load an object, memoizing it for the duration of the request.
+
+    Within a single request the same resource is often resolved several
+    times (by the controller, its sub-controllers and the policy checks).
+    The objects loaded are kept in the identity map of the request, indexed
+    by their UUID and, if they have one, their name; further lookups by
+    either of them return the same object without accessing the database.
+
+    :param cls: the objects class of the resource.
+    :param loader: the function loading the object, called with the request
+                   context and ident.
+    :param ident: the UUID or logical name of the object.
+    :returns: The RPC object.
+    """
+    object_cache = getattr(pecan.request, 'object_cache', None)
+    if not isinstance(object_cache, dict):
+        # Not within a request processed by the DBHook.
+        return loader(pecan.request.context, ident)
+
+    key = (cls.obj_name(), ident)
+    try:
+        return object_cache[key]
+    except KeyError:
+        pass
+
+    rpc_obj = loader(pecan.request.context, ident)
+    for field in ('uuid', 'name'):
+        value = getattr(rpc_obj, field, None)
+        if value:
+            object_cache[(cls.obj_name(), value)] = rpc_obj
+    return rpc_obj
+
+
 def get_rpc_node(node_ident):
     """Get the RPC node from the node uuid or logical name.
 
@@ -153,18 +187,33 @@ def get_rpc_node(node_ident):
     # Check to see if the node_ident is a valid UUID.  If it is, treat it
     # as a UUID.
     if uuidutils.is_uuid_like(node_ident):
-        return objects.Node.get_by_uuid(pecan.request.context, node_ident)
+        return get_cached_object(objects.Node, objects.Node.get_by_uuid,
+                                 node_ident)
 
     # We can refer to nodes by their name, if the client supports it
     if allow_node_logical_names():
         if is_valid_logical_name(node_ident):
-            return objects.Node.get_by_name(pecan.request.context, node_ident)
+            return get_cached_object(objects.Node, objects.Node.get_by_name,
+                                     node_ident)
         raise exception.InvalidUuidOrName(name=node_ident)
 
     # Ensure we raise the same exception as we did for the Juno release
     raise exception.NodeNotFound(node=node_ident)
 
 
+def get_rpc_port(port_uuid):
+    """Get the RPC port from the port UUID.
+
+    :param port_uuid: the UUID of a port.
+
+    :returns: The RPC port.
+    :raises: InvalidUUID if the uuid provided is not valid.
+    :raises: PortNotFound if the port is not found.
+    """
+    return get_cached_object(objects.Port, objects.Port.get_by_uuid,
+                             port_uuid)
+
+
 def get_rpc_portgroup(portgroup_ident):
     """Get the RPC portgroup from the portgroup UUID or logical name.
 
@@ -177,13 +226,15 @@ def get_rpc_portgroup(portgroup_ident):
     # Check to see if the portgroup_ident is a valid UUID.  If it is, treat it
     # as a UUID.
     if uuidutils.is_uuid_like(portgroup_ident):
-        return objects.Portgroup.get_by_uuid(pecan.request.context,
-                                             portgroup_ident)
+        return get_cached_object(objects.Portgroup,
+                                 objects.Portgroup.get_by_uuid,
+                                 portgroup_ident)
 
     # We can refer to portgroups by their name
     if utils.is_valid_logical_name(portgroup_ident):
-        return objects.Portgroup.get_by_name(pecan.request.context,
-                                             portgroup_ident)
+        return get_cached_object(objects.Portgroup,
+                                 objects.Portgroup.get_by_name,
+                                 portgroup_ident)
     raise exception.InvalidUuidOrName(name=portgroup_ident)
 
 
@@ -557,6 +608,24 @@ def allow_volume():
     return (pecan.request.version.minor >= versions.MINOR_32_VOLUME)
 
 
+def allow_node_aggregates():
+    """Check if node aggregates can be retrieved.
+
+    Version 1.33 of the API added the /v1/nodes/aggregates endpoint.
+    """
+    return (pecan.request.version.minor >=
+            versions.MINOR_33_NODE_AGGREGATES)
+
+
+def allow_async_jobs():
+    """Check if actions can be run as asynchronous jobs.
+
+    Version 1.34 of the API added the /v1/jobs endpoint and support for
+    the "Prefer: respond-async" header.
+    """
+    return pecan.request.version.minor >= versions.MINOR_34_ASYNC_JOBS
+
+
 def get_controller_reserved_names(cls):
     """Get reserved names for a given controller.
 
@@ -72,10 +72,36 @@ class ConfigHook(hooks.PecanHook):
 
 
 class DBHook(hooks.PecanHook):
-    """Attach the dbapi object to the request so controllers can get to it."""
+    """Attach the dbapi object to the request so controllers can get to it.
+
+    The request also gets an identity map of the objects loaded from the
+    database, see api_utils.get_cached_object(). Read-only requests are
+    allowed to query the replica database, if enabled by the
+    [api]use_replica_for_reads option.
+    """
 
     def before(self, state):
         state.request.dbapi = dbapi.get_instance()
+        state.request.object_cache = {}
+        state.request.query_count = state.request.dbapi.get_query_count()
+        # The setting is thread-local and threads are reused between
+        # requests, so it is always (re)set here.
+        if (cfg.CONF.api.use_replica_for_reads
+                and state.request.method in ('GET', 'HEAD')):
+            max_staleness = cfg.CONF.api.replica_max_staleness
+        else:
+            max_staleness = None
+        state.request.dbapi.allow_replica_reads(max_staleness)
+
+    def after(self, state):
+        # The 'before' hooks are not run for unknown routes, so the
+        # request may have none of the attributes set there.
+        db = dbapi.get_instance()
+        db.allow_replica_reads(None)
+        query_count = getattr(state.request, 'query_count', None)
+        if cfg.CONF.api.db_query_count_header and query_count is not None:
+            state.response.headers['X-OpenStack-Ironic-DB-Queries'] = str(
+                db.get_query_count() - query_count)
 
 
 class ContextHook(hooks.PecanHook):
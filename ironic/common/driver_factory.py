@@ -411,6 +411,28 @@ def enabled_supported_interfaces(hardware_type):
     return mapping
 
 
+class _EnabledNameDispatchExtensionManager(
+        dispatch.NameDispatchExtensionManager):
+    """NameDispatchExtensionManager only loading the enabled extensions.
+
+    stevedore imports and instantiates every plugin of the namespace before
+    calling the check function, so that all the classic drivers, hardware
+    types and interfaces available were imported at startup, with their
+    third party libraries, even if only a few of them were enabled. The
+    check function only needs the name of the extension, so call it with
+    the entry point to skip the disabled ones before they are loaded.
+    """
+
+    def _load_one_plugin(self, ep, *args, **kwargs):
+        if not self.check_func(ep):
+            LOG.debug('Skipping extension %(name)s of %(namespace)s, it is '
+                      'not enabled', {'name': ep.name,
+                                      'namespace': self.namespace})
+            return None
+        return super(_EnabledNameDispatchExtensionManager,
+                     self)._load_one_plugin(ep, *args, **kwargs)
+
+
 class BaseDriverFactory(object):
     """Discover, load and manage the drivers available.
 
@@ -497,10 +519,12 @@ class BaseDriverFactory(object):
                 raise exc
 
         def _check_func(ext):
+            # NOTE: also called with entry points, see
+            # _EnabledNameDispatchExtensionManager.
             return ext.name in cls._enabled_driver_list
 
         cls._extension_manager = (
-            dispatch.NameDispatchExtensionManager(
+            _EnabledNameDispatchExtensionManager(
                 cls._entrypoint_name,
                 _check_func,
                 invoke_on_load=True,
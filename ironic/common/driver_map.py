@@ -0,0 +1,123 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of the drivers and hardware types of the active conductors.
+
+Listing the drivers in the API and building the hash ring both need to
+know which conductors support which drivers and hardware types. This only
+changes when conductors join or leave the cluster, so the information is
+read from the database at most every [DEFAULT]driver_map_refresh_interval
+seconds, and shared by all the users within a process.
+"""
+
+import threading
+import time
+
+from ironic.conf import CONF
+from ironic.db import api as dbapi
+
+
+class Snapshot(object):
+    """The drivers and hardware types supported at some point in time.
+
+    A new snapshot is only created when the drivers or the hardware types
+    supported by the active conductors change, so the identity of the
+    snapshot can be used as a key for the information derived from it.
+    """
+
+    def __init__(self, drivers, hardware_types):
+        self.drivers = drivers
+        """Dict mapping the classic driver names to sets of hostnames."""
+
+        self.hardware_types = hardware_types
+        """Dict mapping the hardware type names to sets of hostnames."""
+
+        self.interfaces = None
+        """The interfaces of the hardware types, loaded on demand."""
+
+
+class DriverMap(object):
+    """The drivers and hardware types supported by the active conductors.
+
+    All instances share the same cached data.
+    """
+
+    _snapshot = None
+    _loaded_at = 0
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.dbapi = dbapi.get_instance()
+
+    def get_snapshot(self):
+        """Get the current snapshot, refreshing it if it is too old.
+
+        :returns: a Snapshot object.
+        """
+        cls = self.__class__
+        limit = time.time() - CONF.driver_map_refresh_interval
+        # Hot path, no lock
+        snapshot = cls._snapshot
+        if snapshot is not None and cls._loaded_at > limit:
+            return snapshot
+
+        with cls._lock:
+            if cls._snapshot is None or cls._loaded_at <= limit:
+                drivers = self.dbapi.get_active_driver_dict()
+                hardware_types = self.dbapi.get_active_hardware_type_dict()
+                if (cls._snapshot is not None
+                        and cls._snapshot.drivers == drivers
+                        and cls._snapshot.hardware_types == hardware_types):
+                    # The membership did not change, keep the snapshot
+                    # (and whatever was derived from it), but reload the
+                    # interfaces in case a conductor was restarted.
+                    cls._snapshot.interfaces = None
+                else:
+                    cls._snapshot = Snapshot(drivers, hardware_types)
+                cls._loaded_at = time.time()
+            return cls._snapshot
+
+    def get_active_driver_dict(self):
+        """Get the classic drivers supported by the active conductors.
+
+        :returns: a dict mapping driver names to sets of hostnames.
+        """
+        return dict(self.get_snapshot().drivers)
+
+    def get_active_hardware_type_dict(self):
+        """Get the hardware types supported by the active conductors.
+
+        :returns: a dict mapping hardware type names to sets of hostnames.
+        """
+        return dict(self.get_snapshot().hardware_types)
+
+    def list_hardware_type_interfaces(self, hardware_types):
+        """List the interfaces of the hardware types.
+
+        :param hardware_types: a list of hardware type names.
+        :returns: a list of ConductorHardwareInterfaces database models.
+        """
+        snapshot = self.get_snapshot()
+        interfaces = snapshot.interfaces
+        if interfaces is None:
+            interfaces = self.dbapi.list_hardware_type_interfaces(
+                list(snapshot.hardware_types))
+            snapshot.interfaces = interfaces
+        return [iface for iface in interfaces
+                if iface['hardware_type'] in hardware_types]
+
+    @classmethod
+    def reset(cls):
+        """Discard the cached data, it will be reloaded on the next use."""
+        with cls._lock:
+            cls._snapshot = None
+            cls._loaded_at = 0
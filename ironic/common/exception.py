@@ -424,6 +424,10 @@ class VolumeTargetNotFound(NotFound):
     _msg_fmt = _("Volume target %(target)s could not be found.")
 
 
+class JobNotFound(NotFound):
+    _msg_fmt = _("Job %(job)s could not be found.")
+
+
 class DriverNameConflict(IronicException):
     _msg_fmt = _("Classic and dynamic drivers cannot have the "
                  "same names '%(names)s'.")
@@ -21,6 +21,7 @@ import time
 
 from glanceclient import client
 from glanceclient import exc as glance_exc
+from ironic_lib import metrics_utils
 from oslo_config import cfg
 from oslo_log import log
 import sendfile
@@ -28,6 +29,7 @@ import six
 import six.moves.urllib.parse as urlparse
 
 from ironic.common import exception
+from ironic.common.glance_service import metadata_cache
 from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _LE
 
@@ -35,6 +37,8 @@ from ironic.common.i18n import _LE
 LOG = log.getLogger(__name__)
 CONF = cfg.CONF
 
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
 
 def _translate_image_exception(image_id, exc_value):
     if isinstance(exc_value, (glance_exc.Forbidden,
@@ -178,17 +182,26 @@ class BaseImageService(object):
 
         :raises: ImageNotFound
         """
-        LOG.debug("Getting image metadata from glance. Image: %s",
-                  image_href)
         (image_id, self.glance_host,
          self.glance_port, use_ssl) = service_utils.parse_image_ref(image_href)
 
+        cached = metadata_cache.CACHE.get(self.context, image_id)
+        if cached is not None:
+            METRICS.send_counter('GlanceImageService.metadata_cache_hit', 1)
+            LOG.debug("Using the cached metadata of image %s", image_href)
+            return cached
+
+        LOG.debug("Getting image metadata from glance. Image: %s",
+                  image_href)
         image = self.call(method, image_id)
 
         if not service_utils.is_image_available(self.context, image):
             raise exception.ImageNotFound(image_id=image_id)
 
         base_image_meta = service_utils.translate_from_glance(image)
+        if CONF.glance.image_metadata_cache_ttl:
+            METRICS.send_counter('GlanceImageService.metadata_cache_miss', 1)
+            metadata_cache.CACHE.set(self.context, image_id, base_image_meta)
         return base_image_meta
 
     @check_image_service
@@ -265,10 +278,12 @@ class BaseImageService(object):
         # passed in by calling code. Let's be nice and ignore it.
         image_meta.pop('id', None)
 
+        metadata_cache.CACHE.invalidate(image_id)
         image_meta = self.call(method, image_id, **image_meta)
 
         if self.version == 2 and data:
             self.call('upload', image_id, data)
+            metadata_cache.CACHE.invalidate(image_id)
             image_meta = self._show(image_id)
 
         return image_meta
@@ -287,4 +302,5 @@ class BaseImageService(object):
         (image_id, glance_host,
          glance_port, use_ssl) = service_utils.parse_image_ref(image_id)
 
+        metadata_cache.CACHE.invalidate(image_id)
         self.call(method, image_id)
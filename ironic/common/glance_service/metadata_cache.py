@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of the metadata of the Glance images.
+
+The metadata of the instance and deploy images is requested from Glance by
+the validation, the preparation and the deployment of every node, for
+instance to find out whether an image is a whole disk image or to build
+its Swift temporary URL. During a mass deployment of the same image, the
+cache answers the repeated requests without calling Glance.
+
+The cache is local to a process. The entries are per image, project and
+admin status, since the visibility of the images depends on the project of
+the request and on whether it is made by an administrator, and expire after
+[glance]image_metadata_cache_ttl seconds. The entries of an image are
+invalidated when it is updated or deleted through the same process, and
+when fetching it again shows that its ``updated_at`` changed, so that the
+change is seen by all the projects at once. A cached entry is returned
+without asking Glance, so the changes made outside of the process are only
+seen once the entry expires.
+"""
+
+import collections
+import copy
+import time
+
+from oslo_config import cfg
+
+
+CONF = cfg.CONF
+
+_MAX_SIZE = 1000
+"""Maximum number of entries, the oldest ones are evicted first."""
+
+
+class MetadataCache(object):
+    """Time-limited cache of the metadata of the Glance images."""
+
+    def __init__(self, max_size=_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+
+    @staticmethod
+    def _key(context, image_id):
+        return (image_id, getattr(context, 'project_id', None),
+                bool(getattr(context, 'is_admin', False)))
+
+    def get(self, context, image_id):
+        """Get the metadata of an image.
+
+        :param context: The request context.
+        :param image_id: The UUID of the image.
+        :returns: A copy of the metadata, as returned by
+                  service_utils.translate_from_glance(), or None if the image
+                  is not cached.
+        """
+        if not CONF.glance.image_metadata_cache_ttl:
+            return None
+
+        key = self._key(context, image_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, image_meta = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        return copy.deepcopy(image_meta)
+
+    def set(self, context, image_id, image_meta):
+        """Cache the metadata of an image.
+
+        The entries of the image for the other projects are invalidated if
+        its ``updated_at`` changed.
+
+        :param context: The request context.
+        :param image_id: The UUID of the image.
+        :param image_meta: The metadata, as returned by
+                           service_utils.translate_from_glance().
+        """
+        ttl = CONF.glance.image_metadata_cache_ttl
+        if not ttl:
+            return
+
+        updated_at = image_meta.get('updated_at')
+        stale = [key for key, (expires_at, cached) in self._entries.items()
+                 if key[0] == image_id and
+                 cached.get('updated_at') != updated_at]
+        for key in stale:
+            del self._entries[key]
+
+        key = self._key(context, image_id)
+        self._entries.pop(key, None)
+        while len(self._entries) >= self.max_size:
+            self._entries.popitem(last=False)
+        self._entries[key] = (time.time() + ttl, copy.deepcopy(image_meta))
+
+    def invalidate(self, image_id):
+        """Remove the entries of an image, for all the projects.
+
+        :param image_id: The UUID of the image.
+        """
+        stale = [key for key in self._entries if key[0] == image_id]
+        for key in stale:
+            del self._entries[key]
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+
+CACHE = MetadataCache()
@@ -16,6 +16,8 @@
 import collections
 import time
 
+from ironic_lib import metrics_utils
+from oslo_log import log
 from oslo_utils import uuidutils
 from six.moves.urllib import parse as urlparse
 from swiftclient import utils as swift_utils
@@ -27,22 +29,34 @@ from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _
 from ironic.conf import CONF
 
+LOG = log.getLogger(__name__)
+
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
 TempUrlCacheElement = collections.namedtuple('TempUrlCacheElement',
-                                             ['url', 'url_expires_at'])
+                                             ['url', 'url_expires_at',
+                                              'image_updated_at'])
+# NOTE: image_updated_at is optional, None standing for an image which was
+# never updated.
+TempUrlCacheElement.__new__.__defaults__ = (None,)
+
+_TEMP_URL_CACHE_MAX_SIZE = 1000
+"""Maximum number of cached temp URLs, the oldest ones are evicted first."""
 
 
 class GlanceImageService(base_image_service.BaseImageService,
                          service.ImageService):
 
-    # A dictionary containing cached temp URLs in namedtuples
-    # in format:
+    # A dictionary containing cached temp URLs in namedtuples, the oldest
+    # first, in format:
     # {
     #     <image_id> : (
     #          url=<temp_url>,
-    #          url_expires_at=<expiration_time>
+    #          url_expires_at=<expiration_time>,
+    #          image_updated_at=<updated_at of the image>
     #     )
     # }
-    _cache = {}
+    _cache = collections.OrderedDict()
 
     def detail(self, **kwargs):
         return self._detail(method='list', **kwargs)
@@ -66,11 +80,13 @@ class GlanceImageService(base_image_service.BaseImageService,
         return self._delete(image_id, method='delete')
 
     def _generate_temp_url(self, path, seconds, key, method, endpoint,
-                           image_id):
+                           image_id, image_updated_at=None):
         """Get Swift temporary URL.
 
         Generates (or returns the cached one if caching is enabled) a
         temporary URL that gives unauthenticated access to the Swift object.
+        A cached URL is not used if the image was updated since it was
+        generated.
 
         :param path: The full path to the Swift object. Example:
             /v1/AUTH_account/c/o.
@@ -81,13 +97,23 @@ class GlanceImageService(base_image_service.BaseImageService,
             this temporary URL.
         :param endpoint: Endpoint URL of Swift service.
         :param image_id: UUID of a Glance image.
+        :param image_updated_at: the time the Glance image was last updated.
         :returns: temporary URL
         """
 
         if CONF.glance.swift_temp_url_cache_enabled:
             self._remove_expired_items_from_cache()
-            if image_id in self._cache:
-                return self._cache[image_id].url
+            cached = self._cache.get(image_id)
+            if (cached is not None and
+                    cached.image_updated_at == image_updated_at):
+                METRICS.send_counter('GlanceImageService.temp_url_cache_hit',
+                                     1)
+                return cached.url
+            if cached is not None:
+                LOG.debug('Image %s was updated since its cached temporary '
+                          'URL was generated, generating a new one.',
+                          image_id)
+            METRICS.send_counter('GlanceImageService.temp_url_cache_miss', 1)
 
         path = swift_utils.generate_temp_url(
             path=path, seconds=seconds, key=key, method=method)
@@ -98,8 +124,12 @@ class GlanceImageService(base_image_service.BaseImageService,
         if CONF.glance.swift_temp_url_cache_enabled:
             query = urlparse.urlparse(temp_url).query
             exp_time_str = dict(urlparse.parse_qsl(query))['temp_url_expires']
+            self._cache.pop(image_id, None)
+            while len(self._cache) >= _TEMP_URL_CACHE_MAX_SIZE:
+                self._cache.popitem(last=False)
             self._cache[image_id] = TempUrlCacheElement(
-                url=temp_url, url_expires_at=int(exp_time_str)
+                url=temp_url, url_expires_at=int(exp_time_str),
+                image_updated_at=image_updated_at
             )
 
         return temp_url
@@ -170,7 +200,8 @@ class GlanceImageService(base_image_service.BaseImageService,
             key=CONF.glance.swift_temp_url_key,
             method='GET',
             endpoint=endpoint_url,
-            image_id=image_id
+            image_id=image_id,
+            image_updated_at=image_info.get('updated_at')
         )
 
     def _validate_temp_url_config(self):
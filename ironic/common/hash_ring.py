@@ -18,39 +18,48 @@ import time
 
 from tooz import hashring
 
+from ironic.common import driver_map
 from ironic.common import exception
 from ironic.common.i18n import _
 from ironic.conf import CONF
-from ironic.db import api as dbapi
 
 
 class HashRingManager(object):
     _hash_rings = None
+    _snapshot = None
     _lock = threading.Lock()
 
     def __init__(self):
-        self.dbapi = dbapi.get_instance()
+        self.driver_map = driver_map.DriverMap()
         self.updated_at = time.time()
 
     @property
     def ring(self):
         interval = CONF.hash_ring_reset_interval
         limit = time.time() - interval
+        if self.updated_at < limit:
+            driver_map.DriverMap.reset()
+        snapshot = self.driver_map.get_snapshot()
         # Hot path, no lock
-        if self.__class__._hash_rings is not None and self.updated_at >= limit:
+        if (self.__class__._hash_rings is not None
+                and self.__class__._snapshot is snapshot
+                and self.updated_at >= limit):
             return self.__class__._hash_rings
 
         with self._lock:
-            if self.__class__._hash_rings is None or self.updated_at < limit:
-                rings = self._load_hash_rings()
+            if (self.__class__._hash_rings is None
+                    or self.__class__._snapshot is not snapshot
+                    or self.updated_at < limit):
+                rings = self._load_hash_rings(snapshot)
                 self.__class__._hash_rings = rings
+                self.__class__._snapshot = snapshot
                 self.updated_at = time.time()
             return self.__class__._hash_rings
 
-    def _load_hash_rings(self):
+    def _load_hash_rings(self, snapshot):
         rings = {}
-        d2c = self.dbapi.get_active_driver_dict()
-        d2c.update(self.dbapi.get_active_hardware_type_dict())
+        d2c = dict(snapshot.drivers)
+        d2c.update(snapshot.hardware_types)
 
         for driver_name, hosts in d2c.items():
             rings[driver_name] = hashring.HashRing(
@@ -61,6 +70,7 @@ class HashRingManager(object):
     def reset(cls):
         with cls._lock:
             cls._hash_rings = None
+        driver_map.DriverMap.reset()
 
     def __getitem__(self, driver_name):
         try:
@@ -18,9 +18,12 @@
 import abc
 import datetime
 import os
-import shutil
+import time
 
+import eventlet
+from oslo_log import log as logging
 from oslo_utils import importutils
+from oslo_utils import units
 import requests
 import sendfile
 import six
@@ -28,11 +31,13 @@ from six.moves import http_client
 import six.moves.urllib.parse as urlparse
 
 from ironic.common import exception
-from ironic.common.i18n import _
+from ironic.common.i18n import _, _LW
 from ironic.common import keystone
 from ironic.common import utils
 from ironic.conf import CONF
 
+LOG = logging.getLogger(__name__)
+
 IMAGE_CHUNK_SIZE = 1024 * 1024  # 1mb
 
 _GLANCE_SESSION = None
@@ -60,6 +65,53 @@ def GlanceImageService(client=None, version=None, context=None):
     return service_class(client, version, context)
 
 
+class _BandwidthBudget(object):
+    """Bandwidth shared by the downloads of images over HTTP of the process.
+
+    A token bucket refilled at [DEFAULT]image_download_bandwidth MiB/s and
+    holding up to one second of it. The downloads consume it as they
+    receive data, and sleep while it is exhausted.
+    """
+
+    def __init__(self):
+        self._available = 0
+        self._updated = time.time()
+
+    def consume(self, amount):
+        """Consume bandwidth, sleeping until it is available.
+
+        :param amount: the number of bytes received.
+        """
+        rate = CONF.image_download_bandwidth * units.Mi
+        if not rate:
+            return
+        now = time.time()
+        self._available = min(
+            rate, self._available + (now - self._updated) * rate)
+        self._updated = now
+        self._available -= amount
+        if self._available < 0:
+            time.sleep(-self._available / float(rate))
+
+
+_BANDWIDTH = _BandwidthBudget()
+
+
+def _pwrite(fd, data, offset):
+    """Write data at an offset of a file descriptor."""
+    view = memoryview(data)
+    while len(view):
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            # NOTE: there is no os.pwrite on Python 2, the callers do not
+            # share the file descriptor
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
 @six.add_metaclass(abc.ABCMeta)
 class BaseImageService(object):
     """Provides retrieval of disk images."""
@@ -121,9 +173,122 @@ class HttpImageService(BaseImageService):
                                                      reason=e)
         return response
 
+    def _get(self, image_href, start=None, end=None):
+        """Send a GET request for an image, or a range of it."""
+        # NOTE: the ranges are ranges of the image, not of a compressed
+        # version of it
+        headers = {'Accept-Encoding': 'identity'}
+        expected = http_client.OK
+        if start is not None:
+            headers['Range'] = 'bytes=%d-%d' % (start, end - 1)
+            expected = http_client.PARTIAL_CONTENT
+        response = requests.get(image_href, stream=True, headers=headers)
+        if response.status_code != expected:
+            response.close()
+            raise exception.ImageRefValidationFailed(
+                image_href=image_href,
+                reason=_("Got HTTP code %(code)s instead of %(expected)s in "
+                         "response to GET request.") %
+                {'code': response.status_code, 'expected': expected})
+        return response
+
+    def _copy(self, image_href, response, write, start, end, retries):
+        """Copy a range of an image, resuming it after failures.
+
+        :param image_href: Image reference.
+        :param response: the response to a GET request of the image
+            starting at start, or None to send a request for the range.
+        :param write: function writing data at an offset of the image.
+        :param start: the offset of the range in the image.
+        :param end: the end of the range, None if the size of the image is
+            not known.
+        :param retries: how many times the download can be resumed with a
+            range request.
+        :raises: exception.ImageDownloadFailed if the download failed more
+            than retries times.
+        """
+        offset = start
+        while True:
+            try:
+                if response is None:
+                    response = self._get(image_href, offset, end)
+                try:
+                    for chunk in response.iter_content(IMAGE_CHUNK_SIZE):
+                        if end is not None:
+                            chunk = chunk[:end - offset]
+                        _BANDWIDTH.consume(len(chunk))
+                        write(chunk, offset)
+                        offset += len(chunk)
+                        if offset == end:
+                            return
+                finally:
+                    response.close()
+                    response = None
+                if end is None:
+                    return
+                reason = _("the connection was closed after %d bytes"
+                           ) % offset
+            except requests.RequestException as e:
+                reason = e
+            if not retries:
+                raise exception.ImageDownloadFailed(image_href=image_href,
+                                                    reason=reason)
+            retries -= 1
+            LOG.warning(_LW("Resuming the download of image %(href)s at "
+                            "byte %(offset)d after a failure: %(reason)s"),
+                        {'href': image_href, 'offset': offset,
+                         'reason': reason})
+
+    def _copy_segments(self, image_href, response, image_file, size, count,
+                       retries):
+        """Copy an image with one range request per segment, in parallel.
+
+        :param image_href: Image reference.
+        :param response: the response to the GET request of the whole
+            image, used for its first segment.
+        :param image_file: File object to write data to.
+        :param size: the size of the image.
+        :param count: the number of segments.
+        :param retries: how many times the download of each segment can be
+            resumed.
+        """
+        # NOTE: the segments are written at their offset in the file, which
+        # has the size of the image from the start
+        os.ftruncate(image_file.fileno(), size)
+        bounds = [size * i // count for i in range(count + 1)]
+
+        def _copy_segment(index, response):
+            # NOTE: the errors are returned, eventlet would log them
+            try:
+                fd = os.open(image_file.name, os.O_WRONLY)
+                try:
+                    self._copy(image_href, response,
+                               lambda data, offset: _pwrite(fd, data, offset),
+                               bounds[index], bounds[index + 1], retries)
+                finally:
+                    os.close(fd)
+            except Exception as e:
+                return e
+
+        pool = eventlet.GreenPool(count)
+        threads = [pool.spawn(_copy_segment, index,
+                              response if index == 0 else None)
+                   for index in range(count)]
+        for thread in threads:
+            error = thread.wait()
+            if error is not None:
+                for other in threads:
+                    other.kill()
+                raise error
+
     def download(self, image_href, image_file):
         """Downloads image to specified location.
 
+        If the server supports range requests, the download is resumed
+        after connection failures, and images larger than
+        [DEFAULT]image_download_segment_size are downloaded with up to
+        [DEFAULT]image_download_connections connections in parallel.
+
         :param image_href: Image reference.
         :param image_file: File object to write data to.
         :raises: exception.ImageRefValidationFailed if GET request returned
@@ -133,14 +298,25 @@ class HttpImageService(BaseImageService):
             * GET request failed.
         """
         try:
-            response = requests.get(image_href, stream=True)
-            if response.status_code != http_client.OK:
-                raise exception.ImageRefValidationFailed(
-                    image_href=image_href,
-                    reason=_("Got HTTP code %s instead of 200 in response to "
-                             "GET request.") % response.status_code)
-            with response.raw as input_img:
-                shutil.copyfileobj(input_img, image_file, IMAGE_CHUNK_SIZE)
+            response = self._get(image_href)
+            size = response.headers.get('Content-Length')
+            size = int(size) if size is not None else None
+            if (size is None or
+                    response.headers.get('Accept-Ranges') != 'bytes'):
+                retries = 0
+                count = 1
+            else:
+                retries = CONF.image_download_retries
+                count = max(1, min(
+                    CONF.image_download_connections,
+                    size // (CONF.image_download_segment_size * units.Mi)))
+            if count > 1:
+                self._copy_segments(image_href, response, image_file, size,
+                                    count, retries)
+            else:
+                self._copy(image_href, response,
+                           lambda data, offset: image_file.write(data),
+                           0, size, retries)
         except (requests.RequestException, IOError) as e:
             raise exception.ImageDownloadFailed(image_href=image_href,
                                                 reason=e)
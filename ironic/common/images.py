@@ -292,7 +292,182 @@ def create_isolinux_image_for_uefi(output_file, deploy_iso, kernel, ramdisk,
             raise exception.ImageCreationFailed(image_type='iso', error=e)
 
 
-def fetch(context, image_href, path, force_raw=False):
+_HEADER_SIZE = 512
+"""Number of bytes at the start of an image used to detect its format."""
+
+_SPARSE_BLOCK_SIZE = 4096
+"""Size of the blocks of zeros skipped when writing an image to the disk."""
+
+_ZEROS = b'\x00' * _SPARSE_BLOCK_SIZE
+
+# The signatures of the image formats detected by qemu-img, as tuples
+# (format, offset, magic). An image matching none of them is raw.
+_FORMAT_SIGNATURES = (
+    ('qcow2', 0, b'QFI\xfb'),
+    ('qed', 0, b'QED\x00'),
+    ('vmdk', 0, b'KDMV'),
+    ('vmdk', 0, b'COWD'),
+    ('vmdk', 0, b'# Disk Descriptor'),
+    ('vdi', 64, b'\x7f\x10\xda\xbe'),
+    ('vhdx', 0, b'vhdxfile'),
+    ('vpc', 0, b'conectix'),
+    ('parallels', 0, b'WithoutFreeSpace'),
+    ('parallels', 0, b'WithouFreSpacExt'),
+    ('bochs', 0, b'Bochs Virtual HD Image'),
+    ('cloop', 0, b'#!/bin/sh\n#V2.0 Format\n'),
+    ('luks', 0, b'LUKS\xba\xbe'),
+)
+
+
+def detect_format(header):
+    """Detect the format of an image from its first bytes.
+
+    :param header: the first bytes of the image, at least 512 unless the
+                   image is smaller.
+    :returns: the format of the image as named by qemu-img, 'raw' if it
+              does not match any other format.
+    """
+    for fmt, offset, magic in _FORMAT_SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return fmt
+    return 'raw'
+
+
+class _ImageWriter(object):
+    """File object writing an image to the disk as it is downloaded.
+
+    The image services write the image to it like to a regular file. Its
+    checksum, if needed, is computed and its first bytes are kept while it
+    is written, so that the file is not read again to verify it or to detect
+    its format.
+    The blocks of zeros are skipped instead of written, leaving holes in the
+    file, so that the disk space used is proportional to the actual data of
+    the image.
+
+    The image services which copy the image with the file descriptor, or
+    replace the file with a link, bypass the writer: only the first bytes
+    of the file are then read by finish(), and the file is read again if
+    its checksum is needed.
+    """
+
+    def __init__(self, image_file, *hash_algos):
+        """Constructor.
+
+        :param image_file: the file object to write the image to.
+        :param hash_algos: the hashlib algorithms of the checksums to
+                           compute, none to not compute any checksum.
+        """
+        self._file = image_file
+        self._hash_algos = hash_algos
+        self._checksums = [utils._get_hash_object(hash_algo)
+                           for hash_algo in hash_algos]
+        self._header = b''
+        self._bypassed = False
+        self.size = 0
+
+    @property
+    def name(self):
+        return self._file.name
+
+    def fileno(self):
+        self._bypassed = True
+        return self._file.fileno()
+
+    def close(self):
+        self._bypassed = True
+        self._file.close()
+
+    def write(self, data):
+        data = bytes(data)
+        for checksum in self._checksums:
+            checksum.update(data)
+        if len(self._header) < _HEADER_SIZE:
+            self._header += data[:_HEADER_SIZE - len(self._header)]
+
+        view = memoryview(data)
+        end = len(view)
+        # NOTE: the blocks are aligned on the offset in the file, so that
+        # the holes left match the blocks of the file system
+        first = _SPARSE_BLOCK_SIZE - self.size % _SPARSE_BLOCK_SIZE
+        blocks = [0]
+        blocks.extend(range(first, end, _SPARSE_BLOCK_SIZE))
+        blocks.append(end)
+        start = 0
+        zeros = None
+        for block_start, block_end in zip(blocks, blocks[1:]):
+            size = block_end - block_start
+            # NOTE: comparing bytes is much faster than comparing views
+            block_zeros = data[block_start:block_end] == (
+                _ZEROS if size == _SPARSE_BLOCK_SIZE else _ZEROS[:size])
+            if block_zeros != zeros and block_start > start:
+                # Write or skip the previous blocks of the same kind at once
+                self._flush(view[start:block_start], zeros)
+                start = block_start
+            zeros = block_zeros
+        if end > start:
+            self._flush(view[start:end], zeros)
+        self.size += end
+
+    def _flush(self, view, zeros):
+        if zeros:
+            self._file.seek(len(view), os.SEEK_CUR)
+        else:
+            self._file.write(view)
+
+    def finish(self):
+        """Complete the file once the image is downloaded.
+
+        Sets the size of the file, which is not extended by the holes at its
+        end, or reads the first bytes of the image if the image service
+        bypassed the writer.
+        """
+        if self._bypassed:
+            with open(self.name, 'rb') as image_file:
+                self._header = image_file.read(_HEADER_SIZE)
+            self.size = os.path.getsize(self.name)
+        else:
+            self._file.truncate(self.size)
+
+    @property
+    def format(self):
+        """The format of the image, detected from its first bytes."""
+        return detect_format(self._header)
+
+    def hexdigest(self, hash_algo=None):
+        """A checksum of the image, as a string of hexadecimal digits.
+
+        :param hash_algo: the algorithm of the checksum, one of hash_algos.
+                          Defaults to the first of them.
+        :returns: the checksum, or None if no hash_algos were given.
+        """
+        if not self._hash_algos:
+            return None
+        index = (self._hash_algos.index(hash_algo)
+                 if hash_algo is not None else 0)
+        if self._bypassed:
+            with open(self.name, 'rb') as image_file:
+                return utils.hash_file(image_file, self._hash_algos[index])
+        return self._checksums[index].hexdigest()
+
+
+def fetch(context, image_href, path, force_raw=False, checksum=None,
+          hash_algo=None):
+    """Download an image to a file.
+
+    The image is written to the file in a single pass, see _ImageWriter.
+
+    :param context: the context.
+    :param image_href: href of the image.
+    :param path: the path of the file to write the image to.
+    :param force_raw: whether to convert the image to the raw format.
+    :param checksum: if not None, the expected MD5 checksum of the image.
+    :param hash_algo: if not None, the hashlib algorithm of a checksum of
+                      the image to compute while it is downloaded.
+    :raises: ImageDownloadFailed if the checksum of the image is not the
+             expected one.
+    :returns: a tuple of the format of the image, as downloaded, and its
+              checksum computed with hash_algo, None if hash_algo is None.
+    """
     # TODO(vish): Improve context handling and add owner and auth data
     #             when it is added to glance.  Right now there is no
     #             auth checking in glance, so we assume that access was
@@ -303,12 +478,32 @@ def fetch(context, image_href, path, force_raw=False):
               {'image_service': image_service.__class__,
                'image_href': image_href})
 
-    with fileutils.remove_path_on_error(path):
-        with open(path, "wb") as image_file:
-            image_service.download(image_href, image_file)
-
+    path_tmp = "%s.part" % path if force_raw else path
+    with fileutils.remove_path_on_error(path_tmp):
+        with open(path_tmp, "wb") as image_file:
+            hash_algos = [hash_algo] if hash_algo is not None else []
+            if checksum is not None and hash_algo != 'md5':
+                hash_algos.append('md5')
+            writer = _ImageWriter(image_file, *hash_algos)
+            image_service.download(image_href, writer)
+            writer.finish()
+        if checksum is not None:
+            actual = writer.hexdigest('md5')
+            if actual != checksum:
+                raise exception.ImageDownloadFailed(
+                    image_href=image_href,
+                    reason=_("its checksum is %(actual)s instead of "
+                             "%(expected)s") %
+                    {'actual': actual, 'expected': checksum})
+
+    fmt = writer.format
     if force_raw:
-        image_to_raw(image_href, path, "%s.part" % path)
+        if fmt == 'raw':
+            # NOTE: qemu-img would not find a backing file in a raw image
+            os.rename(path_tmp, path)
+        else:
+            image_to_raw(image_href, path, path_tmp)
+    return fmt, writer.hexdigest(hash_algo) if hash_algo is not None else None
 
 
 def image_to_raw(image_href, path, path_tmp):
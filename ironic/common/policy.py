@@ -224,6 +224,14 @@ volume_policies = [
                                    'records'),
 ]
 
+job_policies = [
+    policy.RuleDefault('baremetal:job:get',
+                       'rule:is_admin or rule:is_observer',
+                       description='Retrieve asynchronous job records, '
+                                   'which also requires the policy of the '
+                                   'node action run by the job'),
+]
+
 
 def list_policies():
     policies = (default_policies
@@ -233,7 +241,8 @@ def list_policies():
                 + chassis_policies
                 + driver_policies
                 + extra_policies
-                + volume_policies)
+                + volume_policies
+                + job_policies)
     return policies
 
 
@@ -15,6 +15,7 @@
 # under the License.
 
 import signal
+import time
 
 from oslo_log import log
 import oslo_messaging as messaging
@@ -34,7 +35,12 @@ class RPCService(service.Service):
     def __init__(self, host, manager_module, manager_class):
         super(RPCService, self).__init__()
         self.host = host
+        start = time.time()
+        manager_module_name = manager_module
         manager_module = importutils.try_import(manager_module)
+        LOG.info(_LI('Imported %(module)s in %(time).2f seconds.'),
+                 {'module': manager_module_name,
+                  'time': time.time() - start})
         manager_class = getattr(manager_module, manager_class)
         self.manager = manager_class(host, manager_module.MANAGER_TOPIC)
         self.topic = self.manager.topic
@@ -219,6 +219,26 @@ SOFT_POWER_OFF = 'soft power off'
 """ Node is in the process of soft power off. """
 
 
+############
+# Job states
+############
+
+JOB_PENDING = 'pending'
+""" Job is waiting for a conductor to run it. """
+
+JOB_RUNNING = 'running'
+""" Job is being run by a conductor. """
+
+JOB_SUCCESS = 'success'
+""" Job has completed successfully, its result is available. """
+
+JOB_FAILED = 'failed'
+""" Job has failed, its error is available. """
+
+JOB_FINISHED_STATES = (JOB_SUCCESS, JOB_FAILED)
+"""States of the jobs which will not change any more."""
+
+
 #####################
 # State machine model
 #####################
@@ -53,23 +53,39 @@ class SwiftAPI(object):
         :returns: The Swift UUID of the object
         :raises: SwiftOperationError, if any operation with Swift fails.
         """
+        with open(filename, "r") as fileobj:
+            return self.create_object_from_data(container, obj, fileobj,
+                                                object_headers=object_headers)
+
+    def create_object_from_data(self, container, obj, data,
+                                object_headers=None):
+        """Uploads the given data to Swift.
+
+        The data are sent as they are read, without being copied to a
+        temporary file first.
+
+        :param container: The name of the container for the object.
+        :param obj: The name of the object in Swift
+        :param data: The object data, as a string or a file object
+        :param object_headers: the headers for the object to pass to Swift
+        :returns: The Swift UUID of the object
+        :raises: SwiftOperationError, if any operation with Swift fails.
+        """
         try:
             self.connection.put_container(container)
         except swift_exceptions.ClientException as e:
             operation = _("put container")
             raise exception.SwiftOperationError(operation=operation, error=e)
 
-        with open(filename, "r") as fileobj:
-
-            try:
-                obj_uuid = self.connection.put_object(container,
-                                                      obj,
-                                                      fileobj,
-                                                      headers=object_headers)
-            except swift_exceptions.ClientException as e:
-                operation = _("put object")
-                raise exception.SwiftOperationError(operation=operation,
-                                                    error=e)
+        try:
+            obj_uuid = self.connection.put_object(container,
+                                                  obj,
+                                                  data,
+                                                  headers=object_headers)
+        except swift_exceptions.ClientException as e:
+            operation = _("put object")
+            raise exception.SwiftOperationError(operation=operation,
+                                                error=e)
 
         return obj_uuid
 
@@ -32,7 +32,6 @@ from oslo_concurrency import processutils
 from oslo_log import log as logging
 from oslo_utils import netutils
 from oslo_utils import timeutils
-import paramiko
 import pytz
 import six
 
@@ -87,6 +86,10 @@ def ssh_connect(connection):
     :raises: SSHConnectFailed
 
     """
+    # NOTE: imported here, only a few drivers use ssh and paramiko is slow
+    # to import, which delays the start of every service.
+    import paramiko
+
     try:
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
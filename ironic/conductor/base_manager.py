@@ -12,13 +12,16 @@
 
 """Base conductor manager functionality."""
 
+import collections
 import inspect
 import threading
+import time
 
 import eventlet
 import futurist
 from futurist import periodics
 from futurist import rejection
+from ironic_lib import metrics_utils
 from oslo_db import exception as db_exception
 from oslo_log import log
 from oslo_utils import excutils
@@ -41,6 +44,8 @@ from ironic.objects import fields as obj_fields
 
 LOG = log.getLogger(__name__)
 
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
 
 def _check_enabled_interfaces():
     """Sanity-check enabled_*_interfaces configs.
@@ -108,6 +113,10 @@ class BaseConductorManager(object):
 
         _check_enabled_interfaces()
 
+        # Duration of the phases of the startup, reported once started
+        timings = {}
+        phase_start = time.time()
+
         # NOTE(deva): these calls may raise DriverLoadError or DriverNotFound
         # NOTE(vdrok): Instantiate network and storage interface factory on
         # startup so that all the interfaces are loaded at the very
@@ -116,6 +125,7 @@ class BaseConductorManager(object):
         hardware_types = driver_factory.hardware_types()
         driver_factory.NetworkInterfaceFactory()
         driver_factory.StorageInterfaceFactory()
+        timings['drivers'] = time.time() - phase_start
 
         # NOTE(jroll) this is passed to the dbapi, which requires a list, not
         # a generator (which keys() returns in py3)
@@ -150,6 +160,7 @@ class BaseConductorManager(object):
         # same driver interface class is not traversed twice, otherwise
         # we'll have several instances of the same task.
         LOG.debug('Collecting periodic tasks')
+        phase_start = time.time()
         self._periodic_task_callables = []
         periodic_task_classes = set()
         self._collect_periodic_tasks(self, (admin_context,))
@@ -159,6 +170,7 @@ class BaseConductorManager(object):
                 if iface and iface.__class__ not in periodic_task_classes:
                     self._collect_periodic_tasks(iface, (self, admin_context))
                     periodic_task_classes.add(iface.__class__)
+        timings['periodic_tasks'] = time.time() - phase_start
 
         if (len(self._periodic_task_callables) >
                 CONF.conductor.workers_pool_size):
@@ -192,6 +204,7 @@ class BaseConductorManager(object):
 
         # register hardware types and interfaces supported by this conductor
         # and validate them against other conductors
+        phase_start = time.time()
         try:
             self._register_and_validate_hardware_interfaces(hardware_types)
         except (exception.DriverLoadError, exception.DriverNotFound,
@@ -201,6 +214,14 @@ class BaseConductorManager(object):
             with excutils.save_and_reraise_exception():
                 LOG.error(_LE('Failed to register hardware types. %s'), e)
                 self.del_host()
+        timings['hardware_interfaces'] = time.time() - phase_start
+
+        LOG.info(_LI('Conductor %(hostname)s startup phases: loaded drivers '
+                     'and interfaces in %(drivers).2f seconds, collected '
+                     'periodic tasks in %(periodic_tasks).2f seconds, '
+                     'registered hardware interfaces in '
+                     '%(hardware_interfaces).2f seconds.'),
+                 dict(timings, hostname=self.host))
 
         # Start periodic tasks
         self._periodic_tasks_worker = self._executor.submit(
@@ -278,7 +299,7 @@ class BaseConductorManager(object):
 
         Registers a row in the database for each combination of
         (hardware type, interface type, interface) that is supported and
-        enabled.
+        enabled. The rows are inserted together, at once.
 
         TODO: Validates against other conductors to check if the
         set of registered hardware interfaces for a given hardware type is the
@@ -295,15 +316,21 @@ class BaseConductorManager(object):
         # first unregister, in case we have cruft laying around
         self.conductor.unregister_all_hardware_interfaces()
 
+        interfaces = []
         for ht_name, ht in hardware_types.items():
             interface_map = driver_factory.enabled_supported_interfaces(ht)
             for interface_type, interface_names in interface_map.items():
                 default_interface = driver_factory.default_interface(
                     ht, interface_type, driver_name=ht_name)
-                self.conductor.register_hardware_interfaces(ht_name,
-                                                            interface_type,
-                                                            interface_names,
-                                                            default_interface)
+                interfaces.extend(
+                    {'hardware_type': ht_name,
+                     'interface_type': interface_type,
+                     'interface_name': interface_name,
+                     'default': interface_name == default_interface}
+                    for interface_name in interface_names)
+
+        # register all of them at once, with a single database statement
+        self.conductor.bulk_register_hardware_interfaces(interfaces)
 
         # TODO(jroll) validate against other conductor, warn if different
         # how do we do this performantly? :|
@@ -464,56 +491,95 @@ class BaseConductorManager(object):
             if workers_count >= CONF.conductor.periodic_max_workers:
                 break
 
+    @METRICS.timer('BaseConductorManager._start_consoles')
     def _start_consoles(self, context):
         """Start consoles if set enabled.
 
+        The consoles are started concurrently, up to
+        [console]restart_concurrency at a time, starting with the nodes
+        that have an instance.
+
         :param: context: request context
         """
         filters = {'console_enabled': True}
 
-        node_iter = self.iter_nodes(filters=filters)
+        nodes = list(self.iter_nodes(fields=['instance_uuid'],
+                                     filters=filters))
+        if not nodes:
+            return
 
-        for node_uuid, driver in node_iter:
-            try:
-                with task_manager.acquire(context, node_uuid, shared=False,
-                                          purpose='start console') as task:
+        # NOTE: the users of the nodes in use are the most likely to be
+        # waiting for their consoles, restart them first. The sort is
+        # stable, so that the nodes keep the database order otherwise.
+        nodes.sort(key=lambda node: node[2] is None)
+
+        LOG.info(_LI('Starting the consoles of %d nodes'), len(nodes))
+        results = collections.Counter()
+        remaining = len(nodes)
+        pool = eventlet.GreenPool(CONF.console.restart_concurrency)
+        for result in pool.imap(
+                lambda node: self._start_console(context, node[0]), nodes):
+            results[result] += 1
+            remaining -= 1
+            METRICS.send_counter(
+                'BaseConductorManager._start_consoles.%s' % result, 1)
+            METRICS.send_gauge(
+                'BaseConductorManager._start_consoles.remaining', remaining)
+
+        LOG.info(_LI('Started the consoles of %(started)d nodes, failed to '
+                     'start %(failed)d of them and skipped %(skipped)d '
+                     'nodes'),
+                 {'started': results['started'],
+                  'failed': results['failed'],
+                  'skipped': results['skipped']})
+
+    def _start_console(self, context, node_uuid):
+        """Start the console of a node while starting the conductor.
+
+        :param: context: request context
+        :param node_uuid: the UUID of the node.
+        :returns: 'started' if the console was started, 'failed' if it could
+                  not be started and was disabled, or 'skipped' if the node
+                  was locked or not found.
+        """
+        try:
+            with task_manager.acquire(context, node_uuid, shared=False,
+                                      purpose='start console') as task:
+                notify_utils.emit_console_notification(
+                    task, 'console_restore',
+                    obj_fields.NotificationStatus.START)
+                try:
+                    LOG.debug('Trying to start console of node %(node)s',
+                              {'node': node_uuid})
+                    task.driver.console.start_console(task)
+                    LOG.info(_LI('Successfully started console of node '
+                                 '%(node)s'), {'node': node_uuid})
                     notify_utils.emit_console_notification(
                         task, 'console_restore',
-                        obj_fields.NotificationStatus.START)
-                    try:
-                        LOG.debug('Trying to start console of node %(node)s',
-                                  {'node': node_uuid})
-                        task.driver.console.start_console(task)
-                        LOG.info(_LI('Successfully started console of node '
-                                     '%(node)s'), {'node': node_uuid})
-                        notify_utils.emit_console_notification(
-                            task, 'console_restore',
-                            obj_fields.NotificationStatus.END)
-                    except Exception as err:
-                        msg = (_('Failed to start console of node %(node)s '
-                                 'while starting the conductor, so changing '
-                                 'the console_enabled status to False, error: '
-                                 '%(err)s')
-                               % {'node': node_uuid, 'err': err})
-                        LOG.error(msg)
-                        # If starting console failed, set node console_enabled
-                        # back to False and set node's last error.
-                        task.node.last_error = msg
-                        task.node.console_enabled = False
-                        task.node.save()
-                        notify_utils.emit_console_notification(
-                            task, 'console_restore',
-                            obj_fields.NotificationStatus.ERROR)
-            except exception.NodeLocked:
-                LOG.warning(_LW('Node %(node)s is locked while trying to '
-                                'start console on conductor startup'),
-                            {'node': node_uuid})
-                continue
-            except exception.NodeNotFound:
-                LOG.warning(_LW("During starting console on conductor "
-                                "startup, node %(node)s was not found"),
-                            {'node': node_uuid})
-                continue
-            finally:
-                # Yield on every iteration
-                eventlet.sleep(0)
+                        obj_fields.NotificationStatus.END)
+                    return 'started'
+                except Exception as err:
+                    msg = (_('Failed to start console of node %(node)s '
+                             'while starting the conductor, so changing '
+                             'the console_enabled status to False, error: '
+                             '%(err)s')
+                           % {'node': node_uuid, 'err': err})
+                    LOG.error(msg)
+                    # If starting console failed, set node console_enabled
+                    # back to False and set node's last error.
+                    task.node.last_error = msg
+                    task.node.console_enabled = False
+                    task.node.save()
+                    notify_utils.emit_console_notification(
+                        task, 'console_restore',
+                        obj_fields.NotificationStatus.ERROR)
+                    return 'failed'
+        except exception.NodeLocked:
+            LOG.warning(_LW('Node %(node)s is locked while trying to '
+                            'start console on conductor startup'),
+                        {'node': node_uuid})
+        except exception.NodeNotFound:
+            LOG.warning(_LW("During starting console on conductor "
+                            "startup, node %(node)s was not found"),
+                        {'node': node_uuid})
+        return 'skipped'
@@ -44,17 +44,21 @@ notifying Neutron of a change, etc.
 
 import collections
 import datetime
+import glob
+import os
 from six.moves import queue
-import tempfile
+import time
 
 import eventlet
 from futurist import periodics
 from futurist import waiters
 from ironic_lib import metrics_utils
+from ironic_lib import utils as ironic_utils
 from oslo_log import log
 import oslo_messaging as messaging
 from oslo_utils import excutils
 from oslo_utils import uuidutils
+import six
 
 from ironic.common import driver_factory
 from ironic.common import exception
@@ -70,6 +74,7 @@ from ironic.conductor import utils
 from ironic.conf import CONF
 from ironic.drivers import base as drivers_base
 from ironic.drivers import hardware_type
+from ironic.drivers import utils as driver_utils
 from ironic import objects
 from ironic.objects import base as objects_base
 from ironic.objects import fields
@@ -82,12 +87,20 @@ METRICS = metrics_utils.get_metrics_logger(__name__)
 
 SYNC_EXCLUDED_STATES = (states.DEPLOYWAIT, states.CLEANWAIT, states.ENROLL)
 
+JOB_ACTIONS = frozenset(['change_node_power_state', 'vendor_passthru',
+                         'set_boot_device', 'get_boot_device',
+                         'validate_driver_interfaces', 'inspect_hardware'])
+"""RPC methods which can be run as asynchronous jobs."""
+
+_CONFIGDRIVE_HTTP_DIR = 'configdrive'
+"""Subdirectory of [deploy]http_root storing the config drives."""
+
 
 class ConductorManager(base_manager.BaseConductorManager):
     """Ironic Conductor manager main class."""
 
     # NOTE(rloo): This must be in sync with rpcapi.ConductorAPI's.
-    RPC_API_VERSION = '1.40'
+    RPC_API_VERSION = '1.42'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -135,7 +148,7 @@ class ConductorManager(base_manager.BaseConductorManager):
                                    exception.NodeLocked,
                                    exception.InvalidState,
                                    exception.DriverNotFound)
-    def update_node(self, context, node_obj):
+    def update_node(self, context, node_obj=None, node_delta=None):
         """Update a node with the supplied data.
 
         This method is the main "hub" for PUT and PATCH requests in the API.
@@ -144,11 +157,17 @@ class ConductorManager(base_manager.BaseConductorManager):
 
         :param context: an admin context
         :param node_obj: a changed (but not saved) node object.
+        :param node_delta: the changes of the node, as returned by
+            Node.obj_to_delta_primitive(). Used instead of node_obj
+            since RPC API version 1.42.
         :raises: NoValidDefaultForInterface if no default can be calculated
                  for some interfaces, and explicit values must be provided.
         :raises: MustBeNone if one or more of the node's interface
                  fields were specified when they should not be.
         """
+        if node_delta is not None:
+            node_obj = objects.Node.obj_from_delta_primitive(context,
+                                                            node_delta)
         node_id = node_obj.uuid
         LOG.debug("RPC update_node called for node %s.", node_id)
 
@@ -750,6 +769,7 @@ class ConductorManager(base_manager.BaseConductorManager):
             # because it is a reference to the most recent conductor which
             # deployed a node, and does not limit any future actions.
             # But we do need to clear the instance-related fields.
+            _delete_configdrive_from_http_server(node)
             node.instance_info = {}
             node.instance_uuid = None
             driver_internal_info = node.driver_internal_info
@@ -2654,6 +2674,98 @@ class ConductorManager(base_manager.BaseConductorManager):
                      "%(node_id)s"), {'vif_id': vif_id,
                                       'node_id': node_id})
 
+    @METRICS.timer('ConductorManager.run_job')
+    def run_job(self, context, job_uuid):
+        """RPC method to run an asynchronous job.
+
+        The job is run by a worker thread, which calls the RPC method
+        recorded in the job and stores its result or its error in the job.
+
+        :param context: request context.
+        :param job_uuid: UUID of the job.
+        """
+        LOG.debug('RPC run_job called for job %s', job_uuid)
+        try:
+            job = objects.Job.get_by_uuid(context, job_uuid)
+        except exception.JobNotFound:
+            LOG.warning(_LW('Job %s was deleted before it could be run'),
+                        job_uuid)
+            return
+
+        try:
+            self._spawn_worker(self._do_run_job, context, job)
+        except exception.NoFreeConductorWorker as e:
+            self._finish_job(job, error=e)
+
+    def _do_run_job(self, context, job):
+        job.state = states.JOB_RUNNING
+        job.save()
+
+        try:
+            if job.action not in JOB_ACTIONS:
+                raise exception.InvalidParameterValue(
+                    _('Action %s cannot be run as a job') % job.action)
+            method = getattr(self, job.action)
+            result = method(context, job.node_id, **(job.arguments or {}))
+        except messaging.ExpectedException as e:
+            self._finish_job(job, error=e.exc_info[1])
+        except Exception as e:
+            LOG.exception(_LE('Unexpected error while running job %(job)s '
+                              '(%(action)s) for node %(node)s'),
+                          {'job': job.uuid, 'action': job.action,
+                           'node': job.node_id})
+            self._finish_job(job, error=e)
+        else:
+            self._finish_job(job, result=result)
+
+    def _finish_job(self, job, result=None, error=None):
+        if error is None:
+            job.state = states.JOB_SUCCESS
+            job.result = result
+        else:
+            job.state = states.JOB_FAILED
+            job.error = six.text_type(error)
+        try:
+            job.save()
+        except exception.JobNotFound:
+            LOG.warning(_LW('Job %s was deleted before it was finished'),
+                        job.uuid)
+
+    @METRICS.timer('ConductorManager._clean_up_jobs')
+    @periodics.periodic(spacing=CONF.conductor.job_cleanup_interval)
+    def _clean_up_jobs(self, context):
+        """Periodically delete the jobs which are no longer needed."""
+        count = self.dbapi.destroy_old_jobs(CONF.conductor.job_retention)
+        if count:
+            LOG.debug('Deleted %d old job(s)', count)
+
+    @METRICS.timer('ConductorManager._clean_up_configdrives')
+    @periodics.periodic(
+        spacing=CONF.conductor.configdrive_cleanup_interval,
+        enabled=CONF.conductor.configdrive_cleanup_interval > 0)
+    def _clean_up_configdrives(self, context):
+        """Periodically delete the config drives of the HTTP root."""
+        count = _clean_up_configdrives_on_http_server(context)
+        if count:
+            LOG.debug('Deleted %d config drive(s) from the HTTP root', count)
+
+    @METRICS.timer('ConductorManager._warm_image_caches')
+    @periodics.periodic(
+        spacing=CONF.conductor.image_cache_warming_interval,
+        enabled=CONF.conductor.image_cache_warming_interval > 0)
+    def _warm_image_caches(self, context):
+        """Periodically download images into the master image caches."""
+        count = CONF.conductor.image_cache_warming_count
+        nodes_info = ()
+        if count:
+            nodes_info = (dict(driver_info or {}, **(instance_info or {}))
+                          for uuid, driver, instance_info, driver_info
+                          in self.iter_nodes(fields=['instance_info',
+                                                     'driver_info']))
+        driver_utils.warm_image_caches(
+            context, CONF.conductor.image_cache_warming_images, nodes_info,
+            count)
+
     def _object_dispatch(self, target, method, context, args, kwargs):
         """Dispatch a call to an object method.
 
@@ -2802,9 +2914,12 @@ def _get_configdrive_obj_name(node):
 def _store_configdrive(node, configdrive):
     """Handle the storage of the config drive.
 
-    If configured, the config drive data are uploaded to Swift. The Node's
-    instance_info is updated to include either the temporary Swift URL
-    from the upload, or if no upload, the actual config drive data.
+    If configured, the config drive data are uploaded to Swift. Otherwise
+    the config drives larger than [conductor]configdrive_max_inline_size
+    are stored on the HTTP server of the conductor, if [deploy]http_url is
+    set. The Node's instance_info is updated to include either the
+    temporary URL of the config drive, or if not stored, the actual config
+    drive data.
 
     :param node: an Ironic node object.
     :param configdrive: A gzipped and base64 encoded configdrive.
@@ -2812,6 +2927,10 @@ def _store_configdrive(node, configdrive):
              config drive to Swift.
 
     """
+    # NOTE: the previous config drive of a node being rebuilt
+    _delete_configdrive_from_http_server(node)
+
+    max_inline_size = CONF.conductor.configdrive_max_inline_size * 1024
     if CONF.conductor.configdrive_use_swift:
         # NOTE(lucasagomes): No reason to use a different timeout than
         # the one used for deploying the node
@@ -2821,21 +2940,117 @@ def _store_configdrive(node, configdrive):
 
         object_headers = {'X-Delete-After': str(timeout)}
 
-        with tempfile.NamedTemporaryFile(dir=CONF.tempdir) as fileobj:
-            fileobj.write(configdrive)
-            fileobj.flush()
-
-            swift_api = swift.SwiftAPI()
-            swift_api.create_object(container, object_name, fileobj.name,
-                                    object_headers=object_headers)
-            configdrive = swift_api.get_temp_url(container, object_name,
-                                                 timeout)
+        swift_api = swift.SwiftAPI()
+        swift_api.create_object_from_data(container, object_name,
+                                          configdrive,
+                                          object_headers=object_headers)
+        configdrive = swift_api.get_temp_url(container, object_name,
+                                             timeout)
+    elif max_inline_size and len(configdrive) > max_inline_size:
+        if CONF.deploy.http_url:
+            configdrive = _store_configdrive_on_http_server(node, configdrive)
+        else:
+            LOG.warning(_LW('The config drive of node %(node)s is larger '
+                            'than [conductor]configdrive_max_inline_size, '
+                            'but it is stored in its instance_info since '
+                            'neither Swift nor [deploy]http_url are '
+                            'configured to store it.'), {'node': node.uuid})
 
     i_info = node.instance_info
     i_info['configdrive'] = configdrive
     node.instance_info = i_info
 
 
+def _get_configdrive_http_dir():
+    """Return the directory of the HTTP root storing the config drives."""
+    return os.path.join(CONF.deploy.http_root, _CONFIGDRIVE_HTTP_DIR)
+
+
+def _store_configdrive_on_http_server(node, configdrive):
+    """Store a config drive on the HTTP server of the conductor.
+
+    The config drives are stored in a subdirectory of [deploy]http_root
+    readable only by the user and the group of the conductor, under a random
+    name since the file cannot be protected like the temporary URLs of
+    Swift. They are deleted on tear down, or by the _clean_up_configdrives
+    periodic task once their node is not being deployed anymore.
+
+    :param node: an Ironic node object.
+    :param configdrive: A gzipped and base64 encoded configdrive.
+    :returns: the URL of the config drive.
+    """
+    directory = _get_configdrive_http_dir()
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o750)
+
+    file_name = '%s-%s' % (_get_configdrive_obj_name(node),
+                           uuidutils.generate_uuid())
+    path = os.path.join(directory, file_name)
+    mode = 'wb' if isinstance(configdrive, bytes) else 'w'
+    # NOTE: create the file with restrictive permissions, so that the
+    # secrets of the config drive are never readable by other users
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o640)
+    with os.fdopen(fd, mode) as fileobj:
+        fileobj.write(configdrive)
+    return '/'.join([CONF.deploy.http_url.rstrip('/'), _CONFIGDRIVE_HTTP_DIR,
+                     file_name])
+
+
+def _delete_configdrive_from_http_server(node):
+    """Delete the config drive of a node from the HTTP root, if it is there.
+
+    :param node: an Ironic node object.
+    """
+    configdrive = (node.instance_info or {}).get('configdrive')
+    if not CONF.deploy.http_url or not isinstance(configdrive,
+                                                  six.string_types):
+        return
+    prefix = '/'.join([CONF.deploy.http_url.rstrip('/'),
+                       _CONFIGDRIVE_HTTP_DIR,
+                       _get_configdrive_obj_name(node)])
+    if configdrive.startswith(prefix):
+        file_name = configdrive.rsplit('/', 1)[1]
+        ironic_utils.unlink_without_raise(
+            os.path.join(_get_configdrive_http_dir(), file_name))
+
+
+def _clean_up_configdrives_on_http_server(context):
+    """Delete the config drives of the HTTP root which are not needed.
+
+    A config drive is not needed once its node is not being deployed
+    anymore, or once it expired after [conductor]deploy_callback_timeout
+    seconds like the Swift objects.
+
+    :param context: an admin context.
+    :returns: the number of deleted config drives.
+    """
+    timeout = CONF.conductor.deploy_callback_timeout
+    prefix = 'configdrive-'
+    count = 0
+    for path in glob.glob(os.path.join(_get_configdrive_http_dir(),
+                                       prefix + '*')):
+        try:
+            expired = (timeout and
+                       os.path.getmtime(path) < time.time() - timeout)
+        except OSError:
+            continue
+        if not expired:
+            # NOTE: the file name is the object name followed by a random
+            # UUID, the node UUID being the 36 characters after the prefix
+            node_uuid = os.path.basename(path)[len(prefix):len(prefix) + 36]
+            try:
+                node = objects.Node.get_by_uuid(context, node_uuid)
+            except exception.NodeNotFound:
+                expired = True
+            else:
+                expired = node.provision_state not in (states.DEPLOYING,
+                                                       states.DEPLOYWAIT)
+        if expired:
+            ironic_utils.unlink_without_raise(path)
+            count += 1
+    return count
+
+
 @METRICS.timer('do_node_deploy')
 @task_manager.require_exclusive_lock
 def do_node_deploy(task, conductor_id, configdrive=None):
@@ -2848,6 +3063,7 @@ def do_node_deploy(task, conductor_id, configdrive=None):
         args = {'node': task.node.uuid, 'err': e}
         LOG.error(logmsg, args)
         node.last_error = errmsg % e
+        driver_utils.store_console_log(task)
 
     try:
         try:
@@ -26,11 +26,15 @@ from ironic.common import exception
 from ironic.common import hash_ring
 from ironic.common.i18n import _
 from ironic.common import rpc
-from ironic.conductor import manager
 from ironic.conf import CONF
 from ironic.objects import base as objects_base
 
 
+# NOTE: This must be in sync with manager.MANAGER_TOPIC. The manager is not
+# imported here, it would load the drivers in the API service.
+MANAGER_TOPIC = 'ironic.conductor_manager'
+
+
 class ConductorAPI(object):
     """Client side of the conductor RPC API.
 
@@ -88,17 +92,19 @@ class ConductorAPI(object):
     |    1.38 - Added vif_attach, vif_detach, vif_list
     |    1.39 - Added timeout optional parameter to change_node_power_state
     |    1.40 - Added inject_nmi
+    |    1.41 - Added run_job
+    |    1.42 - Added node_delta parameter to update_node
 
     """
 
     # NOTE(rloo): This must be in sync with manager.ConductorManager's.
-    RPC_API_VERSION = '1.40'
+    RPC_API_VERSION = '1.42'
 
     def __init__(self, topic=None):
         super(ConductorAPI, self).__init__()
         self.topic = topic
         if self.topic is None:
-            self.topic = manager.MANAGER_TOPIC
+            self.topic = MANAGER_TOPIC
 
         target = messaging.Target(topic=self.topic,
                                   version='1.0')
@@ -117,18 +123,17 @@ class ConductorAPI(object):
         :raises: NoValidHost
 
         """
-        self.ring_manager.reset()
-
         try:
-            ring = self.ring_manager[node.driver]
-            dest = ring.get_nodes(node.uuid.encode('utf-8'),
-                                  replicas=CONF.hash_distribution_replicas)
-            return '%s.%s' % (self.topic, dest.pop())
+            ring = self._get_ring(node.driver)
         except exception.DriverNotFound:
             reason = (_('No conductor service registered which supports '
                         'driver %s.') % node.driver)
             raise exception.NoValidHost(reason=reason)
 
+        dest = ring.get_nodes(node.uuid.encode('utf-8'),
+                              replicas=CONF.hash_distribution_replicas)
+        return '%s.%s' % (self.topic, dest.pop())
+
     def get_topic_for_driver(self, driver_name):
         """Get RPC topic name for a conductor supporting the given driver.
 
@@ -141,12 +146,26 @@ class ConductorAPI(object):
         :raises: DriverNotFound
 
         """
-        self.ring_manager.reset()
-
-        ring = self.ring_manager[driver_name]
+        ring = self._get_ring(driver_name)
         host = random.choice(list(ring.nodes))
         return self.topic + "." + host
 
+    def _get_ring(self, driver_name):
+        """Get the hash ring of a driver.
+
+        The hash rings are cached; if the driver is not found, they are
+        reloaded once, in case a conductor supporting it has just joined.
+
+        :param driver_name: the name of the driver or hardware type.
+        :returns: the hash ring.
+        :raises: DriverNotFound
+        """
+        try:
+            return self.ring_manager[driver_name]
+        except exception.DriverNotFound:
+            self.ring_manager.reset()
+            return self.ring_manager[driver_name]
+
     def create_node(self, context, node_obj, topic=None):
         """Synchronously, have a conductor validate and create a node.
 
@@ -184,6 +203,14 @@ class ConductorAPI(object):
                  for some interfaces, and explicit values must be provided.
 
         """
+        if self.client.can_send_version('1.42'):
+            # Only send the changed fields, the conductor loads the others
+            # from the database.
+            cctxt = self.client.prepare(topic=topic or self.topic,
+                                        version='1.42')
+            return cctxt.call(context, 'update_node',
+                              node_delta=node_obj.obj_to_delta_primitive())
+
         cctxt = self.client.prepare(topic=topic or self.topic, version='1.1')
         return cctxt.call(context, 'update_node', node_obj=node_obj)
 
@@ -594,6 +621,19 @@ class ConductorAPI(object):
         cctxt = self.client.prepare(topic=topic or self.topic, version='1.40')
         return cctxt.call(context, 'inject_nmi', node_id=node_id)
 
+    def run_job(self, context, job_uuid, topic=None):
+        """Signal to conductor service to run an asynchronous job.
+
+        The job is recorded in the database beforehand; the conductor
+        stores the result of the job there once it is finished.
+
+        :param context: request context.
+        :param job_uuid: UUID of the job.
+        :param topic: RPC topic. Defaults to self.topic.
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.41')
+        return cctxt.cast(context, 'run_job', job_uuid=job_uuid)
+
     def get_supported_boot_devices(self, context, node_id, topic=None):
         """Get the list of supported devices.
 
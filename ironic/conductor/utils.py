@@ -218,6 +218,7 @@ def cleanup_after_timeout(task):
     node.last_error = msg
     LOG.error(msg)
     node.save()
+    _store_console_log(task)
 
     error_msg = _('Cleanup failed for node %(node)s after deploy timeout: '
                   ' %(error)s')
@@ -235,6 +236,13 @@ def cleanup_after_timeout(task):
         node.save()
 
 
+def _store_console_log(task):
+    """Store the last output of the console of a node which failed."""
+    # NOTE: imported here, ironic.drivers.utils imports this module.
+    from ironic.drivers import utils as driver_utils
+    driver_utils.store_console_log(task)
+
+
 def provisioning_error_handler(e, node, provision_state,
                                target_provision_state):
     """Set the node's provisioning states if error occurs.
@@ -301,6 +309,7 @@ def cleaning_error_handler(task, msg, tear_down_cleaning=True,
     node.maintenance = True
     node.maintenance_reason = msg
     node.save()
+    _store_console_log(task)
     if tear_down_cleaning:
         try:
             task.driver.deploy.tear_down_cleaning(task)
@@ -53,6 +53,17 @@ opts = [
                 default=True,
                 help=_('Whether to restrict the lookup API to only nodes '
                        'in certain states.')),
+    cfg.IntOpt('ramdisk_lookup_cache_ttl',
+               default=10,
+               min=0,
+               help=_('Time (in seconds) for which the node found by a '
+                      'lookup from a deploy ramdisk is cached. Repeated '
+                      'lookups with the same MAC addresses load the node by '
+                      'its cached UUID instead of searching the ports. '
+                      'Changes to ports made '
+                      'through another ironic-api process may take this '
+                      'long to be taken into account. Set to 0 to disable '
+                      'the cache.')),
     cfg.IntOpt('ramdisk_heartbeat_timeout',
                default=300,
                deprecated_group='agent', deprecated_name='heartbeat_timeout',
@@ -60,6 +71,38 @@ opts = [
     cfg.BoolOpt('enable_data_volume_manage',
                 default=False,
                 help=_('Config ironic volume management')),
+    cfg.BoolOpt('db_query_count_header',
+                default=False,
+                help=_('Whether to add the X-OpenStack-Ironic-DB-Queries '
+                       'header, with the number of database queries made '
+                       'while serving the request, to the API responses. '
+                       'This is meant for debugging, and should not be '
+                       'enabled in production.')),
+    cfg.BoolOpt('use_replica_for_reads',
+                default=False,
+                help=_('Whether to serve the read-only queries of GET '
+                       'requests (listing and showing nodes, ports, port '
+                       'groups and chassis, listing drivers and the ramdisk '
+                       'lookup) from the replica database configured by '
+                       '[database]slave_connection. Has no effect if '
+                       '[database]slave_connection is not set.')),
+    cfg.IntOpt('replica_max_staleness',
+               default=30,
+               min=1,
+               help=_('Maximum replication lag (in seconds) tolerated when '
+                      'reading from the replica database. The lag is '
+                      'estimated from the most recent conductor heartbeat '
+                      'found in the replica, so this must be larger than '
+                      '[conductor]heartbeat_interval. While the replica '
+                      'lags behind more than this, all queries are served '
+                      'by the primary database.')),
+    cfg.IntOpt('job_max_wait',
+               default=30,
+               min=0,
+               help=_('Maximum number of seconds a request for an '
+                      'asynchronous job waits for the job to finish, when '
+                      'the "wait" parameter is used. Set to 0 to always '
+                      'return immediately.')),
 ]
 
 opt_group = cfg.OptGroup(name='api',
@@ -114,6 +114,29 @@ opts = [
                default='ironic_configdrive_container',
                help=_('Name of the Swift container to store config drive '
                       'data. Used when configdrive_use_swift is True.')),
+    cfg.IntOpt('configdrive_max_inline_size',
+               default=0,
+               min=0,
+               help=_('Maximum size (in KiB) of a config drive stored in '
+                      'the instance_info of its node, when '
+                      'configdrive_use_swift is False. The larger config '
+                      'drives are stored in the "configdrive" subdirectory '
+                      'of [deploy]http_root and downloaded from '
+                      '[deploy]http_url, so that the node records stay '
+                      'small. The subdirectory and the files are readable '
+                      'only by the user and the group of the conductor, '
+                      'which the HTTP server must belong to. The files are '
+                      'deleted once their node is not being deployed '
+                      'anymore, or after deploy_callback_timeout seconds '
+                      'like the config drives stored in Swift. Defaults to '
+                      '0, storing all the config drives in the '
+                      'instance_info.')),
+    cfg.IntOpt('configdrive_cleanup_interval',
+               default=600,
+               min=0,
+               help=_('Interval (in seconds) between checks for config '
+                      'drives to delete from [deploy]http_root. Set to 0 '
+                      'to disable the checks.')),
     cfg.IntOpt('inspect_timeout',
                default=1800,
                help=_('Timeout (seconds) for waiting for node inspection. '
@@ -147,6 +170,43 @@ opts = [
                min=1,
                help=_('Timeout (in seconds) of soft reboot and soft power '
                       'off operation. This value always has to be positive.')),
+    cfg.IntOpt('job_retention',
+               default=3600,
+               min=1,
+               help=_('Number of seconds after which the asynchronous jobs '
+                      'submitted through the API are deleted, counted from '
+                      'their last update. Jobs which were not finished by '
+                      'then, for example because their conductor went '
+                      'down, are deleted as well.')),
+    cfg.IntOpt('job_cleanup_interval',
+               default=600,
+               min=1,
+               help=_('Interval (in seconds) between checks for '
+                      'asynchronous jobs to delete.')),
+    cfg.IntOpt('image_cache_warming_interval',
+               default=0,
+               min=0,
+               help=_('Interval (in seconds) between downloads of the '
+                      'images of image_cache_warming_images and of the '
+                      'most used images into the master image caches of '
+                      'the conductor, so that the deployments do not wait '
+                      'for them. The images already cached are not '
+                      'downloaded again. The caches are the ones of the '
+                      'PXE boot and of the iSCSI deploy. Set to 0 to '
+                      'disable.')),
+    cfg.ListOpt('image_cache_warming_images',
+                default=[],
+                help=_('Instance images downloaded into the master image '
+                       'caches, see image_cache_warming_interval.')),
+    cfg.IntOpt('image_cache_warming_count',
+               default=5,
+               min=0,
+               help=_('Number of the images most used by the nodes of the '
+                      'conductor downloaded into the master image caches, '
+                      'see image_cache_warming_interval. The instance '
+                      'images, kernels and ramdisks of the nodes and '
+                      'their deploy kernels and ramdisks are counted '
+                      'separately.')),
 ]
 
 
@@ -39,6 +39,25 @@ opts = [
                default=10,
                help=_('Time (in seconds) to wait for the console subprocess '
                       'to start.')),
+    cfg.PortOpt('proxy_port',
+                default=6390,
+                help=_('Port on which the conductor accepts the connections '
+                       'to the consoles of all the nodes, on the IP address '
+                       'of the [DEFAULT]my_ip option. Used only by the '
+                       'ipmitool-proxy console.')),
+    cfg.IntOpt('log_buffer_size',
+               default=0, min=0,
+               help=_('Size (in MiB) of the memory buffer recording the last '
+                      'output of the console of each node, which is sent to '
+                      'the clients when they connect and stored with the '
+                      'deploy logs when the deployment or the cleaning of '
+                      'the node fails. 0 disables the recording. Used only '
+                      'by the ipmitool-proxy console.')),
+    cfg.IntOpt('restart_concurrency',
+               default=10, min=1,
+               help=_('Maximum number of consoles restarted at the same time '
+                      'when the conductor starts. The consoles of the nodes '
+                      'with an instance are restarted first.')),
 ]
 
 
@@ -180,6 +180,16 @@ hash_opts = [
     cfg.IntOpt('hash_ring_reset_interval',
                default=180,
                help=_('Interval (in seconds) between hash ring resets.')),
+    cfg.IntOpt('driver_map_refresh_interval',
+               default=10,
+               min=0,
+               help=_('Interval (in seconds) between two reads of the '
+                      'drivers and hardware types supported by the active '
+                      'conductors from the database. They are cached by '
+                      'each service, to list the drivers in the API and to '
+                      'build the hash ring; the hash ring is only rebuilt '
+                      'when they change. Set to 0 to read them every time '
+                      'they are needed.')),
 ]
 
 image_opts = [
@@ -198,6 +208,31 @@ image_opts = [
                default=os.path.join('$pybasedir',
                                     'common/grub_conf.template'),
                help=_('Template file for grub configuration file.')),
+    cfg.IntOpt('image_download_connections',
+               default=1,
+               min=1,
+               help=_('Maximum number of connections used in parallel to '
+                      'download an image over HTTP(S), each downloading a '
+                      'segment of the image. Only used if the server '
+                      'supports range requests.')),
+    cfg.IntOpt('image_download_segment_size',
+               default=64,
+               min=1,
+               help=_('Minimum size (in MiB) of the segments of an image '
+                      'downloaded over HTTP(S) with several connections.')),
+    cfg.IntOpt('image_download_retries',
+               default=3,
+               min=0,
+               help=_('Number of times the download of an image (or of a '
+                      'segment of it) over HTTP(S) is resumed from where it '
+                      'stopped after a connection failure. Only used if the '
+                      'server supports range requests.')),
+    cfg.IntOpt('image_download_bandwidth',
+               default=0,
+               min=0,
+               help=_('Maximum bandwidth (in MiB/s) shared by the downloads '
+                      'of images over HTTP(S) of the conductor. 0 means '
+                      'unlimited.')),
 ]
 
 img_cache_opts = [
@@ -242,6 +277,16 @@ path_opts = [
                help=_("Top-level directory for maintaining ironic's state.")),
 ]
 
+object_opts = [
+    cfg.BoolOpt('verify_object_hydration',
+                default=False,
+                help=_('Used to debug the fast conversion of the database '
+                       'entities returned by list queries to objects. If '
+                       'True, every object is also converted the usual way, '
+                       'and an error is logged if the results differ. This '
+                       'slows down listing objects.')),
+]
+
 portgroup_opts = [
     cfg.StrOpt(
         'default_portgroup_mode', default='active-backup',
@@ -285,6 +330,7 @@ def register_opts(conf):
     conf.register_opts(img_cache_opts)
     conf.register_opts(netconf_opts)
     conf.register_opts(notification_opts)
+    conf.register_opts(object_opts)
     conf.register_opts(path_opts)
     conf.register_opts(portgroup_opts)
     conf.register_opts(service_opts)
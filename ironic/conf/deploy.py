@@ -26,6 +26,19 @@ opts = [
     cfg.StrOpt('http_root',
                default='/httpboot',
                help=_("ironic-conductor node's HTTP root path.")),
+    cfg.StrOpt('boot_image_master_path',
+               help=_('On the ironic-conductor node, directory where the '
+                      'boot ISOs built for the virtual media boot of the '
+                      'nodes are cached, keyed by a '
+                      'checksum of what they are built from, so that the '
+                      'nodes booting the same kernel and ramdisk with the '
+                      'same parameters share them. The images are linked '
+                      'to where they are used if it is on the same file '
+                      'system, copied otherwise. The size and TTL of the '
+                      'cache are given by [pxe]image_cache_size and '
+                      '[pxe]image_cache_ttl. Not set by default, which '
+                      'disables the cache: the images are built for each '
+                      'node.')),
     cfg.IntOpt('erase_devices_priority',
                help=_('Priority to run in-band erase devices via the Ironic '
                       'Python Agent ramdisk. If unset, will use the priority '
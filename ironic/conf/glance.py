@@ -62,6 +62,17 @@ opts = [
                       'download starts. swift_temp_url_duration value must be '
                       'greater than or equal to this option\'s value. '
                       'Defaults to 0.')),
+    cfg.IntOpt('image_metadata_cache_ttl',
+               default=0,
+               min=0,
+               help=_('Time (in seconds) for which the metadata of an image '
+                      'requested from Glance is cached, for each project. '
+                      'The validation, preparation and deployment of the '
+                      'nodes deployed with the same image then share a '
+                      'single request to Glance. Changes to the images '
+                      'made outside of ironic may take this long to be '
+                      'taken into account. Defaults to 0, disabling the '
+                      'cache.')),
     cfg.StrOpt(
         'swift_endpoint_url',
         help=_('The "endpoint" (scheme, hostname, optional port) for '
@@ -23,6 +23,7 @@ _default_opt_lists = [
     ironic.conf.default.img_cache_opts,
     ironic.conf.default.netconf_opts,
     ironic.conf.default.notification_opts,
+    ironic.conf.default.object_opts,
     ironic.conf.default.path_opts,
     ironic.conf.default.portgroup_opts,
     ironic.conf.default.service_opts,
@@ -47,6 +47,55 @@ opts = [
                default=10080,
                help=_('Maximum TTL (in minutes) for old master images in '
                       'cache.')),
+    cfg.StrOpt('image_cache_eviction_policy',
+               default='lru',
+               choices=['lru', 'lfu', 'greedy-dual-size'],
+               help=_('Policy choosing the master images deleted from the '
+                      'cache when it is larger than image_cache_size. '
+                      '"lru" deletes the least recently used images first. '
+                      '"lfu" deletes the least frequently used images '
+                      'first, the uses counting less and less as they get '
+                      'older, see image_cache_lfu_half_life. '
+                      '"greedy-dual-size" deletes the images with the '
+                      'fewest uses per MiB first, so that a large image '
+                      'used once does not push the small images used for '
+                      'every deployment out of the cache.')),
+    cfg.IntOpt('image_cache_lfu_half_life',
+               default=1440,
+               min=1,
+               help=_('Time (in minutes) after which a use of a master '
+                      'image counts half as much, with the "lfu" '
+                      'image_cache_eviction_policy.')),
+    cfg.BoolOpt('image_cache_content_addressed',
+                default=False,
+                help=_('Whether to name the master images after the SHA-256 '
+                       'checksum of their content instead of after their '
+                       'href. Each href is then an alias of an image, so '
+                       'that an image published under several Glance '
+                       'images or URLs is stored once. The images are '
+                       'still downloaded once for each href the first '
+                       'time it is used, since the checksum is only known '
+                       'once the image is downloaded.')),
+    cfg.BoolOpt('image_cache_shared',
+                default=False,
+                help=_('Whether the master image directories are shared by '
+                       'several conductors, e.g. on NFS. The images are '
+                       'then locked with file locks in the directories, '
+                       'which must support POSIX advisory locks, so that '
+                       'each image is downloaded by a single conductor. '
+                       'The index of the images is then kept in memory by '
+                       'each conductor instead of in the directories. '
+                       'The images are copied instead of linked when '
+                       'images_path or tftp_root is on another file '
+                       'system.')),
+    cfg.IntOpt('image_cache_download_attempts',
+               default=2,
+               min=1,
+               help=_('Number of times a master image is downloaded before '
+                      'giving up, if the downloads fail. The requests '
+                      'fetching an image while it is downloaded wait for '
+                      'the download and fail with its error, instead of '
+                      'downloading the image again one after the other.')),
     cfg.StrOpt('pxe_config_template',
                default=os.path.join(
                    '$pybasedir', 'drivers/modules/pxe_config.template'),
@@ -29,6 +29,10 @@ IMPL = db_api.DBAPI.from_config(cfg.CONF, backend_mapping=_BACKEND_MAPPING,
                                 lazy=True)
 
 
+DELETE_KEY = object()
+"""Value of the keys to remove in the key_updates of update_node()."""
+
+
 def get_instance():
     """Return a DB API instance."""
     return IMPL
@@ -42,6 +46,30 @@ class Connection(object):
     def __init__(self):
         """Constructor."""
 
+    @abc.abstractmethod
+    def allow_replica_reads(self, max_staleness):
+        """Allow read-only API queries to be served by the replica database.
+
+        The setting only applies to the current thread. Only the queries
+        which are safe to run against a lagging replica (such as listing
+        and showing resources) use it; everything else, including any
+        query made within a write transaction, uses the primary database.
+
+        :param max_staleness: Maximum replication lag (in seconds) which is
+                              tolerated, or None to serve all queries from
+                              the primary database.
+        """
+
+    @abc.abstractmethod
+    def get_query_count(self):
+        """Return the number of queries made by the current thread.
+
+        The counter is never reset; callers compute the number of queries
+        made by an operation from the difference of two values.
+
+        :returns: The number of database queries.
+        """
+
     @abc.abstractmethod
     def get_nodeinfo_list(self, columns=None, filters=None, limit=None,
                           marker=None, sort_key=None, sort_dir=None):
@@ -97,6 +125,18 @@ class Connection(object):
                          (asc, desc)
         """
 
+    @abc.abstractmethod
+    def get_node_aggregates(self, group_by, filters=None):
+        """Count the nodes matching the filters, grouped by some columns.
+
+        :param group_by: List of column names to group the nodes by.
+        :param filters: Filters to apply. Defaults to None. See
+                        get_node_list() for the supported filters.
+        :returns: A list of tuples, one per group, containing the values
+                  of the group_by columns followed by the number of nodes
+                  in the group.
+        """
+
     @abc.abstractmethod
     def reserve_node(self, tag, node_id):
         """Reserve a node.
@@ -192,7 +232,7 @@ class Connection(object):
         """
 
     @abc.abstractmethod
-    def update_node(self, node_id, values):
+    def update_node(self, node_id, values, key_updates=None):
         """Update properties of a node.
 
         :param node_id: The id or uuid of a node.
@@ -209,9 +249,26 @@ class Connection(object):
                               'my-field-2': val2,
                              }
                         }
+        :param key_updates: Optional dict of the keys to set in the
+                            driver_internal_info and instance_info
+                            fields, without changing the other keys.
+                            The keys to remove have the DELETE_KEY value.
+                            For example:
+
+                            ::
+
+                             {
+                              'driver_internal_info':
+                                  {
+                                   'agent_url': 'http://1.2.3.4:9999',
+                                   'agent_last_heartbeat': DELETE_KEY,
+                                  }
+                             }
         :returns: A node.
         :raises: NodeAssociated
         :raises: NodeNotFound
+        :raises: InvalidParameterValue if key_updates has other fields, or
+                 fields also in values.
         """
 
     @abc.abstractmethod
@@ -584,6 +641,31 @@ class Connection(object):
                  already registered.
         """
 
+    @abc.abstractmethod
+    def bulk_register_conductor_hardware_interfaces(self, conductor_id,
+                                                    interfaces):
+        """Registers all hardware interfaces of a conductor at once.
+
+        Unlike register_conductor_hardware_interfaces(), this registers the
+        interfaces of any number of hardware types and interface types, in
+        a single database statement.
+
+        :param conductor_id: Database ID of conductor to register for.
+        :param interfaces: List of dictionaries, one per interface, with the
+                           following keys:
+
+                           :hardware_type: Name of hardware type for the
+                                           interface.
+                           :interface_type: Type of the interface, e.g.
+                                            'deploy' or 'boot'.
+                           :interface_name: Name of the interface.
+                           :default: Boolean, whether the interface is the
+                                     default for this hardware type and
+                                     interface type.
+        :raises: ConductorHardwareInterfacesAlreadyRegistered if at least one
+                 of the interfaces is already registered.
+        """
+
     @abc.abstractmethod
     def unregister_conductor_hardware_interfaces(self, conductor_id):
         """Unregisters all hardware interfaces for a conductor.
@@ -867,3 +949,49 @@ class Connection(object):
         :raises: VolumeTargetNotFound if a volume target with the specified
                  ident does not exist.
         """
+
+    @abc.abstractmethod
+    def create_job(self, values):
+        """Create a new job.
+
+        :param values: Dict of values to create a job with. For example:
+
+                       ::
+
+                        {
+                         'uuid': uuidutils.generate_uuid(),
+                         'node_id': 1,
+                         'action': 'get_boot_device',
+                         'state': 'pending',
+                         'arguments': {},
+                        }
+        :returns: A job.
+        """
+
+    @abc.abstractmethod
+    def get_job_by_uuid(self, uuid):
+        """Return a job.
+
+        :param uuid: The UUID of a job.
+        :returns: A job.
+        :raises: JobNotFound if no job with this UUID exists.
+        """
+
+    @abc.abstractmethod
+    def update_job(self, uuid, values):
+        """Update properties of a job.
+
+        :param uuid: The UUID of a job.
+        :param values: Dict of values to update.
+        :returns: A job.
+        :raises: JobNotFound if no job with this UUID exists.
+        """
+
+    @abc.abstractmethod
+    def destroy_old_jobs(self, older_than):
+        """Destroy the jobs which have not been updated for some time.
+
+        :param older_than: Number of seconds since the last update of a job
+                           after which it is destroyed.
+        :returns: The number of destroyed jobs.
+        """
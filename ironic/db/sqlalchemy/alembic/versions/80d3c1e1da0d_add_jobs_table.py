@@ -0,0 +1,48 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add jobs table
+
+Revision ID: 80d3c1e1da0d
+Revises: dbefd6bdaa2c
+Create Date: 2026-10-19 10:12:41.532811
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '80d3c1e1da0d'
+down_revision = 'dbefd6bdaa2c'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('jobs',
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('updated_at', sa.DateTime(), nullable=True),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('uuid', sa.String(length=36), nullable=True),
+                    sa.Column('node_id', sa.Integer(), nullable=True),
+                    sa.Column('action', sa.String(length=64),
+                              nullable=True),
+                    sa.Column('state', sa.String(length=15), nullable=True),
+                    sa.Column('arguments', sa.Text(), nullable=True),
+                    sa.Column('result', sa.Text(), nullable=True),
+                    sa.Column('error', sa.Text(), nullable=True),
+                    sa.ForeignKeyConstraint(['node_id'], ['nodes.id'], ),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('uuid', name='uniq_jobs0uuid'),
+                    mysql_charset='utf8',
+                    mysql_engine='InnoDB')
+    op.create_index('jobs_updated_at_idx', 'jobs', ['updated_at'],
+                    unique=False)
@@ -18,6 +18,7 @@
 
 import collections
 import datetime
+import json
 import threading
 
 from oslo_db import exception as db_exc
@@ -28,7 +29,9 @@ from oslo_utils import netutils
 from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
+import sqlalchemy as sa
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import joinedload
 from sqlalchemy import sql
 
@@ -45,13 +48,173 @@ LOG = log.getLogger(__name__)
 
 _CONTEXT = threading.local()
 
+# The maximum replication lag tolerated by the replica reads of the
+# current thread, see Connection.allow_replica_reads().
+_REPLICA_READS = threading.local()
+
+# Minimum interval (in seconds) between two lag checks of a replica
+# which was found to be lagging behind.
+_REPLICA_RECHECK_INTERVAL = 1
+
+# Newer oslo.db releases rename the 'async' modifier to 'async_', since
+# 'async' is becoming a reserved keyword.
+_replica_reader = getattr(enginefacade.reader, 'async_', None)
+if _replica_reader is None:
+    _replica_reader = getattr(enginefacade.reader, 'async')
+
+
+# The number of queries made by the current thread.
+_QUERY_COUNT = threading.local()
+
+
+# The node fields whose keys can be updated individually.
+_KEY_UPDATE_FIELDS = frozenset(['driver_internal_info', 'instance_info'])
+
+# Whether the database supports the JSON functions used to update the keys
+# of a field in place, by dialect name.
+_JSON_FUNCTIONS_SUPPORTED = {}
+
 
 def get_backend():
     """The backend is this module itself."""
     return Connection()
 
 
-def _session_for_read():
+@sa.event.listens_for(sa.engine.Engine, 'before_cursor_execute')
+def _count_query(*args):
+    _QUERY_COUNT.value = getattr(_QUERY_COUNT, 'value', 0) + 1
+
+
+def _json_key_update(dialect, column, updates):
+    """Build an SQL expression setting and removing keys of a JSON column.
+
+    :param dialect: The name of the database dialect.
+    :param column: The column, or any SQL expression of a JSON object.
+    :param updates: A dict of the keys to set, the keys to remove have the
+                    DELETE_KEY value.
+    :returns: The SQL expression, or None if it can not be built for the
+              dialect or for the keys.
+    """
+    if dialect not in ('mysql', 'postgresql', 'sqlite'):
+        return None
+    if any('"' in key or '\\' in key for key in updates):
+        # Can not be quoted in a JSON path
+        return None
+
+    expr = sa.func.coalesce(column, '{}')
+    if dialect == 'postgresql':
+        expr = sa.cast(expr, postgresql.JSONB)
+    for key, value in updates.items():
+        if dialect == 'postgresql':
+            if value is api.DELETE_KEY:
+                expr = expr.op('-')(key)
+            else:
+                expr = sa.func.jsonb_set(
+                    expr, postgresql.array([key]),
+                    sa.cast(json.dumps(value), postgresql.JSONB))
+        else:
+            path = '$."%s"' % key
+            if value is api.DELETE_KEY:
+                expr = sa.func.json_remove(expr, path)
+            else:
+                # Pass the value as JSON, not as a string
+                if dialect == 'sqlite':
+                    value = sa.func.json(json.dumps(value))
+                else:
+                    value = sa.func.json_extract(json.dumps(value), '$')
+                expr = sa.func.json_set(expr, path, value)
+    if dialect == 'postgresql':
+        expr = sa.cast(expr, sa.Text)
+    return expr
+
+
+def _json_functions_supported():
+    """Check whether the database supports the JSON functions we need.
+
+    They are missing from older MySQL and PostgreSQL releases, and from
+    SQLite builds without the JSON1 extension. The result is cached.
+    """
+    engine = enginefacade.writer.get_engine()
+    dialect = engine.dialect.name
+    supported = _JSON_FUNCTIONS_SUPPORTED.get(dialect)
+    if supported is None:
+        expr = _json_key_update(dialect, sa.literal('{}'),
+                                {'key': 'value', 'other': api.DELETE_KEY})
+        supported = expr is not None
+        if supported:
+            try:
+                with engine.connect() as conn:
+                    conn.scalar(sa.select([expr]))
+            except (db_exc.DBError, sa.exc.DBAPIError) as e:
+                LOG.info('The database does not support the JSON functions '
+                         'needed to update the keys of the node fields in '
+                         'place, the fields will be rewritten: %s', e)
+                supported = False
+        _JSON_FUNCTIONS_SUPPORTED[dialect] = supported
+    return supported
+
+
+class _ReplicaMonitor(object):
+    """Bounds the staleness of the data read from the replica database.
+
+    Conductors record their heartbeats in the primary database. Since
+    the replica applies the changes in order, it holds every change
+    committed before the most recent heartbeat it has received, and the
+    time elapsed since that heartbeat is an upper bound of its lag.
+    """
+
+    def __init__(self):
+        self.heartbeat = None
+        self.checked_at = None
+
+    def _fetch_heartbeat(self):
+        try:
+            with _replica_reader.independent.using(_CONTEXT) as session:
+                return session.query(
+                    sql.func.max(models.Conductor.updated_at)).scalar()
+        except db_exc.DBError as e:
+            LOG.warning(_LW('Unable to check the replication lag of the '
+                            'replica database, using the primary database '
+                            'instead. Error: %s'), e)
+
+    def is_fresh(self, max_staleness):
+        """Check whether the replica lags behind less than max_staleness.
+
+        :param max_staleness: Maximum replication lag in seconds.
+        :returns: True if the replica can be used, False otherwise.
+        """
+        now = timeutils.utcnow()
+        limit = datetime.timedelta(seconds=max_staleness)
+        if self.heartbeat is not None and now - self.heartbeat <= limit:
+            return True
+
+        recheck = datetime.timedelta(seconds=_REPLICA_RECHECK_INTERVAL)
+        if self.checked_at is not None and now - self.checked_at < recheck:
+            return False
+
+        self.checked_at = now
+        self.heartbeat = self._fetch_heartbeat()
+        if self.heartbeat is not None and now - self.heartbeat <= limit:
+            return True
+
+        LOG.debug('The replica database lags behind more than %s seconds, '
+                  'using the primary database', max_staleness)
+        return False
+
+
+_REPLICA_MONITOR = _ReplicaMonitor()
+
+
+def _use_replica():
+    max_staleness = getattr(_REPLICA_READS, 'max_staleness', None)
+    if max_staleness is None or not CONF.database.slave_connection:
+        return False
+    return _REPLICA_MONITOR.is_fresh(max_staleness)
+
+
+def _session_for_read(allow_replica=False):
+    if allow_replica and _use_replica():
+        return _replica_reader.using(_CONTEXT)
     return enginefacade.reader.using(_CONTEXT)
 
 
@@ -59,17 +222,22 @@ def _session_for_write():
     return enginefacade.writer.using(_CONTEXT)
 
 
-def _get_node_query_with_tags():
-    return model_query(models.Node).options(joinedload('tags'))
+def _get_node_query_with_tags(allow_replica=False):
+    return model_query(models.Node,
+                       allow_replica=allow_replica).options(joinedload('tags'))
 
 
 def model_query(model, *args, **kwargs):
     """Query helper for simpler session usage.
 
     :param session: if present, the session to use
+    :param allow_replica: if True, the query may be served by the replica
+                          database, when replica reads are allowed for the
+                          current thread. Only set it for the queries which
+                          are safe to run against a lagging replica.
     """
 
-    with _session_for_read() as session:
+    with _session_for_read(kwargs.get('allow_replica', False)) as session:
         query = session.query(model, *args)
         return query
 
@@ -193,6 +361,12 @@ class Connection(api.Connection):
     def __init__(self):
         pass
 
+    def allow_replica_reads(self, max_staleness):
+        _REPLICA_READS.max_staleness = max_staleness
+
+    def get_query_count(self):
+        return getattr(_QUERY_COUNT, 'value', 0)
+
     def _add_nodes_filters(self, query, filters):
         if filters is None:
             filters = []
@@ -253,11 +427,18 @@ class Connection(api.Connection):
 
     def get_node_list(self, filters=None, limit=None, marker=None,
                       sort_key=None, sort_dir=None):
-        query = _get_node_query_with_tags()
+        query = _get_node_query_with_tags(allow_replica=True)
         query = self._add_nodes_filters(query, filters)
         return _paginate_query(models.Node, limit, marker,
                                sort_key, sort_dir, query)
 
+    def get_node_aggregates(self, group_by, filters=None):
+        columns = [getattr(models.Node, c) for c in group_by]
+        query = model_query(*(columns + [sql.func.count(models.Node.id)]))
+        query = self._add_nodes_filters(query, filters)
+        query = query.group_by(*columns).order_by(*columns)
+        return [tuple(row) for row in query.all()]
+
     def reserve_node(self, tag, node_id):
         with _session_for_write():
             query = _get_node_query_with_tags()
@@ -327,7 +508,7 @@ class Connection(api.Connection):
             return node
 
     def get_node_by_id(self, node_id):
-        query = _get_node_query_with_tags()
+        query = _get_node_query_with_tags(allow_replica=True)
         query = query.filter_by(id=node_id)
         try:
             return query.one()
@@ -335,7 +516,7 @@ class Connection(api.Connection):
             raise exception.NodeNotFound(node=node_id)
 
     def get_node_by_uuid(self, node_uuid):
-        query = _get_node_query_with_tags()
+        query = _get_node_query_with_tags(allow_replica=True)
         query = query.filter_by(uuid=node_uuid)
         try:
             return query.one()
@@ -343,7 +524,7 @@ class Connection(api.Connection):
             raise exception.NodeNotFound(node=node_uuid)
 
     def get_node_by_name(self, node_name):
-        query = _get_node_query_with_tags()
+        query = _get_node_query_with_tags(allow_replica=True)
         query = query.filter_by(name=node_name)
         try:
             return query.one()
@@ -354,7 +535,7 @@ class Connection(api.Connection):
         if not uuidutils.is_uuid_like(instance):
             raise exception.InvalidUUID(uuid=instance)
 
-        query = _get_node_query_with_tags()
+        query = _get_node_query_with_tags(allow_replica=True)
         query = query.filter_by(instance_uuid=instance)
 
         try:
@@ -400,16 +581,33 @@ class Connection(api.Connection):
                 models.VolumeTarget).filter_by(node_id=node_id)
             volume_target_query.delete()
 
+            job_query = model_query(models.Job).filter_by(node_id=node_id)
+            job_query.delete()
+
             query.delete()
 
-    def update_node(self, node_id, values):
+    def update_node(self, node_id, values, key_updates=None):
         # NOTE(dtantsur): this can lead to very strange errors
         if 'uuid' in values:
             msg = _("Cannot overwrite UUID for an existing Node.")
             raise exception.InvalidParameterValue(err=msg)
 
+        key_updates = {field: updates
+                       for field, updates in (key_updates or {}).items()
+                       if updates}
+        invalid = set(key_updates) - _KEY_UPDATE_FIELDS
+        if invalid:
+            msg = (_("Cannot update the keys of the node fields %s.") %
+                   ', '.join(sorted(invalid)))
+            raise exception.InvalidParameterValue(err=msg)
+        invalid = set(key_updates) & set(values)
+        if invalid:
+            msg = (_("Cannot both update the keys of and set the node "
+                     "fields %s.") % ', '.join(sorted(invalid)))
+            raise exception.InvalidParameterValue(err=msg)
+
         try:
-            return self._do_update_node(node_id, values)
+            return self._do_update_node(node_id, values, key_updates)
         except db_exc.DBDuplicateEntry as e:
             if 'name' in e.columns:
                 raise exception.DuplicateName(name=values['name'])
@@ -422,8 +620,9 @@ class Connection(api.Connection):
             else:
                 raise
 
-    def _do_update_node(self, node_id, values):
-        with _session_for_write():
+    def _do_update_node(self, node_id, values, key_updates):
+        in_place = key_updates and _json_functions_supported()
+        with _session_for_write() as session:
             query = model_query(models.Node)
             query = add_identity_filter(query, node_id)
             try:
@@ -444,25 +643,54 @@ class Connection(api.Connection):
                       values['provision_state'] == states.INSPECTFAIL):
                     values['inspection_started_at'] = None
 
+            dialect = session.bind.dialect.name
+            refresh = []
+            for field, updates in key_updates.items():
+                expr = None
+                if in_place:
+                    expr = _json_key_update(dialect,
+                                            getattr(models.Node, field),
+                                            updates)
+                if expr is not None:
+                    # Only the updated keys are sent to the database
+                    values[field] = expr
+                    refresh.append(field)
+                else:
+                    # The row is locked, so the other keys can not change
+                    # until the transaction ends.
+                    info = dict(ref[field] or {})
+                    for key, value in updates.items():
+                        if value is api.DELETE_KEY:
+                            info.pop(key, None)
+                        else:
+                            info[key] = value
+                    values[field] = info
+
             ref.update(values)
+            if refresh:
+                session.flush()
+                session.refresh(ref, attribute_names=refresh)
         return ref
 
     def get_port_by_id(self, port_id):
-        query = model_query(models.Port).filter_by(id=port_id)
+        query = model_query(models.Port, allow_replica=True).filter_by(
+            id=port_id)
         try:
             return query.one()
         except NoResultFound:
             raise exception.PortNotFound(port=port_id)
 
     def get_port_by_uuid(self, port_uuid):
-        query = model_query(models.Port).filter_by(uuid=port_uuid)
+        query = model_query(models.Port, allow_replica=True).filter_by(
+            uuid=port_uuid)
         try:
             return query.one()
         except NoResultFound:
             raise exception.PortNotFound(port=port_uuid)
 
     def get_port_by_address(self, address):
-        query = model_query(models.Port).filter_by(address=address)
+        query = model_query(models.Port, allow_replica=True).filter_by(
+            address=address)
         try:
             return query.one()
         except NoResultFound:
@@ -470,19 +698,20 @@ class Connection(api.Connection):
 
     def get_port_list(self, limit=None, marker=None,
                       sort_key=None, sort_dir=None):
+        query = model_query(models.Port, allow_replica=True)
         return _paginate_query(models.Port, limit, marker,
-                               sort_key, sort_dir)
+                               sort_key, sort_dir, query)
 
     def get_ports_by_node_id(self, node_id, limit=None, marker=None,
                              sort_key=None, sort_dir=None):
-        query = model_query(models.Port)
+        query = model_query(models.Port, allow_replica=True)
         query = query.filter_by(node_id=node_id)
         return _paginate_query(models.Port, limit, marker,
                                sort_key, sort_dir, query)
 
     def get_ports_by_portgroup_id(self, portgroup_id, limit=None, marker=None,
                                   sort_key=None, sort_dir=None):
-        query = model_query(models.Port)
+        query = model_query(models.Port, allow_replica=True)
         query = query.filter_by(portgroup_id=portgroup_id)
         return _paginate_query(models.Port, limit, marker,
                                sort_key, sort_dir, query)
@@ -531,28 +760,32 @@ class Connection(api.Connection):
                 raise exception.PortNotFound(port=port_id)
 
     def get_portgroup_by_id(self, portgroup_id):
-        query = model_query(models.Portgroup).filter_by(id=portgroup_id)
+        query = model_query(models.Portgroup, allow_replica=True).filter_by(
+            id=portgroup_id)
         try:
             return query.one()
         except NoResultFound:
             raise exception.PortgroupNotFound(portgroup=portgroup_id)
 
     def get_portgroup_by_uuid(self, portgroup_uuid):
-        query = model_query(models.Portgroup).filter_by(uuid=portgroup_uuid)
+        query = model_query(models.Portgroup, allow_replica=True).filter_by(
+            uuid=portgroup_uuid)
         try:
             return query.one()
         except NoResultFound:
             raise exception.PortgroupNotFound(portgroup=portgroup_uuid)
 
     def get_portgroup_by_address(self, address):
-        query = model_query(models.Portgroup).filter_by(address=address)
+        query = model_query(models.Portgroup, allow_replica=True).filter_by(
+            address=address)
         try:
             return query.one()
         except NoResultFound:
             raise exception.PortgroupNotFound(portgroup=address)
 
     def get_portgroup_by_name(self, name):
-        query = model_query(models.Portgroup).filter_by(name=name)
+        query = model_query(models.Portgroup, allow_replica=True).filter_by(
+            name=name)
         try:
             return query.one()
         except NoResultFound:
@@ -560,12 +793,13 @@ class Connection(api.Connection):
 
     def get_portgroup_list(self, limit=None, marker=None,
                            sort_key=None, sort_dir=None):
+        query = model_query(models.Portgroup, allow_replica=True)
         return _paginate_query(models.Portgroup, limit, marker,
-                               sort_key, sort_dir)
+                               sort_key, sort_dir, query)
 
     def get_portgroups_by_node_id(self, node_id, limit=None, marker=None,
                                   sort_key=None, sort_dir=None):
-        query = model_query(models.Portgroup)
+        query = model_query(models.Portgroup, allow_replica=True)
         query = query.filter_by(node_id=node_id)
         return _paginate_query(models.Portgroup, limit, marker,
                                sort_key, sort_dir, query)
@@ -636,14 +870,16 @@ class Connection(api.Connection):
                 raise exception.PortgroupNotFound(portgroup=portgroup_id)
 
     def get_chassis_by_id(self, chassis_id):
-        query = model_query(models.Chassis).filter_by(id=chassis_id)
+        query = model_query(models.Chassis, allow_replica=True).filter_by(
+            id=chassis_id)
         try:
             return query.one()
         except NoResultFound:
             raise exception.ChassisNotFound(chassis=chassis_id)
 
     def get_chassis_by_uuid(self, chassis_uuid):
-        query = model_query(models.Chassis).filter_by(uuid=chassis_uuid)
+        query = model_query(models.Chassis, allow_replica=True).filter_by(
+            uuid=chassis_uuid)
         try:
             return query.one()
         except NoResultFound:
@@ -651,8 +887,9 @@ class Connection(api.Connection):
 
     def get_chassis_list(self, limit=None, marker=None,
                          sort_key=None, sort_dir=None):
+        query = model_query(models.Chassis, allow_replica=True)
         return _paginate_query(models.Chassis, limit, marker,
-                               sort_key, sort_dir)
+                               sort_key, sort_dir, query)
 
     def create_chassis(self, values):
         if not values.get('uuid'):
@@ -784,7 +1021,7 @@ class Connection(api.Connection):
                     '%(nodes)s'), {'nodes': nodes})
 
     def get_active_driver_dict(self, interval=None):
-        query = model_query(models.Conductor)
+        query = model_query(models.Conductor, allow_replica=True)
         result = _filter_active_conductors(query, interval=interval)
 
         # build mapping of drivers to the set of hosts which support them
@@ -796,7 +1033,7 @@ class Connection(api.Connection):
 
     def get_active_hardware_type_dict(self):
         query = (model_query(models.ConductorHardwareInterfaces,
-                             models.Conductor)
+                             models.Conductor, allow_replica=True)
                  .join(models.Conductor))
         result = _filter_active_conductors(query)
 
@@ -819,7 +1056,8 @@ class Connection(api.Connection):
         return query.all()
 
     def list_hardware_type_interfaces(self, hardware_types):
-        query = (model_query(models.ConductorHardwareInterfaces)
+        query = (model_query(models.ConductorHardwareInterfaces,
+                             allow_replica=True)
                  .filter(models.ConductorHardwareInterfaces.hardware_type
                          .in_(hardware_types)))
 
@@ -847,6 +1085,34 @@ class Connection(api.Connection):
                     interface_type=interface_type,
                     interfaces=interfaces)
 
+    def bulk_register_conductor_hardware_interfaces(self, conductor_id,
+                                                    interfaces):
+        if not interfaces:
+            return
+        now = timeutils.utcnow()
+        rows = [{'conductor_id': conductor_id,
+                 'hardware_type': iface['hardware_type'],
+                 'interface_type': iface['interface_type'],
+                 'interface_name': iface['interface_name'],
+                 'default': iface['default'],
+                 'created_at': now}
+                for iface in interfaces]
+        # NOTE: a conductor registers hundreds of interfaces when many
+        # hardware types are enabled, insert them with a single multi-row
+        # INSERT instead of one statement per interface.
+        table = models.ConductorHardwareInterfaces.__table__
+        with _session_for_write() as session:
+            try:
+                session.execute(table.insert().values(rows))
+            except db_exc.DBDuplicateEntry:
+                raise exception.ConductorHardwareInterfacesAlreadyRegistered(
+                    hardware_type=', '.join(sorted(
+                        {iface['hardware_type'] for iface in interfaces})),
+                    interface_type=', '.join(sorted(
+                        {iface['interface_type'] for iface in interfaces})),
+                    interfaces=', '.join(sorted(
+                        {iface['interface_name'] for iface in interfaces})))
+
     def unregister_conductor_hardware_interfaces(self, conductor_id):
         with _session_for_write():
             query = (model_query(models.ConductorHardwareInterfaces)
@@ -918,8 +1184,13 @@ class Connection(api.Connection):
         return model_query(q.exists()).scalar()
 
     def get_node_by_port_addresses(self, addresses):
-        q = model_query(models.Node).distinct().join(models.Port)
-        q = q.filter(models.Port.address.in_(addresses))
+        # Selecting the node IDs from the ports first only uses the
+        # unique index on the port addresses, and avoids a DISTINCT over
+        # all columns of the nodes.
+        node_ids = (sql.select([models.Port.node_id])
+                    .where(models.Port.address.in_(addresses)))
+        q = (model_query(models.Node, allow_replica=True)
+             .filter(models.Node.id.in_(node_ids)))
 
         try:
             return q.one()
@@ -1079,3 +1350,47 @@ class Connection(api.Connection):
             count = query.delete()
             if count == 0:
                 raise exception.VolumeTargetNotFound(target=ident)
+
+    def create_job(self, values):
+        if 'uuid' not in values:
+            values['uuid'] = uuidutils.generate_uuid()
+
+        job = models.Job()
+        job.update(values)
+        with _session_for_write() as session:
+            session.add(job)
+            session.flush()
+            return job
+
+    def get_job_by_uuid(self, uuid):
+        query = model_query(models.Job).filter_by(uuid=uuid)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.JobNotFound(job=uuid)
+
+    def update_job(self, uuid, values):
+        if 'uuid' in values:
+            msg = _("Cannot overwrite UUID for an existing Job.")
+            raise exception.InvalidParameterValue(err=msg)
+
+        with _session_for_write() as session:
+            query = model_query(models.Job).filter_by(uuid=uuid)
+            try:
+                ref = query.with_lockmode('update').one()
+            except NoResultFound:
+                raise exception.JobNotFound(job=uuid)
+            ref.update(values)
+            session.flush()
+        return ref
+
+    def destroy_old_jobs(self, older_than):
+        limit = timeutils.utcnow() - datetime.timedelta(seconds=older_than)
+        with _session_for_write():
+            query = model_query(models.Job)
+            # NOTE: a job which has never been updated has only created_at
+            query = query.filter(sql.or_(
+                models.Job.updated_at < limit,
+                sql.and_(models.Job.updated_at.is_(None),
+                         models.Job.created_at < limit)))
+            return query.delete(synchronize_session=False)
@@ -272,3 +272,21 @@ class VolumeTarget(Base):
     boot_index = Column(Integer)
     volume_id = Column(String(36))
     extra = Column(db_types.JsonEncodedDict)
+
+
+class Job(Base):
+    """Represents an action run asynchronously by a conductor."""
+
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        schema.UniqueConstraint('uuid', name='uniq_jobs0uuid'),
+        Index('jobs_updated_at_idx', 'updated_at'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    uuid = Column(String(36))
+    node_id = Column(Integer, ForeignKey('nodes.id'), nullable=True)
+    action = Column(String(64))
+    state = Column(String(15))
+    arguments = Column(db_types.JsonEncodedDict)
+    result = Column(db_types.JsonEncodedDict)
+    error = Column(Text)
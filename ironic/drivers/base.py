@@ -556,6 +556,18 @@ class ConsoleInterface(BaseInterface):
         :returns: the console connection information.
         """
 
+    def get_console_log(self, task):
+        """Get the last output of the console.
+
+        Only the console interfaces recording the output of the console
+        return it.
+
+        :param task: a TaskManager instance containing the node to act on.
+        :returns: the output recorded, as bytes, or None if the output of
+                  the console is not recorded.
+        """
+        return None
+
 
 class RescueInterface(BaseInterface):
     """Interface for rescue-related actions."""
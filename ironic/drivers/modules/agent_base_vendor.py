@@ -445,16 +445,13 @@ class AgentDeployMixin(object):
         node = task.node
         LOG.debug('Heartbeat from node %s', node.uuid)
 
-        driver_internal_info = node.driver_internal_info
-        driver_internal_info['agent_url'] = callback_url
+        node.set_driver_internal_info('agent_url', callback_url)
 
         # TODO(rloo): 'agent_last_heartbeat' was deprecated since it wasn't
         # being used so remove that entry if it exists.
         # Hopefully all nodes will have been updated by Pike, so
         # we can delete this code then.
-        driver_internal_info.pop('agent_last_heartbeat', None)
-
-        node.driver_internal_info = driver_internal_info
+        node.del_driver_internal_info('agent_last_heartbeat')
         node.save()
 
         # Async call backs don't set error state on their own
@@ -0,0 +1,447 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Console proxy serving the serial consoles of all the nodes on one port.
+
+Unlike the shellinabox and socat consoles, which run a terminal server
+listening on its own port for each node, the proxy runs in the conductor
+and accepts the connections to all the consoles on [console]proxy_port.
+A client connects to the proxy, sends the token of the console of a node
+followed by a new line, then exchanges the raw bytes of the console. The
+proxy holds the command providing the console of each node (for example
+``ipmitool sol activate``), restarting it when a client connects if it
+has exited.
+
+When [console]log_buffer_size is set, the proxy also records the last
+output of each console in a ring buffer of that size. The output recorded
+is sent to the clients when they connect, and stored with the deploy logs
+when the deployment or the cleaning of the node fails.
+"""
+
+import atexit
+import binascii
+import mmap
+import os
+import socket
+
+import eventlet
+from eventlet.green import subprocess
+from eventlet import semaphore
+from oslo_log import log as logging
+from oslo_utils import netutils
+from oslo_utils import units
+
+from ironic.common import exception
+from ironic.common.i18n import _, _LE, _LW
+from ironic.conf import CONF
+
+
+LOG = logging.getLogger(__name__)
+
+_TOKEN_TIMEOUT = 10
+"""Time (in seconds) for a client to send its token once connected."""
+
+_MAX_TOKEN_LENGTH = 64
+
+_CHUNK_SIZE = 4096
+
+
+def _generate_token():
+    return binascii.hexlify(os.urandom(16)).decode('ascii')
+
+
+class _RingBuffer(object):
+    """Fixed size buffer keeping the last bytes written to it.
+
+    The bytes are stored in an anonymous memory mapping allocated once, and
+    read without being copied.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._view = memoryview(mmap.mmap(-1, size))
+        self._written = 0
+
+    def write(self, data):
+        """Append bytes to the buffer, overwriting the oldest ones."""
+        data = memoryview(data)[-self.size:]
+        start = self._written % self.size
+        first = min(len(data), self.size - start)
+        self._view[start:start + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self._written += len(data)
+
+    def read(self):
+        """Get the bytes of the buffer, the oldest first.
+
+        :returns: a list of memoryviews of the buffer, only valid until the
+                  next write.
+        """
+        if self._written <= self.size:
+            return [self._view[:self._written]]
+        start = self._written % self.size
+        return [self._view[start:], self._view[:start]]
+
+
+class _Session(object):
+    """The console of a node, and the client connected to it."""
+
+    def __init__(self, node_uuid, args, env, log=None):
+        self.node_uuid = node_uuid
+        self.args = args
+        self.env = env
+        self.log = log
+        self.token = _generate_token()
+        self.process = None
+        self.returncode = None
+        self.client = None
+        # Serializes the output sent to the client
+        self.lock = semaphore.Semaphore()
+
+    def start_process(self):
+        """Start the command providing the console.
+
+        :raises: ConsoleSubprocessFailed if the command cannot be run.
+        """
+        try:
+            LOG.debug('Running console subprocess of node %(node)s: '
+                      '%(args)s', {'node': self.node_uuid,
+                                   'args': ' '.join(self.args)})
+            self.process = subprocess.Popen(self.args, env=self.env,
+                                            stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.STDOUT)
+        except (OSError, ValueError) as e:
+            error = _("%(exec_error)s\n"
+                      "Command: %(command)s") % {'exec_error': e,
+                                                 'command': ' '.join(
+                                                     self.args)}
+            raise exception.ConsoleSubprocessFailed(error=error)
+        eventlet.spawn_n(self._forward_output, self.process)
+
+    def stop_process(self):
+        process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            try:
+                process.terminate()
+            except OSError:
+                # already gone
+                pass
+
+    def close_client(self):
+        """Disconnect the client.
+
+        The socket is only shut down, it is closed by the green thread
+        reading it: eventlet does not support closing a socket being read
+        by another green thread.
+        """
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def _forward_output(self, process):
+        """Send the output of the console command to the client."""
+        while True:
+            try:
+                data = process.stdout.read(_CHUNK_SIZE)
+            except (IOError, OSError, ValueError):
+                data = None
+            if not data:
+                break
+            self.on_output(data)
+
+        self.returncode = process.wait()
+        for pipe in (process.stdin, process.stdout):
+            try:
+                pipe.close()
+            except (IOError, OSError):
+                pass
+        if self.process is process:
+            # Not stopped by the proxy, it will be restarted when a client
+            # connects.
+            LOG.warning(_LW('The console subprocess of node %(node)s exited '
+                            'with code %(code)s'),
+                        {'node': self.node_uuid, 'code': process.returncode})
+            self.process = None
+            self.close_client()
+
+    def on_output(self, data):
+        """Handle the output of the console command.
+
+        :param data: the bytes read.
+        """
+        with self.lock:
+            if self.log is not None:
+                self.log.write(data)
+            client = self.client
+            if client is None:
+                return
+            try:
+                client.sendall(data)
+            except socket.error:
+                if self.client is client:
+                    self.close_client()
+
+    def connect_client(self, client):
+        """Make a client the client of the console.
+
+        Disconnects the previous client, and sends the output recorded to
+        the new one.
+
+        :param client: the socket of the client.
+        """
+        with self.lock:
+            self.close_client()
+            self.client = client
+            if self.log is None:
+                return
+            try:
+                for data in self.log.read():
+                    client.sendall(data)
+            except socket.error:
+                self.close_client()
+
+    def write(self, data):
+        """Send the input of the client to the console command."""
+        process = self.process
+        if process is None:
+            return
+        try:
+            process.stdin.write(data)
+            process.stdin.flush()
+        except (IOError, OSError, ValueError) as e:
+            LOG.debug('Failed to write to the console subprocess of node '
+                      '%(node)s: %(err)s', {'node': self.node_uuid, 'err': e})
+
+
+class ConsoleProxy(object):
+    """Serve the consoles of the nodes on a single listening socket."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._tokens = {}
+        self._server = None
+
+    def _ensure_server(self):
+        if self._server is not None:
+            return
+        host = CONF.my_ip
+        family = (socket.AF_INET6 if netutils.is_valid_ipv6(host)
+                  else socket.AF_INET)
+        try:
+            server = eventlet.listen((host, CONF.console.proxy_port),
+                                     family=family)
+        except socket.error as e:
+            msg = (_("Cannot listen on %(host)s:%(port)s for the console "
+                     "proxy. Reason: %(reason)s.") %
+                   {'host': host, 'port': CONF.console.proxy_port,
+                    'reason': e})
+            raise exception.ConsoleError(message=msg)
+        self._server = server
+        eventlet.spawn_n(self._serve, server)
+
+    def _serve(self, server):
+        while self._server is server:
+            try:
+                client, address = server.accept()
+            except socket.error as e:
+                if self._server is not server:
+                    break
+                LOG.warning(_LW('The console proxy failed to accept a '
+                                'connection: %s'), e)
+                continue
+            eventlet.spawn_n(self._handle_client, client, address)
+        server.close()
+
+    def _read_token(self, client):
+        """Read the token sent by a client.
+
+        :returns: a tuple (token, bytes received after the token), or
+                  (None, None) if the client did not send a valid line.
+        """
+        received = b''
+        with eventlet.Timeout(_TOKEN_TIMEOUT, False):
+            while b'\n' not in received:
+                try:
+                    data = client.recv(_MAX_TOKEN_LENGTH)
+                except socket.error:
+                    data = None
+                if not data or len(received) > _MAX_TOKEN_LENGTH:
+                    return None, None
+                received += data
+        if b'\n' not in received:
+            return None, None
+        line, rest = received.split(b'\n', 1)
+        return line.strip().decode('ascii', 'replace'), rest
+
+    def _handle_client(self, client, address):
+        try:
+            self._serve_client(client, address)
+        finally:
+            client.close()
+
+    def _serve_client(self, client, address):
+        token, rest = self._read_token(client)
+        session = self._tokens.get(token) if token else None
+        if session is None:
+            LOG.warning(_LW('Rejected a connection to the console proxy '
+                            'from %s with an invalid token'), address[0])
+            try:
+                client.sendall(b'Invalid console token\r\n')
+            except socket.error:
+                pass
+            return
+
+        if session.process is None:
+            try:
+                session.start_process()
+            except exception.ConsoleSubprocessFailed as e:
+                LOG.error(_LE('Failed to restart the console of node '
+                              '%(node)s: %(err)s'),
+                          {'node': session.node_uuid, 'err': e})
+                return
+
+        # Only one client at a time, the last one wins: the previous client
+        # may have gone without closing its connection.
+        session.connect_client(client)
+        LOG.debug('Client %(client)s connected to the console of node '
+                  '%(node)s', {'client': address[0],
+                               'node': session.node_uuid})
+        if rest:
+            session.write(rest)
+        while session.client is client:
+            try:
+                data = client.recv(_CHUNK_SIZE)
+            except socket.error:
+                data = None
+            if not data:
+                break
+            session.write(data)
+        if session.client is client:
+            session.close_client()
+
+    def register(self, node_uuid, args, env=None):
+        """Start serving the console of a node.
+
+        Replaces the previous console of the node, if any.
+
+        :param node_uuid: the UUID of the node.
+        :param args: the command providing the console, as a list.
+        :param env: the environment of the command, the environment of the
+                    conductor if None.
+        :returns: the token of the console.
+        :raises: ConsoleError if the proxy cannot listen for connections.
+        :raises: ConsoleSubprocessFailed if the command cannot be run.
+        """
+        self._ensure_server()
+        log = None
+        log_size = CONF.console.log_buffer_size * units.Mi
+        previous = self._sessions.get(node_uuid)
+        if previous is not None and previous.log is not None:
+            if previous.log.size == log_size:
+                # Keep the output recorded when the console is restarted
+                log = previous.log
+        if log is None and log_size:
+            log = _RingBuffer(log_size)
+        self.unregister(node_uuid)
+        session = _Session(node_uuid, args, env, log=log)
+        session.start_process()
+        # NOTE: give the command a chance to fail, e.g. when the
+        # credentials are wrong, like the other consoles do.
+        eventlet.sleep(CONF.console.subprocess_checking_interval)
+        if session.process is None:
+            raise exception.ConsoleSubprocessFailed(
+                error=_("The console command of node %(node)s exited with "
+                        "code %(code)s. Command: %(command)s") %
+                {'node': node_uuid, 'code': session.returncode,
+                 'command': ' '.join(args)})
+        self._sessions[node_uuid] = session
+        self._tokens[session.token] = session
+        return session.token
+
+    def unregister(self, node_uuid):
+        """Stop serving the console of a node.
+
+        Does nothing if the console of the node is not served.
+
+        :param node_uuid: the UUID of the node.
+        """
+        session = self._sessions.pop(node_uuid, None)
+        if session is None:
+            return
+        self._tokens.pop(session.token, None)
+        session.close_client()
+        session.stop_process()
+
+    def get_token(self, node_uuid):
+        """Get the token of the console of a node.
+
+        :param node_uuid: the UUID of the node.
+        :returns: the token, or None if the console of the node is not
+                  served.
+        """
+        session = self._sessions.get(node_uuid)
+        return session.token if session is not None else None
+
+    def get_log(self, node_uuid):
+        """Get the last output of the console of a node.
+
+        :param node_uuid: the UUID of the node.
+        :returns: a list of memoryviews of the output, the oldest first,
+                  only valid until the console outputs more bytes, or None
+                  if the output of the console of the node is not recorded.
+        """
+        session = self._sessions.get(node_uuid)
+        if session is None or session.log is None:
+            return None
+        return session.log.read()
+
+    def stop(self):
+        """Stop serving all the consoles and close the listening socket."""
+        for node_uuid in list(self._sessions):
+            self.unregister(node_uuid)
+        server, self._server = self._server, None
+        if server is not None:
+            # Wakes up the green thread accepting the connections, which
+            # closes the socket.
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def get_url(self):
+        """Get the URL of the proxy."""
+        host = CONF.my_ip
+        if netutils.is_valid_ipv6(host):
+            host = '[%s]' % host
+        return 'tcp://%(host)s:%(port)s' % {'host': host,
+                                            'port': CONF.console.proxy_port}
+
+
+_PROXY = None
+
+
+def get_proxy():
+    """Get the console proxy of this process.
+
+    The proxy is stopped when the process exits, so that the commands
+    providing the consoles do not outlive it.
+    """
+    global _PROXY
+    if _PROXY is None:
+        _PROXY = ConsoleProxy()
+        atexit.register(_PROXY.stop)
+    return _PROXY
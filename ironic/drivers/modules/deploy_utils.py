@@ -15,7 +15,9 @@
 
 
 import contextlib
+import functools
 import glob
+import hashlib
 import os
 import re
 import time
@@ -34,6 +36,7 @@ from ironic.common import exception
 from ironic.common.glance_service import service_utils
 from ironic.common.i18n import _, _LE, _LW
 from ironic.common import image_service
+from ironic.common import images
 from ironic.common import keystone
 from ironic.common import states
 from ironic.common import utils
@@ -488,6 +491,85 @@ def fetch_images(ctx, cache, images_info, force_raw=True):
         cache.fetch_image(href, path, ctx=ctx, force_raw=force_raw)
 
 
+@image_cache.cleanup(priority=10)
+class BootImageCache(image_cache.ImageCache):
+    """Cache of the boot ISOs built for virtual media."""
+
+    def __init__(self):
+        super(BootImageCache, self).__init__(
+            CONF.deploy.boot_image_master_path,
+            # MiB -> B
+            cache_size=CONF.pxe.image_cache_size * 1024 * 1024,
+            # min -> sec
+            cache_ttl=CONF.pxe.image_cache_ttl * 60)
+
+
+def _boot_image_key(kind, *parts):
+    """Compute the name of an image in the BootImageCache.
+
+    :param kind: the kind of image, prefixing the name.
+    :param parts: what the image is built from.
+    :returns: the kind followed by the SHA-256 checksum of the parts.
+    """
+    checksum = hashlib.sha256()
+    for part in parts:
+        checksum.update(six.text_type(part).encode('utf-8') + b'\0')
+    return '%s-%s' % (kind, checksum.hexdigest())
+
+
+def _image_version(ctx, href):
+    """Identify the content of an image, for the keys of BootImageCache.
+
+    The content of the Glance images cannot change, the other images are
+    identified by their href and their last modification time.
+    """
+    if service_utils.is_glance_image(href):
+        return href
+    img_service = image_service.get_image_service(href, context=ctx)
+    return '%s@%s' % (href, img_service.show(href).get('updated_at'))
+
+
+def create_boot_iso(ctx, output_filename, kernel_href, ramdisk_href,
+                    deploy_iso_href, root_uuid=None, kernel_params=None,
+                    boot_mode=None):
+    """Create a bootable ISO image for a node, reusing the ISOs built before.
+
+    Same as images.create_boot_iso(), the ISOs being cached in the
+    BootImageCache when [deploy]boot_image_master_path is set: the nodes
+    booting the same kernel and ramdisk, with the same root partition and
+    parameters, share the ISO built for the first of them.
+
+    :param ctx: context
+    :param output_filename: the absolute path of the output ISO file
+    :param kernel_href: URL or glance uuid of the kernel to use
+    :param ramdisk_href: URL or glance uuid of the ramdisk to use
+    :param deploy_iso_href: URL or glance uuid of the deploy iso used
+    :param root_uuid: uuid of the root filesystem (optional)
+    :param kernel_params: a string containing whitespace separated values
+        kernel cmdline arguments of the form K=V or K (optional).
+    :param boot_mode: the boot mode in which the deploy is to happen.
+    :raises: ImageCreationFailed, if creating boot ISO failed.
+    """
+    cache = BootImageCache()
+    if cache.master_dir is None:
+        images.create_boot_iso(ctx, output_filename, kernel_href,
+                               ramdisk_href, deploy_iso_href, root_uuid,
+                               kernel_params, boot_mode)
+        return
+
+    # NOTE: the deploy ISO is only used in UEFI boot mode
+    hrefs = [kernel_href, ramdisk_href]
+    if boot_mode == 'uefi':
+        hrefs.append(deploy_iso_href)
+    key = _boot_image_key('iso', root_uuid, kernel_params, boot_mode,
+                          *[_image_version(ctx, href) for href in hrefs])
+    cache.build_image(key, output_filename, functools.partial(
+        images.create_boot_iso, ctx, kernel_href=kernel_href,
+        ramdisk_href=ramdisk_href, deploy_iso_href=deploy_iso_href,
+        root_uuid=root_uuid, kernel_params=kernel_params,
+        boot_mode=boot_mode))
+
+
 def set_failed_state(task, msg, collect_logs=True):
     """Sets the deploy status as failed with relevant messages.
 
@@ -507,6 +589,7 @@ def set_failed_state(task, msg, collect_logs=True):
     if (collect_logs and
             CONF.agent.deploy_logs_collect in ('on_failure', 'always')):
         driver_utils.collect_ramdisk_logs(node)
+    driver_utils.store_console_log(task)
 
     try:
         task.process_event('fail')
@@ -632,9 +632,7 @@ def _commit_to_controllers(node, controllers):
                   node.uuid)
         return
 
-    driver_internal_info = node.driver_internal_info
-    if 'raid_config_job_ids' not in driver_internal_info:
-        driver_internal_info['raid_config_job_ids'] = []
+    job_ids = list(node.driver_internal_info.get('raid_config_job_ids', []))
 
     controllers = list(controllers)
     for controller in controllers:
@@ -652,9 +650,9 @@ def _commit_to_controllers(node, controllers):
                  {'controller': controller, 'node': node.uuid,
                   'job_id': job_id})
 
-        driver_internal_info['raid_config_job_ids'].append(job_id)
+        job_ids.append(job_id)
 
-    node.driver_internal_info = driver_internal_info
+    node.set_driver_internal_info('raid_config_job_ids', job_ids)
     node.save()
 
     return states.CLEANWAIT
@@ -855,26 +853,22 @@ class DracRAID(base.RAIDInterface):
                 self._set_clean_failed(task, config_job)
 
     def _set_raid_config_job_failure(self, node):
-        driver_internal_info = node.driver_internal_info
-        driver_internal_info['raid_config_job_failure'] = True
-        node.driver_internal_info = driver_internal_info
+        node.set_driver_internal_info('raid_config_job_failure', True)
         node.save()
 
     def _clear_raid_config_job_failure(self, node):
-        driver_internal_info = node.driver_internal_info
-        del driver_internal_info['raid_config_job_failure']
-        node.driver_internal_info = driver_internal_info
+        node.del_driver_internal_info('raid_config_job_failure')
         node.save()
 
     def _delete_cached_config_job_id(self, node, finished_config_job_ids=None):
         if finished_config_job_ids is None:
             finished_config_job_ids = []
-        driver_internal_info = node.driver_internal_info
         unfinished_job_ids = [job_id for job_id
-                              in driver_internal_info['raid_config_job_ids']
+                              in node.driver_internal_info[
+                                  'raid_config_job_ids']
                               if job_id not in finished_config_job_ids]
-        driver_internal_info['raid_config_job_ids'] = unfinished_job_ids
-        node.driver_internal_info = driver_internal_info
+        node.set_driver_internal_info('raid_config_job_ids',
+                                      unfinished_job_ids)
         node.save()
 
     def _set_clean_failed(self, task, config_job):
@@ -167,6 +167,8 @@ def _get_boot_iso(task, root_uuid):
     # not implemented as of now. Creation/Deletion of such a shared boot ISO
     # will require synchronisation across conductor nodes for the shared boot
     # ISO.  Such a synchronisation mechanism doesn't exist in ironic as of now.
+    # The ISOs built are shared through the BootImageCache of the conductor
+    # though, each node still getting its own copy of the ISO.
 
     # Option 3 - Create boot_iso from kernel/ramdisk, upload to Swift
     # or web server and provide its name.
@@ -176,10 +178,10 @@ def _get_boot_iso(task, root_uuid):
     kernel_params = CONF.pxe.pxe_append_params
     with tempfile.NamedTemporaryFile(dir=CONF.tempdir) as fileobj:
         boot_iso_tmp_file = fileobj.name
-        images.create_boot_iso(task.context, boot_iso_tmp_file,
-                               kernel_href, ramdisk_href,
-                               deploy_iso_uuid, root_uuid,
-                               kernel_params, boot_mode)
+        deploy_utils.create_boot_iso(task.context, boot_iso_tmp_file,
+                                     kernel_href, ramdisk_href,
+                                     deploy_iso_uuid, root_uuid,
+                                     kernel_params, boot_mode)
 
         if CONF.ilo.use_web_server_for_images:
             boot_iso_url = (
@@ -487,9 +487,7 @@ def update_boot_mode(task):
     # No boot mode found. Check if default_boot_mode is defined
     if not boot_mode and (CONF.ilo.default_boot_mode in ['bios', 'uefi']):
         boot_mode = CONF.ilo.default_boot_mode
-        instance_info = node.instance_info
-        instance_info['deploy_boot_mode'] = boot_mode
-        node.instance_info = instance_info
+        node.set_instance_info('deploy_boot_mode', boot_mode)
         node.save()
 
     # Boot mode is computed, setting it for the deploy
@@ -529,9 +527,7 @@ def update_boot_mode(task):
                   "as pending boot mode is unknown.",
                   {'uuid': node.uuid, 'boot_mode': boot_mode})
 
-    instance_info = node.instance_info
-    instance_info['deploy_boot_mode'] = boot_mode
-    node.instance_info = instance_info
+    node.set_instance_info('deploy_boot_mode', boot_mode)
     node.save()
 
 
@@ -18,14 +18,25 @@
 Utility for caching master images.
 """
 
+import abc
+import collections
+import contextlib
+import errno
+import math
 import os
+import shutil
+import sqlite3
 import tempfile
+import threading
 import time
 import uuid
 
+from ironic_lib import metrics_utils
+from ironic_lib import utils as ironic_utils
 from oslo_concurrency import lockutils
 from oslo_log import log as logging
 from oslo_utils import fileutils
+from oslo_utils import units
 import six
 
 from ironic.common import exception
@@ -39,28 +50,566 @@ from ironic.conf import CONF
 
 LOG = logging.getLogger(__name__)
 
+METRICS = metrics_utils.get_metrics_logger(__name__)
+
 # This would contain a sorted list of instances of ImageCache to be
 # considered for cleanup. This list will be kept sorted in non-increasing
 # order of priority.
 _cache_cleanup_list = []
 
+_INDEX_FILE_NAME = '.index.sqlite'
+"""Name of the index of a cache directory, in the directory itself."""
+
+_INDEX_BATCH_SIZE = 64
+"""Number of index entries read at once when looking for images to delete."""
+
+_ALIAS_DIR_NAME = '.aliases'
+"""Name of the directory of the aliases of a content-addressed cache."""
+
+_LOCK_DIR_NAME = '.locks'
+"""Name of the directory of the file locks of a shared cache."""
+
+_CONTENT_HASH_ALGO = 'sha256'
+"""Algorithm of the checksums naming the images of a content-addressed cache.
+
+Unlike MD5, it is not possible to create two images with the same checksum,
+which would let an image be deployed instead of another.
+"""
+
+_DOWNLOAD_PROGRESS_INTERVAL = 30
+"""Interval (in seconds) of the reports of the downloads awaited."""
+
+# The indexes of the cache directories opened by this process, by directory
+_indexes = {}
+
+# The images being fetched by this process, by cache directory and name
+_downloads = {}
+
+
+@six.add_metaclass(abc.ABCMeta)
+class EvictionPolicy(object):
+    """Base class of the eviction policies of the master image caches.
+
+    A policy gives each image of a cache a priority, computed when the image
+    is downloaded and each time it is used again. When the cache is larger
+    than its maximum size, the images with the lowest priority are deleted
+    first.
+    """
+
+    name = None
+    """Name of the policy in the configuration."""
+
+    @abc.abstractmethod
+    def priority(self, size, uses, now, previous, inflation):
+        """Compute the priority of an image of the cache.
+
+        :param size: the size of the image, in bytes.
+        :param uses: how many times the image was used, including this use.
+        :param now: the time of this use.
+        :param previous: the priority of the image before this use, or None
+                         when the image is added to the cache.
+        :param inflation: the highest priority of the images deleted from the
+                          cache so far, 0 if none was.
+        :returns: the priority of the image, as a float.
+        """
+
+
+class LRUEvictionPolicy(EvictionPolicy):
+    """Delete the least recently used images first."""
+
+    name = 'lru'
+
+    def priority(self, size, uses, now, previous, inflation):
+        return now
+
+
+class LFUEvictionPolicy(EvictionPolicy):
+    """Delete the least frequently used images first.
+
+    Each use of an image counts for 1, halved every
+    [pxe]image_cache_lfu_half_life minutes, so that the images used a lot in
+    the past are not kept forever. The priority is the logarithm of the
+    decayed count scaled to the current time, so the priorities of images
+    used at different times can be compared without updating them all.
+    """
+
+    name = 'lfu'
+
+    def priority(self, size, uses, now, previous, inflation):
+        now = now / (CONF.pxe.image_cache_lfu_half_life * 60.0)
+        if previous is None:
+            return now + math.log(uses, 2)
+        high, low = max(previous, now), min(previous, now)
+        return high + math.log(1 + 2 ** (low - high), 2)
+
+
+class GreedyDualSizeEvictionPolicy(EvictionPolicy):
+    """Delete the large and rarely used images first.
+
+    Implements GreedyDual-Size-Frequency: the priority of an image is its
+    number of uses per MiB, plus the priority of the last image deleted.
+    The small images used for every deployment are kept over a large image
+    used once, while the inflation makes the images which are not used any
+    more eventually expire.
+    """
+
+    name = 'greedy-dual-size'
+
+    def priority(self, size, uses, now, previous, inflation):
+        return inflation + float(uses) * units.Mi / max(size, 1)
+
+
+EVICTION_POLICIES = {policy.name: policy for policy in (
+    LRUEvictionPolicy, LFUEvictionPolicy, GreedyDualSizeEvictionPolicy)}
+"""Eviction policies of the master image caches, by name."""
+
+
+class _MasterImageIndex(object):
+    """Persistent index of the master images of a cache directory.
+
+    Records the size, the last use time, the number of uses and the priority
+    given by the eviction policy of each master image in a SQLite database
+    stored in the cache directory. The index is updated when an image is
+    downloaded, linked or deleted, so that the clean up finds the images to
+    delete and the size of the cache without listing the directory and
+    calling stat() on every image. The link count of the images is not
+    recorded, since the links are deleted without the cache knowing it: it
+    is only checked for the images about to be deleted.
+
+    The aliases of the images of a content-addressed cache, the hrefs they
+    were downloaded from, are recorded too, to compute the deduplication
+    ratio of the cache and to find the aliases of an image deleted.
+
+    The index of a directory shared by several conductors is kept in the
+    memory of each process instead, since the locking of SQLite is not
+    reliable on network file systems, and is reconciled with the directory
+    before each clean up to take the changes of the other conductors into
+    account. The uses of its images are then only counted from the start of
+    the process.
+    """
+
+    _SCHEMA_VERSION = 2
+
+    _SCHEMA = (
+        'DROP TABLE IF EXISTS images',
+        'DROP TABLE IF EXISTS total',
+        'DROP TABLE IF EXISTS settings',
+        'DROP TABLE IF EXISTS aliases',
+        'CREATE TABLE images ('
+        'name TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+        'last_used REAL NOT NULL, uses INTEGER NOT NULL, '
+        'priority REAL NOT NULL)',
+        'CREATE INDEX images_last_used ON images (last_used, name)',
+        'CREATE INDEX images_priority ON images (priority, name)',
+        'CREATE TABLE total (size INTEGER NOT NULL)',
+        'INSERT INTO total VALUES (0)',
+        'CREATE TRIGGER images_insert AFTER INSERT ON images '
+        'BEGIN UPDATE total SET size = size + NEW.size; END',
+        'CREATE TRIGGER images_delete AFTER DELETE ON images '
+        'BEGIN UPDATE total SET size = size - OLD.size; '
+        'DELETE FROM aliases WHERE image = OLD.name; END',
+        'CREATE TRIGGER images_update AFTER UPDATE OF size ON images '
+        'BEGIN UPDATE total SET size = size - OLD.size + NEW.size; END',
+        'CREATE TABLE settings (name TEXT PRIMARY KEY, value)',
+        "INSERT INTO settings VALUES ('policy', NULL)",
+        "INSERT INTO settings VALUES ('inflation', 0)",
+        'CREATE TABLE aliases (name TEXT PRIMARY KEY, image TEXT NOT NULL)',
+        'CREATE INDEX aliases_image ON aliases (image)',
+        'PRAGMA user_version = %d' % _SCHEMA_VERSION,
+    )
+
+    def __init__(self, master_dir, policy, shared=False):
+        self.master_dir = master_dir
+        self.shared = shared
+        if shared:
+            path = ':memory:'
+        else:
+            path = os.path.join(master_dir, _INDEX_FILE_NAME)
+        try:
+            self._conn = self._open(path)
+        except sqlite3.DatabaseError as exc:
+            LOG.warning(_LW("Rebuilding the index of master image cache "
+                            "%(dir)s, it cannot be read: %(exc)s"),
+                        {'dir': master_dir, 'exc': exc})
+            os.unlink(path)
+            self._conn = self._open(path)
+        self.policy = None
+        self.set_policy(policy)
+        self.reconcile()
+
+    def _open(self, path):
+        # NOTE: the connection is shared by the green threads of the process
+        conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != self._SCHEMA_VERSION:
+            # NOTE: the index is rebuilt from the directory by reconcile()
+            with conn:
+                for statement in self._SCHEMA:
+                    conn.execute(statement)
+        self._settings = dict(conn.execute('SELECT name, value '
+                                           'FROM settings'))
+        return conn
+
+    def _set(self, name, value):
+        self._conn.execute('UPDATE settings SET value = ? WHERE name = ?',
+                           (value, name))
+        self._settings[name] = value
+
+    def _priority(self, size, uses, now, previous=None):
+        return self.policy.priority(size, uses, now, previous,
+                                    self._settings['inflation'])
+
+    def set_policy(self, policy):
+        """Set the eviction policy giving the priorities of the images.
+
+        The priorities of all the images are computed again if the index
+        was last used with another policy.
+
+        :param policy: an EvictionPolicy instance.
+        """
+        self.policy = policy
+        if self._settings['policy'] == policy.name:
+            return
+        with self._conn:
+            rows = self._conn.execute(
+                'SELECT name, size, last_used, uses FROM images').fetchall()
+            self._conn.executemany(
+                'UPDATE images SET priority = ? WHERE name = ?',
+                ((self._priority(size, uses, last_used), name)
+                 for name, size, last_used, uses in rows))
+            self._set('policy', policy.name)
+
+    def reconcile(self):
+        """Synchronize the index with the content of the cache directory.
+
+        Adds the images missing from the index, like the images cached
+        before the index existed, and removes the images which no longer
+        exist. The aliases are read again, and the aliases of images which
+        no longer exist are deleted.
+        """
+        indexed = set(name for name, in
+                      self._conn.execute('SELECT name FROM images'))
+        found = set()
+        with self._conn:
+            for file_name in os.listdir(self.master_dir):
+                path = os.path.join(self.master_dir, file_name)
+                if file_name.startswith('.') or not os.path.isfile(path):
+                    continue
+                found.add(file_name)
+                if file_name in indexed:
+                    continue
+                stat = os.stat(path)
+                # NOTE(dtantsur): Detect most recently accessed files,
+                # seeing atime can be disabled by the mount option
+                # Also include ctime as it changes when image is linked to
+                last_used = max(stat.st_mtime, stat.st_atime, stat.st_ctime)
+                self._conn.execute(
+                    'INSERT INTO images VALUES (?, ?, ?, 1, ?)',
+                    (file_name, stat.st_size, last_used,
+                     self._priority(stat.st_size, 1, last_used)))
+            self._conn.executemany('DELETE FROM images WHERE name = ?',
+                                   ((name,) for name in indexed - found))
+
+        alias_dir = os.path.join(self.master_dir, _ALIAS_DIR_NAME)
+        aliases = []
+        if os.path.isdir(alias_dir):
+            for alias in os.listdir(alias_dir):
+                if alias.startswith('.'):
+                    continue
+                path = os.path.join(alias_dir, alias)
+                image = _read_alias(path)
+                if image in found:
+                    aliases.append((alias, image))
+                elif image is not None:
+                    ironic_utils.unlink_without_raise(path)
+        with self._conn:
+            self._conn.execute('DELETE FROM aliases')
+            self._conn.executemany('INSERT INTO aliases VALUES (?, ?)',
+                                   aliases)
+
+    def add(self, file_name, size):
+        """Record an image added to the cache, as used now."""
+        now = time.time()
+        priority = self._priority(size, 1, now)
+        with self._conn:
+            cursor = self._conn.execute(
+                'UPDATE images SET size = ?, last_used = ?, uses = 1, '
+                'priority = ? WHERE name = ?',
+                (size, now, priority, file_name))
+            if not cursor.rowcount:
+                self._conn.execute(
+                    'INSERT INTO images VALUES (?, ?, ?, 1, ?)',
+                    (file_name, size, now, priority))
+
+    def touch(self, file_name):
+        """Record that an image of the cache is used now."""
+        now = time.time()
+        with self._conn:
+            row = self._conn.execute(
+                'SELECT size, uses, priority FROM images WHERE name = ?',
+                (file_name,)).fetchone()
+            if row is None:
+                return
+            size, uses, priority = row
+            self._conn.execute(
+                'UPDATE images SET last_used = ?, uses = ?, priority = ? '
+                'WHERE name = ?',
+                (now, uses + 1,
+                 self._priority(size, uses + 1, now, priority), file_name))
+
+    def remove(self, file_name):
+        """Record an image removed from the cache, with its aliases."""
+        with self._conn:
+            self._conn.execute('DELETE FROM images WHERE name = ?',
+                               (file_name,))
+
+    def evict(self, file_name):
+        """Record an image deleted from the cache by the clean up.
+
+        Unlike remove(), raises the inflation of the priorities to the
+        priority of the image, for the policies which use it.
+        """
+        with self._conn:
+            row = self._conn.execute(
+                'SELECT priority FROM images WHERE name = ?',
+                (file_name,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute('DELETE FROM images WHERE name = ?',
+                               (file_name,))
+            if row[0] > self._settings['inflation']:
+                self._set('inflation', row[0])
+
+    def add_alias(self, alias, file_name):
+        """Record an alias of an image of the cache, replacing any other."""
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?)',
+                               (alias, file_name))
+
+    def remove_alias(self, alias):
+        """Record an alias removed from the cache."""
+        with self._conn:
+            self._conn.execute('DELETE FROM aliases WHERE name = ?', (alias,))
+
+    def aliases(self, file_name):
+        """Get the aliases of an image of the cache."""
+        return [alias for alias, in self._conn.execute(
+            'SELECT name FROM aliases WHERE image = ?', (file_name,))]
+
+    def total_size(self):
+        """Get the size of the images of the cache, in bytes."""
+        return self._conn.execute('SELECT size FROM total').fetchone()[0]
+
+    def aliased_size(self):
+        """Get the sizes of the aliased images of the cache.
+
+        :returns: a tuple of the size of the images of all the aliases, as
+                  if each alias was stored separately, and of the size of
+                  the aliased images actually stored, in bytes.
+        """
+        logical = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM aliases '
+            'JOIN images ON aliases.image = images.name').fetchone()[0]
+        stored = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM images '
+            'WHERE name IN (SELECT image FROM aliases)').fetchone()[0]
+        return logical, stored
+
+    def _iterate(self, column, below=None):
+        last = (float('-inf'), '')
+        while True:
+            query = ('SELECT name, size, {0} FROM images '
+                     'WHERE ({0} > ? OR ({0} = ? AND name > ?))'
+                     ).format(column)
+            params = [last[0], last[0], last[1]]
+            if below is not None:
+                query += ' AND {0} < ?'.format(column)
+                params.append(below)
+            query += ' ORDER BY {0}, name LIMIT ?'.format(column)
+            params.append(_INDEX_BATCH_SIZE)
+            rows = self._conn.execute(query, params).fetchall()
+            for row in rows:
+                yield row
+            if len(rows) < _INDEX_BATCH_SIZE:
+                return
+            last = (rows[-1][2], rows[-1][0])
+
+    def oldest(self, used_before=None):
+        """Iterate over the images of the cache, the least recently used first.
+
+        The images can be removed from the index while iterating.
+
+        :param used_before: if not None, only the images last used before
+                            this time are returned.
+        :returns: iterator yielding tuples (file name, size, last used time)
+        """
+        return self._iterate('last_used', used_before)
+
+    def lowest_priority(self):
+        """Iterate over the images of the cache, the lowest priority first.
+
+        The images can be removed from the index while iterating.
+
+        :returns: iterator yielding tuples (file name, size, priority)
+        """
+        return self._iterate('priority')
+
+
+class _Download(object):
+    """A fetch of a master image by a request, awaited by the others.
+
+    The other requests of the process fetching the same image into the same
+    cache wait for it to complete instead of queuing on the lock of the
+    image, then link the image from the cache. If the image cannot be
+    downloaded, they fail with the same error instead of downloading it
+    again one after the other.
+    """
+
+    def __init__(self, href):
+        self.href = href
+        self.started = time.time()
+        self.tmp_dir = None
+        """Temporary directory of the download, None until it starts."""
+        self.error = None
+        """Exception the download failed with, if it did."""
+        self.waiters = 0
+        self.reported = 0
+        self.last_report = self.started
+        self._done = threading.Event()
+
+    def written(self):
+        """Get the number of bytes of the image written to the disk so far.
+
+        The blocks of zeros skipped while the image is written are not
+        counted.
+        """
+        written = 0
+        if self.tmp_dir is not None:
+            try:
+                names = os.listdir(self.tmp_dir)
+            except OSError:
+                names = []
+            for name in names:
+                if not name.endswith('.part'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.tmp_dir, name))
+                except OSError:
+                    continue
+                written += stat.st_blocks * 512
+        # NOTE: the partial file is deleted once the image is converted
+        return max(written, self.reported)
+
+    def finish(self):
+        """Wake up the requests waiting for the fetch."""
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Wait for the fetch to complete.
+
+        :returns: True if it completed, False if the timeout expired.
+        """
+        return self._done.wait(timeout)
+
+
+def _get_index(master_dir, policy):
+    """Get the index of a cache directory, opening it if needed.
+
+    :param master_dir: the cache directory.
+    :param policy: the EvictionPolicy of the cache.
+    """
+    shared = CONF.pxe.image_cache_shared
+    index = _indexes.get(master_dir)
+    if index is None or index.shared != shared:
+        index = _indexes[master_dir] = _MasterImageIndex(master_dir, policy,
+                                                         shared=shared)
+    elif index.policy.name != policy.name:
+        index.set_policy(policy)
+    return index
+
 
 class ImageCache(object):
-    """Class handling access to cache for master images."""
+    """Class handling access to cache for master images.
+
+    By default, the master images are named after the UUID of their Glance
+    image, or a UUID computed from their href. With
+    [pxe]image_cache_content_addressed, they are named after the checksum
+    of their content, and each href is an alias of an image: the same image
+    downloaded from several hrefs is stored once.
+
+    With [pxe]image_cache_shared, the cache directory can be shared by the
+    conductors, e.g. on NFS: the images are then locked with file locks in
+    the directory, and each image is downloaded by a single conductor.
+
+    The requests of the process fetching an image being downloaded wait for
+    the download, see _Download, and the downloads failing are retried up
+    to [pxe]image_cache_download_attempts times.
+    """
 
-    def __init__(self, master_dir, cache_size, cache_ttl):
+    warm_keys = ()
+    """Keys of instance_info and driver_info naming the images of the cache.
+
+    They give the images downloaded into the cache by warm_caches().
+    """
+
+    def __init__(self, master_dir, cache_size, cache_ttl,
+                 eviction_policy=None, fetcher=None):
         """Constructor.
 
         :param master_dir: cache directory to work on
                            Value of None disables image caching.
         :param cache_size: desired maximum cache size in bytes
         :param cache_ttl: cache entity TTL in seconds
+        :param eviction_policy: name of the policy choosing the images to
+                                delete when the cache is too large, one of
+                                EVICTION_POLICIES. Defaults to
+                                [pxe]image_cache_eviction_policy.
+        :param fetcher: function downloading the images, taking the
+                        arguments of _fetch(). Defaults to _fetch().
         """
         self.master_dir = master_dir
+        self._fetcher = fetcher
         self._cache_size = cache_size
         self._cache_ttl = cache_ttl
+        self._policy = EVICTION_POLICIES[
+            eviction_policy or CONF.pxe.image_cache_eviction_policy]()
+        self._content_addressed = CONF.pxe.image_cache_content_addressed
         if master_dir is not None:
             fileutils.ensure_tree(master_dir)
+            if self._content_addressed:
+                fileutils.ensure_tree(os.path.join(master_dir,
+                                                   _ALIAS_DIR_NAME))
+
+    @property
+    def _index(self):
+        """The persistent index of the master images of the cache."""
+        return _get_index(self.master_dir, self._policy)
+
+    def _run_fetcher(self, ctx, href, path, force_raw, **kwargs):
+        """Download an image with the fetcher of the cache."""
+        fetcher = self._fetcher or _fetch
+        return fetcher(ctx, href, path, force_raw, **kwargs)
+
+    @contextlib.contextmanager
+    def _shared_lock(self, name):
+        """Lock a name across the conductors sharing the cache directory.
+
+        Does nothing unless [pxe]image_cache_shared is set: the locks of the
+        process are then enough.
+        """
+        if not CONF.pxe.image_cache_shared:
+            yield
+            return
+        lock_path = os.path.join(self.master_dir, _LOCK_DIR_NAME)
+        with lockutils.external_lock(name, lock_path=lock_path):
+            yield
+
+    @contextlib.contextmanager
+    def _master_image_lock(self):
+        """Lock the images of the cache against the clean up."""
+        with lockutils.lock('master_image'), \
+                self._shared_lock('master_image'):
+            yield
 
     def fetch_image(self, href, dest_path, ctx=None, force_raw=True):
         """Fetch image by given href to the destination path.
@@ -77,16 +626,18 @@ class ImageCache(object):
         :param ctx: context
         :param force_raw: boolean value, whether to convert the image to raw
                           format
+        :returns: True if the image was downloaded, False if it was already
+                  in the cache.
         """
         img_download_lock_name = 'download-image'
         if self.master_dir is None:
             # NOTE(ghe): We don't share images between instances/hosts
             if not CONF.parallel_image_downloads:
                 with lockutils.lock(img_download_lock_name):
-                    _fetch(ctx, href, dest_path, force_raw)
+                    self._run_fetcher(ctx, href, dest_path, force_raw)
             else:
-                _fetch(ctx, href, dest_path, force_raw)
-            return
+                self._run_fetcher(ctx, href, dest_path, force_raw)
+            return True
 
         # TODO(ghe): have hard links and counts the same behaviour in all fs
 
@@ -100,43 +651,430 @@ class ImageCache(object):
             href_encoded = href.encode('utf-8') if six.PY2 else href
             master_file_name = str(uuid.uuid5(uuid.NAMESPACE_URL,
                                               href_encoded))
-        master_path = os.path.join(self.master_dir, master_file_name)
 
         if CONF.parallel_image_downloads:
             img_download_lock_name = 'download-image:%s' % master_file_name
 
         # TODO(dtantsur): lock expiration time
-        with lockutils.lock(img_download_lock_name):
-            # NOTE(vdrok): After rebuild requested image can change, so we
-            # should ensure that dest_path and master_path (if exists) are
-            # pointing to the same file and their content is up to date
-            cache_up_to_date = _delete_master_path_if_stale(master_path, href,
-                                                            ctx)
-            dest_up_to_date = _delete_dest_path_if_stale(master_path,
-                                                         dest_path)
-
-            if cache_up_to_date and dest_up_to_date:
+        with self._fetching(master_file_name, href) as download, \
+                lockutils.lock(img_download_lock_name), \
+                self._shared_lock('download-image-%s' % master_file_name):
+            if self._content_addressed:
+                downloaded = self._fetch_by_content(
+                    href, master_file_name, dest_path, ctx=ctx,
+                    force_raw=force_raw)
+            else:
+                downloaded = self._fetch_by_name(
+                    href, master_file_name, dest_path, ctx=ctx,
+                    force_raw=force_raw)
+
+        if downloaded and download.waiters:
+            LOG.info(_LI("Image %(href)s was downloaded into master image "
+                         "cache %(dir)s in %(elapsed).1f seconds for "
+                         "%(waiters)d more request(s)"),
+                     {'href': href, 'dir': self.master_dir,
+                      'elapsed': time.time() - download.started,
+                      'waiters': download.waiters})
+
+        if downloaded:
+            # NOTE(dtantsur): we increased cache size - time to clean up
+            self.clean_up()
+        return downloaded
+
+    def build_image(self, key, dest_path, build):
+        """Build an image into the cache, or reuse the image built before.
+
+        The image is built once for all the requests with the same key, and
+        linked to the destination like the images fetched: it is not deleted
+        by the clean up while it is linked. The requests waiting for the
+        image fail with the error of the build, if it fails.
+
+        :param key: the name of the image in the cache, identifying its
+                    content, e.g. a checksum of the inputs of the build.
+        :param dest_path: destination file path
+        :param build: function building the image, called with the path of
+                      the file to write the image to.
+        :returns: True if the image was built, False if it was already in
+                  the cache.
+        """
+        if self.master_dir is None:
+            build(dest_path)
+            return True
+
+        master_path = os.path.join(self.master_dir, key)
+        with self._fetching(key, key) as download, \
+                lockutils.lock('build-image:%s' % key), \
+                self._shared_lock('build-image-%s' % key):
+            if _delete_dest_path_if_stale(master_path, dest_path):
+                self._send_counter('cache_hit')
+                return False
+
+            try:
+                with self._master_image_lock():
+                    _link(master_path, dest_path)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    raise
+            else:
+                self._index.touch(key)
+                LOG.debug("Master cache hit for image %(key)s",
+                          {'key': key})
+                self._send_counter('cache_hit')
+                return False
+
+            LOG.info(_LI("Master cache miss for image %(key)s, building it"),
+                     {'key': key})
+            self._send_counter('cache_miss')
+            tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+            tmp_path = os.path.join(tmp_dir, key)
+            try:
+                try:
+                    build(tmp_path)
+                except Exception as exc:
+                    # NOTE: the requests waiting for the image would fail
+                    # to build it too
+                    download.error = exc
+                    raise
+                os.link(tmp_path, master_path)
+                _link(master_path, dest_path)
+                self._index.add(key, os.path.getsize(master_path))
+            finally:
+                utils.rmtree_without_raise(tmp_dir)
+
+        self.clean_up()
+        return True
+
+    @contextlib.contextmanager
+    def _fetching(self, master_file_name, href):
+        """Fetch an image once for the concurrent requests of the process.
+
+        Waits for the other request fetching the image, if any, then
+        registers the _Download of this request for the next ones.
+
+        :param master_file_name: the name of the image in the cache.
+        :param href: image UUID or href to fetch
+        :raises: the exception the download of the other request failed
+                 with, if it did.
+        :returns: the _Download of this request.
+        """
+        key = (self.master_dir, master_file_name)
+        download = _downloads.get(key)
+        while download is not None:
+            # NOTE: another request is fetching the image, it is linked from
+            # the cache once the other request is done
+            self._wait_for_download(download)
+            download = _downloads.get(key)
+        download = _downloads[key] = _Download(href)
+        try:
+            yield download
+        finally:
+            del _downloads[key]
+            download.finish()
+
+    def _wait_for_download(self, download):
+        """Wait for another request of the process fetching an image.
+
+        The progress of the download is logged and sent as metrics every
+        _DOWNLOAD_PROGRESS_INTERVAL seconds while waiting.
+
+        :param download: the _Download of the other request.
+        :raises: the exception the download failed with, if it did.
+        """
+        LOG.debug("Waiting for another request fetching image %(href)s "
+                  "into master image cache %(dir)s",
+                  {'href': download.href, 'dir': self.master_dir})
+        self._send_counter('cache_fetch_wait')
+        started = time.time()
+        download.waiters += 1
+        try:
+            while not download.wait(_DOWNLOAD_PROGRESS_INTERVAL):
+                self._report_progress(download)
+        finally:
+            download.waiters -= 1
+        METRICS.send_timer('%s.fetch_wait' % type(self).__name__,
+                           (time.time() - started) * 1000)
+        if download.error is not None:
+            raise download.error
+
+    def _report_progress(self, download):
+        """Log and send the progress of a download awaited.
+
+        The progress is reported once per interval, whatever the number of
+        requests waiting for the download.
+        """
+        now = time.time()
+        if (download.tmp_dir is None or
+                now - download.last_report < _DOWNLOAD_PROGRESS_INTERVAL):
+            return
+        written = download.written()
+        LOG.info(_LI("Downloading image %(href)s into master image cache "
+                     "%(dir)s for %(waiters)d request(s): %(written)d MiB "
+                     "written in %(elapsed)d seconds"),
+                 {'href': download.href, 'dir': self.master_dir,
+                  'waiters': download.waiters + 1,
+                  'written': written // units.Mi,
+                  'elapsed': now - download.started})
+        self._send_counter('cache_download_progress_bytes',
+                           written - download.reported)
+        download.reported = written
+        download.last_report = now
+
+    def _download_started(self, name, tmp_dir):
+        """Record the temporary directory of a download, for its progress."""
+        download = _downloads.get((self.master_dir, name))
+        if download is not None:
+            download.tmp_dir = tmp_dir
+
+    def _download_with_retries(self, name, download_func, href, *args,
+                               **kwargs):
+        """Download an image, retrying if the download fails.
+
+        The download is attempted up to [pxe]image_cache_download_attempts
+        times if it fails with ImageDownloadFailed, the other errors being
+        raised at once. The error the download eventually fails with is
+        raised in the requests waiting for it too.
+
+        :param name: the name the image is fetched under in the cache.
+        :param download_func: the method downloading the image, called with
+                              href and the other arguments.
+        :param href: image UUID or href to fetch
+        """
+        attempts = CONF.pxe.image_cache_download_attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                return download_func(href, *args, **kwargs)
+            except Exception as exc:
+                if (attempt >= attempts or
+                        not isinstance(exc, exception.ImageDownloadFailed)):
+                    download = _downloads.get((self.master_dir, name))
+                    if download is not None:
+                        download.error = exc
+                    raise
+                LOG.warning(_LW("Download of image %(href)s into master "
+                                "image cache %(dir)s failed (attempt "
+                                "%(attempt)d of %(attempts)d), retrying: "
+                                "%(exc)s"),
+                            {'href': href, 'dir': self.master_dir,
+                             'attempt': attempt, 'attempts': attempts,
+                             'exc': exc})
+                self._send_counter('cache_download_retry')
+
+    def warm(self, href, ctx=None, force_raw=True):
+        """Download an image into the cache ahead of its use.
+
+        :param href: image UUID or href to fetch
+        :param ctx: context
+        :param force_raw: boolean value, whether to convert the image to raw
+                          format
+        :returns: True if the image was downloaded, False if it was already
+                  in the cache.
+        """
+        tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+        try:
+            return self.fetch_image(href, os.path.join(tmp_dir, 'image'),
+                                    ctx=ctx, force_raw=force_raw)
+        finally:
+            utils.rmtree_without_raise(tmp_dir)
+
+    def _fetch_by_name(self, href, master_file_name, dest_path, ctx=None,
+                       force_raw=True):
+        """Fetch an image stored under the name given by its href.
+
+        This method should be called with uuid-specific lock taken.
+
+        :param href: image UUID or href to fetch
+        :param master_file_name: name of the image in the cache
+        :param dest_path: destination file path
+        :param ctx: context
+        :param force_raw: boolean value, whether to convert the image to raw
+                          format
+        :returns: True if the image was downloaded.
+        """
+        master_path = os.path.join(self.master_dir, master_file_name)
+
+        # NOTE(vdrok): After rebuild requested image can change, so we
+        # should ensure that dest_path and master_path (if exists) are
+        # pointing to the same file and their content is up to date
+        cache_up_to_date = _delete_master_path_if_stale(master_path, href,
+                                                        ctx)
+        dest_up_to_date = _delete_dest_path_if_stale(master_path,
+                                                     dest_path)
+
+        if cache_up_to_date and dest_up_to_date:
+            LOG.debug("Destination %(dest)s already exists "
+                      "for image %(href)s",
+                      {'href': href, 'dest': dest_path})
+            self._send_counter('cache_hit')
+            return False
+
+        if cache_up_to_date:
+            # NOTE(dtantsur): ensure we're not in the middle of clean up
+            with self._master_image_lock():
+                _link(master_path, dest_path)
+            self._index.touch(master_file_name)
+            LOG.debug("Master cache hit for image %(href)s",
+                      {'href': href})
+            self._send_counter('cache_hit')
+            return False
+
+        LOG.info(_LI("Master cache miss for image %(href)s, "
+                     "starting download"),
+                 {'href': href})
+        self._send_counter('cache_miss')
+        self._download_with_retries(
+            master_file_name, self._download_image,
+            href, master_path, dest_path, ctx=ctx, force_raw=force_raw)
+        return True
+
+    def _fetch_by_content(self, href, alias, dest_path, ctx=None,
+                          force_raw=True):
+        """Fetch an image stored under the checksum of its content.
+
+        This method should be called with the lock of the alias taken.
+
+        :param href: image UUID or href to fetch
+        :param alias: name of the alias of the href in the cache
+        :param dest_path: destination file path
+        :param ctx: context
+        :param force_raw: boolean value, whether to convert the image to raw
+                          format
+        :returns: True if the image was downloaded.
+        """
+        master_file_name = self._resolve_alias(alias, href, ctx)
+        if master_file_name is not None:
+            master_path = os.path.join(self.master_dir, master_file_name)
+            if _delete_dest_path_if_stale(master_path, dest_path):
                 LOG.debug("Destination %(dest)s already exists "
                           "for image %(href)s",
                           {'href': href, 'dest': dest_path})
-                return
+                self._send_counter('cache_hit')
+                return False
 
-            if cache_up_to_date:
-                # NOTE(dtantsur): ensure we're not in the middle of clean up
-                with lockutils.lock('master_image'):
-                    os.link(master_path, dest_path)
+            try:
+                with self._master_image_lock():
+                    _link(master_path, dest_path)
+            except OSError as exc:
+                # NOTE: the image can be deleted by the clean up of another
+                # conductor since the alias was read, it is then downloaded
+                # again
+                if exc.errno != errno.ENOENT:
+                    raise
+            else:
+                self._index.touch(master_file_name)
                 LOG.debug("Master cache hit for image %(href)s",
                           {'href': href})
-                return
+                self._send_counter('cache_hit')
+                return False
+
+        LOG.info(_LI("Master cache miss for image %(href)s, "
+                     "starting download"),
+                 {'href': href})
+        self._send_counter('cache_miss')
+        # NOTE: dest_path may still be linked to the previous image of href
+        ironic_utils.unlink_without_raise(dest_path)
+        self._download_with_retries(alias, self._download_by_content,
+                                    href, alias, dest_path, ctx=ctx,
+                                    force_raw=force_raw)
+        return True
+
+    def _alias_path(self, alias):
+        return os.path.join(self.master_dir, _ALIAS_DIR_NAME, alias)
+
+    def _resolve_alias(self, alias, href, ctx):
+        """Get the image of an alias, if it is up to date.
+
+        Deletes the alias if its image was deleted, or if the image of the
+        href was modified since the alias was created.
+
+        :returns: the name of the image in the cache, or None.
+        """
+        alias_path = self._alias_path(alias)
+        master_file_name = _read_alias(alias_path)
+        if master_file_name is None:
+            return None
+        if (os.path.exists(os.path.join(self.master_dir, master_file_name))
+                and _delete_master_path_if_stale(alias_path, href, ctx)):
+            return master_file_name
+        ironic_utils.unlink_without_raise(alias_path)
+        self._index.remove_alias(alias)
+        return None
+
+    def _download_by_content(self, href, alias, dest_path, ctx=None,
+                             force_raw=True):
+        """Download an image and store it under the checksum of its content.
+
+        If an image with the same content is already in the cache, it is
+        used instead of the one downloaded.
+
+        This method should be called with the lock of the alias taken.
+
+        :param href: image UUID or href to fetch
+        :param alias: name of the alias of the href in the cache
+        :param dest_path: destination file path
+        :param ctx: context
+        :param force_raw: boolean value, whether to convert the image to raw
+                          format
+        """
+        tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+        tmp_path = os.path.join(tmp_dir, href.split('/')[-1])
+        self._download_started(alias, tmp_dir)
 
-            LOG.info(_LI("Master cache miss for image %(href)s, "
-                         "starting download"),
-                     {'href': href})
-            self._download_image(
-                href, master_path, dest_path, ctx=ctx, force_raw=force_raw)
+        try:
+            master_file_name = self._run_fetcher(
+                ctx, href, tmp_path, force_raw, hash_algo=_CONTENT_HASH_ALGO)
+            master_path = os.path.join(self.master_dir, master_file_name)
+            size = os.path.getsize(tmp_path)
+            with self._master_image_lock():
+                try:
+                    os.link(tmp_path, master_path)
+                    deduplicated = False
+                except OSError as exc:
+                    if exc.errno != errno.EEXIST:
+                        raise
+                    # NOTE: link the image stored to the temporary directory
+                    # too, so that it is not deleted until it is linked to
+                    # dest_path
+                    os.link(master_path, tmp_path + '.stored')
+                    deduplicated = True
+            _link(master_path, dest_path)
+
+            alias_dir = os.path.dirname(self._alias_path(alias))
+            with tempfile.NamedTemporaryFile('w', dir=alias_dir, prefix='.',
+                                             delete=False) as alias_file:
+                alias_file.write(master_file_name)
+            os.rename(alias_file.name, self._alias_path(alias))
+
+            if deduplicated:
+                LOG.info(_LI("Image %(href)s is already in the master image "
+                             "cache as %(name)s, the download is discarded"),
+                         {'href': href, 'name': master_file_name})
+                self._index.touch(master_file_name)
+                self._send_counter('cache_dedupe_hit')
+                self._send_counter('cache_deduplicated_bytes', size)
+            else:
+                self._index.add(master_file_name, size)
+            self._index.add_alias(alias, master_file_name)
+        finally:
+            utils.rmtree_without_raise(tmp_dir)
+        self._report_dedupe_ratio()
 
-        # NOTE(dtantsur): we increased cache size - time to clean up
-        self.clean_up()
+    def _report_dedupe_ratio(self):
+        """Send the deduplication ratio of the cache as a gauge.
+
+        The ratio is the size of the images of all the aliases of the cache
+        divided by the size actually stored for them.
+        """
+        logical, stored = self._index.aliased_size()
+        if not stored:
+            return
+        ratio = float(logical) / stored
+        LOG.debug("Deduplication ratio of master image cache %(dir)s is "
+                  "%(ratio).2f", {'dir': self.master_dir, 'ratio': ratio})
+        METRICS.send_gauge('%s.dedupe_ratio' % type(self).__name__, ratio)
+
+    def _send_counter(self, name, value=1):
+        """Send a counter of the cache, named after its class."""
+        METRICS.send_counter('%s.%s' % (type(self).__name__, name), value)
 
     def _download_image(self, href, master_path, dest_path, ctx=None,
                         force_raw=True):
@@ -151,27 +1089,31 @@ class ImageCache(object):
         :param force_raw: boolean value, whether to convert the image to raw
                           format
         """
-        # TODO(ghe): timeout and retry for downloads
+        # TODO(ghe): timeout for downloads
         # TODO(ghe): logging when image cannot be created
         tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
         tmp_path = os.path.join(tmp_dir, href.split('/')[-1])
+        self._download_started(os.path.basename(master_path), tmp_dir)
 
         try:
-            _fetch(ctx, href, tmp_path, force_raw)
+            self._run_fetcher(ctx, href, tmp_path, force_raw)
             # NOTE(dtantsur): no need for global lock here - master_path
             # will have link count >1 at any moment, so won't be cleaned up
             os.link(tmp_path, master_path)
-            os.link(master_path, dest_path)
+            _link(master_path, dest_path)
+            self._index.add(os.path.basename(master_path),
+                            os.path.getsize(master_path))
         finally:
             utils.rmtree_without_raise(tmp_dir)
 
-    @lockutils.synchronized('master_image')
     def clean_up(self, amount=None):
         """Clean up directory with images, keeping cache of the latest images.
 
-        Files with link count >1 are never deleted.
-        Protected by global lock, so that no one messes with master images
-        after we get listing and before we actually delete files.
+        Files with link count >1 are never deleted. The aliases of the files
+        deleted are deleted too.
+        The images to delete are chosen and moved out of the cache under a
+        global lock, so that no one links them after we check their link
+        count. They are deleted from the disk after the lock is released.
 
         :param amount: if present, amount of space to reclaim in bytes,
                        cleaning will stop, if this goal was reached,
@@ -184,11 +1126,19 @@ class ImageCache(object):
                   {'dir': self.master_dir})
 
         amount_copy = amount
-        listing = _find_candidates_for_deletion(self.master_dir)
-        survived, amount = self._clean_up_too_old(listing, amount)
-        if amount is not None and amount <= 0:
-            return
-        amount = self._clean_up_ensure_cache_size(survived, amount)
+        trash_dir = tempfile.mkdtemp(dir=self.master_dir)
+        try:
+            with self._master_image_lock():
+                if CONF.pxe.image_cache_shared:
+                    # NOTE: the index of this process does not know about
+                    # the images added and deleted by the other conductors
+                    self._index.reconcile()
+                amount = self._clean_up_too_old(trash_dir, amount)
+                if amount is None or amount > 0:
+                    amount = self._clean_up_ensure_cache_size(trash_dir,
+                                                              amount)
+        finally:
+            utils.rmtree_without_raise(trash_dir)
         if amount is not None and amount > 0:
             LOG.warning(
                 _LW("Cache clean up was unable to reclaim %(required)d "
@@ -196,7 +1146,39 @@ class ImageCache(object):
                 {'required': amount_copy / 1024 / 1024,
                  'left': amount / 1024 / 1024})
 
-    def _clean_up_too_old(self, listing, amount):
+    def _delete(self, file_name, trash_dir):
+        """Move an image out of the cache if it is not used.
+
+        Must be called with the global master_image lock.
+
+        :param file_name: the name of the image in the cache directory.
+        :param trash_dir: the directory where the image is moved to, to be
+                          deleted from the disk once the lock is released.
+        :returns: True if the image was moved out of the cache.
+        """
+        path = os.path.join(self.master_dir, file_name)
+        try:
+            if os.stat(path).st_nlink > 1:
+                return False
+            size = os.path.getsize(path)
+            os.rename(path, os.path.join(trash_dir, file_name))
+        except EnvironmentError as exc:
+            if not os.path.exists(path):
+                # Deleted behind our back
+                self._index.remove(file_name)
+                return False
+            LOG.warning(_LW("Unable to delete file %(name)s from "
+                            "master image cache: %(exc)s"),
+                        {'name': path, 'exc': exc})
+            return False
+        for alias in self._index.aliases(file_name):
+            ironic_utils.unlink_without_raise(self._alias_path(alias))
+        self._index.evict(file_name)
+        self._send_counter('cache_eviction')
+        self._send_counter('cache_evicted_bytes', size)
+        return True
+
+    def _clean_up_too_old(self, trash_dir, amount):
         """Clean up stage 1: drop images that are older than TTL.
 
         This method removes files all files older than TTL seconds
@@ -204,66 +1186,42 @@ class ImageCache(object):
         it starts removing files older than TTL seconds,
         oldest first, until the required 'amount' of space is reclaimed.
 
-        :param listing: list of tuples (file name, last used time)
+        :param trash_dir: the directory where the images are moved to.
         :param amount: if not None, amount of space to reclaim in bytes,
                        cleaning will stop, if this goal was reached,
                        even if it is possible to clean up more files
-        :returns: tuple (list of files left after clean up,
-                         amount still to reclaim)
+        :returns: amount still to reclaim
         """
         threshold = time.time() - self._cache_ttl
-        survived = []
-        for file_name, last_used, stat in listing:
-            if last_used < threshold:
-                try:
-                    os.unlink(file_name)
-                except EnvironmentError as exc:
-                    LOG.warning(_LW("Unable to delete file %(name)s from "
-                                    "master image cache: %(exc)s"),
-                                {'name': file_name, 'exc': exc})
-                else:
-                    if amount is not None:
-                        amount -= stat.st_size
-                        if amount <= 0:
-                            amount = 0
-                            break
-            else:
-                survived.append((file_name, last_used, stat))
-        return survived, amount
-
-    def _clean_up_ensure_cache_size(self, listing, amount):
+        for file_name, size, last_used in self._index.oldest(threshold):
+            if self._delete(file_name, trash_dir) and amount is not None:
+                amount -= size
+                if amount <= 0:
+                    return 0
+        return amount
+
+    def _clean_up_ensure_cache_size(self, trash_dir, amount):
         """Clean up stage 2: try to ensure cache size < threshold.
 
-        Try to delete the oldest files until conditions is satisfied
-        or no more files are eligible for deletion.
+        Try to delete the files with the lowest priority according to the
+        eviction policy of the cache until conditions is satisfied or no
+        more files are eligible for deletion.
 
-        :param listing: list of tuples (file name, last used time)
+        :param trash_dir: the directory where the images are moved to.
         :param amount: amount of space to reclaim, if possible.
                        if amount is not None, it has higher priority than
                        cache size in settings
         :returns: amount of space still required after clean up
         """
-        # NOTE(dtantsur): Sort listing to delete the oldest files first
-        listing = sorted(listing,
-                         key=lambda entry: entry[1],
-                         reverse=True)
-        total_listing = (os.path.join(self.master_dir, f)
-                         for f in os.listdir(self.master_dir))
-        total_size = sum(os.path.getsize(f)
-                         for f in total_listing)
-        while listing and (total_size > self._cache_size or
-                           (amount is not None and amount > 0)):
-            file_name, last_used, stat = listing.pop()
-            try:
-                os.unlink(file_name)
-            except EnvironmentError as exc:
-                LOG.warning(_LW("Unable to delete file %(name)s from "
-                                "master image cache: %(exc)s"),
-                            {'name': file_name, 'exc': exc})
-            else:
-                total_size -= stat.st_size
+        total_size = self._index.total_size()
+        for file_name, size, priority in self._index.lowest_priority():
+            if not (total_size > self._cache_size or
+                    (amount is not None and amount > 0)):
+                break
+            if self._delete(file_name, trash_dir):
+                total_size -= size
                 if amount is not None:
-                    amount -= stat.st_size
+                    amount -= size
 
         if total_size > self._cache_size:
             LOG.info(_LI("After cleaning up cache dir %(dir)s "
@@ -274,43 +1232,42 @@ class ImageCache(object):
         return max(amount, 0) if amount is not None else 0
 
 
-def _find_candidates_for_deletion(master_dir):
-    """Find files eligible for deletion i.e. with link count ==1.
-
-    :param master_dir: directory to operate on
-    :returns: iterator yielding tuples (file name, last used time, stat)
-    """
-    for filename in os.listdir(master_dir):
-        filename = os.path.join(master_dir, filename)
-        stat = os.stat(filename)
-        if not os.path.isfile(filename) or stat.st_nlink > 1:
-            continue
-        # NOTE(dtantsur): Detect most recently accessed files,
-        # seeing atime can be disabled by the mount option
-        # Also include ctime as it changes when image is linked to
-        last_used_time = max(stat.st_mtime, stat.st_atime, stat.st_ctime)
-        yield filename, last_used_time, stat
-
-
 def _free_disk_space_for(path):
     """Get free disk space on a drive where path is located."""
     stat = os.statvfs(path)
     return stat.f_frsize * stat.f_bavail
 
 
-def _fetch(context, image_href, path, force_raw=False):
-    """Fetch image and convert to raw format if needed."""
+def _fetch(context, image_href, path, force_raw=False, hash_algo=None):
+    """Fetch image and convert to raw format if needed.
+
+    The Glance images are checked against the checksum recorded by Glance
+    while they are downloaded.
+
+    :raises: ImageDownloadFailed if the checksum of a Glance image is not
+             the expected one.
+    :returns: the checksum of the image as downloaded, computed with
+              hash_algo, None if hash_algo is None.
+    """
+    expected = None
+    if service_utils.is_glance_image(image_href):
+        expected = images.image_show(context, image_href).get('checksum')
     path_tmp = "%s.part" % path
-    images.fetch(context, image_href, path_tmp, force_raw=False)
+    fmt, checksum = images.fetch(context, image_href, path_tmp,
+                                 force_raw=False, checksum=expected,
+                                 hash_algo=hash_algo)
     # Notes(yjiang5): If glance can provide the virtual size information,
     # then we can firstly clean cache and then invoke images.fetch().
-    if force_raw:
+    # NOTE: the raw images need neither conversion nor more space, their
+    # format is detected while they are downloaded.
+    if force_raw and fmt != 'raw':
         required_space = images.converted_size(path_tmp)
         directory = os.path.dirname(path_tmp)
         _clean_up_caches(directory, required_space)
         images.image_to_raw(image_href, path, path_tmp)
     else:
         os.rename(path_tmp, path)
+    return checksum
 
 
 def _clean_up_caches(directory, amount):
@@ -330,8 +1287,10 @@ def _clean_up_caches(directory, amount):
     st_dev = os.stat(directory).st_dev
 
     caches_to_clean = [x[1]() for x in _cache_cleanup_list]
+    # NOTE: the caches without a master directory are disabled
     caches = (c for c in caches_to_clean
-              if os.stat(c.master_dir).st_dev == st_dev)
+              if c.master_dir is not None and
+              os.stat(c.master_dir).st_dev == st_dev)
     for cache_to_clean in caches:
         cache_to_clean.clean_up(amount=(amount - free))
         free = _free_disk_space_for(directory)
@@ -364,6 +1323,77 @@ def clean_up_caches(ctx, directory, images_info):
     _clean_up_caches(directory, total_size)
 
 
+def most_used_images(nodes_info, count):
+    """Find the images most used by nodes.
+
+    :param nodes_info: iterable of the instance_info and driver_info of the
+                       nodes, merged in a dict for each node.
+    :param count: number of images to return for each key of the warm_keys
+                  of the caches.
+    :returns: a list of tuples (key, href), the most used first for each
+              key.
+    """
+    keys = set()
+    for priority, cache_class in _cache_cleanup_list:
+        keys.update(cache_class.warm_keys)
+    uses = {key: collections.Counter() for key in keys}
+    for info in nodes_info:
+        for key in keys:
+            image = info.get(key)
+            if image:
+                uses[key][image] += 1
+    return [(key, href) for key in sorted(keys)
+            for href, _count in uses[key].most_common(count)]
+
+
+def warm_caches(ctx, images):
+    """Download images into the caches holding them, ahead of their use.
+
+    Avoids the first deployments using an image waiting for its download,
+    one after the other. Each image is downloaded into the caches, among
+    the ones registered with cleanup(), with its key in their warm_keys.
+    The progress is logged for each image.
+
+    :param ctx: context
+    :param images: a list of tuples (key, href), key being the key of
+                   instance_info or driver_info naming the image.
+    :returns: a list of dicts with the href, the cache class name, the
+              status ('cached', 'downloaded' or 'failed') and the error
+              message of each image downloaded into each cache.
+    """
+    caches = [cache_class() for priority, cache_class in _cache_cleanup_list]
+    caches = [(key, href, cache) for key, href in images for cache in caches
+              if key in cache.warm_keys and cache.master_dir is not None]
+    results = []
+    for number, (key, href, cache) in enumerate(caches, 1):
+        result = {'href': href, 'cache': type(cache).__name__,
+                  'error': None}
+        LOG.info(_LI("Warming master image cache %(cache)s with image "
+                     "%(href)s (%(number)d of %(total)d)"),
+                 {'cache': result['cache'], 'href': href, 'number': number,
+                  'total': len(caches)})
+        started = time.time()
+        try:
+            downloaded = cache.warm(href, ctx=ctx,
+                                    force_raw=CONF.force_raw_images)
+        except Exception as exc:
+            LOG.warning(_LW("Unable to warm master image cache %(cache)s "
+                            "with image %(href)s: %(exc)s"),
+                        {'cache': result['cache'], 'href': href,
+                         'exc': exc})
+            result.update(status='failed', error=six.text_type(exc))
+        else:
+            result['status'] = 'downloaded' if downloaded else 'cached'
+            LOG.info(_LI("Image %(href)s is in master image cache "
+                         "%(cache)s (%(status)s) after %(elapsed).1f "
+                         "seconds"),
+                     {'href': href, 'status': result['status'],
+                      'cache': result['cache'],
+                      'elapsed': time.time() - started})
+        results.append(result)
+    return results
+
+
 def cleanup(priority):
     """Decorator method for adding cleanup priority to a class."""
     def _add_property_to_class_func(cls):
@@ -407,14 +1437,21 @@ def _delete_master_path_if_stale(master_path, href, ctx):
                   'local_time': master_mtime, 'cached_file': master_path})
 
         os.unlink(master_path)
+        master_dir, file_name = os.path.split(master_path)
+        index = _indexes.get(master_dir)
+        if index is not None:
+            index.remove(file_name)
     return False
 
 
 def _delete_dest_path_if_stale(master_path, dest_path):
     """Delete dest_path if it does not point to cached image.
 
+    A copy of the cached image made by _link() is up to date if it has the
+    size and modification time of the cached image.
+
     :param master_path: path to an image in master cache
-    :param dest_path: hard link to an image
+    :param dest_path: hard link to an image, or copy of an image
     :returns: True if dest_path points to master_path, False if dest_path was
         stale and was deleted or it didn't exist
     """
@@ -424,8 +1461,48 @@ def _delete_dest_path_if_stale(master_path, dest_path):
         return False
     master_path_exists = os.path.exists(master_path)
     if (not master_path_exists or
-            os.stat(master_path).st_ino != os.stat(dest_path).st_ino):
+            not _same_image(os.stat(master_path), os.stat(dest_path))):
         # Image exists in cache, but dest_path out of date
         os.unlink(dest_path)
         return False
     return True
+
+
+def _same_image(master_stat, dest_stat):
+    """Whether a destination is a link to or a copy of a cached image."""
+    if master_stat.st_ino == dest_stat.st_ino:
+        return True
+    # NOTE: st_mtime_ns is only available on Python 3, the copies are
+    # considered stale if the times differ in precision on Python 2
+    return (dest_stat.st_size == master_stat.st_size and
+            getattr(dest_stat, 'st_mtime_ns', dest_stat.st_mtime) ==
+            getattr(master_stat, 'st_mtime_ns', master_stat.st_mtime))
+
+
+def _read_alias(alias_path):
+    """Read the name of the image of an alias, None if it does not exist."""
+    try:
+        with open(alias_path) as alias_file:
+            return alias_file.read().strip() or None
+    except EnvironmentError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+        return None
+
+
+def _link(master_path, dest_path):
+    """Link an image of the cache to its destination.
+
+    Copies the image when the destination is on another file system, like
+    when the cache is shared by the conductors. The copy is given the
+    modification time of the cached image, identifying it as up to date,
+    see _delete_dest_path_if_stale().
+    """
+    try:
+        os.link(master_path, dest_path)
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+        with fileutils.remove_path_on_error(dest_path):
+            shutil.copyfile(master_path, dest_path)
+            shutil.copystat(master_path, dest_path)
@@ -53,6 +53,7 @@ from ironic.common import utils
 from ironic.conductor import task_manager
 from ironic.conf import CONF
 from ironic.drivers import base
+from ironic.drivers.modules import console_proxy
 from ironic.drivers.modules import console_utils
 from ironic.drivers.modules import deploy_utils
 from ironic.drivers import utils as driver_utils
@@ -1409,3 +1410,122 @@ class IPMISocatConsole(IPMIConsole):
         driver_info = _parse_driver_info(task.node)
         url = console_utils.get_socat_console_url(driver_info['port'])
         return {'type': 'socat', 'url': url}
+
+
+class IPMIProxyConsole(IPMIConsole):
+    """A ConsoleInterface that uses ipmitool and the conductor console proxy.
+
+    Instead of running a terminal server listening on its own port for each
+    node, the conductor serves the consoles of all its nodes on
+    [console]proxy_port, each console being identified by a token. See
+    :mod:`ironic.drivers.modules.console_proxy`.
+    """
+
+    def get_properties(self):
+        # The console is not served on a port of its own
+        return COMMON_PROPERTIES.copy()
+
+    @METRICS.timer('IPMIProxyConsole.validate')
+    def validate(self, task):
+        """Validate the Node console info.
+
+        :param task: a task from TaskManager.
+        :raises: InvalidParameterValue
+        :raises: MissingParameterValue when a required parameter is missing
+
+        """
+        driver_info = _parse_driver_info(task.node)
+        if driver_info['protocol_version'] != '2.0':
+            raise exception.InvalidParameterValue(_(
+                "Serial over lan only works with IPMI protocol version 2.0. "
+                "Check the 'ipmi_protocol_version' parameter in "
+                "node's driver_info"))
+
+    def _get_ipmi_args(self, driver_info):
+        """Get the ipmitool command activating the serial over lan session.
+
+        The password is passed in the IPMI_PASSWORD environment variable
+        (the -E option), so that no password file is needed.
+
+        :param driver_info: driver info with the ipmitool parameters
+        :returns: the command, as a list of arguments.
+        """
+        args = ['ipmitool', '-H', driver_info['address'], '-I', 'lanplus',
+                '-L', driver_info['priv_level']]
+        if driver_info['dest_port']:
+            # NOTE: the arguments are not converted to strings for us, as
+            # they are by utils.execute() for _exec_ipmitool()
+            args.extend(['-p', str(driver_info['dest_port'])])
+        if driver_info['username']:
+            args.extend(['-U', driver_info['username']])
+        args.append('-E')
+        for name, option in BRIDGING_OPTIONS:
+            if driver_info[name] is not None:
+                args.extend([option, driver_info[name]])
+        if CONF.debug:
+            args.append('-v')
+        args.extend(['sol', 'activate'])
+        return args
+
+    @METRICS.timer('IPMIProxyConsole.start_console')
+    def start_console(self, task):
+        """Start a remote console for the node.
+
+        :param task: a task from TaskManager
+        :raises: InvalidParameterValue if required ipmi parameters are missing
+        :raises: ConsoleError if the console proxy cannot listen for
+                 connections
+        :raises: ConsoleSubprocessFailed when invoking the subprocess failed
+        """
+        driver_info = _parse_driver_info(task.node)
+        try:
+            self._exec_stop_console(driver_info)
+        except OSError:
+            # We need to drop any existing sol sessions with sol deactivate.
+            # OSError is raised when sol session is already deactivated,
+            # so we can ignore it.
+            pass
+        env = dict(os.environ, IPMI_PASSWORD=driver_info['password'] or '')
+        console_proxy.get_proxy().register(task.node.uuid,
+                                           self._get_ipmi_args(driver_info),
+                                           env=env)
+
+    @METRICS.timer('IPMIProxyConsole.stop_console')
+    def stop_console(self, task):
+        """Stop the remote console session for the node.
+
+        :param task: a task from TaskManager
+        """
+        driver_info = _parse_driver_info(task.node)
+        console_proxy.get_proxy().unregister(task.node.uuid)
+        self._exec_stop_console(driver_info)
+
+    def _exec_stop_console(self, driver_info):
+        cmd = "sol deactivate"
+        _exec_ipmitool(driver_info, cmd, check_exit_code=[0, 1])
+
+    @METRICS.timer('IPMIProxyConsole.get_console')
+    def get_console(self, task):
+        """Get the type and connection information about the console.
+
+        :param task: a task from TaskManager
+        :raises: ConsoleError if the console of the node is not served by
+                 this conductor.
+        """
+        proxy = console_proxy.get_proxy()
+        token = proxy.get_token(task.node.uuid)
+        if token is None:
+            raise exception.ConsoleError(
+                _("The console of node %s is not served by this conductor, "
+                  "it has to be restarted") % task.node.uuid)
+        return {'type': 'proxy', 'url': proxy.get_url(), 'token': token}
+
+    def get_console_log(self, task):
+        """Get the last output of the console.
+
+        :param task: a TaskManager instance containing the node to act on.
+        :returns: the output recorded, as bytes, or None if the output of
+                  the console is not recorded.
+        """
+        log = console_proxy.get_proxy().get_log(task.node.uuid)
+        return b''.join(log) if log is not None else None
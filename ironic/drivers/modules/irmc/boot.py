@@ -262,10 +262,10 @@ def _prepare_boot_iso(task, root_uuid):
         boot_iso_fullpathname = os.path.join(
             CONF.irmc.remote_image_share_root, boot_iso_filename)
 
-        images.create_boot_iso(task.context, boot_iso_fullpathname,
-                               kernel_href, ramdisk_href,
-                               deploy_iso, root_uuid,
-                               kernel_params, boot_mode)
+        deploy_utils.create_boot_iso(task.context, boot_iso_fullpathname,
+                                     kernel_href, ramdisk_href,
+                                     deploy_iso, root_uuid,
+                                     kernel_params, boot_mode)
 
         driver_internal_info['irmc_boot_iso'] = boot_iso_filename
 
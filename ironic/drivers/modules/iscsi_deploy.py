@@ -46,6 +46,8 @@ DISK_LAYOUT_PARAMS = ('root_gb', 'swap_mb', 'ephemeral_gb')
 @image_cache.cleanup(priority=50)
 class InstanceImageCache(image_cache.ImageCache):
 
+    warm_keys = ('image_source',)
+
     def __init__(self):
         super(self.__class__, self).__init__(
             CONF.pxe.instance_master_path,
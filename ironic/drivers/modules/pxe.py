@@ -272,6 +272,9 @@ def validate_boot_parameters_for_trusted_boot(node):
 
 @image_cache.cleanup(priority=25)
 class TFTPImageCache(image_cache.ImageCache):
+
+    warm_keys = ('deploy_kernel', 'deploy_ramdisk', 'kernel', 'ramdisk')
+
     def __init__(self):
         super(TFTPImageCache, self).__init__(
             CONF.pxe.tftp_master_path,
@@ -12,8 +12,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import io
 import os
+import tarfile
 import tempfile
+import time
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -22,11 +25,12 @@ from oslo_utils import timeutils
 import six
 
 from ironic.common import exception
-from ironic.common.i18n import _, _LE, _LW
+from ironic.common.i18n import _, _LE, _LI, _LW
 from ironic.common import swift
 from ironic.conductor import utils
 from ironic.drivers import base
 from ironic.drivers.modules import agent_client
+from ironic.drivers.modules import image_cache
 
 
 LOG = logging.getLogger(__name__)
@@ -263,22 +267,25 @@ def normalize_mac(mac):
     return mac.replace('-', '').replace(':', '').lower()
 
 
-def get_ramdisk_logs_file_name(node):
+def get_ramdisk_logs_file_name(node, label=None):
     """Construct the log file name.
 
     :param node: A node object.
+    :param label: A string to label the log file, such as "console".
     :returns: The log file name.
     """
     timestamp = timeutils.utcnow().strftime('%Y-%m-%d-%H:%M:%S')
     file_name_fields = [node.uuid]
     if node.instance_uuid:
         file_name_fields.append(node.instance_uuid)
+    if label:
+        file_name_fields.append(label)
 
     file_name_fields.append(timestamp)
     return '_'.join(file_name_fields) + '.tar.gz'
 
 
-def store_ramdisk_logs(node, logs):
+def store_ramdisk_logs(node, logs, label=None):
     """Store the ramdisk logs.
 
     This method stores the ramdisk logs according to the configured
@@ -287,13 +294,26 @@ def store_ramdisk_logs(node, logs):
     :param node: A node object.
     :param logs: A gzipped and base64 encoded string containing the
                  logs archive.
+    :param label: A string to label the log file, such as "console".
     :raises: OSError if the directory to save the logs cannot be created.
     :raises: IOError when the logs can't be saved to the local file system.
     :raises: SwiftOperationError, if any operation with Swift fails.
 
     """
-    logs_file_name = get_ramdisk_logs_file_name(node)
-    data = base64.decode_as_bytes(logs)
+    _store_logs_archive(node, base64.decode_as_bytes(logs), label=label)
+
+
+def _store_logs_archive(node, data, label=None):
+    """Store a gzipped archive of logs in the configured storage backend.
+
+    :param node: A node object.
+    :param data: The bytes of the archive.
+    :param label: A string to label the log file.
+    :raises: OSError if the directory to save the logs cannot be created.
+    :raises: IOError when the logs can't be saved to the local file system.
+    :raises: SwiftOperationError, if any operation with Swift fails.
+    """
+    logs_file_name = get_ramdisk_logs_file_name(node, label=label)
 
     if CONF.agent.deploy_logs_storage_backend == 'local':
         if not os.path.exists(CONF.agent.deploy_logs_local_path):
@@ -359,3 +379,81 @@ def collect_ramdisk_logs(node):
         LOG.exception(_LE('Unknown error when storing logs from the node '
                           '%(node)s deployment. Error: %(error)s'),
                       {'node': node.uuid, 'error': e})
+
+
+def store_console_log(task):
+    """Store the last output of the console of a node.
+
+    The output recorded by the console interface of the node is stored
+    with the deploy logs, in a "console.log" file archived under a
+    "console" label. Nothing is stored if the console interface does not
+    record the output of the console, or if CONF.agent.deploy_logs_collect
+    is "never".
+
+    :param task: A TaskManager instance containing the node.
+
+    """
+    if CONF.agent.deploy_logs_collect == 'never':
+        return
+    node = task.node
+    console = task.driver.console
+    if console is None:
+        return
+    try:
+        output = console.get_console_log(task)
+    except Exception as e:
+        LOG.exception(_LE('Failed to get the console output of node '
+                          '%(node)s. Error: %(error)s'),
+                      {'node': node.uuid, 'error': e})
+        return
+    if not output:
+        return
+
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+        info = tarfile.TarInfo('console.log')
+        info.size = len(output)
+        info.mtime = time.time()
+        tar.addfile(info, io.BytesIO(output))
+
+    try:
+        _store_logs_archive(node, archive.getvalue(), label='console')
+    except exception.SwiftOperationError as e:
+        LOG.error(_LE('Failed to store the console output of node %(node)s '
+                      'in Swift. Error: %(error)s'),
+                  {'node': node.uuid, 'error': e})
+    except EnvironmentError as e:
+        LOG.exception(_LE('Failed to store the console output of node '
+                          '%(node)s due a file-system related error. '
+                          'Error: %(error)s'),
+                      {'node': node.uuid, 'error': e})
+
+
+def warm_image_caches(context, image_hrefs, nodes_info=(), count=0):
+    """Download images into the master image caches of the conductor.
+
+    The progress is logged for each image, then a summary once done.
+
+    :param context: request context.
+    :param image_hrefs: list of hrefs of instance images to download.
+    :param nodes_info: iterable of the instance_info and driver_info of the
+                       nodes of the conductor, merged in a dict for each
+                       node.
+    :param count: number of the images most used by the nodes to download
+                  as well.
+    :returns: the results of image_cache.warm_caches().
+    """
+    images = [('image_source', href) for href in image_hrefs or ()]
+    if count:
+        images.extend(image_cache.most_used_images(nodes_info, count))
+    results = image_cache.warm_caches(context, images)
+    failed = [result['href'] for result in results
+              if result['status'] == 'failed']
+    LOG.info(_LI('Warmed the master image caches with %(total)d '
+                 'image(s), %(downloaded)d downloaded, %(failed)d '
+                 'failed: %(failed_images)s'),
+             {'total': len(results), 'failed': len(failed),
+              'downloaded': sum(1 for result in results
+                                if result['status'] == 'downloaded'),
+              'failed_images': ', '.join(failed) or 'none'})
+    return results
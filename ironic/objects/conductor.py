@@ -29,7 +29,8 @@ class Conductor(base.IronicObject, object_base.VersionedObjectDictCompat):
     #              to touch() optional.
     # Version 1.2: Add register_hardware_interfaces() and
     #              unregister_all_hardware_interfaces()
-    VERSION = '1.2'
+    # Version 1.3: Add bulk_register_hardware_interfaces()
+    VERSION = '1.3'
 
     dbapi = db_api.get_instance()
 
@@ -136,6 +137,16 @@ class Conductor(base.IronicObject, object_base.VersionedObjectDictCompat):
                                                           interfaces,
                                                           default_interface)
 
+    def bulk_register_hardware_interfaces(self, interfaces):
+        """Register all hardware interfaces with the conductor at once.
+
+        :param interfaces: List of dictionaries with the hardware_type,
+                           interface_type, interface_name and default keys,
+                           one per interface to register.
+        """
+        self.dbapi.bulk_register_conductor_hardware_interfaces(self.id,
+                                                               interfaces)
+
     def unregister_all_hardware_interfaces(self):
         """Unregister all hardware interfaces for this conductor."""
         self.dbapi.unregister_conductor_hardware_interfaces(self.id)
@@ -0,0 +1,118 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_versionedobjects import base as object_base
+
+from ironic.common import states
+from ironic.db import api as db_api
+from ironic.objects import base
+from ironic.objects import fields as object_fields
+
+
+@base.IronicObjectRegistry.register
+class Job(base.IronicObject, object_base.VersionedObjectDictCompat):
+    """An action run asynchronously by a conductor on behalf of the API."""
+
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = db_api.get_instance()
+
+    fields = {
+        'id': object_fields.IntegerField(),
+        'uuid': object_fields.UUIDField(nullable=True),
+        'node_id': object_fields.IntegerField(nullable=True),
+        'action': object_fields.StringField(nullable=True),
+        'state': object_fields.StringField(nullable=True),
+        'arguments': object_fields.FlexibleDictField(nullable=True),
+        'result': object_fields.FlexibleDictField(nullable=True),
+        'error': object_fields.StringField(nullable=True),
+    }
+
+    @property
+    def finished(self):
+        """Whether the job has completed, successfully or not."""
+        return self.state in states.JOB_FINISHED_STATES
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_by_uuid(cls, context, uuid):
+        """Find a job based on its UUID.
+
+        :param cls: the :class:`Job`
+        :param context: security context
+        :param uuid: the UUID of a job
+        :returns: a :class:`Job` object
+        :raises: JobNotFound if no job exists with the specified UUID
+        """
+        db_job = cls.dbapi.get_job_by_uuid(uuid)
+        job = cls._from_db_object(cls(context), db_job)
+        return job
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable
+    def create(self, context=None):
+        """Create a Job record in the DB.
+
+        :param context: security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Job(context).
+        """
+        values = self.obj_get_changes()
+        db_job = self.dbapi.create_job(values)
+        self._from_db_object(self, db_job)
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable
+    def save(self, context=None):
+        """Save updates to this Job.
+
+        :param context: security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Job(context).
+        :raises: JobNotFound if the job cannot be found
+        """
+        updates = self.obj_get_changes()
+        updated_job = self.dbapi.update_job(self.uuid, updates)
+        self._from_db_object(self, updated_job)
+
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable
+    def refresh(self, context=None):
+        """Load updates for this Job.
+
+        :param context: security context. NOTE: This should only
+                        be used internally by the indirection_api.
+                        Unfortunately, RPC requires context as the first
+                        argument, even though we don't use it.
+                        A context should be set when instantiating the
+                        object, e.g.: Job(context).
+        :raises: JobNotFound if the job cannot be found
+        """
+        current = self.get_by_uuid(self._context, uuid=self.uuid)
+        self.obj_refresh(current)
+        self.obj_reset_changes()
@@ -55,7 +55,8 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
     #               power_interface, raid_interface, vendor_interface
     # Version 1.20: Type of network_interface changed to just nullable string
     # Version 1.21: Add storage_interface field
-    VERSION = '1.21'
+    # Version 1.22: Add get_aggregates()
+    VERSION = '1.22'
 
     dbapi = db_api.get_instance()
 
@@ -127,6 +128,95 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
         'vendor_interface': object_fields.StringField(nullable=True),
     }
 
+    def __init__(self, context=None, **kwargs):
+        super(Node, self).__init__(context, **kwargs)
+        # The keys of the dict fields set or removed with the set_*() and
+        # del_*() methods, by field name.
+        self._key_updates = {}
+
+    def obj_what_changed(self):
+        """Returns a set of fields that have been modified.
+
+        Unlike for the base implementation, this includes the fields whose
+        keys were set or removed with the set_*() and del_*() methods.
+        """
+        changes = super(Node, self).obj_what_changed()
+        changes.update(self._key_updates)
+        return changes
+
+    def obj_reset_changes(self, fields=None, recursive=False):
+        """Reset the list of fields that have been changed.
+
+        :param fields: List of fields to reset, or "all" if None.
+        :param recursive: Call obj_reset_changes(recursive=True) on
+                          any sub-objects within the list of fields
+                          being reset.
+        """
+        super(Node, self).obj_reset_changes(fields=fields,
+                                            recursive=recursive)
+        if fields is None:
+            self._key_updates.clear()
+        else:
+            for field in fields:
+                self._key_updates.pop(field, None)
+
+    def _update_key(self, field, key, value):
+        if not self.obj_attr_is_set(field) or getattr(self, field) is None:
+            # Start from an empty dict, e.g. for a new node. Unless the whole
+            # field was assigned, only the keys are written to the database.
+            assigned = field in super(Node, self).obj_what_changed()
+            setattr(self, field, {})
+            if not assigned:
+                super(Node, self).obj_reset_changes([field])
+        info = getattr(self, field)
+        if value is db_api.DELETE_KEY:
+            info.pop(key, None)
+        else:
+            info[key] = value
+        self._key_updates.setdefault(field, {})[key] = value
+
+    def set_driver_internal_info(self, key, value):
+        """Set a key of the driver_internal_info field.
+
+        Unlike when assigning the whole field, only this key is written to
+        the database when the node is saved, the other keys are kept as
+        they are in the database.
+
+        :param key: The key to set.
+        :param value: The new value of the key.
+        """
+        self._update_key('driver_internal_info', key, value)
+
+    def del_driver_internal_info(self, key):
+        """Remove a key from the driver_internal_info field, if present.
+
+        Only this key is removed from the database when the node is saved.
+
+        :param key: The key to remove.
+        """
+        self._update_key('driver_internal_info', key, db_api.DELETE_KEY)
+
+    def set_instance_info(self, key, value):
+        """Set a key of the instance_info field.
+
+        Unlike when assigning the whole field, only this key is written to
+        the database when the node is saved, the other keys are kept as
+        they are in the database.
+
+        :param key: The key to set.
+        :param value: The new value of the key.
+        """
+        self._update_key('instance_info', key, value)
+
+    def del_instance_info(self, key):
+        """Remove a key from the instance_info field, if present.
+
+        Only this key is removed from the database when the node is saved.
+
+        :param key: The key to remove.
+        """
+        self._update_key('instance_info', key, db_api.DELETE_KEY)
+
     def _validate_property_values(self, properties):
         """Check if the input of local_gb, cpus and memory_mb are valid.
 
@@ -255,6 +345,29 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
                                            sort_dir=sort_dir)
         return cls._from_db_object_list(context, db_nodes)
 
+    # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
+    # methods can be used in the future to replace current explicit RPC calls.
+    # Implications of calling new remote procedures should be thought through.
+    # @object_base.remotable_classmethod
+    @classmethod
+    def get_aggregates(cls, context, group_by, filters=None):
+        """Count the nodes, grouped by the values of some of their fields.
+
+        :param context: Security context.
+        :param group_by: a list of field names to group the nodes by.
+        :param filters: Filters to apply, the same as for :meth:`list`.
+        :returns: a list of dictionaries, one per group, with the values
+                  of the group_by fields and the number of nodes of the
+                  group in the 'count' key.
+
+        """
+        aggregates = []
+        for row in cls.dbapi.get_node_aggregates(group_by, filters=filters):
+            aggregate = dict(zip(group_by, row))
+            aggregate['count'] = row[-1]
+            aggregates.append(aggregate)
+        return aggregates
+
     # NOTE(xek): We don't want to enable RPC on this call just yet. Remotable
     # methods can be used in the future to replace current explicit RPC calls.
     # Implications of calling new remote procedures should be thought through.
@@ -361,7 +474,20 @@ class Node(base.IronicObject, object_base.VersionedObjectDictCompat):
             # Clean driver_internal_info when changes driver
             self.driver_internal_info = {}
             updates = self.obj_get_changes()
-        db_node = self.dbapi.update_node(self.uuid, updates)
+
+        # Only write the updated keys of the fields which were not assigned
+        # as a whole.
+        assigned = super(Node, self).obj_what_changed()
+        key_updates = {}
+        for field, keys in self._key_updates.items():
+            if field not in assigned:
+                key_updates[field] = keys
+                del updates[field]
+        if key_updates:
+            db_node = self.dbapi.update_node(self.uuid, updates,
+                                             key_updates=key_updates)
+        else:
+            db_node = self.dbapi.update_node(self.uuid, updates)
 
         # TODO(galyna): updating specific field not touching others to not
         # change default behaviour. Otherwise it will break a bunch of tests
@@ -38,6 +38,7 @@ import testtools
 from ironic.common import config as ironic_config
 from ironic.common import context as ironic_context
 from ironic.common import driver_factory
+from ironic.common import driver_map
 from ironic.common import hash_ring
 from ironic.conf import CONF
 from ironic.drivers import base as drivers_base
@@ -109,6 +110,7 @@ class TestCase(testtools.TestCase):
 
         self.addCleanup(self._clear_attrs)
         self.addCleanup(hash_ring.HashRingManager().reset)
+        self.addCleanup(driver_map.DriverMap.reset)
         self.useFixture(fixtures.EnvironmentVariable('http_proxy'))
         self.policy = self.useFixture(policy_fixture.PolicyFixture())
 
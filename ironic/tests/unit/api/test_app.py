@@ -0,0 +1,52 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the modules imported by the API service.
+"""
+
+import json
+import subprocess
+import sys
+
+from ironic.api import app
+from ironic.tests import base
+
+# NOTE: run in a new interpreter, the test runner has already imported
+# everything.
+_SCRIPT = """
+import json
+import sys
+
+from ironic.api import app
+from ironic.conf import CONF
+from ironic import objects
+
+objects.register_all()
+CONF([], project='ironic')
+CONF.set_override('auth_strategy', 'noauth')
+app.setup_app(pecan_config=app.get_pecan_config())
+print(json.dumps(sorted(name for name in sys.modules
+                        if sys.modules[name] is not None)))
+"""
+
+
+class TestAppImports(base.TestCase):
+
+    def test_setup_app_does_not_import_drivers(self):
+        output = subprocess.check_output([sys.executable, '-c', _SCRIPT],
+                                         stderr=subprocess.PIPE)
+        modules = json.loads(output.decode('utf-8').splitlines()[-1])
+        self.assertIn('ironic.api.controllers.v1.node', modules)
+        self.assertIn('ironic.conductor.rpcapi', modules)
+        unexpected = [name for name in modules
+                      if name.startswith(app.UNEXPECTED_MODULE_PREFIXES)]
+        self.assertEqual([], unexpected)
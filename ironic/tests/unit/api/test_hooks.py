@@ -26,8 +26,10 @@ from ironic.api.controllers import root
 from ironic.api import hooks
 from ironic.common import context
 from ironic.common import policy
+from ironic.db import api as dbapi
 from ironic.tests import base as tests_base
 from ironic.tests.unit.api import base
+from ironic.tests.unit.objects import utils as obj_utils
 
 
 class FakeRequest(object):
@@ -203,6 +205,75 @@ class TestNoExceptionTracebackHook(base.BaseApiTest):
         self.assertEqual(self.MSG_WITH_TRACE, msg)
 
 
+@mock.patch.object(dbapi, 'get_instance', autospec=True)
+class TestDBHook(tests_base.TestCase):
+
+    def _test_db_hook(self, mock_get_dbapi, method='GET'):
+        reqstate = FakeRequestState()
+        reqstate.request.method = method
+        db_hook = hooks.DBHook()
+        db_hook.before(reqstate)
+        self.assertIs(mock_get_dbapi.return_value, reqstate.request.dbapi)
+        return db_hook, reqstate
+
+    def test_db_hook(self, mock_get_dbapi):
+        db_hook, reqstate = self._test_db_hook(mock_get_dbapi)
+        mock_dbapi = mock_get_dbapi.return_value
+        mock_dbapi.allow_replica_reads.assert_called_once_with(None)
+        self.assertEqual({}, reqstate.request.object_cache)
+
+        reqstate.response.headers = {}
+        db_hook.after(reqstate)
+        self.assertEqual({}, reqstate.response.headers)
+
+    def test_db_hook_query_count_header(self, mock_get_dbapi):
+        self.config(db_query_count_header=True, group='api')
+        mock_dbapi = mock_get_dbapi.return_value
+        mock_dbapi.get_query_count.side_effect = [40, 42]
+        db_hook, reqstate = self._test_db_hook(mock_get_dbapi)
+
+        reqstate.response.headers = {}
+        db_hook.after(reqstate)
+        self.assertEqual({'X-OpenStack-Ironic-DB-Queries': '2'},
+                         reqstate.response.headers)
+
+    def test_db_hook_replica_reads(self, mock_get_dbapi):
+        self.config(use_replica_for_reads=True, replica_max_staleness=42,
+                    group='api')
+        db_hook, reqstate = self._test_db_hook(mock_get_dbapi)
+        mock_dbapi = mock_get_dbapi.return_value
+        mock_dbapi.allow_replica_reads.assert_called_once_with(42)
+
+        mock_dbapi.allow_replica_reads.reset_mock()
+        db_hook.after(reqstate)
+        mock_dbapi.allow_replica_reads.assert_called_once_with(None)
+
+    def test_db_hook_replica_reads_not_read_only(self, mock_get_dbapi):
+        self.config(use_replica_for_reads=True, group='api')
+        self._test_db_hook(mock_get_dbapi, method='PATCH')
+        mock_dbapi = mock_get_dbapi.return_value
+        mock_dbapi.allow_replica_reads.assert_called_once_with(None)
+
+
+class TestDBHookQueryCount(base.BaseApiTest):
+
+    def test_query_count_header(self):
+        self.config(db_query_count_header=True, group='api')
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertLess(0, int(
+            response.headers['X-OpenStack-Ironic-DB-Queries']))
+
+    def test_query_count_header_disabled(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json('/nodes/%s' % node.uuid,
+                                 expect_errors=True)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertNotIn('X-OpenStack-Ironic-DB-Queries', response.headers)
+
+
 class TestContextHook(base.BaseApiTest):
 
     @mock.patch.object(context, 'RequestContext')
@@ -0,0 +1,132 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the API /jobs/ methods.
+"""
+
+import mock
+from oslo_utils import uuidutils
+from six.moves import http_client
+
+from ironic.api.controllers import base as api_base
+from ironic.api.controllers.v1 import job as api_job
+from ironic.common import states
+from ironic.conductor import manager
+from ironic import objects
+from ironic.tests.unit.api import base as test_api_base
+from ironic.tests.unit.db import utils as db_utils
+from ironic.tests.unit.objects import utils as obj_utils
+
+
+class TestGetJob(test_api_base.BaseApiTest):
+
+    headers = {api_base.Version.string: '1.34'}
+
+    def setUp(self):
+        super(TestGetJob, self).setUp()
+        self.node = obj_utils.create_test_node(self.context)
+        self.job = db_utils.create_test_job(node_id=self.node.id)
+
+    def test_get_one(self):
+        data = self.get_json('/jobs/%s' % self.job.uuid,
+                             headers=self.headers)
+        self.assertEqual(self.job.uuid, data['uuid'])
+        self.assertEqual(self.node.uuid, data['node_uuid'])
+        self.assertEqual('get_boot_device', data['action'])
+        self.assertEqual(states.JOB_PENDING, data['state'])
+        self.assertNotIn('arguments', data)
+        self.assertNotIn('node_id', data)
+        self.assertIn('links', data)
+
+    def test_get_one_finished(self):
+        self.dbapi.update_job(self.job.uuid,
+                              {'state': states.JOB_SUCCESS,
+                               'result': {'boot_device': 'pxe'}})
+        data = self.get_json('/jobs/%s' % self.job.uuid,
+                             headers=self.headers)
+        self.assertEqual(states.JOB_SUCCESS, data['state'])
+        self.assertEqual({'boot_device': 'pxe'}, data['result'])
+
+    def test_get_one_not_found(self):
+        response = self.get_json('/jobs/%s' % uuidutils.generate_uuid(),
+                                 headers=self.headers, expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    def test_get_one_old_version(self):
+        response = self.get_json('/jobs/%s' % self.job.uuid,
+                                 headers={api_base.Version.string: '1.33'},
+                                 expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    @mock.patch.object(api_job, 'time', autospec=True)
+    def test_get_one_wait(self, mock_time):
+        def _finish(interval):
+            self.dbapi.update_job(self.job.uuid,
+                                  {'state': states.JOB_FAILED,
+                                   'error': 'boom'})
+        mock_time.time.return_value = 100
+        mock_time.sleep.side_effect = _finish
+
+        data = self.get_json('/jobs/%s?wait=10' % self.job.uuid,
+                             headers=self.headers)
+        self.assertEqual(states.JOB_FAILED, data['state'])
+        self.assertEqual('boom', data['error'])
+        mock_time.sleep.assert_called_once_with(api_job._POLL_INTERVAL)
+
+    @mock.patch.object(api_job, 'time', autospec=True)
+    def test_get_one_wait_timeout(self, mock_time):
+        self.config(job_max_wait=2, group='api')
+        mock_time.time.side_effect = [100, 101, 102]
+
+        data = self.get_json('/jobs/%s?wait=10' % self.job.uuid,
+                             headers=self.headers)
+        self.assertEqual(states.JOB_PENDING, data['state'])
+        self.assertEqual(1, mock_time.sleep.call_count)
+
+    @mock.patch.object(objects.Job, 'refresh', autospec=True)
+    @mock.patch.object(api_job, 'time', autospec=True)
+    def test_get_one_wait_disabled(self, mock_time, mock_refresh):
+        self.config(job_max_wait=0, group='api')
+        mock_time.time.return_value = 100
+        data = self.get_json('/jobs/%s?wait=10' % self.job.uuid,
+                             headers=self.headers)
+        self.assertEqual(states.JOB_PENDING, data['state'])
+        self.assertFalse(mock_time.sleep.called)
+        self.assertFalse(mock_refresh.called)
+
+    def _get_as_observer(self, job_uuid):
+        # the application is built with the noauth strategy, which bypasses
+        # the policies
+        self.config(auth_strategy='keystone')
+        headers = dict(self.headers, **{'X-Roles': 'baremetal_observer',
+                                        'X-Project-Name': 'baremetal'})
+        return self.get_json('/jobs/%s' % job_uuid, headers=headers,
+                             expect_errors=True)
+
+    def test_get_one_observer(self):
+        response = self._get_as_observer(self.job.uuid)
+        self.assertEqual(http_client.OK, response.status_int)
+        self.assertEqual(self.job.uuid, response.json['uuid'])
+
+    def test_get_one_observer_vendor_passthru(self):
+        job = db_utils.create_test_job(node_id=self.node.id,
+                                       uuid=uuidutils.generate_uuid(),
+                                       action='vendor_passthru',
+                                       state=states.JOB_SUCCESS,
+                                       result={'return': 'secret'})
+        response = self._get_as_observer(job.uuid)
+        self.assertEqual(http_client.FORBIDDEN, response.status_int)
+        self.assertNotIn('secret', response.text)
+
+    def test_action_policies(self):
+        self.assertEqual(manager.JOB_ACTIONS,
+                         set(api_job._ACTION_POLICIES))
@@ -0,0 +1,82 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the cache of the ramdisk lookup results.
+"""
+
+import time
+
+import mock
+
+from ironic.api.controllers.v1 import lookup_cache
+from ironic.tests import base
+
+
+@mock.patch.object(time, 'time', autospec=True, return_value=1000)
+class TestLookupCache(base.TestCase):
+
+    addresses = ['66:55:44:33:22:11', '11:22:33:44:55:66']
+
+    def setUp(self):
+        super(TestLookupCache, self).setUp()
+        self.cache = lookup_cache.LookupCache(max_size=3)
+        self.node = mock.Mock(uuid='uuid', provision_state='deploy wait')
+
+    def test_get_set(self, mock_time):
+        self.assertIsNone(self.cache.get(self.addresses))
+        self.cache.set(self.addresses, self.node)
+        self.assertEqual('uuid',
+                         self.cache.get(self.addresses))
+        # the order of the addresses does not matter
+        self.assertEqual('uuid',
+                         self.cache.get(reversed(self.addresses)))
+        self.assertIsNone(self.cache.get(self.addresses[:1]))
+
+    def test_expired(self, mock_time):
+        self.cache.set(self.addresses, self.node)
+        mock_time.return_value = 1009
+        self.assertIsNotNone(self.cache.get(self.addresses))
+        mock_time.return_value = 1010
+        self.assertIsNone(self.cache.get(self.addresses))
+
+    def test_disabled(self, mock_time):
+        self.config(ramdisk_lookup_cache_ttl=0, group='api')
+        self.cache.set(self.addresses, self.node)
+        self.assertIsNone(self.cache.get(self.addresses))
+
+    def test_max_size(self, mock_time):
+        for i in range(4):
+            self.cache.set(['00:00:00:00:00:0%d' % i], self.node)
+        self.assertIsNone(self.cache.get(['00:00:00:00:00:00']))
+        for i in range(1, 4):
+            self.assertIsNotNone(self.cache.get(['00:00:00:00:00:0%d' % i]))
+
+    def test_invalidate(self, mock_time):
+        self.cache.set(self.addresses, self.node)
+        self.cache.set(['00:00:00:00:00:00'], self.node)
+        self.cache.invalidate(None, '11:22:33:44:55:66'.upper())
+        self.assertIsNone(self.cache.get(self.addresses))
+        self.assertIsNotNone(self.cache.get(['00:00:00:00:00:00']))
+
+    def test_clear(self, mock_time):
+        self.cache.set(self.addresses, self.node)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(self.addresses))
+
+    def test_locked(self, mock_time):
+        self.cache._lock = mock.MagicMock(spec_set=['__enter__', '__exit__'])
+        self.cache.set(self.addresses, self.node)
+        self.cache.get(self.addresses)
+        self.cache.invalidate(self.addresses[0])
+        self.cache.clear()
+        self.assertEqual(4, self.cache._lock.__enter__.call_count)
+        self.assertEqual(4, self.cache._lock.__exit__.call_count)
@@ -299,6 +299,124 @@ class TestListNodes(test_api_base.BaseApiTest):
         # never expose the chassis_id
         self.assertNotIn('chassis_id', data['nodes'][0])
 
+    def test_detail_matches_get_one(self):
+        # NOTE: the collection endpoints render nodes with NodeSerializer,
+        # which must produce the same output as Node.convert_with_links()
+        obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(), name='node-0',
+            chassis_id=self.chassis.id, provision_state=states.AVAILABLE,
+            driver_info={'fake_password': 'secret',
+                         'ssh_key_contents': 'key'},
+            instance_info={'image_url': 'http://img', 'foo': 'bar'},
+            driver_internal_info={'foo': 'bar'}, clean_step={'foo': 'bar'},
+            inspection_started_at=datetime.datetime(2017, 3, 18, 19, 20))
+        obj_utils.create_test_node(
+            self.context, uuid=uuidutils.generate_uuid(), name='node-1',
+            chassis_id=None, provision_state=states.ACTIVE,
+            instance_uuid=uuidutils.generate_uuid(), resource_class='foo')
+        for minor in range(versions.MINOR_1_INITIAL_VERSION,
+                           versions.MINOR_MAX_VERSION + 1):
+            headers = {api_base.Version.string: '1.%d' % minor}
+            data = self.get_json('/nodes/detail', headers=headers)
+            self.assertEqual(2, len(data['nodes']))
+            for node in data['nodes']:
+                expected = self.get_json('/nodes/%s' % node['uuid'],
+                                         headers=headers)
+                self.assertEqual(json.dumps(expected, sort_keys=True),
+                                 json.dumps(node, sort_keys=True))
+
+    def test_get_all_fields_matches_get_one(self):
+        obj_utils.create_test_node(self.context, name='node-0',
+                                   chassis_id=self.chassis.id,
+                                   driver_info={'fake_password': 'secret'})
+        headers = {api_base.Version.string: str(api_v1.MAX_VER)}
+        fields = 'uuid,name,chassis_uuid,driver_info,created_at'
+        data = self.get_json('/nodes?fields=%s' % fields, headers=headers)
+        node = data['nodes'][0]
+        expected = self.get_json('/nodes/%s?fields=%s' % (node['uuid'],
+                                                          fields),
+                                 headers=headers)
+        self.assertEqual(json.dumps(expected, sort_keys=True),
+                         json.dumps(node, sort_keys=True))
+
+    def _create_aggregates_test_nodes(self):
+        obj_utils.create_test_node(self.context,
+                                   uuid=uuidutils.generate_uuid(),
+                                   provision_state=states.ACTIVE,
+                                   resource_class='gold',
+                                   chassis_id=self.chassis.id)
+        obj_utils.create_test_node(self.context,
+                                   uuid=uuidutils.generate_uuid(),
+                                   provision_state=states.ACTIVE,
+                                   resource_class='gold', maintenance=True)
+        obj_utils.create_test_node(self.context,
+                                   uuid=uuidutils.generate_uuid(),
+                                   provision_state=states.AVAILABLE,
+                                   resource_class='gold')
+
+    def test_aggregates(self):
+        self._create_aggregates_test_nodes()
+        data = self.get_json(
+            '/nodes/aggregates?group_by=resource_class,provision_state',
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(
+            {'aggregates': [
+                {'provision_state': states.ACTIVE, 'resource_class': 'gold',
+                 'count': 2},
+                {'provision_state': states.AVAILABLE,
+                 'resource_class': 'gold', 'count': 1}]},
+            data)
+
+    def test_aggregates_with_filters(self):
+        self._create_aggregates_test_nodes()
+        data = self.get_json(
+            '/nodes/aggregates?group_by=maintenance'
+            '&provision_state=%s' % states.ACTIVE,
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(
+            {'aggregates': [{'maintenance': False, 'count': 1},
+                            {'maintenance': True, 'count': 1}]},
+            data)
+
+    def test_aggregates_from_chassis(self):
+        self._create_aggregates_test_nodes()
+        data = self.get_json(
+            '/chassis/%s/nodes/aggregates?group_by=provision_state' %
+            self.chassis.uuid,
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(
+            {'aggregates': [{'provision_state': states.ACTIVE, 'count': 1}]},
+            data)
+
+    def test_aggregates_missing_group_by(self):
+        response = self.get_json(
+            '/nodes/aggregates', expect_errors=True,
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+        self.assertIn('group_by', response.json['error_message'])
+
+    def test_aggregates_invalid_group_by(self):
+        response = self.get_json(
+            '/nodes/aggregates?group_by=provision_state,driver_info',
+            expect_errors=True,
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(http_client.BAD_REQUEST, response.status_int)
+        self.assertIn('driver_info', response.json['error_message'])
+
+    def test_aggregates_old_version(self):
+        response = self.get_json(
+            '/nodes/aggregates?group_by=provision_state', expect_errors=True,
+            headers={api_base.Version.string: '1.32'})
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    def test_aggregates_against_single(self):
+        node = obj_utils.create_test_node(self.context)
+        response = self.get_json(
+            '/nodes/%s/aggregates?group_by=provision_state' % node.uuid,
+            expect_errors=True,
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
     def test_detail_against_single(self):
         node = obj_utils.create_test_node(self.context)
         response = self.get_json('/nodes/%s/detail' % node.uuid,
@@ -3302,6 +3420,13 @@ class TestPut(test_api_base.BaseApiTest):
 
 
 class TestCheckCleanSteps(base.TestCase):
+    def test__get_clean_steps_schema(self):
+        schema = api_node._get_clean_steps_schema()
+        self.assertIs(schema, api_node._get_clean_steps_schema())
+        self.assertEqual(
+            {'power', 'management', 'deploy', 'raid'},
+            set(schema['items']['properties']['interface']['enum']))
+
     def test__check_clean_steps_not_list(self):
         clean_steps = {"step": "upgrade_firmware", "interface": "deploy"}
         self.assertRaisesRegex(exception.InvalidParameterValue,
@@ -3592,3 +3717,117 @@ class TestAttachDetachVif(test_api_base.BaseApiTest):
 
         self.assertEqual(http_client.CONFLICT, ret.status_code)
         self.assertTrue(ret.json['error_message'])
+
+
+@mock.patch.object(rpcapi.ConductorAPI, 'run_job')
+class TestAsyncJobs(test_api_base.BaseApiTest):
+
+    headers = {api_base.Version.string: '1.34', 'Prefer': 'respond-async'}
+
+    def setUp(self):
+        super(TestAsyncJobs, self).setUp()
+        self.node = obj_utils.create_test_node(
+            self.context, provision_state=states.MANAGEABLE)
+        p = mock.patch.object(rpcapi.ConductorAPI, 'get_topic_for')
+        self.mock_gtf = p.start()
+        self.mock_gtf.return_value = 'test-topic'
+        self.addCleanup(p.stop)
+
+    def _check_job(self, response, mock_run, action, arguments):
+        self.assertEqual(http_client.ACCEPTED, response.status_int)
+        self.assertEqual('respond-async',
+                         response.headers['Preference-Applied'])
+        data = response.json
+        self.assertTrue(response.location.endswith('/v1/jobs/%s'
+                                                   % data['uuid']))
+        self.assertEqual(self.node.uuid, data['node_uuid'])
+        self.assertEqual(action, data['action'])
+        self.assertEqual(states.JOB_PENDING, data['state'])
+        mock_run.assert_called_once_with(mock.ANY, data['uuid'],
+                                         topic='test-topic')
+        job = objects.Job.get_by_uuid(self.context, data['uuid'])
+        self.assertEqual(self.node.id, job.node_id)
+        self.assertEqual(arguments, job.arguments)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'get_boot_device')
+    def test_get_boot_device(self, mock_gbd, mock_run):
+        response = self.get_json(
+            '/nodes/%s/management/boot_device' % self.node.uuid,
+            headers=self.headers, expect_errors=True)
+        self._check_job(response, mock_run, 'get_boot_device', {})
+        self.assertFalse(mock_gbd.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'set_boot_device')
+    def test_set_boot_device(self, mock_sbd, mock_run):
+        response = self.put_json(
+            '/nodes/%s/management/boot_device' % self.node.uuid,
+            {'boot_device': boot_devices.PXE}, headers=self.headers)
+        self._check_job(response, mock_run, 'set_boot_device',
+                        {'device': boot_devices.PXE, 'persistent': False})
+        self.assertFalse(mock_sbd.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'change_node_power_state')
+    def test_power(self, mock_cnps, mock_run):
+        response = self.put_json('/nodes/%s/states/power' % self.node.uuid,
+                                 {'target': states.POWER_ON},
+                                 headers=self.headers)
+        self._check_job(response, mock_run, 'change_node_power_state',
+                        {'new_state': states.POWER_ON, 'timeout': None})
+        self.assertFalse(mock_cnps.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'inspect_hardware')
+    def test_inspect(self, mock_inspect, mock_run):
+        response = self.put_json(
+            '/nodes/%s/states/provision' % self.node.uuid,
+            {'target': states.VERBS['inspect']}, headers=self.headers)
+        self._check_job(response, mock_run, 'inspect_hardware', {})
+        self.assertFalse(mock_inspect.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'validate_driver_interfaces')
+    def test_validate(self, mock_validate, mock_run):
+        response = self.get_json('/nodes/%s/validate' % self.node.uuid,
+                                 headers=self.headers, expect_errors=True)
+        self._check_job(response, mock_run, 'validate_driver_interfaces', {})
+        self.assertFalse(mock_validate.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'vendor_passthru')
+    def test_vendor_passthru(self, mock_vendor, mock_run):
+        response = self.post_json(
+            '/nodes/%s/vendor_passthru/test' % self.node.uuid,
+            {'foo': 'bar'}, headers=self.headers)
+        self._check_job(response, mock_run, 'vendor_passthru',
+                        {'driver_method': 'test', 'http_method': 'POST',
+                         'info': {'foo': 'bar'}})
+        self.assertFalse(mock_vendor.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'get_boot_device')
+    def test_other_preferences(self, mock_gbd, mock_run):
+        headers = dict(self.headers,
+                       Prefer='return=minimal, Respond-Async; wait=10')
+        response = self.get_json(
+            '/nodes/%s/management/boot_device' % self.node.uuid,
+            headers=headers, expect_errors=True)
+        self._check_job(response, mock_run, 'get_boot_device', {})
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'get_boot_device')
+    def test_not_requested(self, mock_gbd, mock_run):
+        mock_gbd.return_value = {'boot_device': boot_devices.PXE,
+                                 'persistent': True}
+        headers = dict(self.headers, Prefer='return=minimal')
+        data = self.get_json(
+            '/nodes/%s/management/boot_device' % self.node.uuid,
+            headers=headers)
+        self.assertEqual(mock_gbd.return_value, data)
+        self.assertFalse(mock_run.called)
+
+    @mock.patch.object(rpcapi.ConductorAPI, 'get_boot_device')
+    def test_old_version(self, mock_gbd, mock_run):
+        mock_gbd.return_value = {'boot_device': boot_devices.PXE,
+                                 'persistent': True}
+        headers = dict(self.headers)
+        headers[api_base.Version.string] = '1.33'
+        data = self.get_json(
+            '/nodes/%s/management/boot_device' % self.node.uuid,
+            headers=headers)
+        self.assertEqual(mock_gbd.return_value, data)
+        self.assertFalse(mock_run.called)
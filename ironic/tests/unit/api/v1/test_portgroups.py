@@ -14,6 +14,7 @@ Tests for the API /portgroups/ methods.
 """
 
 import datetime
+import json
 
 import mock
 from oslo_config import cfg
@@ -29,6 +30,7 @@ from ironic.api.controllers import base as api_base
 from ironic.api.controllers import v1 as api_v1
 from ironic.api.controllers.v1 import portgroup as api_portgroup
 from ironic.api.controllers.v1 import utils as api_utils
+from ironic.api.controllers.v1 import versions
 from ironic.common import exception
 from ironic.common import utils as common_utils
 from ironic.conductor import rpcapi
@@ -171,6 +173,27 @@ class TestListPortgroups(test_api_base.BaseApiTest):
             expect_errors=True)
         self.assertEqual(http_client.NOT_FOUND, response.status_int)
 
+    def test_detail_matches_get_one(self):
+        # NOTE: the collection endpoints render portgroups with
+        # PortgroupSerializer, which must produce the same output as
+        # Portgroup.convert_with_links()
+        obj_utils.create_test_portgroup(self.context, node_id=self.node.id,
+                                        properties={'foo': 'bar'})
+        obj_utils.create_test_portgroup(self.context, node_id=self.node.id,
+                                        uuid=uuidutils.generate_uuid(),
+                                        name='pg-1',
+                                        address='52:54:00:cf:2d:42')
+        for minor in range(versions.MINOR_23_PORTGROUPS,
+                           versions.MINOR_MAX_VERSION + 1):
+            headers = {api_base.Version.string: '1.%d' % minor}
+            data = self.get_json('/portgroups/detail', headers=headers)
+            self.assertEqual(2, len(data['portgroups']))
+            for portgroup in data['portgroups']:
+                expected = self.get_json('/portgroups/%s' % portgroup['uuid'],
+                                         headers=headers)
+                self.assertEqual(json.dumps(expected, sort_keys=True),
+                                 json.dumps(portgroup, sort_keys=True))
+
     def test_detail_against_single(self):
         portgroup = obj_utils.create_test_portgroup(self.context,
                                                     node_id=self.node.id)
@@ -16,6 +16,7 @@ Tests for the API /ports/ methods.
 """
 
 import datetime
+import json
 
 import mock
 from oslo_config import cfg
@@ -29,6 +30,7 @@ from wsme import types as wtypes
 
 from ironic.api.controllers import base as api_base
 from ironic.api.controllers import v1 as api_v1
+from ironic.api.controllers.v1 import lookup_cache
 from ironic.api.controllers.v1 import notification_utils
 from ironic.api.controllers.v1 import port as api_port
 from ironic.api.controllers.v1 import utils as api_utils
@@ -194,6 +196,30 @@ class TestListPorts(test_api_base.BaseApiTest):
         self.assertNotIn('node_id', data['ports'][0])
         self.assertNotIn('portgroup_id', data['ports'][0])
 
+    def test_detail_matches_get_one(self):
+        # NOTE: the collection endpoints render ports with PortSerializer,
+        # which must produce the same output as Port.convert_with_links()
+        portgroup = obj_utils.create_test_portgroup(self.context,
+                                                    node_id=self.node.id)
+        obj_utils.create_test_port(
+            self.context, node_id=self.node.id, portgroup_id=portgroup.id,
+            internal_info={'foo': 'bar'},
+            local_link_connection={'switch_id': 'aa:bb:cc:dd:ee:ff',
+                                   'port_id': 'Gig0/1'})
+        obj_utils.create_test_port(self.context, node_id=self.node.id,
+                                   uuid=uuidutils.generate_uuid(),
+                                   address='52:54:00:cf:2d:42')
+        for minor in range(versions.MINOR_1_INITIAL_VERSION,
+                           versions.MINOR_MAX_VERSION + 1):
+            headers = {api_base.Version.string: '1.%d' % minor}
+            data = self.get_json('/ports/detail', headers=headers)
+            self.assertEqual(2, len(data['ports']))
+            for port in data['ports']:
+                expected = self.get_json('/ports/%s' % port['uuid'],
+                                         headers=headers)
+                self.assertEqual(json.dumps(expected, sort_keys=True),
+                                 json.dumps(port, sort_keys=True))
+
     def test_detail_against_single(self):
         port = obj_utils.create_test_port(self.context, node_id=self.node.id)
         response = self.get_json('/ports/%s/detail' % port.uuid,
@@ -495,6 +521,19 @@ class TestPatch(test_api_base.BaseApiTest):
                                       obj_fields.NotificationStatus.END,
                                       node_uuid=self.node.uuid)])
 
+    @mock.patch.object(lookup_cache.CACHE, 'invalidate', autospec=True)
+    def test_update_address_invalidates_lookup_cache(self, mock_invalidate,
+                                                     mock_upd):
+        address = 'aa:bb:cc:dd:ee:ff'
+        mock_upd.return_value = self.port
+        mock_upd.return_value.address = address
+        response = self.patch_json('/ports/%s' % self.port.uuid,
+                                   [{'path': '/address',
+                                     'value': address,
+                                     'op': 'replace'}])
+        self.assertEqual(http_client.OK, response.status_code)
+        mock_invalidate.assert_called_once_with('52:54:00:cf:2d:31', address)
+
     def test_update_byaddress_not_allowed(self, mock_upd):
         extra = {'foo': 'bar'}
         mock_upd.return_value = self.port
@@ -989,6 +1028,13 @@ class TestPost(test_api_base.BaseApiTest):
                                       node_uuid=self.node.uuid)])
         self.assertEqual(0, mock_warn.call_count)
 
+    @mock.patch.object(lookup_cache.CACHE, 'invalidate', autospec=True)
+    def test_create_port_invalidates_lookup_cache(self, mock_invalidate):
+        pdict = post_get_test_port()
+        response = self.post_json('/ports', pdict, headers=self.headers)
+        self.assertEqual(http_client.CREATED, response.status_int)
+        mock_invalidate.assert_called_once_with(pdict['address'])
+
     def test_create_port_min_api_version(self):
         pdict = post_get_test_port(
             node_uuid=self.node.uuid)
@@ -1402,6 +1448,13 @@ class TestDelete(test_api_base.BaseApiTest):
                                       obj_fields.NotificationStatus.END,
                                       node_uuid=self.node.uuid)])
 
+    @mock.patch.object(lookup_cache.CACHE, 'invalidate', autospec=True)
+    def test_delete_port_invalidates_lookup_cache(self, mock_invalidate,
+                                                  mock_dpt):
+        self.delete('/ports/%s' % self.port.uuid)
+        self.assertTrue(mock_dpt.called)
+        mock_invalidate.assert_called_once_with(self.port.address)
+
     @mock.patch.object(notification_utils, '_emit_api_notification')
     def test_delete_port_node_locked(self, mock_notify, mock_dpt):
         self.node.reserve(self.context, 'fake', self.node.uuid)
@@ -22,8 +22,11 @@ from six.moves import http_client
 
 from ironic.api.controllers import base as api_base
 from ironic.api.controllers import v1 as api_v1
+from ironic.api.controllers.v1 import lookup_cache
 from ironic.api.controllers.v1 import ramdisk
+from ironic.common import states
 from ironic.conductor import rpcapi
+from ironic import objects
 from ironic.tests.unit.api import base as test_api_base
 from ironic.tests.unit.objects import utils as obj_utils
 
@@ -43,6 +46,8 @@ class TestLookup(test_api_base.BaseApiTest):
                                                 uuid=uuidutils.generate_uuid(),
                                                 provision_state='available')
         CONF.set_override('agent_backend', 'statsd', 'metrics')
+        lookup_cache.CACHE.clear()
+        self.addCleanup(lookup_cache.CACHE.clear)
 
     def _check_config(self, data):
         expected_metrics = {
@@ -144,6 +149,72 @@ class TestLookup(test_api_base.BaseApiTest):
             expect_errors=True)
         self.assertEqual(http_client.NOT_FOUND, response.status_int)
 
+    @mock.patch.object(objects.Node, 'get_by_port_addresses',
+                       side_effect=objects.Node.get_by_port_addresses)
+    def test_found_by_addresses_cached(self, mock_get_by_addresses):
+        obj_utils.create_test_port(self.context,
+                                   node_id=self.node.id,
+                                   address=self.addresses[1])
+
+        for i in range(2):
+            data = self.get_json(
+                '/lookup?addresses=%s' % ','.join(self.addresses),
+                headers={api_base.Version.string: str(api_v1.MAX_VER)})
+            self.assertEqual(self.node.uuid, data['node']['uuid'])
+            self.assertEqual(set(ramdisk._LOOKUP_RETURN_FIELDS) | {'links'},
+                             set(data['node']))
+        mock_get_by_addresses.assert_called_once_with(mock.ANY, mock.ANY)
+        self.assertEqual(sorted(self.addresses),
+                         sorted(mock_get_by_addresses.call_args[0][1]))
+
+    def test_restrict_lookup_cached(self):
+        obj_utils.create_test_port(self.context,
+                                   node_id=self.node2.id,
+                                   address=self.addresses[1])
+
+        response = self.get_json(
+            '/lookup?addresses=%s' % ','.join(self.addresses),
+            headers={api_base.Version.string: str(api_v1.MAX_VER)},
+            expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+        # the current state of the node is checked, not a cached one
+        self.node2.provision_state = states.DEPLOYWAIT
+        self.node2.save()
+        data = self.get_json(
+            '/lookup?addresses=%s' % ','.join(self.addresses),
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(self.node2.uuid, data['node']['uuid'])
+
+        self.node2.provision_state = states.ACTIVE
+        self.node2.save()
+        response = self.get_json(
+            '/lookup?addresses=%s' % ','.join(self.addresses),
+            headers={api_base.Version.string: str(api_v1.MAX_VER)},
+            expect_errors=True)
+        self.assertEqual(http_client.NOT_FOUND, response.status_int)
+
+    def test_found_by_addresses_cached_node_deleted(self):
+        port = obj_utils.create_test_port(self.context,
+                                          node_id=self.node.id,
+                                          address=self.addresses[1])
+        data = self.get_json(
+            '/lookup?addresses=%s' % ','.join(self.addresses),
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(self.node.uuid, data['node']['uuid'])
+
+        port.destroy()
+        self.node.destroy()
+        obj_utils.create_test_port(self.context,
+                                   node_id=self.node2.id,
+                                   address=self.addresses[1],
+                                   uuid=uuidutils.generate_uuid())
+        CONF.set_override('restrict_lookup', False, 'api')
+        data = self.get_json(
+            '/lookup?addresses=%s' % ','.join(self.addresses),
+            headers={api_base.Version.string: str(api_v1.MAX_VER)})
+        self.assertEqual(self.node2.uuid, data['node']['uuid'])
+
     def test_no_restrict_lookup(self):
         CONF.set_override('restrict_lookup', False, 'api')
         data = self.get_json(
@@ -506,6 +506,79 @@ class TestNodeIdent(base.TestCase):
                           self.valid_name)
 
 
+@mock.patch.object(pecan, 'request', spec_set=['context', 'object_cache',
+                                               'version'])
+class TestGetCachedObject(base.TestCase):
+
+    def setUp(self):
+        super(TestGetCachedObject, self).setUp()
+        # 'name' is an argument of the Mock constructor
+        self.node = mock.Mock(uuid=uuidutils.generate_uuid())
+        self.node.name = 'node-1'
+        self.port = mock.Mock(uuid=uuidutils.generate_uuid())
+        self.port.name = None
+
+    def test_no_object_cache(self, mock_pr):
+        loader = mock.Mock(return_value=self.node)
+        del mock_pr.object_cache
+        for i in range(2):
+            self.assertIs(self.node, utils.get_cached_object(
+                objects.Node, loader, self.node.uuid))
+        self.assertEqual(2, loader.call_count)
+
+    def test_cached_by_uuid_and_name(self, mock_pr):
+        mock_pr.object_cache = {}
+        loader = mock.Mock(return_value=self.node)
+        for ident in (self.node.uuid, self.node.uuid, self.node.name):
+            self.assertIs(self.node, utils.get_cached_object(
+                objects.Node, loader, ident))
+        loader.assert_called_once_with(mock_pr.context, self.node.uuid)
+
+    def test_cached_per_class(self, mock_pr):
+        mock_pr.object_cache = {}
+        self.port.uuid = self.node.uuid
+        utils.get_cached_object(objects.Node, mock.Mock(
+            return_value=self.node), self.node.uuid)
+        self.assertIs(self.port, utils.get_cached_object(
+            objects.Port, mock.Mock(return_value=self.port), self.node.uuid))
+
+    def test_not_found_not_cached(self, mock_pr):
+        mock_pr.object_cache = {}
+        loader = mock.Mock(side_effect=exception.NodeNotFound(node='foo'))
+        for i in range(2):
+            self.assertRaises(exception.NodeNotFound,
+                              utils.get_cached_object,
+                              objects.Node, loader, self.node.uuid)
+        self.assertEqual(2, loader.call_count)
+
+    @mock.patch.object(objects.Node, 'get_by_uuid')
+    @mock.patch.object(objects.Node, 'get_by_name')
+    def test_get_rpc_node(self, mock_gbn, mock_gbu, mock_pr):
+        mock_pr.object_cache = {}
+        mock_pr.version.minor = 10
+        mock_gbn.return_value = self.node
+        self.assertIs(self.node, utils.get_rpc_node(self.node.name))
+        self.assertIs(self.node, utils.get_rpc_node(self.node.uuid))
+        mock_gbn.assert_called_once_with(mock_pr.context, self.node.name)
+        self.assertFalse(mock_gbu.called)
+
+    @mock.patch.object(objects.Port, 'get_by_uuid')
+    def test_get_rpc_port(self, mock_gbu, mock_pr):
+        mock_pr.object_cache = {}
+        mock_gbu.return_value = self.port
+        for i in range(2):
+            self.assertIs(self.port, utils.get_rpc_port(self.port.uuid))
+        mock_gbu.assert_called_once_with(mock_pr.context, self.port.uuid)
+
+    @mock.patch.object(objects.Portgroup, 'get_by_uuid')
+    def test_get_rpc_portgroup(self, mock_gbu, mock_pr):
+        mock_pr.object_cache = {}
+        mock_gbu.return_value = self.port
+        for i in range(2):
+            self.assertIs(self.port, utils.get_rpc_portgroup(self.port.uuid))
+        mock_gbu.assert_called_once_with(mock_pr.context, self.port.uuid)
+
+
 class TestVendorPassthru(base.TestCase):
 
     def test_method_not_specified(self):
@@ -590,7 +663,7 @@ class TestVendorPassthru(base.TestCase):
 
     def test_get_controller_reserved_names(self):
         expected = ['maintenance', 'management', 'states',
-                    'vendor_passthru', 'validate', 'detail']
+                    'vendor_passthru', 'validate', 'detail', 'aggregates']
         self.assertEqual(sorted(expected),
                          sorted(utils.get_controller_reserved_names(
                                 api_node.NodesController)))
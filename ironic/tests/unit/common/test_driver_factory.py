@@ -15,6 +15,7 @@
 import mock
 from oslo_utils import uuidutils
 from stevedore import dispatch
+from stevedore import extension
 
 from ironic.common import driver_factory
 from ironic.common import exception
@@ -68,6 +69,19 @@ class DriverLoadTestCase(db_base.DbTestCase):
             driver_factory.DriverFactory._init_extension_manager()
             self.assertEqual(3, mock_em.call_count)
 
+    @mock.patch.object(dispatch.NameDispatchExtensionManager,
+                       '_load_one_plugin', autospec=True)
+    def test_disabled_drivers_not_loaded(self, mock_load):
+        self.config(enabled_drivers=['fake'])
+        mock_load.side_effect = (
+            lambda mgr, ep, *args: extension.Extension(
+                ep.name, ep, None, mock.Mock(supported=True)))
+        driver_factory.DriverFactory._init_extension_manager()
+        self.assertEqual(
+            ['fake'], driver_factory.DriverFactory._extension_manager.names())
+        self.assertEqual(['fake'], [call[0][1].name
+                                    for call in mock_load.call_args_list])
+
     @mock.patch.object(driver_factory.LOG, 'warning', autospec=True)
     def test_driver_duplicated_entry(self, mock_log):
         self.config(enabled_drivers=['fake', 'fake'])
@@ -0,0 +1,115 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import mock
+
+from ironic.common import driver_map
+from ironic.common import hash_ring
+from ironic.tests.unit.db import base as db_base
+
+
+class DriverMapTestCase(db_base.DbTestCase):
+
+    def setUp(self):
+        super(DriverMapTestCase, self).setUp()
+        self.driver_map = driver_map.DriverMap()
+        self.conductor = self.dbapi.register_conductor({
+            'hostname': 'host1',
+            'drivers': ['driver1'],
+        })
+        self.dbapi.register_conductor_hardware_interfaces(
+            self.conductor.id, 'hw-type1', 'deploy', ['iscsi', 'direct'],
+            'iscsi')
+        self.dbapi.register_conductor_hardware_interfaces(
+            self.conductor.id, 'hw-type2', 'deploy', ['iscsi'], 'iscsi')
+
+    def _register_conductor2(self):
+        self.dbapi.register_conductor({
+            'hostname': 'host2',
+            'drivers': ['driver2'],
+        })
+
+    def test_get_active_dicts(self):
+        self.assertEqual({'driver1': {'host1'}},
+                         self.driver_map.get_active_driver_dict())
+        self.assertEqual({'hw-type1': {'host1'}, 'hw-type2': {'host1'}},
+                         self.driver_map.get_active_hardware_type_dict())
+
+    def test_cached(self):
+        snapshot = self.driver_map.get_snapshot()
+        self._register_conductor2()
+        self.assertIs(snapshot, driver_map.DriverMap().get_snapshot())
+        self.assertEqual({'driver1': {'host1'}},
+                         self.driver_map.get_active_driver_dict())
+
+    def test_refreshed(self):
+        snapshot = self.driver_map.get_snapshot()
+        self._register_conductor2()
+        with mock.patch.object(time, 'time', autospec=True,
+                               return_value=time.time() + 10):
+            new_snapshot = self.driver_map.get_snapshot()
+        self.assertIsNot(snapshot, new_snapshot)
+        self.assertEqual({'driver1': {'host1'}, 'driver2': {'host2'}},
+                         new_snapshot.drivers)
+
+    def test_refreshed_unchanged(self):
+        snapshot = self.driver_map.get_snapshot()
+        snapshot.interfaces = ['stale']
+        with mock.patch.object(time, 'time', autospec=True,
+                               return_value=time.time() + 10):
+            self.assertIs(snapshot, self.driver_map.get_snapshot())
+        self.assertIsNone(snapshot.interfaces)
+
+    def test_refresh_disabled(self):
+        self.config(driver_map_refresh_interval=0)
+        snapshot = self.driver_map.get_snapshot()
+        self._register_conductor2()
+        self.assertIsNot(snapshot, self.driver_map.get_snapshot())
+
+    def test_list_hardware_type_interfaces(self):
+        with mock.patch.object(self.dbapi, 'list_hardware_type_interfaces',
+                               wraps=self.dbapi.list_hardware_type_interfaces
+                               ) as mock_list:
+            for i in range(2):
+                ifaces = self.driver_map.list_hardware_type_interfaces(
+                    ['hw-type1'])
+                self.assertEqual({('hw-type1', 'iscsi'),
+                                  ('hw-type1', 'direct')},
+                                 {(i['hardware_type'], i['interface_name'])
+                                  for i in ifaces})
+            ifaces = self.driver_map.list_hardware_type_interfaces(
+                ['hw-type2'])
+            self.assertEqual(['iscsi'],
+                             [i['interface_name'] for i in ifaces])
+            mock_list.assert_called_once_with(mock.ANY)
+            self.assertEqual({'hw-type1', 'hw-type2'},
+                             set(mock_list.call_args[0][0]))
+
+    def test_reset(self):
+        snapshot = self.driver_map.get_snapshot()
+        driver_map.DriverMap.reset()
+        self.assertIsNone(driver_map.DriverMap._snapshot)
+        self.assertEqual(0, driver_map.DriverMap._loaded_at)
+        self.assertIsNot(snapshot, self.driver_map.get_snapshot())
+
+    def test_hash_ring_rebuilt_on_change(self):
+        ring_manager = hash_ring.HashRingManager()
+        self.assertEqual(['host1'], list(ring_manager['driver1'].nodes))
+        rings = ring_manager.ring
+        self.assertIs(rings, ring_manager.ring)
+
+        self._register_conductor2()
+        driver_map.DriverMap.reset()
+        self.assertIsNot(rings, ring_manager.ring)
+        self.assertEqual(['host2'], list(ring_manager['driver2'].nodes))
@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Tests for the cache of the metadata of the Glance images.
+"""
+
+import time
+
+import mock
+
+from ironic.common import context
+from ironic.common.glance_service import metadata_cache
+from ironic.tests import base
+
+
+@mock.patch.object(time, 'time', autospec=True, return_value=1000)
+class TestMetadataCache(base.TestCase):
+
+    image_id = 'image-uuid'
+
+    def setUp(self):
+        super(TestMetadataCache, self).setUp()
+        self.config(image_metadata_cache_ttl=10, group='glance')
+        self.cache = metadata_cache.MetadataCache(max_size=3)
+        self.context = context.RequestContext(tenant='project')
+        self.image_meta = {'id': self.image_id, 'updated_at': 'yesterday',
+                           'properties': {'kernel_id': 'kernel-uuid'}}
+
+    def test_get_set(self, mock_time):
+        self.assertIsNone(self.cache.get(self.context, self.image_id))
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        self.assertEqual(self.image_meta,
+                         self.cache.get(self.context, self.image_id))
+        self.assertIsNone(self.cache.get(self.context, 'other-uuid'))
+
+    def test_per_project(self, mock_time):
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        other = context.RequestContext(tenant='other')
+        self.assertIsNone(self.cache.get(other, self.image_id))
+
+    def test_per_admin(self, mock_time):
+        admin = context.RequestContext(tenant='project', is_admin=True)
+        self.cache.set(admin, self.image_id, self.image_meta)
+        self.assertIsNone(self.cache.get(self.context, self.image_id))
+        self.assertIsNotNone(self.cache.get(admin, self.image_id))
+
+    def test_copies(self, mock_time):
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        self.image_meta['properties']['kernel_id'] = 'modified'
+        cached = self.cache.get(self.context, self.image_id)
+        self.assertEqual('kernel-uuid', cached['properties']['kernel_id'])
+        cached['properties']['kernel_id'] = 'modified'
+        cached = self.cache.get(self.context, self.image_id)
+        self.assertEqual('kernel-uuid', cached['properties']['kernel_id'])
+
+    def test_expired(self, mock_time):
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        mock_time.return_value = 1009
+        self.assertIsNotNone(self.cache.get(self.context, self.image_id))
+        mock_time.return_value = 1010
+        self.assertIsNone(self.cache.get(self.context, self.image_id))
+
+    def test_disabled(self, mock_time):
+        self.config(image_metadata_cache_ttl=0, group='glance')
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        self.assertIsNone(self.cache.get(self.context, self.image_id))
+
+    def test_max_size(self, mock_time):
+        for i in range(4):
+            self.cache.set(self.context, 'uuid-%d' % i, self.image_meta)
+        self.assertIsNone(self.cache.get(self.context, 'uuid-0'))
+        for i in range(1, 4):
+            self.assertIsNotNone(self.cache.get(self.context, 'uuid-%d' % i))
+
+    def test_updated(self, mock_time):
+        other = context.RequestContext(tenant='other')
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        self.cache.set(other, self.image_id, self.image_meta)
+        self.cache.set(self.context, 'other-uuid', self.image_meta)
+
+        updated = dict(self.image_meta, updated_at='today')
+        self.cache.set(self.context, self.image_id, updated)
+        self.assertEqual(updated, self.cache.get(self.context, self.image_id))
+        self.assertIsNone(self.cache.get(other, self.image_id))
+        self.assertIsNotNone(self.cache.get(self.context, 'other-uuid'))
+
+    def test_invalidate(self, mock_time):
+        other = context.RequestContext(tenant='other')
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        self.cache.set(other, self.image_id, self.image_meta)
+        self.cache.set(self.context, 'other-uuid', self.image_meta)
+        self.cache.invalidate(self.image_id)
+        self.assertIsNone(self.cache.get(self.context, self.image_id))
+        self.assertIsNone(self.cache.get(other, self.image_id))
+        self.assertIsNotNone(self.cache.get(self.context, 'other-uuid'))
+
+    def test_clear(self, mock_time):
+        self.cache.set(self.context, self.image_id, self.image_meta)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(self.context, self.image_id))
@@ -14,6 +14,7 @@
 #    under the License.
 
 
+import collections
 import datetime
 import time
 
@@ -29,6 +30,7 @@ import testtools
 from ironic.common import context
 from ironic.common import exception
 from ironic.common.glance_service import base_image_service
+from ironic.common.glance_service import metadata_cache
 from ironic.common.glance_service import service_utils
 from ironic.common.glance_service.v2 import image_service as glance_v2
 from ironic.common import image_service as service
@@ -415,6 +417,62 @@ class TestGlanceImageService(base.TestCase):
                           self.service.show,
                           image_id)
 
+    def test_show_cached(self):
+        self.config(image_metadata_cache_ttl=60, group='glance')
+        self.addCleanup(metadata_cache.CACHE.clear)
+        fixture = self._make_fixture(name='image1', is_public=True)
+        image_id = self.service.create(fixture)['id']
+
+        with mock.patch.object(self.service, 'call', autospec=True,
+                               side_effect=self.service.call) as mock_call:
+            image_meta = self.service.show(image_id)
+            image_meta['name'] = 'modified by the caller'
+            self.assertEqual('image1', self.service.show(image_id)['name'])
+            mock_call.assert_called_once_with('get', image_id)
+
+            # the other projects do not use the cached metadata
+            self.context.project_id = 'other'
+            self.service.show(image_id)
+            self.assertEqual(2, mock_call.call_count)
+
+    def test_show_cached_admin(self):
+        self.config(image_metadata_cache_ttl=60, group='glance')
+        self.addCleanup(metadata_cache.CACHE.clear)
+        fixture = self._make_fixture(name='image1', is_public=False,
+                                     properties={'owner_id': 'other'})
+        image_id = self.service.create(fixture)['id']
+        self.context.auth_token = False
+        self.context.is_admin = True
+        self.assertEqual('image1', self.service.show(image_id)['name'])
+
+        # the non-admin users of the project do not see the image
+        self.context.is_admin = False
+        self.assertRaises(exception.ImageNotFound,
+                          self.service.show, image_id)
+
+    def test_show_cache_disabled(self):
+        self.addCleanup(metadata_cache.CACHE.clear)
+        fixture = self._make_fixture(name='image1', is_public=True)
+        image_id = self.service.create(fixture)['id']
+
+        with mock.patch.object(self.service, 'call', autospec=True,
+                               side_effect=self.service.call) as mock_call:
+            self.service.show(image_id)
+            self.service.show(image_id)
+            self.assertEqual(2, mock_call.call_count)
+
+    def test_update_invalidates_cache(self):
+        self.config(image_metadata_cache_ttl=60, group='glance')
+        self.addCleanup(metadata_cache.CACHE.clear)
+        fixture = self._make_fixture(name='test image')
+        image_id = self.service.create(fixture)['id']
+        self.assertEqual('test image', self.service.show(image_id)['name'])
+
+        fixture['name'] = 'new image name'
+        self.service.update(image_id, fixture)
+        self.assertEqual('new image name',
+                         self.service.show(image_id)['name'])
+
     def test_detail_passes_through_to_client(self):
         fixture = self._make_fixture(name='image10', is_public=True)
         image_id = self.service.create(fixture)['id']
@@ -934,7 +992,7 @@ class TestSwiftTempUrlCache(base.TestCase):
             seconds=CONF.glance.swift_temp_url_duration,
             key=CONF.glance.swift_temp_url_key,
             method='GET')
-        self.assertEqual((temp_url, exp_time),
+        self.assertEqual((temp_url, exp_time, None),
                          self.glance_service._cache[fake_image['id']])
 
     @mock.patch('swiftclient.utils.generate_temp_url', autospec=True)
@@ -1004,8 +1062,61 @@ class TestSwiftTempUrlCache(base.TestCase):
             key=CONF.glance.swift_temp_url_key,
             method='GET')
         self.assertEqual(
-            (fresh_temp_url, new_exp_time),
+            (fresh_temp_url, new_exp_time, None),
+            self.glance_service._cache[fake_image['id']])
+
+    @mock.patch('swiftclient.utils.generate_temp_url', autospec=True)
+    def test_do_not_return_tempurls_of_updated_images(self, tempurl_mock):
+        fake_image = {
+            'id': uuidutils.generate_uuid(),
+            'updated_at': datetime.datetime(2017, 5, 1, 10, 0, 0)
+        }
+        path = (
+            '/v1/AUTH_a422b2-91f3-2f46-74b7-d7c9e8958f5d30'
+            '/glance'
+            '/%s' % fake_image['id']
+        )
+        query = '?temp_url_sig=hmacsig&temp_url_expires=%s'
+        exp_time = int(time.time()) + 1200
+        old_temp_url = CONF.glance.swift_endpoint_url + path + query % 42
+        self.glance_service._cache[fake_image['id']] = (
+            glance_v2.TempUrlCacheElement(
+                url=old_temp_url, url_expires_at=exp_time,
+                image_updated_at=datetime.datetime(2017, 4, 1, 10, 0, 0))
+        )
+        tempurl_mock.return_value = path + query % exp_time
+        self.glance_service._validate_temp_url_config = mock.Mock()
+
+        fresh_temp_url = self.glance_service.swift_temp_url(
+            image_info=fake_image)
+
+        self.assertEqual(CONF.glance.swift_endpoint_url +
+                         tempurl_mock.return_value,
+                         fresh_temp_url)
+        self.assertEqual(
+            (fresh_temp_url, exp_time, fake_image['updated_at']),
             self.glance_service._cache[fake_image['id']])
+        # the URL is reused as long as the image is not updated
+        self.assertEqual(fresh_temp_url, self.glance_service.swift_temp_url(
+            image_info=fake_image))
+        tempurl_mock.assert_called_once_with(
+            path=path,
+            seconds=CONF.glance.swift_temp_url_duration,
+            key=CONF.glance.swift_temp_url_key,
+            method='GET')
+
+    @mock.patch.object(glance_v2, '_TEMP_URL_CACHE_MAX_SIZE', 2)
+    @mock.patch.object(glance_v2.GlanceImageService, '_cache',
+                       collections.OrderedDict())
+    def test_cache_max_size(self):
+        fake_images = [{'id': uuidutils.generate_uuid()} for i in range(3)]
+        self.glance_service._validate_temp_url_config = mock.Mock()
+
+        for fake_image in fake_images:
+            self.glance_service.swift_temp_url(image_info=fake_image)
+
+        self.assertEqual([fake_image['id'] for fake_image in fake_images[1:]],
+                         list(self.glance_service._cache))
 
     def test_remove_expired_items_from_cache(self):
         expired_items = {
@@ -12,10 +12,12 @@
 
 import datetime
 import os
-import shutil
+import time
 
+import fixtures
 import mock
 from oslo_config import cfg
+from oslo_utils import units
 import requests
 import sendfile
 import six
@@ -111,19 +113,65 @@ class HttpImageServiceTestCase(base.TestCase):
                           self.service.show, self.href)
         head_mock.assert_called_with(self.href)
 
-    @mock.patch.object(shutil, 'copyfileobj', autospec=True)
+    def _response(self, data, status=http_client.OK, headers=None,
+                  fail_at=None):
+        response = mock.Mock(spec=requests.Response)
+        response.status_code = status
+        response.headers = headers if headers is not None else {}
+
+        def iter_content(chunk_size):
+            for offset in range(0, len(data), chunk_size):
+                if fail_at is not None and offset >= fail_at:
+                    raise requests.ConnectionError('boom')
+                yield data[offset:offset + chunk_size]
+        response.iter_content.side_effect = iter_content
+        return response
+
+    def _range_server(self, data, fail_at=None):
+        """Fake requests.get of a server supporting range requests.
+
+        :param fail_at: dict of the offsets at which the connection of the
+                        request starting at a given offset fails.
+        """
+        fail_at = fail_at or {}
+
+        def get(url, stream, headers):
+            self.assertEqual(self.href, url)
+            self.assertTrue(stream)
+            self.assertEqual('identity', headers['Accept-Encoding'])
+            if 'Range' not in headers:
+                return self._response(
+                    data, headers={'Content-Length': str(len(data)),
+                                   'Accept-Ranges': 'bytes'},
+                    fail_at=fail_at.get(0))
+            start, end = headers['Range'][len('bytes='):].split('-')
+            start, end = int(start), int(end) + 1
+            failure = fail_at.get(start)
+            return self._response(
+                data[start:end], status=http_client.PARTIAL_CONTENT,
+                fail_at=failure - start if failure is not None else None)
+        return get
+
+    def _download(self, data):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'image')
+        with open(path, 'wb') as image_file:
+            self.service.download(self.href, image_file)
+        with open(path, 'rb') as image_file:
+            self.assertEqual(data, image_file.read())
+
     @mock.patch.object(requests, 'get', autospec=True)
-    def test_download_success(self, req_get_mock, shutil_mock):
-        response_mock = req_get_mock.return_value
-        response_mock.status_code = http_client.OK
-        response_mock.raw = mock.MagicMock(spec=file)
+    def test_download_success(self, req_get_mock):
+        response_mock = self._response(b'0123456789')
+        req_get_mock.return_value = response_mock
         file_mock = mock.Mock(spec=file)
         self.service.download(self.href, file_mock)
-        shutil_mock.assert_called_once_with(
-            response_mock.raw.__enter__(), file_mock,
-            image_service.IMAGE_CHUNK_SIZE
-        )
-        req_get_mock.assert_called_once_with(self.href, stream=True)
+        response_mock.iter_content.assert_called_once_with(
+            image_service.IMAGE_CHUNK_SIZE)
+        file_mock.write.assert_called_once_with(b'0123456789')
+        response_mock.close.assert_called_once_with()
+        req_get_mock.assert_called_once_with(
+            self.href, stream=True, headers={'Accept-Encoding': 'identity'})
 
     @mock.patch.object(requests, 'get', autospec=True)
     def test_download_fail_connerror(self, req_get_mock):
@@ -132,17 +180,174 @@ class HttpImageServiceTestCase(base.TestCase):
         self.assertRaises(exception.ImageDownloadFailed,
                           self.service.download, self.href, file_mock)
 
-    @mock.patch.object(shutil, 'copyfileobj', autospec=True)
     @mock.patch.object(requests, 'get', autospec=True)
-    def test_download_fail_ioerror(self, req_get_mock, shutil_mock):
-        response_mock = req_get_mock.return_value
-        response_mock.status_code = http_client.OK
-        response_mock.raw = mock.MagicMock(spec=file)
+    def test_download_fail_ioerror(self, req_get_mock):
+        req_get_mock.return_value = self._response(b'0123456789')
+        file_mock = mock.Mock(spec=file)
+        file_mock.write.side_effect = IOError
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self.service.download, self.href, file_mock)
+        req_get_mock.assert_called_once_with(
+            self.href, stream=True, headers={'Accept-Encoding': 'identity'})
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_fail_http_code(self, req_get_mock):
+        req_get_mock.return_value = self._response(
+            b'', status=http_client.NOT_FOUND)
+        file_mock = mock.Mock(spec=file)
+        self.assertRaises(exception.ImageRefValidationFailed,
+                          self.service.download, self.href, file_mock)
+        req_get_mock.return_value.close.assert_called_once_with()
+
+    @mock.patch.object(image_service, 'IMAGE_CHUNK_SIZE', 4)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_no_resume_without_ranges(self, req_get_mock):
+        req_get_mock.return_value = self._response(
+            b'0123456789', headers={'Content-Length': '10'}, fail_at=4)
         file_mock = mock.Mock(spec=file)
-        shutil_mock.side_effect = IOError
         self.assertRaises(exception.ImageDownloadFailed,
                           self.service.download, self.href, file_mock)
-        req_get_mock.assert_called_once_with(self.href, stream=True)
+        self.assertEqual(1, req_get_mock.call_count)
+
+    @mock.patch.object(image_service, 'IMAGE_CHUNK_SIZE', 4)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_resume(self, req_get_mock):
+        data = b'0123456789'
+        req_get_mock.side_effect = self._range_server(
+            data, fail_at={0: 4, 4: 8})
+        self._download(data)
+        self.assertEqual(3, req_get_mock.call_count)
+        self.assertEqual(
+            ['bytes=4-9', 'bytes=8-9'],
+            [call[1]['headers']['Range']
+             for call in req_get_mock.call_args_list[1:]])
+
+    @mock.patch.object(image_service, 'IMAGE_CHUNK_SIZE', 4)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_resume_closed_connection(self, req_get_mock):
+        data = b'0123456789'
+        server = self._range_server(data)
+
+        def get(url, stream, headers):
+            response = server(url, stream, headers)
+            if 'Range' not in headers:
+                # Data missing, with no error
+                response = self._response(data[:4],
+                                          headers=response.headers)
+            return response
+        req_get_mock.side_effect = get
+
+        self._download(data)
+        self.assertEqual(2, req_get_mock.call_count)
+
+    @mock.patch.object(image_service, 'IMAGE_CHUNK_SIZE', 4)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_resume_too_many_failures(self, req_get_mock):
+        self.config(image_download_retries=1)
+        data = b'0123456789'
+        req_get_mock.side_effect = self._range_server(
+            data, fail_at={0: 4, 4: 8})
+        file_mock = mock.Mock(spec=file)
+        self.assertRaisesRegex(exception.ImageDownloadFailed, 'boom',
+                               self.service.download, self.href, file_mock)
+        self.assertEqual(2, req_get_mock.call_count)
+
+    @mock.patch.object(image_service, 'IMAGE_CHUNK_SIZE', 5)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_segments(self, req_get_mock):
+        self.config(image_download_connections=3,
+                    image_download_segment_size=1)
+        data = os.urandom(3 * units.Mi + 7)
+        req_get_mock.side_effect = self._range_server(data)
+
+        self._download(data)
+
+        ranges = sorted(call[1]['headers'].get('Range')
+                        for call in req_get_mock.call_args_list[1:])
+        self.assertEqual(['bytes=1048578-2097155', 'bytes=2097156-3145734'],
+                         ranges)
+
+    @mock.patch.object(image_service, 'IMAGE_CHUNK_SIZE', units.Mi // 2)
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_segments_resume(self, req_get_mock):
+        self.config(image_download_connections=2,
+                    image_download_segment_size=1)
+        data = os.urandom(2 * units.Mi)
+        req_get_mock.side_effect = self._range_server(
+            data, fail_at={0: units.Mi // 2, units.Mi: 3 * units.Mi // 2})
+
+        self._download(data)
+
+        self.assertEqual(4, req_get_mock.call_count)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_segments_fail(self, req_get_mock):
+        self.config(image_download_connections=2,
+                    image_download_segment_size=1,
+                    image_download_retries=0)
+        data = os.urandom(2 * units.Mi)
+        req_get_mock.side_effect = self._range_server(
+            data, fail_at={units.Mi: units.Mi})
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'image')
+        with open(path, 'wb') as image_file:
+            self.assertRaisesRegex(exception.ImageDownloadFailed, 'boom',
+                                   self.service.download, self.href,
+                                   image_file)
+
+    @mock.patch.object(requests, 'get', autospec=True)
+    def test_download_small_image_one_connection(self, req_get_mock):
+        self.config(image_download_connections=4,
+                    image_download_segment_size=1)
+        data = os.urandom(units.Mi + 10)
+        req_get_mock.side_effect = self._range_server(data)
+        self._download(data)
+        self.assertEqual(1, req_get_mock.call_count)
+
+
+class BandwidthBudgetTestCase(base.TestCase):
+
+    def setUp(self):
+        super(BandwidthBudgetTestCase, self).setUp()
+        self.now = 1000.0
+        time_patcher = mock.patch.object(time, 'time', lambda: self.now)
+        time_patcher.start()
+        self.addCleanup(time_patcher.stop)
+        self.budget = image_service._BandwidthBudget()
+
+    @mock.patch.object(time, 'sleep', autospec=True)
+    def test_unlimited(self, mock_sleep):
+        self.budget.consume(100 * units.Mi)
+        self.assertFalse(mock_sleep.called)
+
+    @mock.patch.object(time, 'sleep', autospec=True)
+    def test_consume(self, mock_sleep):
+        self.config(image_download_bandwidth=10)
+        self.now += 60
+        # One second of bandwidth is available at most
+        self.budget.consume(10 * units.Mi)
+        self.assertFalse(mock_sleep.called)
+        self.budget.consume(5 * units.Mi)
+        mock_sleep.assert_called_once_with(0.5)
+        mock_sleep.reset_mock()
+
+        self.now += 1
+        self.budget.consume(10 * units.Mi)
+        mock_sleep.assert_called_once_with(0.5)
+
+
+class PwriteTestCase(base.TestCase):
+
+    def test_pwrite(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'f')
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+        try:
+            image_service._pwrite(fd, b'world', 6)
+            image_service._pwrite(fd, b'hello ', 0)
+        finally:
+            os.close(fd)
+        with open(path, 'rb') as f:
+            self.assertEqual(b'hello world', f.read())
 
 
 class FileImageServiceTestCase(base.TestCase):
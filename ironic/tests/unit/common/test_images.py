@@ -15,16 +15,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import os
 import shutil
 
+import fixtures
 from ironic_lib import disk_utils
 from ironic_lib import utils as ironic_utils
 import mock
 from oslo_concurrency import processutils
 from oslo_config import cfg
 import six
-import six.moves.builtins as __builtin__
 
 from ironic.common import exception
 from ironic.common.glance_service import service_utils as glance_utils
@@ -45,37 +46,96 @@ class IronicImagesTestCase(base.TestCase):
     class FakeImgInfo(object):
         pass
 
+    def _fake_download(self, *chunks):
+        def download(image_href, image_file):
+            for chunk in chunks:
+                image_file.write(chunk)
+        return download
+
     @mock.patch.object(image_service, 'get_image_service', autospec=True)
-    @mock.patch.object(__builtin__, 'open', autospec=True)
-    def test_fetch_image_service(self, open_mock, image_service_mock):
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'file'
-        open_mock.return_value = mock_file_handle
+    def test_fetch_image_service(self, image_service_mock):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'path')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'QFI\xfb', b'data'))
 
-        images.fetch('context', 'image_href', 'path')
+        fmt, checksum = images.fetch('context', 'image_href', path)
 
-        open_mock.assert_called_once_with('path', 'wb')
+        self.assertEqual('qcow2', fmt)
+        self.assertIsNone(checksum)
         image_service_mock.assert_called_once_with('image_href',
                                                    context='context')
         image_service_mock.return_value.download.assert_called_once_with(
-            'image_href', 'file')
+            'image_href', mock.ANY)
+        with open(path, 'rb') as image_file:
+            self.assertEqual(b'QFI\xfbdata', image_file.read())
 
     @mock.patch.object(image_service, 'get_image_service', autospec=True)
     @mock.patch.object(images, 'image_to_raw', autospec=True)
-    @mock.patch.object(__builtin__, 'open', autospec=True)
-    def test_fetch_image_service_force_raw(self, open_mock, image_to_raw_mock,
+    def test_fetch_image_service_force_raw(self, image_to_raw_mock,
                                            image_service_mock):
-        mock_file_handle = mock.MagicMock(spec=file)
-        mock_file_handle.__enter__.return_value = 'file'
-        open_mock.return_value = mock_file_handle
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'path')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'QFI\xfb'))
 
-        images.fetch('context', 'image_href', 'path', force_raw=True)
+        images.fetch('context', 'image_href', path, force_raw=True)
 
-        open_mock.assert_called_once_with('path', 'wb')
-        image_service_mock.return_value.download.assert_called_once_with(
-            'image_href', 'file')
         image_to_raw_mock.assert_called_once_with(
-            'image_href', 'path', 'path.part')
+            'image_href', path, path + '.part')
+        self.assertTrue(os.path.exists(path + '.part'))
+
+    @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    @mock.patch.object(images, 'image_to_raw', autospec=True)
+    def test_fetch_image_service_force_raw_already_raw(
+            self, image_to_raw_mock, image_service_mock, qemu_img_info_mock):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'path')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'raw data'))
+
+        fmt, checksum = images.fetch('context', 'image_href', path,
+                                     force_raw=True)
+
+        self.assertEqual('raw', fmt)
+        self.assertFalse(image_to_raw_mock.called)
+        self.assertFalse(qemu_img_info_mock.called)
+        self.assertFalse(os.path.exists(path + '.part'))
+        with open(path, 'rb') as image_file:
+            self.assertEqual(b'raw data', image_file.read())
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_image_service_checksum(self, image_service_mock):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'path')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'data'))
+
+        images.fetch('context', 'image_href', path,
+                     checksum='8d777f385d3dfec8815d20f7496026dc')
+
+        self.assertTrue(os.path.exists(path))
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_image_service_hash_algo(self, image_service_mock):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'path')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'da', b'ta'))
+
+        fmt, checksum = images.fetch(
+            'context', 'image_href', path,
+            checksum='8d777f385d3dfec8815d20f7496026dc', hash_algo='sha256')
+
+        self.assertEqual('raw', fmt)
+        self.assertEqual(hashlib.sha256(b'data').hexdigest(), checksum)
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    def test_fetch_image_service_bad_checksum(self, image_service_mock):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'path')
+        image_service_mock.return_value.download.side_effect = (
+            self._fake_download(b'data'))
+
+        self.assertRaisesRegex(exception.ImageDownloadFailed,
+                               'instead of 1234', images.fetch, 'context',
+                               'image_href', path, checksum='1234')
+        self.assertFalse(os.path.exists(path))
 
     @mock.patch.object(disk_utils, 'qemu_img_info', autospec=True)
     def test_image_to_raw_no_file_format(self, qemu_img_info_mock):
@@ -252,6 +312,111 @@ class IronicImagesTestCase(base.TestCase):
         mock_igi.assert_called_once_with(instance_info['image_source'])
 
 
+class ImageWriterTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ImageWriterTestCase, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'image')
+
+    def _write(self, *chunks):
+        with open(self.path, 'wb') as image_file:
+            writer = images._ImageWriter(image_file, 'md5')
+            for chunk in chunks:
+                writer.write(chunk)
+            writer.finish()
+        return writer
+
+    def _read(self):
+        with open(self.path, 'rb') as image_file:
+            return image_file.read()
+
+    def test_write(self):
+        writer = self._write(b'abc', b'def')
+        self.assertEqual(b'abcdef', self._read())
+        self.assertEqual(6, writer.size)
+        self.assertEqual(hashlib.md5(b'abcdef').hexdigest(),
+                         writer.hexdigest())
+        self.assertEqual('raw', writer.format)
+
+    def test_write_empty(self):
+        writer = self._write()
+        self.assertEqual(b'', self._read())
+        self.assertEqual(0, writer.size)
+        self.assertEqual(hashlib.md5(b'').hexdigest(), writer.hexdigest())
+
+    def test_write_sparse(self):
+        block = images._SPARSE_BLOCK_SIZE
+        data = (b'\x01' * 10 + b'\x00' * (4 * block - 10) +
+                b'\x02' * block + b'\x00' * (3 * block + 5))
+        writer = self._write(data[:block + 3], data[block + 3:])
+
+        self.assertEqual(data, self._read())
+        self.assertEqual(len(data), writer.size)
+        self.assertEqual(len(data), os.path.getsize(self.path))
+        self.assertEqual(hashlib.md5(data).hexdigest(), writer.hexdigest())
+
+    def test_write_sparse_holes(self):
+        block = images._SPARSE_BLOCK_SIZE
+        with open(self.path, 'wb') as image_file:
+            writer = images._ImageWriter(image_file, 'md5')
+            with mock.patch.object(image_file, 'seek',
+                                   wraps=image_file.seek) as mock_seek:
+                writer.write(b'\x00' * (2 * block - 3))
+                writer.write(b'\x00' * 3 + b'\x01' * (2 * block))
+                writer.write(b'\x00' * block)
+            writer.finish()
+
+        mock_seek.assert_has_calls([mock.call(2 * block - 3, os.SEEK_CUR),
+                                    mock.call(3, os.SEEK_CUR),
+                                    mock.call(block, os.SEEK_CUR)])
+        self.assertEqual(b'\x00' * 2 * block + b'\x01' * 2 * block +
+                         b'\x00' * block, self._read())
+
+    def test_write_several_checksums(self):
+        with open(self.path, 'wb') as image_file:
+            writer = images._ImageWriter(image_file, 'sha256', 'md5')
+            writer.write(b'abc')
+            writer.finish()
+        self.assertEqual(hashlib.sha256(b'abc').hexdigest(),
+                         writer.hexdigest())
+        self.assertEqual(hashlib.md5(b'abc').hexdigest(),
+                         writer.hexdigest('md5'))
+
+    def test_write_no_checksum(self):
+        with open(self.path, 'wb') as image_file:
+            writer = images._ImageWriter(image_file)
+            writer.write(b'abc')
+            writer.finish()
+        self.assertEqual(b'abc', self._read())
+        self.assertIsNone(writer.hexdigest())
+
+    def test_header(self):
+        writer = self._write(b'QF', b'I\xfb' + b'\x00' * 1000)
+        self.assertEqual('qcow2', writer.format)
+
+    def test_bypassed(self):
+        with open(self.path, 'wb') as image_file:
+            writer = images._ImageWriter(image_file, 'md5')
+            os.write(writer.fileno(), b'KDMV data')
+            writer.finish()
+
+        self.assertEqual(b'KDMV data', self._read())
+        self.assertEqual(9, writer.size)
+        self.assertEqual('vmdk', writer.format)
+        self.assertEqual(hashlib.md5(b'KDMV data').hexdigest(),
+                         writer.hexdigest())
+
+    def test_detect_format(self):
+        self.assertEqual('raw', images.detect_format(b''))
+        self.assertEqual('raw', images.detect_format(b'\x00' * 512))
+        self.assertEqual('qcow2', images.detect_format(b'QFI\xfb\x00\x00'))
+        self.assertEqual('vdi', images.detect_format(
+            b'<<< Oracle VM VirtualBox Disk Image >>>\n'.ljust(64, b'\x00')
+            + b'\x7f\x10\xda\xbe'))
+        self.assertEqual('vhdx', images.detect_format(b'vhdxfile'))
+
+
 class FsImageTestCase(base.TestCase):
 
     @mock.patch.object(shutil, 'copyfile', autospec=True)
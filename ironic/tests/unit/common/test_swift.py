@@ -61,6 +61,21 @@ class SwiftTestCase(base.TestCase):
             'container', 'object', 'file-object', headers=None)
         self.assertEqual('object-uuid', object_uuid)
 
+    def test_create_object_from_data(self, connection_mock, keystone_mock):
+        swiftapi = swift.SwiftAPI()
+        connection_obj_mock = connection_mock.return_value
+        connection_obj_mock.put_object.return_value = 'object-uuid'
+
+        object_uuid = swiftapi.create_object_from_data(
+            'container', 'object', 'some-data',
+            object_headers={'X-Delete-After': '10'})
+
+        connection_obj_mock.put_container.assert_called_once_with('container')
+        connection_obj_mock.put_object.assert_called_once_with(
+            'container', 'object', 'some-data',
+            headers={'X-Delete-After': '10'})
+        self.assertEqual('object-uuid', object_uuid)
+
     @mock.patch.object(__builtin__, 'open', autospec=True)
     def test_create_object_create_container_fails(self, open_mock,
                                                   connection_mock,
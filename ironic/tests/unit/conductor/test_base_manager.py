@@ -76,6 +76,16 @@ class StartStopTestCase(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
         res = objects.Conductor.get_by_hostname(self.context, self.hostname)
         self.assertEqual(self.hostname, res['hostname'])
 
+    @mock.patch.object(base_manager.LOG, 'info', autospec=True)
+    def test_start_logs_startup_phases(self, mock_log):
+        self._start_service()
+        timings = [call[0][1] for call in mock_log.call_args_list
+                   if 'startup phases' in call[0][0]]
+        self.assertEqual(1, len(timings))
+        self.assertEqual(self.hostname, timings[0]['hostname'])
+        for phase in ('drivers', 'periodic_tasks', 'hardware_interfaces'):
+            self.assertGreaterEqual(timings[0][phase], 0)
+
     @mock.patch.object(manager.ConductorManager, 'init_host')
     def test_stop_uninitialized_conductor(self, mock_init):
         self._start_service()
@@ -316,7 +326,7 @@ class ManagerSpawnWorkerTestCase(tests_base.TestCase):
 
 @mock.patch.object(objects.Conductor, 'unregister_all_hardware_interfaces',
                    autospec=True)
-@mock.patch.object(objects.Conductor, 'register_hardware_interfaces',
+@mock.patch.object(objects.Conductor, 'bulk_register_hardware_interfaces',
                    autospec=True)
 @mock.patch.object(driver_factory, 'default_interface', autospec=True)
 @mock.patch.object(driver_factory, 'enabled_supported_interfaces',
@@ -349,22 +359,28 @@ class RegisterInterfacesTestCase(mgr_utils.ServiceSetUpMixin,
             )),
         ]
         default_mock.side_effect = ('fake', 'agent', 'fake', 'agent')
-        expected_calls = [
-            mock.call(mock.ANY, 'fake-hardware', 'management',
-                      ['fake', 'noop'], 'fake'),
-            mock.call(mock.ANY, 'fake-hardware', 'deploy', ['agent', 'iscsi'],
-                      'agent'),
-            mock.call(mock.ANY, 'manual-management', 'management', ['fake'],
-                      'fake'),
-            mock.call(mock.ANY, 'manual-management', 'deploy',
-                      ['agent', 'fake'], 'agent'),
+
+        def _iface(hardware_type, interface_type, name, default=False):
+            return {'hardware_type': hardware_type,
+                    'interface_type': interface_type,
+                    'interface_name': name,
+                    'default': default}
+
+        expected_interfaces = [
+            _iface('fake-hardware', 'management', 'fake', default=True),
+            _iface('fake-hardware', 'management', 'noop'),
+            _iface('fake-hardware', 'deploy', 'agent', default=True),
+            _iface('fake-hardware', 'deploy', 'iscsi'),
+            _iface('manual-management', 'management', 'fake', default=True),
+            _iface('manual-management', 'deploy', 'agent', default=True),
+            _iface('manual-management', 'deploy', 'fake'),
         ]
 
         self.service._register_and_validate_hardware_interfaces(hardware_types)
 
         unreg_mock.assert_called_once_with(mock.ANY)
-        # we're iterating over dicts, don't worry about order
-        reg_mock.assert_has_calls(expected_calls)
+        # all the interfaces are registered at once
+        reg_mock.assert_called_once_with(mock.ANY, expected_interfaces)
 
     def test__register_and_validate_no_valid_default(self,
                                                      esi_mock,
@@ -397,6 +413,12 @@ class RegisterInterfacesTestCase(mgr_utils.ServiceSetUpMixin,
 
 class StartConsolesTestCase(mgr_utils.ServiceSetUpMixin,
                             tests_db_base.DbTestCase):
+    def _start_service_without_consoles(self):
+        # do not let the service start the consoles in the background
+        with mock.patch.object(base_manager.BaseConductorManager,
+                               '_start_consoles', autospec=True):
+            self._start_service()
+
     @mock.patch.object(notification_utils, 'emit_console_notification')
     def test__start_consoles(self, mock_notify):
         obj_utils.create_test_node(self.context,
@@ -424,6 +446,58 @@ class StartConsolesTestCase(mgr_utils.ServiceSetUpMixin,
                  mock.call(mock.ANY, 'console_restore',
                            fields.NotificationStatus.END)])
 
+    @mock.patch.object(base_manager.METRICS, 'send_counter', autospec=True)
+    @mock.patch.object(notification_utils, 'emit_console_notification')
+    def test__start_consoles_nodes_in_use_first(self, mock_notify,
+                                                mock_counter):
+        self.config(restart_concurrency=1, group='console')
+        free = obj_utils.create_test_node(self.context,
+                                          driver='fake',
+                                          console_enabled=True)
+        in_use = obj_utils.create_test_node(
+            self.context,
+            uuid=uuidutils.generate_uuid(),
+            instance_uuid=uuidutils.generate_uuid(),
+            driver='fake',
+            console_enabled=True
+        )
+        self._start_service_without_consoles()
+        started = []
+        with mock.patch.object(self.driver.console,
+                               'start_console') as mock_start_console:
+            mock_start_console.side_effect = (
+                lambda task: started.append(task.node.uuid))
+            self.service._start_consoles(self.context)
+        self.assertEqual([in_use.uuid, free.uuid], started)
+        mock_counter.assert_called_with(
+            'BaseConductorManager._start_consoles.started', 1)
+        self.assertEqual(2, mock_counter.call_count)
+
+    @mock.patch.object(notification_utils, 'emit_console_notification')
+    def test__start_consoles_concurrently(self, mock_notify):
+        self.config(restart_concurrency=2, group='console')
+        for i in range(5):
+            obj_utils.create_test_node(self.context,
+                                       uuid=uuidutils.generate_uuid(),
+                                       driver='fake',
+                                       console_enabled=True)
+        self._start_service_without_consoles()
+        running = []
+        max_running = []
+
+        def _start_console(task):
+            running.append(task.node.uuid)
+            max_running.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(task.node.uuid)
+
+        with mock.patch.object(self.driver.console,
+                               'start_console') as mock_start_console:
+            mock_start_console.side_effect = _start_console
+            self.service._start_consoles(self.context)
+            self.assertEqual(5, mock_start_console.call_count)
+        self.assertEqual(2, max(max_running))
+
     @mock.patch.object(notification_utils, 'emit_console_notification')
     def test__start_consoles_no_console_enabled(self, mock_notify):
         obj_utils.create_test_node(self.context,
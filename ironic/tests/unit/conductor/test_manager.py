@@ -19,8 +19,13 @@
 """Test class for Ironic ManagerService."""
 
 import datetime
+import os
+import shutil
+import stat
+import tempfile
 
 import eventlet
+import fixtures
 import mock
 from oslo_config import cfg
 import oslo_messaging as messaging
@@ -44,6 +49,7 @@ from ironic.db import api as dbapi
 from ironic.drivers import base as drivers_base
 from ironic.drivers.modules import fake
 from ironic.drivers.modules.network import flat as n_flat
+from ironic.drivers import utils as driver_utils
 from ironic import objects
 from ironic.objects import base as obj_base
 from ironic.objects import fields as obj_fields
@@ -485,6 +491,35 @@ class UpdateNodeTestCase(mgr_utils.ServiceSetUpMixin,
         res = self.service.update_node(self.context, node)
         self.assertEqual({'test': 'two'}, res['extra'])
 
+    def test_update_node_delta(self):
+        node = obj_utils.create_test_node(self.context, driver='fake',
+                                          extra={'test': 'one'},
+                                          name='old')
+        stale = objects.Node.get_by_uuid(self.context, node.uuid)
+        node.name = 'new'
+        node.save()
+
+        # only the changed fields are sent, the others are not overwritten
+        stale.extra = {'test': 'two'}
+        res = self.service.update_node(
+            self.context, node_delta=stale.obj_to_delta_primitive())
+        self.assertEqual({'test': 'two'}, res['extra'])
+        self.assertEqual('new', res['name'])
+        node.refresh()
+        self.assertEqual({'test': 'two'}, node.extra)
+        self.assertEqual('new', node.name)
+
+    def test_update_node_delta_clears_maintenance_reason(self):
+        node = obj_utils.create_test_node(self.context, driver='fake',
+                                          maintenance=True,
+                                          maintenance_reason='reason')
+
+        node.maintenance = False
+        res = self.service.update_node(
+            self.context, node_delta=node.obj_to_delta_primitive())
+        self.assertFalse(res['maintenance'])
+        self.assertIsNone(res['maintenance_reason'])
+
     def test_update_node_clears_maintenance_reason(self):
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           maintenance=True,
@@ -1388,6 +1423,22 @@ class DoNodeDeployTearDownTestCase(mgr_utils.ServiceSetUpMixin,
         self.assertIsNotNone(node.last_error)
         mock_deploy.assert_called_once_with(mock.ANY)
 
+    @mock.patch.object(driver_utils, 'store_console_log', autospec=True)
+    @mock.patch('ironic.drivers.modules.fake.FakeDeploy.deploy')
+    def test__do_node_deploy_driver_raises_error_store_console_log(
+            self, mock_deploy, mock_store_console):
+        self._start_service()
+        mock_deploy.side_effect = exception.InstanceDeployFailure('test')
+        node = obj_utils.create_test_node(self.context, driver='fake',
+                                          provision_state=states.DEPLOYING,
+                                          target_provision_state=states.ACTIVE)
+        task = task_manager.TaskManager(self.context, node.uuid)
+
+        self.assertRaises(exception.InstanceDeployFailure,
+                          manager.do_node_deploy, task,
+                          self.service.conductor.id)
+        mock_store_console.assert_called_once_with(task)
+
     @mock.patch.object(manager, '_store_configdrive')
     @mock.patch('ironic.drivers.modules.fake.FakeDeploy.deploy')
     def test__do_node_deploy_ok(self, mock_deploy, mock_store):
@@ -1596,6 +1647,32 @@ class DoNodeDeployTearDownTestCase(mgr_utils.ServiceSetUpMixin,
         mock_tear_down.assert_called_once_with(mock.ANY)
         mock_clean.assert_called_once_with(mock.ANY)
 
+    @mock.patch('ironic.conductor.manager.ConductorManager._do_node_clean')
+    @mock.patch('ironic.drivers.modules.fake.FakeDeploy.tear_down')
+    def test__do_node_tear_down_configdrive_http_server(self, mock_tear_down,
+                                                        mock_clean):
+        http_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, http_root)
+        self.config(http_root=http_root, http_url='http://1.2.3.4',
+                    group='deploy')
+        node_uuid = uuidutils.generate_uuid()
+        file_name = 'configdrive-%s-abc' % node_uuid
+        directory = os.path.join(http_root, 'configdrive')
+        os.mkdir(directory)
+        open(os.path.join(directory, file_name), 'w').close()
+        node = obj_utils.create_test_node(
+            self.context, driver='fake', uuid=node_uuid,
+            provision_state=states.DELETING,
+            target_provision_state=states.AVAILABLE,
+            instance_info={'configdrive':
+                           'http://1.2.3.4/configdrive/' + file_name})
+
+        task = task_manager.TaskManager(self.context, node.uuid)
+        self._start_service()
+        self.service._do_node_tear_down(task)
+
+        self.assertEqual([], os.listdir(directory))
+
     @mock.patch('ironic.conductor.manager.ConductorManager._do_node_clean')
     @mock.patch('ironic.drivers.modules.fake.FakeDeploy.tear_down')
     def _test_do_node_tear_down_from_state(self, init_state, mock_tear_down,
@@ -2970,7 +3047,11 @@ class ConsoleTestCase(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
     def test_enable_console_already_enabled(self, mock_notify):
         node = obj_utils.create_test_node(self.context, driver='fake',
                                           console_enabled=True)
-        self._start_service()
+        # NOTE: the consoles are restarted in the background, do not let
+        # the conductor restart this one while the test runs.
+        with mock.patch.object(manager.ConductorManager, '_start_consoles',
+                               autospec=True):
+            self._start_service()
         with mock.patch.object(self.driver.console,
                                'start_console') as mock_sc:
             self.service.set_console_mode(self.context, node.uuid, True)
@@ -5063,13 +5144,107 @@ class StoreConfigDriveTestCase(tests_base.TestCase):
         manager._store_configdrive(self.node, b'foo')
 
         mock_swift.assert_called_once_with()
-        mock_swift.return_value.create_object.assert_called_once_with(
-            container_name, expected_obj_name, mock.ANY,
+        create_object = mock_swift.return_value.create_object_from_data
+        create_object.assert_called_once_with(
+            container_name, expected_obj_name, b'foo',
             object_headers=expected_obj_header)
         mock_swift.return_value.get_temp_url.assert_called_once_with(
             container_name, expected_obj_name, timeout)
         self.assertEqual(expected_instance_info, self.node.instance_info)
 
+    def _store_on_http_server(self, configdrive):
+        http_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, http_root)
+        CONF.set_override('http_root', http_root, group='deploy')
+        CONF.set_override('http_url', 'http://1.2.3.4/boot/', group='deploy')
+        CONF.set_override('configdrive_max_inline_size', 1,
+                          group='conductor')
+        manager._store_configdrive(self.node, configdrive)
+        return http_root
+
+    def test_store_configdrive_http_server(self, mock_swift):
+        http_root = self._store_on_http_server('x' * 2048)
+
+        url = self.node.instance_info['configdrive']
+        file_name = url.rsplit('/', 1)[1]
+        self.assertTrue(url.startswith(
+            'http://1.2.3.4/boot/configdrive/configdrive-%s-'
+            % self.node.uuid))
+        directory = os.path.join(http_root, 'configdrive')
+        path = os.path.join(directory, file_name)
+        with open(path) as fileobj:
+            self.assertEqual('x' * 2048, fileobj.read())
+        # NOTE: the config drives are not readable by other users
+        self.assertFalse(os.stat(directory).st_mode & stat.S_IRWXO)
+        self.assertFalse(os.stat(path).st_mode & stat.S_IRWXO)
+        self.assertFalse(mock_swift.called)
+
+        manager._delete_configdrive_from_http_server(self.node)
+        self.assertEqual([], os.listdir(directory))
+
+    def test_store_configdrive_http_server_small(self, mock_swift):
+        http_root = self._store_on_http_server('foo')
+        self.assertEqual({'configdrive': 'foo'}, self.node.instance_info)
+        self.assertEqual([], os.listdir(http_root))
+
+    def test_store_configdrive_http_server_no_url(self, mock_swift):
+        CONF.set_override('configdrive_max_inline_size', 1,
+                          group='conductor')
+        manager._store_configdrive(self.node, 'x' * 2048)
+        self.assertEqual({'configdrive': 'x' * 2048}, self.node.instance_info)
+
+    def test_store_configdrive_http_server_rebuild(self, mock_swift):
+        http_root = self._store_on_http_server('x' * 2048)
+        manager._store_configdrive(self.node, 'y' * 2048)
+        # NOTE: the previous config drive of the node is deleted
+        self.assertEqual(
+            1, len(os.listdir(os.path.join(http_root, 'configdrive'))))
+
+
+class CleanUpConfigDrivesTestCase(mgr_utils.CommonMixIn,
+                                  tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(CleanUpConfigDrivesTestCase, self).setUp()
+        self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.dbapi = dbapi.get_instance()
+        http_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, http_root)
+        self.config(http_root=http_root, group='deploy')
+        self.directory = os.path.join(http_root, 'configdrive')
+        os.mkdir(self.directory)
+
+    def _create_configdrive(self, **node_kwargs):
+        node = obj_utils.create_test_node(
+            self.context, driver='fake', uuid=uuidutils.generate_uuid(),
+            **node_kwargs)
+        file_name = 'configdrive-%s-%s' % (node.uuid,
+                                           uuidutils.generate_uuid())
+        open(os.path.join(self.directory, file_name), 'w').close()
+        return file_name
+
+    def test__clean_up_configdrives(self):
+        deploying = self._create_configdrive(
+            provision_state=states.DEPLOYWAIT)
+        self._create_configdrive(provision_state=states.ACTIVE)
+        self._create_configdrive(provision_state=states.DEPLOYFAIL)
+        self.service._clean_up_configdrives(self.context)
+        self.assertEqual([deploying], os.listdir(self.directory))
+
+    def test__clean_up_configdrives_expired(self):
+        file_name = self._create_configdrive(
+            provision_state=states.DEPLOYWAIT)
+        os.utime(os.path.join(self.directory, file_name), (0, 0))
+        self.service._clean_up_configdrives(self.context)
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test__clean_up_configdrives_node_not_found(self):
+        file_name = 'configdrive-%s-%s' % (uuidutils.generate_uuid(),
+                                           uuidutils.generate_uuid())
+        open(os.path.join(self.directory, file_name), 'w').close()
+        self.service._clean_up_configdrives(self.context)
+        self.assertEqual([], os.listdir(self.directory))
+
 
 @mgr_utils.mock_record_keepalive
 class NodeInspectHardware(mgr_utils.ServiceSetUpMixin,
@@ -6149,3 +6324,123 @@ class UpdateVolumeTargetTestCase(mgr_utils.ServiceSetUpMixin,
     def test_update_volume_target_not_found(self):
             self._test_update_volume_target_exception(
                 exception.VolumeTargetNotFound)
+
+
+@mgr_utils.mock_record_keepalive
+class RunJobTestCase(mgr_utils.ServiceSetUpMixin, tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(RunJobTestCase, self).setUp()
+        self.node = obj_utils.create_test_node(self.context, driver='fake')
+
+    def _run_job(self, action, **arguments):
+        job = utils.create_test_job(node_id=self.node.id, action=action,
+                                    arguments=arguments)
+        self._start_service()
+        self.service.run_job(self.context, job.uuid)
+        self._stop_service()
+        return objects.Job.get_by_uuid(self.context, job.uuid)
+
+    def test_run_job(self):
+        job = self._run_job('get_boot_device')
+        self.assertEqual(states.JOB_SUCCESS, job.state)
+        self.assertEqual({'boot_device': boot_devices.PXE,
+                          'persistent': False}, job.result)
+        self.assertIsNone(job.error)
+
+    def test_run_job_with_arguments(self):
+        job = self._run_job('set_boot_device', device=boot_devices.PXE,
+                            persistent=True)
+        self.assertEqual(states.JOB_SUCCESS, job.state)
+        self.assertFalse(job.result)
+
+    def test_run_job_expected_error(self):
+        self.node.reservation = 'fake-reserv'
+        self.node.save()
+        job = self._run_job('get_boot_device')
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertIn('locked', job.error)
+
+    @mock.patch.object(manager.ConductorManager, 'get_boot_device',
+                       autospec=True)
+    def test_run_job_unexpected_error(self, mock_get):
+        mock_get.side_effect = RuntimeError('boom')
+        job = self._run_job('get_boot_device')
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertEqual('boom', job.error)
+
+    def test_run_job_invalid_action(self):
+        job = self._run_job('destroy_node')
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertIn('destroy_node', job.error)
+        objects.Node.get_by_uuid(self.context, self.node.uuid)
+
+    def test_run_job_no_free_worker(self):
+        job = utils.create_test_job(node_id=self.node.id,
+                                    action='get_boot_device')
+        self._start_service()
+        with mock.patch.object(self.service, '_spawn_worker',
+                               autospec=True) as mock_spawn:
+            mock_spawn.side_effect = exception.NoFreeConductorWorker()
+            self.service.run_job(self.context, job.uuid)
+        job = objects.Job.get_by_uuid(self.context, job.uuid)
+        self.assertEqual(states.JOB_FAILED, job.state)
+        self.assertIsNotNone(job.error)
+
+    def test_run_job_not_found(self):
+        self._start_service()
+        self.service.run_job(self.context, uuidutils.generate_uuid())
+
+
+@mock.patch.object(dbapi.IMPL, 'destroy_old_jobs', autospec=True)
+class ManagerCleanUpJobsTestCase(mgr_utils.CommonMixIn,
+                                 tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(ManagerCleanUpJobsTestCase, self).setUp()
+        self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.dbapi = dbapi.get_instance()
+
+    def test__clean_up_jobs(self, mock_destroy):
+        self.config(job_retention=42, group='conductor')
+        mock_destroy.return_value = 2
+        self.service._clean_up_jobs(self.context)
+        mock_destroy.assert_called_once_with(42)
+
+
+@mock.patch.object(driver_utils, 'warm_image_caches', autospec=True)
+class WarmImageCachesTestCase(mgr_utils.CommonMixIn,
+                              tests_db_base.DbTestCase):
+
+    def setUp(self):
+        super(WarmImageCachesTestCase, self).setUp()
+        self.service = manager.ConductorManager('hostname', 'test-topic')
+        self.service.dbapi = dbapi.get_instance()
+        self.mock_iter = self.useFixture(fixtures.MockPatchObject(
+            self.service, 'iter_nodes', autospec=True)).mock
+        self.mock_iter.return_value = [
+            ('uuid1', 'fake', {'image_source': 'image1'},
+             {'deploy_kernel': 'kernel'}),
+            ('uuid2', 'fake', None, None),
+        ]
+
+    def test__warm_image_caches(self, mock_warm):
+        self.config(image_cache_warming_images=['image'],
+                    image_cache_warming_count=2, group='conductor')
+        nodes_info = []
+        mock_warm.side_effect = (
+            lambda context, hrefs, info, count: nodes_info.extend(info))
+        self.service._warm_image_caches(self.context)
+        mock_warm.assert_called_once_with(self.context, ['image'], mock.ANY,
+                                          2)
+        self.assertEqual([{'image_source': 'image1',
+                           'deploy_kernel': 'kernel'}, {}], nodes_info)
+        self.mock_iter.assert_called_once_with(
+            fields=['instance_info', 'driver_info'])
+
+    def test__warm_image_caches_no_count(self, mock_warm):
+        self.config(image_cache_warming_images=['image'],
+                    image_cache_warming_count=0, group='conductor')
+        self.service._warm_image_caches(self.context)
+        mock_warm.assert_called_once_with(self.context, ['image'], (), 0)
+        self.assertFalse(self.mock_iter.called)
@@ -27,6 +27,7 @@ from oslo_messaging import _utils as messaging_utils
 
 from ironic.common import boot_devices
 from ironic.common import exception
+from ironic.common import hash_ring
 from ironic.common import states
 from ironic.conductor import manager as conductor_manager
 from ironic.conductor import rpcapi as conductor_rpcapi
@@ -45,6 +46,10 @@ class ConductorRPCAPITestCase(tests_base.TestCase):
             conductor_manager.ConductorManager.RPC_API_VERSION,
             conductor_rpcapi.ConductorAPI.RPC_API_VERSION)
 
+    def test_topics_in_sync(self):
+        self.assertEqual(conductor_manager.MANAGER_TOPIC,
+                         conductor_rpcapi.MANAGER_TOPIC)
+
 
 class RPCAPITestCase(base.DbTestCase):
 
@@ -130,6 +135,23 @@ class RPCAPITestCase(base.DbTestCase):
         self.assertEqual('fake-topic.fake-host',
                          rpcapi.get_topic_for_driver('fake-driver'))
 
+    @mock.patch.object(hash_ring.HashRingManager, 'reset', autospec=True)
+    def test_get_topic_for_driver_cached(self, mock_reset):
+        CONF.set_override('host', 'fake-host')
+        self.dbapi.register_conductor({
+            'hostname': 'fake-host',
+            'drivers': ['fake-driver'],
+        })
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        rpcapi.get_topic_for_driver('fake-driver')
+        with mock.patch.object(self.dbapi, 'get_active_driver_dict',
+                               autospec=True) as mock_get:
+            for i in range(3):
+                self.assertEqual('fake-topic.fake-host',
+                                 rpcapi.get_topic_for_driver('fake-driver'))
+            self.assertFalse(mock_get.called)
+        self.assertFalse(mock_reset.called)
+
     def _test_rpcapi(self, method, rpc_method, **kwargs):
         rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
 
@@ -179,11 +201,38 @@ class RPCAPITestCase(base.DbTestCase):
                                                  expected_args):
                         self.assertEqual(arg, expected_arg)
 
-    def test_update_node(self):
-        self._test_rpcapi('update_node',
-                          'call',
-                          version='1.1',
-                          node_obj=self.fake_node)
+    @mock.patch.object(messaging.RPCClient, 'can_send_version', autospec=True)
+    def test_update_node(self, mock_send):
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        mock_send.return_value = True
+        self.fake_node_obj.extra = {'answer': 42}
+        with mock.patch.object(rpcapi.client, 'prepare',
+                               autospec=True) as mock_prepare:
+            rpcapi.update_node(self.context, self.fake_node_obj)
+
+        mock_prepare.assert_called_once_with(topic='fake-topic',
+                                             version='1.42')
+        mock_call = mock_prepare.return_value.call
+        mock_call.assert_called_once_with(
+            self.context, 'update_node',
+            node_delta=self.fake_node_obj.obj_to_delta_primitive())
+        delta = mock_call.call_args[1]['node_delta']
+        self.assertEqual({'id': self.fake_node['id'],
+                          'extra': {'answer': 42}},
+                         delta['ironic_object.data'])
+
+    @mock.patch.object(messaging.RPCClient, 'can_send_version', autospec=True)
+    def test_update_node_old_version(self, mock_send):
+        rpcapi = conductor_rpcapi.ConductorAPI(topic='fake-topic')
+        mock_send.return_value = False
+        with mock.patch.object(rpcapi.client, 'prepare',
+                               autospec=True) as mock_prepare:
+            rpcapi.update_node(self.context, self.fake_node_obj)
+
+        mock_prepare.assert_called_once_with(topic='fake-topic',
+                                             version='1.1')
+        mock_prepare.return_value.call.assert_called_once_with(
+            self.context, 'update_node', node_obj=self.fake_node_obj)
 
     def test_change_node_power_state(self):
         self._test_rpcapi('change_node_power_state',
@@ -276,6 +325,12 @@ class RPCAPITestCase(base.DbTestCase):
                           version='1.17',
                           node_id=self.fake_node['uuid'])
 
+    def test_run_job(self):
+        self._test_rpcapi('run_job',
+                          'cast',
+                          version='1.41',
+                          job_uuid=self.fake_node['uuid'])
+
     def test_inject_nmi(self):
         self._test_rpcapi('inject_nmi',
                           'call',
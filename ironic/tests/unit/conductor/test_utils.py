@@ -594,6 +594,10 @@ class CleanupAfterTimeoutTestCase(tests_base.TestCase):
         self.task.shared = False
         self.task.node = mock.Mock(spec_set=objects.Node)
         self.node = self.task.node
+        p = mock.patch.object(conductor_utils, '_store_console_log',
+                              autospec=True)
+        self.mock_store_console_log = p.start()
+        self.addCleanup(p.stop)
 
     def test_cleanup_after_timeout(self):
         conductor_utils.cleanup_after_timeout(self.task)
@@ -601,6 +605,7 @@ class CleanupAfterTimeoutTestCase(tests_base.TestCase):
         self.node.save.assert_called_once_with()
         self.task.driver.deploy.clean_up.assert_called_once_with(self.task)
         self.assertIn('Timeout reached', self.node.last_error)
+        self.mock_store_console_log.assert_called_once_with(self.task)
 
     def test_cleanup_after_timeout_shared_lock(self):
         self.task.shared = True
@@ -859,6 +864,10 @@ class ErrorHandlersTestCase(tests_base.TestCase):
                        'target_power_state': states.POWER_ON}
         self.node.configure_mock(**power_attrs)
         self.task.context = self.context
+        p = mock.patch.object(conductor_utils, '_store_console_log',
+                              autospec=True)
+        self.mock_store_console_log = p.start()
+        self.addCleanup(p.stop)
 
     @mock.patch.object(conductor_utils, 'LOG')
     def test_provision_error_handler_no_worker(self, log_mock):
@@ -928,6 +937,7 @@ class ErrorHandlersTestCase(tests_base.TestCase):
         driver.tear_down_cleaning.assert_called_once_with(self.task)
         self.task.process_event.assert_called_once_with('fail',
                                                         target_state=None)
+        self.mock_store_console_log.assert_called_once_with(self.task)
 
     def test_cleaning_error_handler_manual(self):
         target = states.MANAGEABLE
@@ -16,6 +16,7 @@
 """Ironic DB test base class."""
 
 import fixtures
+import mock
 from oslo_config import cfg
 from oslo_db.sqlalchemy import enginefacade
 
@@ -61,6 +62,34 @@ class Database(fixtures.Fixture):
         """Any addition steps that are needed outside of the migrations."""
 
 
+class EngineRecorder(fixtures.Fixture):
+    """Record which database served each session opened by the DB API.
+
+    The unit tests only have a single database, so the replica database
+    can not be told apart from the primary one by its engine; instead the
+    mode in which each session is opened is recorded. After the fixture
+    is set up, ``engines`` lists 'replica' or 'primary' for every session,
+    in the order they were opened.
+    """
+
+    def _setUp(self):
+        self.engines = []
+        factory = enginefacade._context_manager._factory
+        create_session = factory._create_session
+
+        def _create_session(mode, bind=None):
+            if mode is enginefacade._ASYNC_READER:
+                self.engines.append('replica')
+            else:
+                self.engines.append('primary')
+            return create_session(mode, bind=bind)
+
+        patcher = mock.patch.object(factory, '_create_session',
+                                    side_effect=_create_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
 class DbTestCase(base.TestCase):
 
     def setUp(self):
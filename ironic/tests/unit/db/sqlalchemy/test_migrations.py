@@ -660,6 +660,21 @@ class MigrationCheckersMixin(object):
                               (sqlalchemy.types.Boolean,
                                sqlalchemy.types.Integer))
 
+    def _check_80d3c1e1da0d(self, engine, data):
+        jobs = db_utils.get_table(engine, 'jobs')
+        col_names = [column.name for column in jobs.c]
+        expected_names = ['created_at', 'updated_at', 'id', 'uuid', 'node_id',
+                          'action', 'state', 'arguments', 'result', 'error']
+        self.assertEqual(sorted(expected_names), sorted(col_names))
+
+        self.assertIsInstance(jobs.c.uuid.type, sqlalchemy.types.String)
+        self.assertIsInstance(jobs.c.node_id.type, sqlalchemy.types.Integer)
+        self.assertIsInstance(jobs.c.action.type, sqlalchemy.types.String)
+        self.assertIsInstance(jobs.c.state.type, sqlalchemy.types.String)
+        self.assertIsInstance(jobs.c.arguments.type, sqlalchemy.types.TEXT)
+        self.assertIsInstance(jobs.c.result.type, sqlalchemy.types.TEXT)
+        self.assertIsInstance(jobs.c.error.type, sqlalchemy.types.TEXT)
+
     def test_upgrade_and_version(self):
         with patch_with_engine(self.engine):
             self.migration_api.upgrade('head')
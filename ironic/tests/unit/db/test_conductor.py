@@ -85,6 +85,54 @@ class DbConductorTestCase(base.DbTestCase):
             self.dbapi.register_conductor_hardware_interfaces,
             c.id, 'generic', 'deploy', interfaces, 'iscsi')
 
+    def test_bulk_register_conductor_hardware_interfaces(self):
+        c = self._create_test_cdr()
+        interfaces = [
+            {'hardware_type': 'generic', 'interface_type': 'deploy',
+             'interface_name': 'direct', 'default': False},
+            {'hardware_type': 'generic', 'interface_type': 'deploy',
+             'interface_name': 'iscsi', 'default': True},
+            {'hardware_type': 'other', 'interface_type': 'boot',
+             'interface_name': 'pxe', 'default': True},
+        ]
+        self.dbapi.bulk_register_conductor_hardware_interfaces(c.id,
+                                                               interfaces)
+        ifaces = self.dbapi.list_conductor_hardware_interfaces(c.id)
+        self.assertEqual(
+            interfaces,
+            [{'hardware_type': i.hardware_type,
+              'interface_type': i.interface_type,
+              'interface_name': i.interface_name,
+              'default': i.default} for i in ifaces])
+        for iface in ifaces:
+            self.assertEqual(c.id, iface.conductor_id)
+            self.assertIsNotNone(iface.created_at)
+
+    def test_bulk_register_conductor_hardware_interfaces_empty(self):
+        c = self._create_test_cdr()
+        self.dbapi.bulk_register_conductor_hardware_interfaces(c.id, [])
+        self.assertEqual([],
+                         self.dbapi.list_conductor_hardware_interfaces(c.id))
+
+    def test_bulk_register_conductor_hardware_interfaces_duplicate(self):
+        c = self._create_test_cdr()
+        self.dbapi.register_conductor_hardware_interfaces(c.id, 'generic',
+                                                          'deploy', ['iscsi'],
+                                                          'iscsi')
+        interfaces = [
+            {'hardware_type': 'generic', 'interface_type': 'deploy',
+             'interface_name': 'direct', 'default': False},
+            {'hardware_type': 'generic', 'interface_type': 'deploy',
+             'interface_name': 'iscsi', 'default': True},
+        ]
+        self.assertRaises(
+            exception.ConductorHardwareInterfacesAlreadyRegistered,
+            self.dbapi.bulk_register_conductor_hardware_interfaces,
+            c.id, interfaces)
+        # nothing was registered
+        ifaces = self.dbapi.list_conductor_hardware_interfaces(c.id)
+        self.assertEqual(['iscsi'], [i.interface_name for i in ifaces])
+
     def test_unregister_conductor_hardware_interfaces(self):
         c = self._create_test_cdr()
         interfaces = ['direct', 'iscsi']
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for manipulating Jobs via the DB API"""
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
+
+from ironic.common import exception
+from ironic.tests.unit.db import base
+from ironic.tests.unit.db import utils as db_utils
+
+
+class DbJobTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(DbJobTestCase, self).setUp()
+        self.node = db_utils.create_test_node()
+        self.job = db_utils.create_test_job(node_id=self.node.id,
+                                            arguments={'device': 'pxe'})
+
+    def test_get_job_by_uuid(self):
+        res = self.dbapi.get_job_by_uuid(self.job.uuid)
+        self.assertEqual(self.job.id, res.id)
+        self.assertEqual({'device': 'pxe'}, res.arguments)
+        self.assertEqual('pending', res.state)
+
+    def test_get_job_not_found(self):
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.get_job_by_uuid,
+                          uuidutils.generate_uuid())
+
+    def test_create_job_generates_uuid(self):
+        job = self.dbapi.create_job({'node_id': self.node.id,
+                                     'action': 'get_boot_device'})
+        self.assertTrue(uuidutils.is_uuid_like(job.uuid))
+
+    def test_update_job(self):
+        res = self.dbapi.update_job(self.job.uuid,
+                                    {'state': 'success',
+                                     'result': {'boot_device': 'pxe'}})
+        self.assertEqual('success', res.state)
+        self.assertEqual({'boot_device': 'pxe'},
+                         self.dbapi.get_job_by_uuid(self.job.uuid).result)
+
+    def test_update_job_uuid(self):
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.dbapi.update_job, self.job.uuid,
+                          {'uuid': uuidutils.generate_uuid()})
+
+    def test_update_job_not_found(self):
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.update_job,
+                          uuidutils.generate_uuid(), {'state': 'running'})
+
+    @mock.patch.object(timeutils, 'utcnow', autospec=True)
+    def test_destroy_old_jobs(self, mock_utcnow):
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        created = db_utils.create_test_job(node_id=self.node.id,
+                                           uuid=uuidutils.generate_uuid())
+        updated = db_utils.create_test_job(node_id=self.node.id,
+                                           uuid=uuidutils.generate_uuid())
+        self.dbapi.update_job(updated.uuid, {'state': 'running'})
+
+        # still within the retention period
+        mock_utcnow.return_value = now + datetime.timedelta(seconds=50)
+        self.assertEqual(0, self.dbapi.destroy_old_jobs(60))
+
+        mock_utcnow.return_value = now + datetime.timedelta(seconds=61)
+        # the job created in setUp is older than 60 seconds as well
+        self.assertEqual(3, self.dbapi.destroy_old_jobs(60))
+        for job in (self.job, created, updated):
+            self.assertRaises(exception.JobNotFound,
+                              self.dbapi.get_job_by_uuid, job.uuid)
+
+    def test_destroy_old_jobs_recent(self):
+        self.assertEqual(0, self.dbapi.destroy_old_jobs(60))
+        self.dbapi.get_job_by_uuid(self.job.uuid)
+
+    def test_destroy_node_destroys_jobs(self):
+        self.dbapi.destroy_node(self.node.id)
+        self.assertRaises(exception.JobNotFound,
+                          self.dbapi.get_job_by_uuid, self.job.uuid)
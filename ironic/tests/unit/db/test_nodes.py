@@ -24,6 +24,8 @@ import six
 
 from ironic.common import exception
 from ironic.common import states
+from ironic.db import api as db_api
+from ironic.db.sqlalchemy import api as sqlalchemy_api
 from ironic.tests.unit.db import base
 from ironic.tests.unit.db import utils
 
@@ -229,6 +231,45 @@ class DbNodeTestCase(base.DbTestCase):
         for r in res:
             self.assertEqual([], r.tags)
 
+    def test_get_node_aggregates(self):
+        ch = utils.create_test_chassis(uuid=uuidutils.generate_uuid())
+        utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                               driver='driver-one', provision_state='active',
+                               chassis_id=ch['id'])
+        utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                               driver='driver-one', provision_state='active',
+                               instance_uuid=uuidutils.generate_uuid())
+        utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                               driver='driver-two', provision_state='active',
+                               maintenance=True)
+        utils.create_test_node(uuid=uuidutils.generate_uuid(),
+                               driver='driver-two',
+                               provision_state='available')
+
+        res = self.dbapi.get_node_aggregates(['provision_state'])
+        self.assertEqual([('active', 3), ('available', 1)], res)
+
+        res = self.dbapi.get_node_aggregates(['driver', 'provision_state'])
+        self.assertEqual([('driver-one', 'active', 2),
+                          ('driver-two', 'active', 1),
+                          ('driver-two', 'available', 1)], res)
+
+        res = self.dbapi.get_node_aggregates(
+            ['driver'], filters={'maintenance': False})
+        self.assertEqual([('driver-one', 2), ('driver-two', 1)], res)
+
+        res = self.dbapi.get_node_aggregates(
+            ['driver'], filters={'associated': True})
+        self.assertEqual([('driver-one', 1)], res)
+
+        res = self.dbapi.get_node_aggregates(
+            ['provision_state'], filters={'chassis_uuid': ch['uuid']})
+        self.assertEqual([('active', 1)], res)
+
+        res = self.dbapi.get_node_aggregates(
+            ['provision_state'], filters={'driver': 'bad-driver'})
+        self.assertEqual([], res)
+
     def test_get_node_list_with_filters(self):
         ch1 = utils.create_test_chassis(uuid=uuidutils.generate_uuid())
         ch2 = utils.create_test_chassis(uuid=uuidutils.generate_uuid())
@@ -421,6 +462,73 @@ class DbNodeTestCase(base.DbTestCase):
                           self.dbapi.update_node, node.id,
                           {'uuid': ''})
 
+    def _test_update_node_key_updates(self):
+        node = utils.create_test_node(
+            driver_internal_info={'agent_url': 'http://1.2.3.4:9999',
+                                  'agent_last_heartbeat': 42,
+                                  'is_whole_disk_image': True},
+            instance_info={'image_source': 'foo'})
+        key_updates = {
+            'driver_internal_info': {
+                'agent_url': 'http://5.6.7.8:9999',
+                'agent_last_heartbeat': db_api.DELETE_KEY,
+                'clean_steps': [{'step': 'erase_devices', 'priority': 10}],
+                'not-found': db_api.DELETE_KEY},
+            'instance_info': {'deploy_boot_mode': 'uefi'},
+        }
+        res = self.dbapi.update_node(node.id, {'extra': {'foo': 'bar'}},
+                                     key_updates=key_updates)
+        expected_dii = {
+            'agent_url': 'http://5.6.7.8:9999',
+            'clean_steps': [{'step': 'erase_devices', 'priority': 10}],
+            'is_whole_disk_image': True}
+        expected_ii = {'image_source': 'foo', 'deploy_boot_mode': 'uefi'}
+        self.assertEqual(expected_dii, res.driver_internal_info)
+        self.assertEqual(expected_ii, res.instance_info)
+        self.assertEqual({'foo': 'bar'}, res.extra)
+
+        res = self.dbapi.get_node_by_id(node.id)
+        self.assertEqual(expected_dii, res.driver_internal_info)
+        self.assertEqual(expected_ii, res.instance_info)
+
+    def test_update_node_key_updates(self):
+        self.assertTrue(sqlalchemy_api._json_functions_supported())
+        with mock.patch.object(sqlalchemy_api, '_json_key_update',
+                               wraps=sqlalchemy_api._json_key_update) as m:
+            self._test_update_node_key_updates()
+            self.assertEqual(2, m.call_count)
+
+    @mock.patch.object(sqlalchemy_api, '_json_functions_supported',
+                       autospec=True, return_value=False)
+    def test_update_node_key_updates_not_in_place(self, mock_supported):
+        with mock.patch.object(sqlalchemy_api, '_json_key_update',
+                               autospec=True) as mock_update:
+            self._test_update_node_key_updates()
+            self.assertFalse(mock_update.called)
+
+    def test_update_node_key_updates_quoted_key(self):
+        node = utils.create_test_node(driver_internal_info={'a': 1})
+        res = self.dbapi.update_node(
+            node.id, {}, key_updates={'driver_internal_info': {'"b"': 2}})
+        self.assertEqual({'a': 1, '"b"': 2}, res.driver_internal_info)
+
+    def test_update_node_key_updates_invalid_field(self):
+        node = utils.create_test_node()
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.dbapi.update_node, node.id, {},
+                          key_updates={'extra': {'foo': 'bar'}})
+
+    def test_update_node_key_updates_field_in_values(self):
+        node = utils.create_test_node()
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.dbapi.update_node, node.id,
+                          {'instance_info': {}},
+                          key_updates={'instance_info': {'foo': 'bar'}})
+
+    def test_json_key_update_unsupported_dialect(self):
+        self.assertIsNone(sqlalchemy_api._json_key_update(
+            'oracle', 'column', {'foo': 'bar'}))
+
     def test_update_node_associate_and_disassociate(self):
         node = utils.create_test_node()
         new_i_uuid = uuidutils.generate_uuid()
@@ -603,6 +711,13 @@ class DbNodeTestCase(base.DbTestCase):
             exception.NodeNotFound,
             self.dbapi.touch_node_provisioning, uuidutils.generate_uuid())
 
+    def test_get_query_count(self):
+        node = utils.create_test_node()
+        count = self.dbapi.get_query_count()
+        self.dbapi.get_node_by_uuid(node.uuid)
+        # oslo.db may also ping the database when checking out a connection
+        self.assertLess(count, self.dbapi.get_query_count())
+
     def test_get_node_by_port_addresses(self):
         wrong_node = utils.create_test_node(
             driver='driver-one',
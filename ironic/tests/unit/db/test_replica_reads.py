@@ -0,0 +1,113 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for serving read-only queries from the replica database"""
+
+import datetime
+
+import mock
+from oslo_db import exception as db_exc
+from oslo_utils import timeutils
+
+from ironic.db.sqlalchemy import api as sqlalchemy_api
+from ironic.tests.unit.db import base
+from ironic.tests.unit.db import utils
+
+
+class DbReplicaReadsTestCase(base.DbTestCase):
+
+    def setUp(self):
+        super(DbReplicaReadsTestCase, self).setUp()
+        # The database engines are already set up, so this only enables
+        # the replica reads; the queries still run against the same
+        # database.
+        self.config(slave_connection='sqlite://', group='database')
+        patcher = mock.patch.object(sqlalchemy_api, '_REPLICA_MONITOR',
+                                    sqlalchemy_api._ReplicaMonitor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.dbapi.allow_replica_reads, None)
+
+        self.node = utils.create_test_node()
+        self.port = utils.create_test_port(node_id=self.node.id)
+        self.dbapi.register_conductor(utils.get_test_conductor())
+        self.recorder = self.useFixture(base.EngineRecorder())
+
+    def _list_all(self):
+        self.dbapi.get_node_list()
+        self.dbapi.get_node_by_uuid(self.node.uuid)
+        self.dbapi.get_port_list()
+        self.dbapi.get_port_by_address(self.port.address)
+        self.dbapi.get_node_by_port_addresses([self.port.address])
+        self.dbapi.get_chassis_list()
+        self.dbapi.get_active_driver_dict()
+
+    def test_primary_by_default(self):
+        self._list_all()
+        self.assertEqual(['primary'] * 7, self.recorder.engines)
+
+    def test_replica(self):
+        self.dbapi.allow_replica_reads(30)
+        self._list_all()
+        # the first session checks the replication lag
+        self.assertEqual(['replica'] * 8, self.recorder.engines)
+
+    def test_replica_not_configured(self):
+        self.config(slave_connection=None, group='database')
+        self.dbapi.allow_replica_reads(30)
+        self._list_all()
+        self.assertEqual(['primary'] * 7, self.recorder.engines)
+
+    def test_replica_disallowed(self):
+        self.dbapi.allow_replica_reads(30)
+        self.dbapi.allow_replica_reads(None)
+        self._list_all()
+        self.assertEqual(['primary'] * 7, self.recorder.engines)
+
+    def test_writes_use_primary(self):
+        self.dbapi.allow_replica_reads(30)
+        self.dbapi.get_node_list()
+        self.recorder.engines = []
+
+        self.dbapi.update_node(self.node.id, {'extra': {'foo': 'bar'}})
+        self.dbapi.reserve_node('fake-host', self.node.id)
+        self.dbapi.get_nodeinfo_list()
+        self.assertNotIn('replica', self.recorder.engines)
+
+    @mock.patch.object(timeutils, 'utcnow', autospec=True)
+    def test_stale_replica(self, mock_utcnow):
+        heartbeat = self.dbapi.get_conductor('test-conductor-node').updated_at
+        mock_utcnow.return_value = heartbeat + datetime.timedelta(seconds=31)
+        self.dbapi.allow_replica_reads(30)
+        self.recorder.engines = []
+
+        self.dbapi.get_node_list()
+        self.assertEqual(['replica', 'primary'], self.recorder.engines)
+
+        # the lag is not checked again right away
+        self.recorder.engines = []
+        self.dbapi.get_node_list()
+        self.assertEqual(['primary'], self.recorder.engines)
+
+        # the known heartbeat is recent enough for a larger lag
+        self.recorder.engines = []
+        self.dbapi.allow_replica_reads(60)
+        self.dbapi.get_node_list()
+        self.assertEqual(['replica'], self.recorder.engines)
+
+    @mock.patch.object(sqlalchemy_api, '_replica_reader')
+    def test_replica_unavailable(self, mock_reader):
+        mock_reader.independent.using.side_effect = db_exc.DBError()
+        self.dbapi.allow_replica_reads(30)
+        self.dbapi.get_node_list()
+        self.assertEqual(['primary'], self.recorder.engines)
+        self.assertFalse(mock_reader.using.called)
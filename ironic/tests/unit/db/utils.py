@@ -473,3 +473,35 @@ def create_test_node_tag(**kw):
     tag = get_test_node_tag(**kw)
     dbapi = db_api.get_instance()
     return dbapi.add_node_tag(tag['node_id'], tag['tag'])
+
+
+def get_test_job(**kw):
+    return {
+        'id': kw.get('id', 345),
+        'uuid': kw.get('uuid', '9c9a7e45-5a5d-4a55-9ee7-7f1d7bbf5a3f'),
+        'node_id': kw.get('node_id', 123),
+        'action': kw.get('action', 'get_boot_device'),
+        'state': kw.get('state', 'pending'),
+        'arguments': kw.get('arguments', {}),
+        'result': kw.get('result'),
+        'error': kw.get('error'),
+        'created_at': kw.get('created_at'),
+        'updated_at': kw.get('updated_at'),
+    }
+
+
+def create_test_job(**kw):
+    """Create test job entry in DB and return Job DB object.
+
+    Function to be used to create test Job objects in the database.
+
+    :param kw: kwargs with overriding values for job's attributes.
+    :returns: Test Job DB object.
+
+    """
+    job = get_test_job(**kw)
+    # Let DB generate ID if it isn't specified explicitly
+    if 'id' not in kw:
+        del job['id']
+    dbapi = db_api.get_instance()
+    return dbapi.create_job(job)
@@ -0,0 +1,313 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Test class for console_proxy driver module."""
+
+import atexit
+import socket
+
+import eventlet
+import mock
+from oslo_utils import units
+
+from ironic.common import exception
+from ironic.drivers.modules import console_proxy
+from ironic.tests import base
+
+NODE_UUID = '1be26c0b-03f2-4d2e-ae87-c02d7f33c123'
+OTHER_NODE_UUID = '1be26c0b-03f2-4d2e-ae87-c02d7f33c456'
+
+
+class RingBufferTestCase(base.TestCase):
+
+    def _read(self, ring):
+        return b''.join(view.tobytes() for view in ring.read())
+
+    def test_empty(self):
+        ring = console_proxy._RingBuffer(8)
+        self.assertEqual(b'', self._read(ring))
+
+    def test_write(self):
+        ring = console_proxy._RingBuffer(8)
+        ring.write(b'abc')
+        ring.write(b'def')
+        self.assertEqual(b'abcdef', self._read(ring))
+
+    def test_write_wraps(self):
+        ring = console_proxy._RingBuffer(8)
+        ring.write(b'abcdef')
+        ring.write(b'ghijk')
+        self.assertEqual(b'defghijk', self._read(ring))
+        ring.write(b'lmn')
+        self.assertEqual(b'ghijklmn', self._read(ring))
+
+    def test_write_larger_than_buffer(self):
+        ring = console_proxy._RingBuffer(8)
+        ring.write(b'ab')
+        ring.write(b'0123456789')
+        self.assertEqual(b'23456789', self._read(ring))
+
+    def test_read_does_not_copy(self):
+        ring = console_proxy._RingBuffer(8)
+        ring.write(b'abc')
+        view = ring.read()[0]
+        ring.write(b'def')
+        ring.write(b'ghijkl')
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(b'ijk', view.tobytes())
+
+
+class ConsoleProxyTestCase(base.TestCase):
+
+    def setUp(self):
+        super(ConsoleProxyTestCase, self).setUp()
+        self.config(my_ip='127.0.0.1')
+        self.config(proxy_port=0, subprocess_checking_interval=0,
+                    group='console')
+        self.proxy = console_proxy.ConsoleProxy()
+        self.addCleanup(self.proxy.stop)
+
+    def _connect(self, token):
+        port = self.proxy._server.getsockname()[1]
+        client = eventlet.connect(('127.0.0.1', port))
+        self.addCleanup(client.close)
+        client.sendall(token.encode('ascii') + b'\n')
+        return client
+
+    def _recv(self, client, size):
+        received = b''
+        with eventlet.Timeout(5):
+            while len(received) < size:
+                data = client.recv(size - len(received))
+                if not data:
+                    break
+                received += data
+        return received
+
+    def _wait_for_exit(self, session):
+        with eventlet.Timeout(5):
+            while session.process is not None:
+                eventlet.sleep(0.01)
+
+    def test_register(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        self.assertEqual(token, self.proxy.get_token(NODE_UUID))
+        client = self._connect(token)
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+
+    def test_register_data_sent_with_token(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        port = self.proxy._server.getsockname()[1]
+        client = eventlet.connect(('127.0.0.1', port))
+        self.addCleanup(client.close)
+        client.sendall(token.encode('ascii') + b'\nhello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+
+    def test_register_env(self):
+        token = self.proxy.register(
+            NODE_UUID, ['sh', '-c', 'read line; echo $IPMI_PASSWORD'],
+            env={'IPMI_PASSWORD': 'secret'})
+        client = self._connect(token)
+        client.sendall(b'\n')
+        self.assertEqual(b'secret\n', self._recv(client, 7))
+
+    def test_register_several_nodes(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        other_token = self.proxy.register(OTHER_NODE_UUID, ['cat'])
+        self.assertNotEqual(token, other_token)
+        client = self._connect(token)
+        other_client = self._connect(other_token)
+        other_client.sendall(b'other')
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+        self.assertEqual(b'other', self._recv(other_client, 5))
+
+    def test_register_replaces_console(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        session = self.proxy._sessions[NODE_UUID]
+        process = session.process
+
+        new_token = self.proxy.register(NODE_UUID, ['cat'])
+
+        self.assertNotEqual(token, new_token)
+        self.assertEqual(new_token, self.proxy.get_token(NODE_UUID))
+        self.assertNotIn(token, self.proxy._tokens)
+        self.assertIsNotNone(process.wait())
+
+    def test_register_command_not_found(self):
+        self.assertRaises(exception.ConsoleSubprocessFailed,
+                          self.proxy.register, NODE_UUID,
+                          ['/nonexistent/console-command'])
+        self.assertIsNone(self.proxy.get_token(NODE_UUID))
+
+    def test_register_command_exits(self):
+        self.config(subprocess_checking_interval=1, group='console')
+        self.assertRaisesRegex(exception.ConsoleSubprocessFailed,
+                               'exited with code 3',
+                               self.proxy.register, NODE_UUID,
+                               ['sh', '-c', 'exit 3'])
+        self.assertIsNone(self.proxy.get_token(NODE_UUID))
+
+    @mock.patch.object(eventlet, 'listen', autospec=True)
+    def test_register_listen_fails(self, mock_listen):
+        mock_listen.side_effect = socket.error('boom')
+        self.assertRaisesRegex(exception.ConsoleError, 'boom',
+                               self.proxy.register, NODE_UUID, ['cat'])
+        self.assertIsNone(self.proxy.get_token(NODE_UUID))
+
+    def test_invalid_token(self):
+        self.proxy.register(NODE_UUID, ['cat'])
+        client = self._connect('wrong')
+        self.assertEqual(b'Invalid console token\r\n',
+                         self._recv(client, 100))
+
+    def test_last_client_wins(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        first_client = self._connect(token)
+        first_client.sendall(b'first')
+        self.assertEqual(b'first', self._recv(first_client, 5))
+
+        client = self._connect(token)
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+        self.assertEqual(b'', self._recv(first_client, 5))
+
+    def test_restart_exited_process(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        session = self.proxy._sessions[NODE_UUID]
+        session.process.terminate()
+        self._wait_for_exit(session)
+
+        client = self._connect(token)
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+        self.assertIsNotNone(session.process)
+
+    def test_process_exit_closes_client(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        client = self._connect(token)
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+
+        session = self.proxy._sessions[NODE_UUID]
+        session.process.terminate()
+        self.assertEqual(b'', self._recv(client, 5))
+        self._wait_for_exit(session)
+        self.assertIsNotNone(session.returncode)
+
+    def test_unregister(self):
+        token = self.proxy.register(NODE_UUID, ['cat'])
+        client = self._connect(token)
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+        process = self.proxy._sessions[NODE_UUID].process
+
+        self.proxy.unregister(NODE_UUID)
+
+        self.assertIsNone(self.proxy.get_token(NODE_UUID))
+        self.assertIsNotNone(process.wait())
+        self.assertEqual(b'', self._recv(client, 5))
+        client = self._connect(token)
+        self.assertEqual(b'Invalid console token\r\n',
+                         self._recv(client, 100))
+
+    def test_unregister_unknown_node(self):
+        self.proxy.unregister(NODE_UUID)
+        self.assertIsNone(self.proxy.get_token(NODE_UUID))
+
+    def test_stop(self):
+        self.proxy.register(NODE_UUID, ['cat'])
+        process = self.proxy._sessions[NODE_UUID].process
+        server = self.proxy._server
+
+        self.proxy.stop()
+
+        self.assertIsNone(self.proxy._server)
+        self.assertIsNone(self.proxy.get_token(NODE_UUID))
+        self.assertIsNotNone(process.wait())
+        with eventlet.Timeout(5):
+            while server.fileno() != -1:
+                eventlet.sleep(0.01)
+
+    def _register_with_log(self, args):
+        self.config(log_buffer_size=1, group='console')
+        token = self.proxy.register(NODE_UUID, args)
+        session = self.proxy._sessions[NODE_UUID]
+        self.assertEqual(units.Mi, session.log.size)
+        return token, session
+
+    def _get_log(self):
+        return b''.join(self.proxy.get_log(NODE_UUID))
+
+    def test_log(self):
+        token, session = self._register_with_log(['cat'])
+        client = self._connect(token)
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+        self.assertEqual(b'hello', self._get_log())
+
+    def test_log_sent_to_client(self):
+        token, session = self._register_with_log(
+            ['sh', '-c', 'echo boot; cat'])
+        with eventlet.Timeout(5):
+            while not self._get_log():
+                eventlet.sleep(0.01)
+
+        client = self._connect(token)
+        self.assertEqual(b'boot\n', self._recv(client, 5))
+        client.sendall(b'hello')
+        self.assertEqual(b'hello', self._recv(client, 5))
+        self.assertEqual(b'boot\nhello', self._get_log())
+
+    def test_log_kept_when_restarted(self):
+        token, session = self._register_with_log(['cat'])
+        session.log.write(b'boot')
+        self.proxy.register(NODE_UUID, ['cat'])
+        self.assertIs(session.log, self.proxy._sessions[NODE_UUID].log)
+        self.assertEqual(b'boot', self._get_log())
+
+    def test_log_size_changed(self):
+        token, session = self._register_with_log(['cat'])
+        session.log.write(b'boot')
+        self.config(log_buffer_size=2, group='console')
+        self.proxy.register(NODE_UUID, ['cat'])
+        self.assertEqual(b'', self._get_log())
+        self.assertEqual(2 * units.Mi,
+                         self.proxy._sessions[NODE_UUID].log.size)
+
+    def test_log_disabled(self):
+        self.proxy.register(NODE_UUID, ['cat'])
+        self.assertIsNone(self.proxy._sessions[NODE_UUID].log)
+        self.assertIsNone(self.proxy.get_log(NODE_UUID))
+
+    def test_log_unknown_node(self):
+        self.assertIsNone(self.proxy.get_log(NODE_UUID))
+
+    def test_get_url(self):
+        self.config(my_ip='192.0.2.1')
+        self.config(proxy_port=6390, group='console')
+        self.assertEqual('tcp://192.0.2.1:6390', self.proxy.get_url())
+
+    def test_get_url_ipv6(self):
+        self.config(my_ip='2001:db8::1')
+        self.config(proxy_port=6390, group='console')
+        self.assertEqual('tcp://[2001:db8::1]:6390', self.proxy.get_url())
+
+    @mock.patch.object(atexit, 'register', autospec=True)
+    def test_get_proxy(self, mock_register):
+        self.addCleanup(setattr, console_proxy, '_PROXY', None)
+        console_proxy._PROXY = None
+        proxy = console_proxy.get_proxy()
+        self.assertIsInstance(proxy, console_proxy.ConsoleProxy)
+        self.assertIs(proxy, console_proxy.get_proxy())
+        mock_register.assert_called_once_with(proxy.stop)
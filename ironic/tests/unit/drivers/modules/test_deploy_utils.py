@@ -19,6 +19,7 @@ import tempfile
 import time
 import types
 
+import fixtures
 from ironic_lib import disk_utils
 import mock
 from oslo_config import cfg
@@ -29,6 +30,7 @@ from testtools import matchers
 from ironic.common import boot_devices
 from ironic.common import exception
 from ironic.common import image_service
+from ironic.common import images
 from ironic.common import states
 from ironic.common import utils as common_utils
 from ironic.conductor import task_manager
@@ -1064,6 +1066,13 @@ class OtherFunctionTestCase(db_base.DbTestCase):
         self._test_set_failed_state(collect_logs=False)
         self.assertFalse(mock_collect.called)
 
+    @mock.patch.object(driver_utils, 'store_console_log', autospec=True)
+    @mock.patch.object(driver_utils, 'collect_ramdisk_logs', autospec=True)
+    def test_set_failed_state_store_console_log(self, mock_collect,
+                                                mock_store_console):
+        self._test_set_failed_state(collect_logs=False)
+        mock_store_console.assert_called_once_with(mock.ANY)
+
     def test_get_boot_option(self):
         self.node.instance_info = {'capabilities': '{"boot_option": "local"}'}
         result = utils.get_boot_option(self.node)
@@ -1235,6 +1244,109 @@ class VirtualMediaDeployUtilsTestCase(db_base.DbTestCase):
             self.assertEqual('aa:bb:cc:dd:ee:ff', address)
 
 
+class BootImageCacheTestCase(tests_base.TestCase):
+
+    def setUp(self):
+        super(BootImageCacheTestCase, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.dest_dir = tempfile.mkdtemp()
+        self.config(boot_image_master_path=self.master_dir, group='deploy')
+        self.kernel = uuidutils.generate_uuid()
+        self.ramdisk = uuidutils.generate_uuid()
+
+    def _fake_build(self, *args, **kwargs):
+        with open(args[1] if len(args) > 1 else args[0], 'w') as fp:
+            fp.write('image')
+
+    def _path(self, name):
+        return os.path.join(self.dest_dir, name)
+
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_no_cache(self, mock_create):
+        self.config(boot_image_master_path=None, group='deploy')
+        utils.create_boot_iso('ctx', 'output', self.kernel, self.ramdisk,
+                              'deploy-iso', 'root-uuid', 'params', 'bios')
+        mock_create.assert_called_once_with('ctx', 'output', self.kernel,
+                                            self.ramdisk, 'deploy-iso',
+                                            'root-uuid', 'params', 'bios')
+
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_shared(self, mock_create):
+        mock_create.side_effect = self._fake_build
+        for node in ('node1', 'node2'):
+            utils.create_boot_iso('ctx', self._path(node), self.kernel,
+                                  self.ramdisk, 'deploy-iso', 'root-uuid',
+                                  'params', 'bios')
+
+        mock_create.assert_called_once_with(
+            'ctx', mock.ANY, kernel_href=self.kernel,
+            ramdisk_href=self.ramdisk, deploy_iso_href='deploy-iso',
+            root_uuid='root-uuid', kernel_params='params', boot_mode='bios')
+        self.assertEqual(os.stat(self._path('node1')).st_ino,
+                         os.stat(self._path('node2')).st_ino)
+        # NOTE: linked to the cache and to both nodes
+        self.assertEqual(3, os.stat(self._path('node1')).st_nlink)
+
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_different_params(self, mock_create):
+        mock_create.side_effect = self._fake_build
+        utils.create_boot_iso('ctx', self._path('node1'), self.kernel,
+                              self.ramdisk, 'deploy-iso', 'root-uuid1',
+                              'params', 'bios')
+        utils.create_boot_iso('ctx', self._path('node2'), self.kernel,
+                              self.ramdisk, 'deploy-iso', 'root-uuid2',
+                              'params', 'bios')
+        self.assertEqual(2, mock_create.call_count)
+
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_deploy_iso_uefi(self, mock_create):
+        mock_create.side_effect = self._fake_build
+        iso1, iso2 = uuidutils.generate_uuid(), uuidutils.generate_uuid()
+        for node, deploy_iso in (('node1', iso1), ('node2', iso2)):
+            utils.create_boot_iso('ctx', self._path(node), self.kernel,
+                                  self.ramdisk, deploy_iso, 'root-uuid',
+                                  'params', 'bios')
+        self.assertEqual(1, mock_create.call_count)
+
+        for node, deploy_iso in (('node3', iso1), ('node4', iso2)):
+            utils.create_boot_iso('ctx', self._path(node), self.kernel,
+                                  self.ramdisk, deploy_iso, 'root-uuid',
+                                  'params', 'uefi')
+        self.assertEqual(3, mock_create.call_count)
+
+    @mock.patch.object(image_service, 'get_image_service', autospec=True)
+    @mock.patch.object(images, 'create_boot_iso', autospec=True)
+    def test_create_boot_iso_http_modified(self, mock_create, mock_service):
+        mock_create.side_effect = self._fake_build
+        mock_show = mock_service.return_value.show
+        mock_show.return_value = {'updated_at': 'yesterday'}
+        kernel = 'http://server/kernel'
+        for node in ('node1', 'node2'):
+            utils.create_boot_iso('ctx', self._path(node), kernel,
+                                  self.ramdisk, 'deploy-iso')
+        self.assertEqual(1, mock_create.call_count)
+        mock_show.assert_called_with(kernel)
+
+        mock_show.return_value = {'updated_at': 'today'}
+        utils.create_boot_iso('ctx', self._path('node3'), kernel,
+                              self.ramdisk, 'deploy-iso')
+        self.assertEqual(2, mock_create.call_count)
+
+    @mock.patch.object(os, 'statvfs', autospec=True)
+    def test_clean_up_caches_boot_image_cache_disabled(self, mock_statvfs):
+        self.config(boot_image_master_path=None, group='deploy')
+        mock_statvfs.return_value = mock.Mock(f_frsize=1, f_bavail=1)
+        other_cache = mock.Mock(spec_set=[])
+        other_cache.return_value.master_dir = self.dest_dir
+        self.useFixture(fixtures.MockPatchObject(
+            image_cache, '_cache_cleanup_list',
+            [(25, other_cache), (10, utils.BootImageCache)]))
+
+        self.assertRaises(exception.InsufficientDiskSpace,
+                          image_cache._clean_up_caches, self.dest_dir, 42)
+        other_cache.return_value.clean_up.assert_called_once_with(amount=41)
+
+
 class ParseInstanceInfoCapabilitiesTestCase(tests_base.TestCase):
 
     def setUp(self):
@@ -17,12 +17,21 @@
 """Tests for ImageCache class and helper functions."""
 
 import datetime
+import errno
+import hashlib
+import math
 import os
+import shutil
+import sqlite3
 import tempfile
 import time
 import uuid
 
+import eventlet
+import fixtures
 import mock
+from oslo_concurrency import lockutils
+from oslo_utils import units
 from oslo_utils import uuidutils
 import six
 
@@ -173,6 +182,788 @@ class TestImageCacheFetch(base.TestCase):
                          os.stat(self.master_path).st_ino)
         with open(self.dest_path) as fp:
             self.assertEqual("TEST", fp.read())
+        entries = list(self.cache._index.oldest())
+        self.assertEqual([(self.uuid, 4)],
+                         [entry[:2] for entry in entries])
+        self.assertEqual(4, self.cache._index.total_size())
+
+    @mock.patch.object(image_cache, '_delete_master_path_if_stale',
+                       return_value=True, autospec=True)
+    def test_fetch_image_master_hit_touches_index(self, mock_cache_upd):
+        with open(self.master_path, 'w') as fp:
+            fp.write("TEST")
+        with mock.patch.object(time, 'time', lambda: 1000):
+            self.cache._index.add(self.uuid, 4)
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+
+        self.assertEqual(os.stat(self.dest_path).st_ino,
+                         os.stat(self.master_path).st_ino)
+        last_used = list(self.cache._index.oldest())[0][2]
+        self.assertGreater(last_used, time.time() - 60)
+
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test_fetch_image_counters(self, mock_fetch, mock_counter):
+        def _fake_fetch(ctx, uuid, tmp_path, *args):
+            with open(tmp_path, 'w') as fp:
+                fp.write("TEST")
+
+        mock_fetch.side_effect = _fake_fetch
+        self.cache._cache_size = 100
+        self.cache._cache_ttl = 600
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        mock_counter.assert_called_once_with('ImageCache.cache_miss', 1)
+        mock_counter.reset_mock()
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        mock_counter.assert_called_once_with('ImageCache.cache_hit', 1)
+        mock_counter.reset_mock()
+
+        os.unlink(self.dest_path)
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        mock_counter.assert_called_once_with('ImageCache.cache_hit', 1)
+
+    def test_eviction_policy(self):
+        self.assertIsInstance(self.cache._policy,
+                              image_cache.LRUEvictionPolicy)
+        self.config(image_cache_eviction_policy='lfu', group='pxe')
+        cache = image_cache.ImageCache(self.master_dir, None, None)
+        self.assertIsInstance(cache._policy, image_cache.LFUEvictionPolicy)
+        cache = image_cache.ImageCache(self.master_dir, None, None,
+                                       eviction_policy='greedy-dual-size')
+        self.assertIsInstance(cache._policy,
+                              image_cache.GreedyDualSizeEvictionPolicy)
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test_fetch_image_fetcher(self, mock_fetch):
+        def fetch(ctx, href, path, force_raw):
+            with open(path, 'w') as image:
+                image.write('image')
+
+        cache = image_cache.ImageCache(self.master_dir, units.Gi, 3600,
+                                       fetcher=fetch)
+        self.assertTrue(cache.fetch_image(self.uuid, self.dest_path))
+        self.assertFalse(mock_fetch.called)
+        with open(self.dest_path) as image:
+            self.assertEqual('image', image.read())
+        self.assertTrue(os.path.exists(self.master_path))
+
+
+class TestImageCacheSingleFlight(base.TestCase):
+
+    def setUp(self):
+        super(TestImageCacheSingleFlight, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.cache = image_cache.ImageCache(self.master_dir, 100, 600)
+        self.dest_dir = tempfile.mkdtemp()
+        self.uuid = uuidutils.generate_uuid()
+        self.failures = 0
+        self.fetch_mock = self.useFixture(fixtures.MockPatchObject(
+            image_cache, '_fetch', autospec=True,
+            side_effect=self._fake_fetch)).mock
+
+    def _fake_fetch(self, ctx, href, tmp_path, *args, **kwargs):
+        # NOTE: let the other green threads run while downloading
+        eventlet.sleep(0.1)
+        if self.failures:
+            self.failures -= 1
+            raise exception.ImageDownloadFailed(image_href=href,
+                                                reason='boom')
+        with open(tmp_path, 'w') as fp:
+            fp.write('TEST')
+
+    def _fetch_concurrently(self, count):
+        def _fetch(number):
+            try:
+                return self.cache.fetch_image(
+                    self.uuid, os.path.join(self.dest_dir, str(number)))
+            except Exception as exc:
+                return exc
+
+        threads = [eventlet.spawn(_fetch, number) for number in range(count)]
+        return [thread.wait() for thread in threads]
+
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    def test_fetch_image_once(self, mock_counter):
+        results = self._fetch_concurrently(5)
+
+        self.assertEqual([True, False, False, False, False], results)
+        self.assertEqual(1, self.fetch_mock.call_count)
+        master_path = os.path.join(self.master_dir, self.uuid)
+        self.assertEqual(6, os.stat(master_path).st_nlink)
+        mock_counter.assert_any_call('ImageCache.cache_fetch_wait', 1)
+        self.assertEqual({}, image_cache._downloads)
+
+    def test_fetch_image_failure(self):
+        self.failures = 2
+
+        results = self._fetch_concurrently(3)
+
+        self.assertEqual(2, self.fetch_mock.call_count)
+        for result in results:
+            self.assertIsInstance(result, exception.ImageDownloadFailed)
+        self.assertEqual({}, image_cache._downloads)
+        # NOTE: the failure is not remembered by the next requests
+        self.assertTrue(self.cache.fetch_image(
+            self.uuid, os.path.join(self.dest_dir, 'next')))
+
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    def test_fetch_image_retry(self, mock_counter):
+        self.failures = 1
+
+        results = self._fetch_concurrently(3)
+
+        self.assertEqual([True, False, False], results)
+        self.assertEqual(2, self.fetch_mock.call_count)
+        mock_counter.assert_any_call('ImageCache.cache_download_retry', 1)
+
+    def test_fetch_image_no_retry(self):
+        self.config(image_cache_download_attempts=1, group='pxe')
+        self.failures = 1
+
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self.cache.fetch_image, self.uuid,
+                          os.path.join(self.dest_dir, 'dest'))
+        self.assertEqual(1, self.fetch_mock.call_count)
+
+    def test_fetch_image_not_found(self):
+        def _fake_fetch(ctx, href, tmp_path, *args, **kwargs):
+            eventlet.sleep(0.1)
+            raise exception.ImageNotFound(image_id=href)
+
+        self.fetch_mock.side_effect = _fake_fetch
+
+        results = self._fetch_concurrently(2)
+
+        self.assertEqual(1, self.fetch_mock.call_count)
+        for result in results:
+            self.assertIsInstance(result, exception.ImageNotFound)
+
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    @mock.patch.object(image_cache.LOG, 'info', autospec=True)
+    def test_report_progress(self, mock_log, mock_counter):
+        download = image_cache._Download(self.uuid)
+        download.tmp_dir = tempfile.mkdtemp(dir=self.master_dir)
+        with open(os.path.join(download.tmp_dir, 'image.part'), 'wb') as fp:
+            fp.write(b'x' * 8192)
+        download.last_report -= image_cache._DOWNLOAD_PROGRESS_INTERVAL
+
+        self.cache._report_progress(download)
+        # NOTE: reported once per interval
+        self.cache._report_progress(download)
+
+        self.assertEqual(1, mock_log.call_count)
+        written = download.written()
+        self.assertGreaterEqual(written, 8192)
+        self.assertEqual(written, download.reported)
+        mock_counter.assert_called_once_with(
+            'ImageCache.cache_download_progress_bytes', written)
+
+    @mock.patch.object(image_cache.ImageCache, '_report_progress',
+                       autospec=True)
+    def test__wait_for_download(self, mock_report):
+        download = image_cache._Download(self.uuid)
+        eventlet.spawn_after(0.05, download.finish)
+        self.useFixture(fixtures.MockPatchObject(
+            image_cache, '_DOWNLOAD_PROGRESS_INTERVAL', 0.01))
+
+        self.cache._wait_for_download(download)
+
+        self.assertTrue(mock_report.called)
+        self.assertEqual(0, download.waiters)
+
+
+class TestImageCacheBuild(base.TestCase):
+
+    def setUp(self):
+        super(TestImageCacheBuild, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.cache = image_cache.ImageCache(self.master_dir, 100, 600)
+        self.dest_dir = tempfile.mkdtemp()
+        self.dest_path = os.path.join(self.dest_dir, 'dest')
+        self.build = mock.Mock(side_effect=self._fake_build)
+
+    def _fake_build(self, path):
+        with open(path, 'w') as fp:
+            fp.write('TEST')
+
+    @mock.patch.object(image_cache.ImageCache, 'clean_up', autospec=True)
+    def test_build_image(self, mock_clean_up):
+        self.assertTrue(self.cache.build_image('key', self.dest_path,
+                                               self.build))
+
+        self.build.assert_called_once_with(mock.ANY)
+        master_path = os.path.join(self.master_dir, 'key')
+        self.assertEqual(os.stat(master_path).st_ino,
+                         os.stat(self.dest_path).st_ino)
+        self.assertEqual(4, self.cache._index.total_size())
+        mock_clean_up.assert_called_once_with(self.cache)
+
+    def test_build_image_cached(self):
+        other_path = os.path.join(self.dest_dir, 'other')
+        self.cache.build_image('key', other_path, self.build)
+        self.build.reset_mock()
+
+        self.assertFalse(self.cache.build_image('key', self.dest_path,
+                                                self.build))
+        self.assertFalse(self.build.called)
+        self.assertEqual(os.stat(other_path).st_ino,
+                         os.stat(self.dest_path).st_ino)
+        # NOTE: the destination is up to date
+        self.assertFalse(self.cache.build_image('key', self.dest_path,
+                                                self.build))
+
+    def test_build_image_stale_dest(self):
+        touch(self.dest_path)
+        self.assertTrue(self.cache.build_image('key', self.dest_path,
+                                               self.build))
+        with open(self.dest_path) as fp:
+            self.assertEqual('TEST', fp.read())
+
+    def test_build_image_no_master_dir(self):
+        self.cache.master_dir = None
+        self.assertTrue(self.cache.build_image('key', self.dest_path,
+                                               self.build))
+        self.build.assert_called_once_with(self.dest_path)
+
+    def test_build_image_failure(self):
+        self.build.side_effect = exception.ImageCreationFailed(
+            image_type='iso', error='boom')
+        self.assertRaises(exception.ImageCreationFailed,
+                          self.cache.build_image, 'key', self.dest_path,
+                          self.build)
+        self.assertFalse(os.path.exists(self.dest_path))
+        self.assertEqual([], os.listdir(self.master_dir))
+
+
+class TestWarmCaches(base.TestCase):
+
+    def setUp(self):
+        super(TestWarmCaches, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.uuid = uuidutils.generate_uuid()
+        master_dir = self.master_dir
+
+        class InstanceCache(image_cache.ImageCache):
+            warm_keys = ('image_source',)
+
+            def __init__(self):
+                super(InstanceCache, self).__init__(master_dir, 100, 600)
+
+        class BootCache(image_cache.ImageCache):
+            warm_keys = ('deploy_kernel', 'deploy_ramdisk')
+
+            def __init__(self):
+                super(BootCache, self).__init__(None, 100, 600)
+
+        self.useFixture(fixtures.MockPatchObject(
+            image_cache, '_cache_cleanup_list',
+            [(50, InstanceCache), (25, BootCache)]))
+
+    @mock.patch.object(image_cache, '_fetch', autospec=True)
+    def test_warm(self, mock_fetch):
+        def _fake_fetch(ctx, uuid, tmp_path, *args):
+            with open(tmp_path, 'w') as fp:
+                fp.write("TEST")
+
+        mock_fetch.side_effect = _fake_fetch
+        cache = image_cache.ImageCache(self.master_dir, 100, 600)
+
+        self.assertTrue(cache.warm(self.uuid))
+        self.assertFalse(cache.warm(self.uuid))
+
+        self.assertEqual(1, mock_fetch.call_count)
+        self.assertEqual(sorted([self.uuid, image_cache._INDEX_FILE_NAME]),
+                         sorted(os.listdir(self.master_dir)))
+
+    def test_most_used_images(self):
+        nodes_info = [
+            {'image_source': 'a', 'deploy_kernel': 'k', 'other': 'x'},
+            {'image_source': 'b', 'deploy_kernel': 'k'},
+            {'image_source': 'b', 'deploy_ramdisk': 'r'},
+            {'image_source': 'c'},
+            {'image_source': None},
+        ]
+        self.assertEqual([('deploy_kernel', 'k'), ('deploy_ramdisk', 'r'),
+                          ('image_source', 'b'), ('image_source', 'a')],
+                         image_cache.most_used_images(nodes_info, 2))
+
+    @mock.patch.object(image_cache.ImageCache, 'warm', autospec=True)
+    def test_warm_caches(self, mock_warm):
+        self.config(force_raw_images=False)
+        mock_warm.side_effect = [True, False, RuntimeError('boom')]
+
+        results = image_cache.warm_caches(
+            'context', [('image_source', 'a'), ('deploy_kernel', 'k'),
+                        ('image_source', 'b'), ('image_source', 'c')])
+
+        self.assertEqual([
+            {'href': 'a', 'cache': 'InstanceCache', 'status': 'downloaded',
+             'error': None},
+            {'href': 'b', 'cache': 'InstanceCache', 'status': 'cached',
+             'error': None},
+            {'href': 'c', 'cache': 'InstanceCache', 'status': 'failed',
+             'error': 'boom'}], results)
+        mock_warm.assert_has_calls([
+            mock.call(mock.ANY, href, ctx='context', force_raw=False)
+            for href in ('a', 'b', 'c')])
+
+
+class TestImageCacheContentAddressed(base.TestCase):
+
+    def setUp(self):
+        super(TestImageCacheContentAddressed, self).setUp()
+        self.config(image_cache_content_addressed=True, group='pxe')
+        self.master_dir = tempfile.mkdtemp()
+        self.cache = image_cache.ImageCache(self.master_dir, 100, 600)
+        self.dest_dir = tempfile.mkdtemp()
+        self.dest_path = os.path.join(self.dest_dir, 'dest')
+        self.uuid = uuidutils.generate_uuid()
+        self.images = {}
+        self.fetch_mock = self.useFixture(fixtures.MockPatchObject(
+            image_cache, '_fetch', autospec=True,
+            side_effect=self._fake_fetch)).mock
+
+    def _fake_fetch(self, ctx, href, tmp_path, force_raw, hash_algo=None):
+        self.assertEqual('sha256', hash_algo)
+        with open(tmp_path, 'wb') as fp:
+            fp.write(self.images[href])
+        return hashlib.sha256(self.images[href]).hexdigest()
+
+    def _alias(self, href):
+        return os.path.join(self.master_dir, image_cache._ALIAS_DIR_NAME,
+                            href)
+
+    def _read(self, path):
+        with open(path, 'rb') as fp:
+            return fp.read()
+
+    @mock.patch.object(image_cache.METRICS, 'send_gauge', autospec=True)
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    def test_fetch_image(self, mock_counter, mock_gauge):
+        self.images[self.uuid] = b'TEST'
+        digest = hashlib.sha256(b'TEST').hexdigest()
+        master_path = os.path.join(self.master_dir, digest)
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+
+        self.assertEqual(os.stat(self.dest_path).st_ino,
+                         os.stat(master_path).st_ino)
+        self.assertEqual(digest.encode(), self._read(self._alias(self.uuid)))
+        self.assertEqual([self.uuid], self.cache._index.aliases(digest))
+        self.assertEqual([(digest, 4)],
+                         [entry[:2] for entry in self.cache._index.oldest()])
+        mock_counter.assert_called_once_with('ImageCache.cache_miss', 1)
+        mock_gauge.assert_called_once_with('ImageCache.dedupe_ratio', 1.0)
+
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    def test_fetch_image_alias_hit(self, mock_counter):
+        self.images[self.uuid] = b'TEST'
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        mock_counter.reset_mock()
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        os.unlink(self.dest_path)
+        self.cache.fetch_image(self.uuid, self.dest_path)
+
+        self.assertEqual(1, self.fetch_mock.call_count)
+        self.assertEqual(b'TEST', self._read(self.dest_path))
+        self.assertEqual([mock.call('ImageCache.cache_hit', 1)] * 2,
+                         mock_counter.call_args_list)
+
+    @mock.patch.object(image_cache.METRICS, 'send_gauge', autospec=True)
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    def test_fetch_image_deduplicated(self, mock_counter, mock_gauge):
+        other_uuid = uuidutils.generate_uuid()
+        other_dest_path = os.path.join(self.dest_dir, 'other')
+        self.images[self.uuid] = self.images[other_uuid] = b'TEST'
+        digest = hashlib.sha256(b'TEST').hexdigest()
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        mock_counter.reset_mock()
+        mock_gauge.reset_mock()
+        self.cache.fetch_image(other_uuid, other_dest_path)
+
+        self.assertEqual(os.stat(self.dest_path).st_ino,
+                         os.stat(other_dest_path).st_ino)
+        self.assertEqual(sorted([digest, image_cache._ALIAS_DIR_NAME,
+                                 image_cache._INDEX_FILE_NAME]),
+                         sorted(os.listdir(self.master_dir)))
+        self.assertEqual(sorted([self.uuid, other_uuid]),
+                         sorted(self.cache._index.aliases(digest)))
+        self.assertEqual((8, 4), self.cache._index.aliased_size())
+        mock_counter.assert_has_calls([
+            mock.call('ImageCache.cache_miss', 1),
+            mock.call('ImageCache.cache_dedupe_hit', 1),
+            mock.call('ImageCache.cache_deduplicated_bytes', 4)])
+        mock_gauge.assert_called_once_with('ImageCache.dedupe_ratio', 2.0)
+
+    @mock.patch.object(image_cache, '_delete_master_path_if_stale',
+                       autospec=True)
+    def test_fetch_image_alias_stale(self, mock_cache_upd):
+        href = 'http://127.0.0.1/image'
+        self.images[href] = b'OLD'
+        self.cache.fetch_image(href, self.dest_path)
+        alias = os.listdir(os.path.join(self.master_dir,
+                                        image_cache._ALIAS_DIR_NAME))[0]
+        mock_cache_upd.return_value = False
+        self.images[href] = b'NEW'
+
+        self.cache.fetch_image(href, self.dest_path)
+
+        mock_cache_upd.assert_called_once_with(self._alias(alias), href,
+                                               None)
+        self.assertEqual(2, self.fetch_mock.call_count)
+        self.assertEqual(b'NEW', self._read(self.dest_path))
+        self.assertEqual(hashlib.sha256(b'NEW').hexdigest().encode(),
+                         self._read(self._alias(alias)))
+
+    def test_fetch_image_evicted(self):
+        self.images[self.uuid] = b'TEST'
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        os.unlink(self.dest_path)
+        os.unlink(os.path.join(self.master_dir,
+                               hashlib.sha256(b'TEST').hexdigest()))
+
+        self.cache.fetch_image(self.uuid, self.dest_path)
+
+        self.assertEqual(2, self.fetch_mock.call_count)
+        self.assertEqual(b'TEST', self._read(self.dest_path))
+
+    def test_clean_up_deletes_aliases(self):
+        self.images[self.uuid] = b'TEST'
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        os.unlink(self.dest_path)
+        digest = hashlib.sha256(b'TEST').hexdigest()
+
+        self.cache.clean_up(amount=1)
+
+        self.assertFalse(os.path.exists(os.path.join(self.master_dir,
+                                                     digest)))
+        self.assertFalse(os.path.exists(self._alias(self.uuid)))
+        self.assertEqual([], self.cache._index.aliases(digest))
+
+    @mock.patch.object(lockutils, 'external_lock', autospec=True)
+    def test_shared_lock(self, mock_lock):
+        self.images[self.uuid] = b'TEST'
+        self.cache.fetch_image(self.uuid, self.dest_path)
+        self.assertFalse(mock_lock.called)
+
+        self.config(image_cache_shared=True, group='pxe')
+        os.unlink(self.dest_path)
+        self.cache.fetch_image(self.uuid, self.dest_path)
+
+        lock_path = os.path.join(self.master_dir, image_cache._LOCK_DIR_NAME)
+        mock_lock.assert_has_calls([
+            mock.call('download-image-%s' % self.uuid, lock_path=lock_path),
+            mock.call('master_image', lock_path=lock_path)], any_order=True)
+
+    def test_link_another_file_system(self):
+        self.images[self.uuid] = b'TEST'
+        link = os.link
+
+        def _link(src, dst):
+            if dst == self.dest_path:
+                raise OSError(errno.EXDEV, 'Invalid cross-device link')
+            link(src, dst)
+
+        with mock.patch.object(os, 'link', autospec=True, side_effect=_link):
+            self.cache.fetch_image(self.uuid, self.dest_path)
+
+        self.assertEqual(b'TEST', self._read(self.dest_path))
+        self.assertEqual(1, os.stat(self.dest_path).st_nlink)
+
+        # the copy is up to date, it is neither deleted nor copied again
+        with mock.patch.object(os, 'link', autospec=True,
+                               side_effect=_link), \
+                mock.patch.object(shutil, 'copyfile', autospec=True,
+                                  side_effect=shutil.copyfile) as mock_cp:
+            self.cache.fetch_image(self.uuid, self.dest_path)
+        self.assertFalse(mock_cp.called)
+        self.assertEqual(b'TEST', self._read(self.dest_path))
+
+
+class TestMasterImageIndex(base.TestCase):
+
+    def setUp(self):
+        super(TestMasterImageIndex, self).setUp()
+        self.master_dir = tempfile.mkdtemp()
+        self.eviction_policy = image_cache.LRUEvictionPolicy()
+
+    def _write(self, file_name, data, last_used=None):
+        path = os.path.join(self.master_dir, file_name)
+        with open(path, 'w') as fp:
+            fp.write(data)
+        if last_used is not None:
+            os.utime(path, (last_used, last_used))
+        return path
+
+    def _open(self):
+        return image_cache._MasterImageIndex(self.master_dir,
+                                             self.eviction_policy)
+
+    def _names(self, index, **kwargs):
+        return [entry[0] for entry in index.oldest(**kwargs)]
+
+    def test_reconcile(self):
+        future = time.time() + 1000
+        self._write('old', '1', last_used=future)
+        self._write('new', '123', last_used=future + 100)
+        os.mkdir(os.path.join(self.master_dir, 'tmpdir'))
+        self._write('.hidden', '12345')
+
+        index = self._open()
+
+        self.assertEqual([('old', 1, future), ('new', 3, future + 100)],
+                         list(index.oldest()))
+        self.assertEqual(4, index.total_size())
+
+        os.unlink(os.path.join(self.master_dir, 'old'))
+        self._write('other', '12')
+        index.reconcile()
+        self.assertEqual(['other', 'new'], self._names(index))
+        self.assertEqual(5, index.total_size())
+
+    def test_persistent(self):
+        index = self._open()
+        index.add('image', 42)
+        self._write('image', '')
+
+        index = self._open()
+        self.assertEqual([('image', 42)],
+                         [entry[:2] for entry in index.oldest()])
+        self.assertEqual(42, index.total_size())
+
+    def test_add_touch_remove(self):
+        index = self._open()
+        with mock.patch.object(time, 'time', lambda: 100):
+            index.add('a', 10)
+        with mock.patch.object(time, 'time', lambda: 200):
+            index.add('b', 20)
+        self.assertEqual(['a', 'b'], self._names(index))
+        self.assertEqual(30, index.total_size())
+
+        with mock.patch.object(time, 'time', lambda: 300):
+            index.touch('a')
+        self.assertEqual(['b', 'a'], self._names(index))
+        self.assertEqual(['b'], self._names(index, used_before=300))
+
+        with mock.patch.object(time, 'time', lambda: 400):
+            index.add('b', 5)
+        self.assertEqual(['a', 'b'], self._names(index))
+        self.assertEqual(15, index.total_size())
+
+        index.remove('a')
+        self.assertEqual(['b'], self._names(index))
+        self.assertEqual(5, index.total_size())
+
+    @mock.patch.object(image_cache, '_INDEX_BATCH_SIZE', 2)
+    def test_oldest_remove_while_iterating(self):
+        index = self._open()
+        for i in range(5):
+            with mock.patch.object(time, 'time', lambda: 100 + i):
+                index.add(str(i), 1)
+
+        seen = []
+        for name, size, last_used in index.oldest():
+            seen.append(name)
+            index.remove(name)
+
+        self.assertEqual(['0', '1', '2', '3', '4'], seen)
+        self.assertEqual(0, index.total_size())
+
+    def test_corrupted(self):
+        self._write(image_cache._INDEX_FILE_NAME, 'garbage' * 1000)
+        self._write('image', '123')
+
+        index = self._open()
+
+        self.assertEqual(['image'], self._names(index))
+        self.assertEqual(3, index.total_size())
+
+    def test_get_index(self):
+        index = image_cache._get_index(self.master_dir, self.eviction_policy)
+        self.assertIsInstance(index, image_cache._MasterImageIndex)
+        self.assertIs(index, image_cache._get_index(self.master_dir,
+                                                    self.eviction_policy))
+        self.assertIs(self.eviction_policy, index.policy)
+
+    def test_shared(self):
+        self._write('image', '123')
+        index = image_cache._MasterImageIndex(
+            self.master_dir, self.eviction_policy, shared=True)
+        self.assertEqual(['image'], self._names(index))
+        index.add('other', 42)
+        self.assertEqual(45, index.total_size())
+        self.assertEqual(['image'], os.listdir(self.master_dir))
+
+    def test_get_index_shared(self):
+        index = image_cache._get_index(self.master_dir, self.eviction_policy)
+        self.assertFalse(index.shared)
+        self.config(image_cache_shared=True, group='pxe')
+        shared = image_cache._get_index(self.master_dir, self.eviction_policy)
+        self.assertTrue(shared.shared)
+        self.assertIsNot(index, shared)
+        self.assertIs(shared, image_cache._get_index(self.master_dir,
+                                                     self.eviction_policy))
+
+    def test_get_index_policy_changed(self):
+        index = image_cache._get_index(self.master_dir, self.eviction_policy)
+        policy = image_cache.GreedyDualSizeEvictionPolicy()
+        self.assertIs(index, image_cache._get_index(self.master_dir, policy))
+        self.assertIs(policy, index.policy)
+
+    def test_old_schema(self):
+        conn = sqlite3.connect(os.path.join(self.master_dir,
+                                            image_cache._INDEX_FILE_NAME))
+        with conn:
+            conn.execute('CREATE TABLE images (name TEXT PRIMARY KEY, '
+                         'size INTEGER NOT NULL, last_used REAL NOT NULL)')
+            conn.execute("INSERT INTO images VALUES ('gone', 1, 1)")
+        conn.close()
+        self._write('image', '123', last_used=1000)
+
+        index = self._open()
+
+        self.assertEqual([('image', 3)],
+                         [entry[:2] for entry in index.lowest_priority()])
+        self.assertEqual(3, index.total_size())
+
+    def _priorities(self, index):
+        return [(name, priority)
+                for name, size, priority in index.lowest_priority()]
+
+    def test_set_policy(self):
+        self._write('big', '')
+        self._write('small', '')
+        index = self._open()
+        with mock.patch.object(time, 'time', lambda: 100):
+            index.add('big', 4 * units.Mi)
+        with mock.patch.object(time, 'time', lambda: 200):
+            index.add('small', units.Mi)
+            index.touch('small')
+        self.assertEqual([('big', 100), ('small', 200)],
+                         self._priorities(index))
+
+        index.set_policy(image_cache.GreedyDualSizeEvictionPolicy())
+
+        self.assertEqual([('big', 0.25), ('small', 2)],
+                         self._priorities(index))
+        index = image_cache._MasterImageIndex(
+            self.master_dir, image_cache.GreedyDualSizeEvictionPolicy())
+        self.assertEqual([('big', 0.25), ('small', 2)],
+                         self._priorities(index))
+
+    def test_evict(self):
+        index = image_cache._MasterImageIndex(
+            self.master_dir, image_cache.GreedyDualSizeEvictionPolicy())
+        index.add('a', 4 * units.Mi)
+        index.add('b', units.Mi)
+        index.add('c', units.Mi)
+
+        index.evict('a')
+        index.remove('b')
+        index.evict('missing')
+        index.touch('c')
+
+        self.assertEqual([('c', 2.25)], self._priorities(index))
+        self.assertEqual(units.Mi, index.total_size())
+        index.add('d', units.Mi)
+        self.assertEqual([('d', 1.25), ('c', 2.25)],
+                         self._priorities(index))
+
+    def test_aliases(self):
+        index = self._open()
+        index.add('a', 10)
+        index.add('b', 20)
+        index.add_alias('x', 'a')
+        index.add_alias('y', 'a')
+        index.add_alias('z', 'b')
+        self.assertEqual(['x', 'y'], sorted(index.aliases('a')))
+        self.assertEqual((40, 30), index.aliased_size())
+
+        index.add_alias('y', 'b')
+        index.remove_alias('z')
+        self.assertEqual(['x'], index.aliases('a'))
+        self.assertEqual(['y'], index.aliases('b'))
+
+        index.evict('a')
+        self.assertEqual([], index.aliases('a'))
+        self.assertEqual((20, 20), index.aliased_size())
+
+    def test_reconcile_aliases(self):
+        alias_dir = os.path.join(self.master_dir, image_cache._ALIAS_DIR_NAME)
+        os.mkdir(alias_dir)
+        self._write('image', '123')
+        for alias, image in (('x', 'image'), ('y', 'gone'),
+                             ('.tmp', 'image')):
+            with open(os.path.join(alias_dir, alias), 'w') as fp:
+                fp.write(image)
+
+        index = self._open()
+
+        self.assertEqual(['x'], index.aliases('image'))
+        self.assertEqual([], index.aliases('gone'))
+        self.assertEqual(['.tmp', 'x'], sorted(os.listdir(alias_dir)))
+        self.assertEqual((3, 3), index.aliased_size())
+
+    @mock.patch.object(image_cache, '_INDEX_BATCH_SIZE', 2)
+    def test_lowest_priority_remove_while_iterating(self):
+        index = image_cache._MasterImageIndex(
+            self.master_dir, image_cache.GreedyDualSizeEvictionPolicy())
+        for i in range(5):
+            index.add(str(i), (5 - i) * units.Mi)
+
+        seen = []
+        for name, size, priority in index.lowest_priority():
+            seen.append(name)
+            index.evict(name)
+
+        self.assertEqual(['0', '1', '2', '3', '4'], seen)
+        self.assertEqual(0, index.total_size())
+
+
+class TestEvictionPolicies(base.TestCase):
+
+    def test_lru(self):
+        policy = image_cache.LRUEvictionPolicy()
+        self.assertEqual(100, policy.priority(units.Mi, 1, 100, None, 0))
+        self.assertEqual(200, policy.priority(units.Mi, 5, 200, 100, 0))
+
+    def test_lfu(self):
+        self.config(image_cache_lfu_half_life=1, group='pxe')
+        policy = image_cache.LFUEvictionPolicy()
+        self.assertEqual(2, policy.priority(units.Mi, 1, 120, None, 0))
+        self.assertEqual(4, policy.priority(units.Mi, 4, 120, None, 0))
+        # Two uses at the same time count twice
+        self.assertAlmostEqual(3, policy.priority(units.Mi, 2, 120, 2, 0))
+        # A use one half-life ago counts half as much
+        self.assertAlmostEqual(math.log(3, 2),
+                               policy.priority(units.Mi, 2, 60, 0, 0))
+
+    def test_lfu_decay(self):
+        self.config(image_cache_lfu_half_life=60, group='pxe')
+        policy = image_cache.LFUEvictionPolicy()
+        # Used 4 times a day ago, or once now
+        old = None
+        for uses in range(1, 5):
+            old = policy.priority(units.Mi, uses, 0, old, 0)
+        recent = policy.priority(units.Mi, 1, 86400, None, 0)
+        self.assertGreater(recent, old)
+        # Used 4 times an hour ago, or once now
+        recent = policy.priority(units.Mi, 1, 3600, None, 0)
+        self.assertLess(recent, old)
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, image_cache.EvictionPolicy)
+
+    def test_greedy_dual_size(self):
+        policy = image_cache.GreedyDualSizeEvictionPolicy()
+        self.assertEqual(0.5, policy.priority(2 * units.Mi, 1, 100, None, 0))
+        self.assertEqual(3.5, policy.priority(2 * units.Mi, 3, 200, 0.5, 2))
+        self.assertEqual(units.Mi, policy.priority(0, 1, 100, None, 0))
 
 
 @mock.patch.object(os, 'unlink', autospec=True)
@@ -263,6 +1054,8 @@ class TestUpdateImages(base.TestCase):
     def test__delete_master_path_if_stale_out_of_date(self, mock_gis,
                                                       mock_unlink):
         touch(self.master_path)
+        index = image_cache._get_index(self.master_dir,
+                                       image_cache.LRUEvictionPolicy())
         href = 'http://awesomefreeimages.al/img999'
         mock_gis.return_value.show.return_value = {
             'updated_at': datetime.datetime((datetime.datetime.utcnow().year
@@ -273,6 +1066,7 @@ class TestUpdateImages(base.TestCase):
         mock_gis.assert_called_once_with(href, context=None)
         mock_unlink.assert_called_once_with(self.master_path)
         self.assertFalse(res)
+        self.assertEqual([], list(index.oldest()))
 
     def test__delete_dest_path_if_stale_no_dest(self, mock_unlink):
         res = image_cache._delete_dest_path_if_stale(self.master_path,
@@ -290,6 +1084,7 @@ class TestUpdateImages(base.TestCase):
     def test__delete_dest_path_if_stale_out_of_date(self, mock_unlink):
         touch(self.master_path)
         touch(self.dest_path)
+        os.utime(self.dest_path, (1000, 1000))
         res = image_cache._delete_dest_path_if_stale(self.master_path,
                                                      self.dest_path)
         mock_unlink.assert_called_once_with(self.dest_path)
@@ -303,6 +1098,30 @@ class TestUpdateImages(base.TestCase):
         self.assertFalse(mock_unlink.called)
         self.assertTrue(res)
 
+    def test__delete_dest_path_if_stale_copy_up_to_date(self, mock_unlink):
+        with open(self.master_path, 'w') as fp:
+            fp.write('image')
+        with mock.patch.object(os, 'link', autospec=True,
+                               side_effect=OSError(errno.EXDEV, 'EXDEV')):
+            image_cache._link(self.master_path, self.dest_path)
+        res = image_cache._delete_dest_path_if_stale(self.master_path,
+                                                     self.dest_path)
+        self.assertFalse(mock_unlink.called)
+        self.assertTrue(res)
+
+    def test__delete_dest_path_if_stale_copy_out_of_date(self, mock_unlink):
+        with open(self.master_path, 'w') as fp:
+            fp.write('image')
+        with mock.patch.object(os, 'link', autospec=True,
+                               side_effect=OSError(errno.EXDEV, 'EXDEV')):
+            image_cache._link(self.master_path, self.dest_path)
+        # NOTE: the image downloaded again
+        os.utime(self.master_path, (1000, 1000))
+        res = image_cache._delete_dest_path_if_stale(self.master_path,
+                                                     self.dest_path)
+        mock_unlink.assert_called_once_with(self.dest_path)
+        self.assertFalse(res)
+
 
 class TestImageCacheCleanUp(base.TestCase):
 
@@ -328,13 +1147,13 @@ class TestImageCacheCleanUp(base.TestCase):
             self.cache.clean_up()
 
         mock_clean_size.assert_called_once_with(self.cache, mock.ANY, None)
-        survived = mock_clean_size.call_args[0][1]
+        self.assertTrue(os.path.exists(files[0]))
+        self.assertFalse(os.path.exists(files[1]))
+        survived = list(self.cache._index.oldest())
         self.assertEqual(1, len(survived))
-        self.assertEqual(files[0], survived[0][0])
+        self.assertEqual('0', survived[0][0])
         # NOTE(dtantsur): do not compare milliseconds
-        self.assertEqual(int(new_current_time - 100), int(survived[0][1]))
-        self.assertEqual(int(new_current_time - 100),
-                         int(survived[0][2].st_mtime))
+        self.assertEqual(int(new_current_time - 100), int(survived[0][2]))
 
     @mock.patch.object(image_cache.ImageCache, '_clean_up_ensure_cache_size',
                        autospec=True)
@@ -369,12 +1188,12 @@ class TestImageCacheCleanUp(base.TestCase):
 
         for filename in files:
             self.assertTrue(os.path.exists(filename))
-        mock_clean_size.assert_called_once_with(mock.ANY, [], None)
+        mock_clean_size.assert_called_once_with(mock.ANY, mock.ANY, None)
 
     @mock.patch.object(image_cache.ImageCache, '_clean_up_too_old',
                        autospec=True)
     def test_clean_up_ensure_cache_size(self, mock_clean_ttl):
-        mock_clean_ttl.side_effect = lambda *xx: xx[1:]
+        mock_clean_ttl.side_effect = lambda self, trash_dir, amount: amount
         # NOTE(dtantsur): Cache size in test is 10 bytes, we create 6 files
         # with 3 bytes each and expect 3 to be deleted
         files = [os.path.join(self.master_dir, str(i))
@@ -401,7 +1220,7 @@ class TestImageCacheCleanUp(base.TestCase):
     @mock.patch.object(image_cache.ImageCache, '_clean_up_too_old',
                        autospec=True)
     def test_clean_up_ensure_cache_size_with_amount(self, mock_clean_ttl):
-        mock_clean_ttl.side_effect = lambda *xx: xx[1:]
+        mock_clean_ttl.side_effect = lambda self, trash_dir, amount: amount
         # NOTE(dtantsur): Cache size in test is 10 bytes, we create 6 files
         # with 3 bytes each and set amount to be 15, 5 files are to be deleted
         files = [os.path.join(self.master_dir, str(i))
@@ -427,7 +1246,7 @@ class TestImageCacheCleanUp(base.TestCase):
     @mock.patch.object(image_cache.ImageCache, '_clean_up_too_old',
                        autospec=True)
     def test_clean_up_cache_still_large(self, mock_clean_ttl, mock_log):
-        mock_clean_ttl.side_effect = lambda *xx: xx[1:]
+        mock_clean_ttl.side_effect = lambda self, trash_dir, amount: amount
         # NOTE(dtantsur): Cache size in test is 10 bytes, we create 2 files
         # than cannot be deleted and expected this to be logged
         files = [os.path.join(self.master_dir, str(i))
@@ -444,6 +1263,92 @@ class TestImageCacheCleanUp(base.TestCase):
         self.assertTrue(mock_log.called)
         mock_clean_ttl.assert_called_once_with(mock.ANY, mock.ANY, None)
 
+    def test_clean_up_uses_index(self):
+        files = [os.path.join(self.master_dir, str(i))
+                 for i in range(6)]
+        for filename in files:
+            with open(filename, 'w') as fp:
+                fp.write('123')
+        self.cache.clean_up()
+        self.assertEqual(9, self.cache._index.total_size())
+
+        with mock.patch.object(os, 'listdir', autospec=True,
+                               side_effect=os.listdir) as mock_listdir:
+            self.cache.clean_up(amount=3)
+
+        self.assertNotIn(mock.call(self.master_dir),
+                         mock_listdir.call_args_list)
+        self.assertEqual(6, self.cache._index.total_size())
+        self.assertEqual(2, sum(os.path.exists(f) for f in files))
+
+    def test_clean_up_shared_reconciles(self):
+        self.config(image_cache_shared=True, group='pxe')
+        self.cache.clean_up()
+        # NOTE: added by another conductor
+        with open(os.path.join(self.master_dir, 'other'), 'w') as fp:
+            fp.write('12345678901')
+
+        self.cache.clean_up()
+
+        self.assertFalse(os.path.exists(os.path.join(self.master_dir,
+                                                     'other')))
+        self.assertEqual(0, self.cache._index.total_size())
+        self.assertNotIn(image_cache._INDEX_FILE_NAME,
+                         os.listdir(self.master_dir))
+
+    @mock.patch.object(image_cache.METRICS, 'send_counter', autospec=True)
+    def test_clean_up_counters(self, mock_counter):
+        for i in range(2):
+            with open(os.path.join(self.master_dir, str(i)), 'w') as fp:
+                fp.write('123456')
+
+        self.cache.clean_up()
+
+        mock_counter.assert_has_calls(
+            [mock.call('ImageCache.cache_eviction', 1),
+             mock.call('ImageCache.cache_evicted_bytes', 6)])
+
+    def test_clean_up_greedy_dual_size(self):
+        # NOTE: the small image is used at every deployment, the large one
+        # was used once, after the last use of the small one
+        cache = image_cache.ImageCache(self.master_dir, cache_size=10,
+                                       cache_ttl=600,
+                                       eviction_policy='greedy-dual-size')
+        small = os.path.join(self.master_dir, 'small')
+        large = os.path.join(self.master_dir, 'large')
+        with open(small, 'w') as fp:
+            fp.write('123')
+        cache._index.add('small', 3)
+        cache._index.touch('small')
+        with open(large, 'w') as fp:
+            fp.write('1234567')
+        cache._index.add('large', 7)
+        with open(os.path.join(self.master_dir, 'other'), 'w') as fp:
+            fp.write('12')
+        cache._index.add('other', 2)
+
+        cache.clean_up()
+
+        self.assertTrue(os.path.exists(small))
+        self.assertFalse(os.path.exists(large))
+        self.assertEqual(5, cache._index.total_size())
+
+    def test_clean_up_file_deleted(self):
+        files = [os.path.join(self.master_dir, str(i))
+                 for i in range(2)]
+        for filename in files:
+            with open(filename, 'w') as fp:
+                fp.write('123456')
+        os.utime(files[0], (1000, 1000))
+        self.assertEqual(12, self.cache._index.total_size())
+        os.unlink(files[0])
+
+        self.cache.clean_up()
+
+        self.assertFalse(os.path.exists(files[1]))
+        self.assertEqual([], list(self.cache._index.oldest()))
+        self.assertEqual(0, self.cache._index.total_size())
+
     @mock.patch.object(utils, 'rmtree_without_raise', autospec=True)
     @mock.patch.object(image_cache, '_fetch', autospec=True)
     def test_temp_images_not_cleaned(self, mock_fetch, mock_rmtree):
@@ -477,8 +1382,8 @@ class TestImageCacheCleanUp(base.TestCase):
                        autospec=True)
     def test_clean_up_amount_not_satisfied(self, mock_clean_size,
                                            mock_clean_ttl, mock_log):
-        mock_clean_ttl.side_effect = lambda *xx: xx[1:]
-        mock_clean_size.side_effect = lambda self, listing, amount: amount
+        mock_clean_ttl.side_effect = lambda self, trash_dir, amount: amount
+        mock_clean_size.side_effect = lambda self, trash_dir, amount: amount
         self.cache.clean_up(amount=15)
         self.assertTrue(mock_log.called)
 
@@ -689,10 +1594,48 @@ class TestFetchCleanup(base.TestCase):
     @mock.patch.object(images, 'image_to_raw', autospec=True)
     @mock.patch.object(image_cache, '_clean_up_caches', autospec=True)
     def test__fetch(self, mock_clean, mock_raw, mock_fetch, mock_size):
+        mock_fetch.return_value = ('qcow2', None)
         mock_size.return_value = 100
-        image_cache._fetch('fake', 'fake-uuid', '/foo/bar', force_raw=True)
+        self.assertIsNone(image_cache._fetch('fake', 'fake-uuid', '/foo/bar',
+                                             force_raw=True))
         mock_fetch.assert_called_once_with('fake', 'fake-uuid',
-                                           '/foo/bar.part', force_raw=False)
+                                           '/foo/bar.part', force_raw=False,
+                                           checksum=None, hash_algo=None)
         mock_clean.assert_called_once_with('/foo', 100)
         mock_raw.assert_called_once_with('fake-uuid', '/foo/bar',
                                          '/foo/bar.part')
+
+    @mock.patch.object(os, 'rename', autospec=True)
+    @mock.patch.object(images, 'converted_size', autospec=True)
+    @mock.patch.object(images, 'fetch', autospec=True)
+    @mock.patch.object(images, 'image_to_raw', autospec=True)
+    @mock.patch.object(image_cache, '_clean_up_caches', autospec=True)
+    def test__fetch_raw(self, mock_clean, mock_raw, mock_fetch, mock_size,
+                        mock_rename):
+        mock_fetch.return_value = ('raw', 'checksum')
+        self.assertEqual('checksum',
+                         image_cache._fetch('fake', 'fake-uuid', '/foo/bar',
+                                            force_raw=True,
+                                            hash_algo='sha256'))
+        mock_fetch.assert_called_once_with('fake', 'fake-uuid',
+                                           '/foo/bar.part', force_raw=False,
+                                           checksum=None, hash_algo='sha256')
+        mock_rename.assert_called_once_with('/foo/bar.part', '/foo/bar')
+        self.assertFalse(mock_size.called)
+        self.assertFalse(mock_clean.called)
+        self.assertFalse(mock_raw.called)
+
+    @mock.patch.object(os, 'rename', autospec=True)
+    @mock.patch.object(images, 'image_show', autospec=True)
+    @mock.patch.object(images, 'fetch', autospec=True)
+    def test__fetch_glance_checksum(self, mock_fetch, mock_show,
+                                    mock_rename):
+        image_uuid = uuidutils.generate_uuid()
+        mock_show.return_value = {'checksum': 'md5-checksum'}
+        mock_fetch.return_value = ('raw', None)
+        image_cache._fetch('fake', image_uuid, '/foo/bar', force_raw=True)
+        mock_show.assert_called_once_with('fake', image_uuid)
+        mock_fetch.assert_called_once_with('fake', image_uuid,
+                                           '/foo/bar.part', force_raw=False,
+                                           checksum='md5-checksum',
+                                           hash_algo=None)
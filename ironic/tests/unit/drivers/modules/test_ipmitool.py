@@ -41,6 +41,7 @@ from ironic.common import states
 from ironic.common import utils
 from ironic.conductor import task_manager
 import ironic.conf
+from ironic.drivers.modules import console_proxy
 from ironic.drivers.modules import console_utils
 from ironic.drivers.modules import deploy_utils
 from ironic.drivers.modules import ipmitool as ipmi
@@ -2628,3 +2629,139 @@ class IPMIToolSocatDriverTestCase(IPMIToolDriverTestCase):
 
         self.assertEqual(expected, console_info)
         mock_get_url.assert_called_once_with(self.info['port'])
+
+
+@mock.patch.object(console_proxy, 'get_proxy', autospec=True)
+class IPMIToolProxyConsoleTestCase(db_base.DbTestCase):
+
+    def setUp(self):
+        super(IPMIToolProxyConsoleTestCase, self).setUp()
+        mgr_utils.mock_the_extension_manager(driver="fake_ipmitool")
+        self.node = obj_utils.create_test_node(self.context,
+                                               driver='fake_ipmitool',
+                                               driver_info=INFO_DICT)
+        self.info = ipmi._parse_driver_info(self.node)
+        with mock.patch.object(ipmi, '_constructor_checks', autospec=True):
+            self.console = ipmi.IPMIProxyConsole()
+
+    def test_get_properties(self, mock_get_proxy):
+        self.assertEqual(ipmi.COMMON_PROPERTIES,
+                         self.console.get_properties())
+
+    def test_validate(self, mock_get_proxy):
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.console.validate(task)
+
+    def test_validate_protocol_version_1_5(self, mock_get_proxy):
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            task.node.driver_info['ipmi_protocol_version'] = '1.5'
+            self.assertRaises(exception.InvalidParameterValue,
+                              self.console.validate, task)
+
+    def test__get_ipmi_args(self, mock_get_proxy):
+        self.config(debug=False)
+        args = self.console._get_ipmi_args(self.info)
+        self.assertEqual(['ipmitool', '-H', self.info['address'],
+                          '-I', 'lanplus', '-L', 'ADMINISTRATOR',
+                          '-U', self.info['username'],
+                          '-E', 'sol', 'activate'], args)
+
+    def test__get_ipmi_args_port_priv_level(self, mock_get_proxy):
+        self.config(debug=False)
+        self.node.driver_info['ipmi_port'] = '1623'
+        self.node.driver_info['ipmi_priv_level'] = 'OPERATOR'
+        info = ipmi._parse_driver_info(self.node)
+        args = self.console._get_ipmi_args(info)
+        self.assertEqual(['ipmitool', '-H', info['address'],
+                          '-I', 'lanplus', '-L', 'OPERATOR', '-p', '1623',
+                          '-U', info['username'],
+                          '-E', 'sol', 'activate'], args)
+
+    def test__get_ipmi_args_without_user_with_bridging(self,
+                                                       mock_get_proxy):
+        self.config(debug=True)
+        node = obj_utils.get_test_node(self.context, driver='fake_ipmitool',
+                                       driver_info=BRIDGE_INFO_DICT)
+        with mock.patch.object(ipmi, '_is_option_supported', autospec=True):
+            info = ipmi._parse_driver_info(node)
+        info['username'] = None
+        args = self.console._get_ipmi_args(info)
+        self.assertEqual(['ipmitool', '-H', info['address'],
+                          '-I', 'lanplus', '-L', 'ADMINISTRATOR', '-E',
+                          '-m', info['local_address'],
+                          '-B', info['transit_channel'],
+                          '-T', info['transit_address'],
+                          '-b', info['target_channel'],
+                          '-t', info['target_address'],
+                          '-v', 'sol', 'activate'], args)
+
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test_start_console(self, mock_exec, mock_get_proxy):
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.console.start_console(task)
+
+        mock_exec.assert_called_once_with(self.info, 'sol deactivate',
+                                          check_exit_code=[0, 1])
+        mock_get_proxy.return_value.register.assert_called_once_with(
+            self.node.uuid, self.console._get_ipmi_args(self.info),
+            env=mock.ANY)
+        env = mock_get_proxy.return_value.register.call_args[1]['env']
+        self.assertEqual(self.info['password'], env['IPMI_PASSWORD'])
+        self.assertIn('PATH', env)
+
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test_start_console_deactivate_fails(self, mock_exec,
+                                            mock_get_proxy):
+        mock_exec.side_effect = OSError()
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.console.start_console(task)
+
+        self.assertTrue(mock_get_proxy.return_value.register.called)
+
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test_start_console_fails(self, mock_exec, mock_get_proxy):
+        mock_get_proxy.return_value.register.side_effect = (
+            exception.ConsoleSubprocessFailed(error='error'))
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.ConsoleSubprocessFailed,
+                              self.console.start_console, task)
+
+    @mock.patch.object(ipmi, '_exec_ipmitool', autospec=True)
+    def test_stop_console(self, mock_exec, mock_get_proxy):
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.console.stop_console(task)
+
+        mock_get_proxy.return_value.unregister.assert_called_once_with(
+            self.node.uuid)
+        mock_exec.assert_called_once_with(self.info, 'sol deactivate',
+                                          check_exit_code=[0, 1])
+
+    def test_get_console(self, mock_get_proxy):
+        proxy = mock_get_proxy.return_value
+        proxy.get_token.return_value = 'token'
+        proxy.get_url.return_value = 'tcp://192.0.2.1:6390'
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            console_info = self.console.get_console(task)
+
+        self.assertEqual({'type': 'proxy', 'url': 'tcp://192.0.2.1:6390',
+                          'token': 'token'}, console_info)
+        proxy.get_token.assert_called_once_with(self.node.uuid)
+
+    def test_get_console_not_served(self, mock_get_proxy):
+        mock_get_proxy.return_value.get_token.return_value = None
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertRaises(exception.ConsoleError,
+                              self.console.get_console, task)
+
+    def test_get_console_log(self, mock_get_proxy):
+        mock_get_proxy.return_value.get_log.return_value = [
+            memoryview(b'boot'), memoryview(b' log')]
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertEqual(b'boot log', self.console.get_console_log(task))
+        mock_get_proxy.return_value.get_log.assert_called_once_with(
+            self.node.uuid)
+
+    def test_get_console_log_not_recorded(self, mock_get_proxy):
+        mock_get_proxy.return_value.get_log.return_value = None
+        with task_manager.acquire(self.context, self.node.uuid) as task:
+            self.assertIsNone(self.console.get_console_log(task))
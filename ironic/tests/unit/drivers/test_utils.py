@@ -15,7 +15,11 @@
 
 import datetime
 import os
+import shutil
+import tarfile
+import tempfile
 
+import fixtures
 import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
@@ -27,6 +31,9 @@ from ironic.conductor import task_manager
 from ironic.conductor import utils as manager_utils
 from ironic.drivers.modules import agent_client
 from ironic.drivers.modules import fake
+from ironic.drivers.modules import image_cache
+from ironic.drivers.modules import iscsi_deploy
+from ironic.drivers.modules import pxe
 from ironic.drivers import utils as driver_utils
 from ironic.tests import base as tests_base
 from ironic.tests.unit.conductor import mgr_utils
@@ -272,6 +279,14 @@ class UtilsRamdiskLogsTestCase(tests_base.TestCase):
                          instance_uuid + '_2000-01-01-00:00:00.tar.gz')
         self.assertEqual(expected_name, name)
 
+        # with label
+        name = driver_utils.get_ramdisk_logs_file_name(node2,
+                                                       label='console')
+        expected_name = ('1be26c0b-03f2-4d2e-ae87-c02d7f33c123_' +
+                         instance_uuid + '_console_2000-01-01-00:00:00'
+                         '.tar.gz')
+        self.assertEqual(expected_name, name)
+
     @mock.patch.object(driver_utils, 'store_ramdisk_logs', autospec=True)
     @mock.patch.object(agent_client.AgentClient,
                        'collect_system_logs', autospec=True)
@@ -358,7 +373,7 @@ class UtilsRamdiskLogsTestCase(tests_base.TestCase):
         mock_swift.return_value.create_object.assert_called_once_with(
             container_name, file_name, mock.ANY,
             object_headers={'X-Delete-After': '86400'})
-        mock_logs_name.assert_called_once_with(self.node)
+        mock_logs_name.assert_called_once_with(self.node, label=None)
 
     @mock.patch.object(os, 'makedirs', autospec=True)
     @mock.patch.object(driver_utils,
@@ -379,4 +394,106 @@ class UtilsRamdiskLogsTestCase(tests_base.TestCase):
             mock_open.assert_called_once_with(expected_path, 'wb')
 
         mock_makedirs.assert_called_once_with(log_path)
-        mock_logs_name.assert_called_once_with(self.node)
+        mock_logs_name.assert_called_once_with(self.node, label=None)
+
+    def _store_console_log(self, output):
+        task = mock.Mock(spec=task_manager.TaskManager, node=self.node)
+        task.driver = mock.Mock(spec_set=['console'])
+        task.driver.console.get_console_log.return_value = output
+        driver_utils.store_console_log(task)
+        task.driver.console.get_console_log.assert_called_once_with(task)
+        return task
+
+    def test_store_console_log(self):
+        log_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_path)
+        cfg.CONF.set_override('deploy_logs_local_path', log_path, 'agent')
+
+        self._store_console_log(b'console output')
+
+        file_names = os.listdir(log_path)
+        self.assertEqual(1, len(file_names))
+        self.assertIn('_console_', file_names[0])
+        with tarfile.open(os.path.join(log_path, file_names[0])) as tar:
+            self.assertEqual(['console.log'], tar.getnames())
+            self.assertEqual(b'console output',
+                             tar.extractfile('console.log').read())
+
+    @mock.patch.object(driver_utils, '_store_logs_archive', autospec=True)
+    def test_store_console_log_not_recorded(self, mock_store):
+        self._store_console_log(None)
+        self.assertFalse(mock_store.called)
+
+    @mock.patch.object(driver_utils, '_store_logs_archive', autospec=True)
+    def test_store_console_log_never(self, mock_store):
+        cfg.CONF.set_override('deploy_logs_collect', 'never', 'agent')
+        task = mock.Mock(spec=task_manager.TaskManager, node=self.node)
+        task.driver = mock.Mock(spec_set=['console'])
+        driver_utils.store_console_log(task)
+        self.assertFalse(task.driver.console.get_console_log.called)
+        self.assertFalse(mock_store.called)
+
+    @mock.patch.object(driver_utils, '_store_logs_archive', autospec=True)
+    def test_store_console_log_no_console(self, mock_store):
+        task = mock.Mock(spec=task_manager.TaskManager, node=self.node)
+        task.driver = mock.Mock(spec_set=['console'], console=None)
+        driver_utils.store_console_log(task)
+        self.assertFalse(mock_store.called)
+
+    @mock.patch.object(driver_utils.LOG, 'error', autospec=True)
+    @mock.patch.object(driver_utils, '_store_logs_archive', autospec=True)
+    def test_store_console_log_storage_fail_swift(self, mock_store,
+                                                  mock_log):
+        error = exception.SwiftOperationError('boom')
+        mock_store.side_effect = error
+        self._store_console_log(b'console output')
+        mock_store.assert_called_once_with(self.node, mock.ANY,
+                                           label='console')
+        mock_log.assert_called_once_with(
+            mock.ANY, {'node': self.node.uuid, 'error': error})
+
+
+@mock.patch.object(image_cache, 'warm_caches', autospec=True)
+class WarmImageCachesTestCase(tests_base.TestCase):
+
+    def setUp(self):
+        super(WarmImageCachesTestCase, self).setUp()
+        self.nodes_info = [
+            {'image_source': 'image1', 'deploy_kernel': 'kernel'},
+            {'image_source': 'image2', 'deploy_kernel': 'kernel'},
+            {'image_source': 'image2'},
+            {},
+        ]
+        self.useFixture(fixtures.MockPatchObject(
+            image_cache, '_cache_cleanup_list',
+            [(50, iscsi_deploy.InstanceImageCache),
+             (25, pxe.TFTPImageCache)]))
+
+    def test_warm_image_caches(self, mock_warm):
+        mock_warm.return_value = [
+            {'href': 'image', 'cache': 'InstanceImageCache',
+             'status': 'downloaded', 'error': None},
+            {'href': 'image2', 'cache': 'InstanceImageCache',
+             'status': 'failed', 'error': 'boom'}]
+        results = driver_utils.warm_image_caches(self.context, ['image'],
+                                                 self.nodes_info, 1)
+        self.assertEqual(mock_warm.return_value, results)
+        mock_warm.assert_called_once_with(
+            self.context, [('image_source', 'image'),
+                           ('deploy_kernel', 'kernel'),
+                           ('image_source', 'image2')])
+
+    def test_warm_image_caches_most_used(self, mock_warm):
+        driver_utils.warm_image_caches(self.context, ['image'],
+                                       self.nodes_info, 2)
+        mock_warm.assert_called_once_with(
+            self.context, [('image_source', 'image'),
+                           ('deploy_kernel', 'kernel'),
+                           ('image_source', 'image2'),
+                           ('image_source', 'image1')])
+
+    def test_warm_image_caches_no_count(self, mock_warm):
+        driver_utils.warm_image_caches(self.context, ['image'],
+                                       self.nodes_info, 0)
+        mock_warm.assert_called_once_with(self.context,
+                                          [('image_source', 'image')])
@@ -134,6 +134,22 @@ class TestConductorObject(base.DbTestCase):
                 c.register_hardware_interfaces(*args)
                 mock_register.assert_called_once_with(c.id, *args)
 
+    def test_bulk_register_hardware_interfaces(self):
+        host = self.fake_conductor['hostname']
+        with mock.patch.object(self.dbapi, 'get_conductor',
+                               autospec=True) as mock_get_cdr:
+            with mock.patch.object(
+                    self.dbapi, 'bulk_register_conductor_hardware_interfaces',
+                    autospec=True) as mock_register:
+                mock_get_cdr.return_value = self.fake_conductor
+                c = objects.Conductor.get_by_hostname(self.context, host)
+                interfaces = [{'hardware_type': 'hardware-type',
+                               'interface_type': 'deploy',
+                               'interface_name': 'iscsi',
+                               'default': True}]
+                c.bulk_register_hardware_interfaces(interfaces)
+                mock_register.assert_called_once_with(c.id, interfaces)
+
     def test_unregister_all_hardware_interfaces(self):
         host = self.fake_conductor['hostname']
         with mock.patch.object(self.dbapi, 'get_conductor',
@@ -0,0 +1,72 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from ironic import objects
+from ironic.tests.unit.db import base
+from ironic.tests.unit.db import utils
+
+
+class TestJobObject(base.DbTestCase):
+
+    def setUp(self):
+        super(TestJobObject, self).setUp()
+        self.job_dict = utils.get_test_job()
+
+    def test_get_by_uuid(self):
+        uuid = self.job_dict['uuid']
+        with mock.patch.object(self.dbapi, 'get_job_by_uuid',
+                               autospec=True) as mock_get_job:
+            mock_get_job.return_value = self.job_dict
+
+            job = objects.Job.get_by_uuid(self.context, uuid)
+
+            mock_get_job.assert_called_once_with(uuid)
+            self.assertIsInstance(job, objects.Job)
+            self.assertEqual(self.context, job._context)
+            self.assertFalse(job.finished)
+
+    def test_create(self):
+        with mock.patch.object(self.dbapi, 'create_job',
+                               autospec=True) as mock_create_job:
+            mock_create_job.return_value = utils.get_test_job()
+
+            job = objects.Job(self.context, node_id=123,
+                              action='get_boot_device', state='pending')
+            job.create()
+
+            mock_create_job.assert_called_once_with(
+                {'node_id': 123, 'action': 'get_boot_device',
+                 'state': 'pending'})
+            self.assertEqual(self.job_dict['uuid'], job.uuid)
+
+    def test_save(self):
+        uuid = self.job_dict['uuid']
+        result = {'boot_device': 'pxe', 'persistent': False}
+        with mock.patch.object(self.dbapi, 'get_job_by_uuid',
+                               autospec=True) as mock_get_job:
+            mock_get_job.return_value = self.job_dict
+            with mock.patch.object(self.dbapi, 'update_job',
+                                   autospec=True) as mock_update_job:
+                mock_update_job.return_value = utils.get_test_job(
+                    state='success', result=result)
+
+                job = objects.Job.get_by_uuid(self.context, uuid)
+                job.state = 'success'
+                job.result = result
+                job.save()
+
+                mock_update_job.assert_called_once_with(
+                    uuid, {'state': 'success', 'result': result})
+                self.assertTrue(job.finished)
+                self.assertEqual(result, job.result)
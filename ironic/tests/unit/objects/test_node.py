@@ -15,10 +15,12 @@
 
 import datetime
 import mock
+from oslo_versionedobjects import exception as object_exception
 from testtools import matchers
 
 from ironic.common import context
 from ironic.common import exception
+from ironic.db import api as db_api
 from ironic import objects
 from ironic.tests.unit.db import base
 from ironic.tests.unit.db import utils
@@ -123,6 +125,64 @@ class TestNodeObject(base.DbTestCase):
                 res_updated_at = n.updated_at.replace(tzinfo=None)
                 self.assertEqual(test_time, res_updated_at)
 
+    def test_save_key_updates(self):
+        uuid = self.fake_node['uuid']
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            with mock.patch.object(self.dbapi, 'update_node',
+                                   autospec=True) as mock_update_node:
+                mock_update_node.return_value = utils.get_test_node()
+                n = objects.Node.get(self.context, uuid)
+                n.set_driver_internal_info('agent_url', 'http://1.2.3.4')
+                n.del_driver_internal_info('private_state')
+                n.set_instance_info('deploy_boot_mode', 'uefi')
+                n.extra = {'foo': 'bar'}
+                self.assertEqual({'agent_url': 'http://1.2.3.4'},
+                                 n.driver_internal_info)
+                self.assertEqual('uefi', n.instance_info['deploy_boot_mode'])
+                self.assertEqual({'driver_internal_info', 'instance_info',
+                                  'extra'}, n.obj_what_changed())
+                n.save()
+
+                mock_update_node.assert_called_once_with(
+                    uuid, {'extra': {'foo': 'bar'}},
+                    key_updates={
+                        'driver_internal_info': {
+                            'agent_url': 'http://1.2.3.4',
+                            'private_state': db_api.DELETE_KEY},
+                        'instance_info': {'deploy_boot_mode': 'uefi'}})
+                self.assertEqual(set(), n.obj_what_changed())
+
+    def test_save_key_updates_field_assigned(self):
+        uuid = self.fake_node['uuid']
+        with mock.patch.object(self.dbapi, 'get_node_by_uuid',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            with mock.patch.object(self.dbapi, 'update_node',
+                                   autospec=True) as mock_update_node:
+                mock_update_node.return_value = utils.get_test_node()
+                n = objects.Node.get(self.context, uuid)
+                n.set_driver_internal_info('agent_url', 'http://1.2.3.4')
+                n.set_instance_info('deploy_boot_mode', 'uefi')
+                # The whole field is written if it is also assigned
+                n.driver_internal_info = {'foo': 'bar'}
+                n.save()
+
+                mock_update_node.assert_called_once_with(
+                    uuid, {'driver_internal_info': {'foo': 'bar'}},
+                    key_updates={
+                        'instance_info': {'deploy_boot_mode': 'uefi'}})
+
+    def test_key_updates_reset(self):
+        self.node.obj_reset_changes()
+        self.node.set_driver_internal_info('agent_url', 'http://1.2.3.4')
+        self.node.obj_reset_changes(['instance_info'])
+        self.assertEqual({'driver_internal_info'},
+                         self.node.obj_what_changed())
+        self.node.obj_reset_changes()
+        self.assertEqual(set(), self.node.obj_what_changed())
+
     def test_refresh(self):
         uuid = self.fake_node['uuid']
         returns = [dict(self.fake_node, properties={"fake": "first"}),
@@ -159,6 +219,61 @@ class TestNodeObject(base.DbTestCase):
             self.assertIsInstance(nodes[0], objects.Node)
             self.assertEqual(self.context, nodes[0]._context)
 
+    def test_get_aggregates(self):
+        with mock.patch.object(self.dbapi, 'get_node_aggregates',
+                               autospec=True) as mock_get_aggregates:
+            mock_get_aggregates.return_value = [('active', 'fake', 3),
+                                                ('available', 'fake', 1)]
+            filters = {'maintenance': False}
+            aggregates = objects.Node.get_aggregates(
+                self.context, ['provision_state', 'driver'], filters=filters)
+            self.assertEqual(
+                [{'provision_state': 'active', 'driver': 'fake', 'count': 3},
+                 {'provision_state': 'available', 'driver': 'fake',
+                  'count': 1}],
+                aggregates)
+            mock_get_aggregates.assert_called_once_with(
+                ['provision_state', 'driver'], filters=filters)
+
+    def test_delta_primitive(self):
+        self.node.obj_reset_changes()
+        self.node.driver_internal_info = {'is_whole_disk_image': True}
+        self.node.power_state = 'power off'
+        primitive = self.node.obj_to_delta_primitive()
+        self.assertEqual({'id': self.fake_node['id'],
+                          'driver_internal_info': {
+                              'is_whole_disk_image': True},
+                          'power_state': 'power off'},
+                         primitive['ironic_object.data'])
+        self.assertEqual(['driver_internal_info', 'power_state'],
+                         sorted(primitive['ironic_object.changes']))
+        self.assertEqual(objects.Node.VERSION,
+                         primitive['ironic_object.version'])
+
+        with mock.patch.object(self.dbapi, 'get_node_by_id',
+                               autospec=True) as mock_get_node:
+            mock_get_node.return_value = self.fake_node
+            node = objects.Node.obj_from_delta_primitive(self.context,
+                                                         primitive)
+
+            mock_get_node.assert_called_once_with(self.fake_node['id'])
+        self.assertEqual(self.context, node._context)
+        self.assertEqual({'driver_internal_info', 'power_state'},
+                         node.obj_what_changed())
+        self.assertEqual({'is_whole_disk_image': True},
+                         node.driver_internal_info)
+        self.assertEqual('power off', node.power_state)
+        self.assertEqual(self.fake_node['instance_info'], node.instance_info)
+
+    def test_delta_primitive_newer_version(self):
+        self.node.obj_reset_changes()
+        self.node.extra = {}
+        primitive = self.node.obj_to_delta_primitive()
+        primitive['ironic_object.version'] = '99.0'
+        self.assertRaises(object_exception.IncompatibleObjectVersion,
+                          objects.Node.obj_from_delta_primitive,
+                          self.context, primitive)
+
     def test_reserve(self):
         with mock.patch.object(self.dbapi, 'reserve_node',
                                autospec=True) as mock_reserve:
@@ -210,6 +325,23 @@ class TestNodeObject(base.DbTestCase):
         node = objects.Node(self.context, **self.fake_node)
         node.create()
 
+    def test_create_key_updates(self):
+        uuid = self.fake_node['uuid']
+        with mock.patch.object(self.dbapi, 'create_node',
+                               autospec=True) as mock_create_node:
+            mock_create_node.return_value = utils.get_test_node()
+            node = objects.Node(self.context, uuid=uuid)
+            # The dict fields of a new node are not set yet
+            node.set_instance_info('configdrive', 'foo')
+            node.del_driver_internal_info('agent_url')
+            self.assertEqual({'configdrive': 'foo'}, node.instance_info)
+            self.assertEqual({}, node.driver_internal_info)
+            node.create()
+
+            mock_create_node.assert_called_once_with(
+                {'uuid': uuid, 'instance_info': {'configdrive': 'foo'},
+                 'driver_internal_info': {}})
+
     def test_create_with_invalid_properties(self):
         node = objects.Node(self.context, **self.fake_node)
         node.properties = {"local_gb": "5G"}
@@ -24,9 +24,12 @@ from oslo_versionedobjects import fixture as object_fixture
 import six
 
 from ironic.common import context
+from ironic import objects
 from ironic.objects import base
 from ironic.objects import fields
 from ironic.tests import base as test_base
+from ironic.tests.unit.db import base as db_base
+from ironic.tests.unit.db import utils as db_utils
 
 gettext.install('ironic')
 
@@ -404,12 +407,12 @@ class TestObject(_LocalTest, _TestObject):
 # version bump. It is an MD5 hash of the object fields and remotable methods.
 # The fingerprint values should only be changed if there is a version bump.
 expected_object_fingerprints = {
-    'Node': '1.21-52674c214141cf3e09f8688bfed54577',
+    'Node': '1.22-52674c214141cf3e09f8688bfed54577',
     'MyObj': '1.5-4f5efe8f0fcaf182bbe1c7fe3ba858db',
     'Chassis': '1.3-d656e039fd8ae9f34efc232ab3980905',
     'Port': '1.6-609504503d68982a10f495659990084b',
     'Portgroup': '1.3-71923a81a86743b313b190f5c675e258',
-    'Conductor': '1.2-5091f249719d4a465062a1b3dc7f860d',
+    'Conductor': '1.3-5091f249719d4a465062a1b3dc7f860d',
     'EventType': '1.1-aa2ba1afd38553e3880c267404e8d370',
     'NotificationPublisher': '1.0-51a09397d6c0687771fb5be9a999605d',
     'NodePayload': '1.3-e54d6506953ad0aa0b965615b0aa38a0',
@@ -423,6 +426,7 @@ expected_object_fingerprints = {
     'NodeSetProvisionStatePayload': '1.3-96e85e927b10d96c79c27f5fb6727f86',
     'VolumeConnector': '1.0-3e0252c0ab6e6b9d158d09238a577d97',
     'VolumeTarget': '1.0-0b10d663d8dae675900b2c7548f76f5e',
+    'Job': '1.0-e6287c015dc1e1fe72647cf29f8165c5',
     'ChassisCRUDNotification': '1.0-59acc533c11d306f149846f922739c15',
     'ChassisCRUDPayload': '1.0-dce63895d8186279a7dd577cffccb202',
     'NodeCRUDNotification': '1.0-59acc533c11d306f149846f922739c15',
@@ -520,6 +524,60 @@ class TestObjectSerializer(test_base.TestCase):
         self._test_deserialize_entity_newer('1.7', '1.6.1', my_version='1.6.1')
 
 
+class TestTrustedDbObject(db_base.DbTestCase):
+
+    def setUp(self):
+        super(TestTrustedDbObject, self).setUp()
+        self.db_node = db_utils.create_test_node(
+            driver_internal_info={'is_whole_disk_image': True},
+            clean_step=None,
+            provision_updated_at=datetime.datetime(2000, 1, 1, 12, 0))
+        self.db_port = db_utils.create_test_port(node_id=self.db_node.id)
+
+    def _assert_same(self, cls, db_object):
+        expected = cls._from_db_object(cls(self.context), db_object)
+        obj = cls._from_trusted_db_object(self.context, db_object)
+        self.assertEqual(self.context, obj._context)
+        self.assertEqual(set(), obj.obj_what_changed())
+        for name in cls.fields:
+            self.assertEqual(expected[name], obj[name], name)
+            self.assertEqual(type(expected[name]), type(obj[name]), name)
+        self.assertEqual(expected.obj_to_primitive(), obj.obj_to_primitive())
+
+    def test_node(self):
+        self._assert_same(objects.Node, self.db_node)
+
+    def test_port(self):
+        self._assert_same(objects.Port, self.db_port)
+
+    def test_list(self):
+        nodes = objects.Node.list(self.context)
+        self.assertEqual([self.db_node.uuid], [n.uuid for n in nodes])
+        self.assertEqual({'is_whole_disk_image': True},
+                         nodes[0].driver_internal_info)
+        self.assertEqual({}, nodes[0].clean_step)
+        self.assertIsNotNone(nodes[0].created_at.tzinfo)
+
+    @mock.patch.object(base.LOG, 'error', autospec=True)
+    def test_verify(self, mock_log):
+        self.config(verify_object_hydration=True)
+        nodes = objects.Node.list(self.context)
+        self.assertEqual({'is_whole_disk_image': True},
+                         nodes[0].driver_internal_info)
+        self.assertFalse(mock_log.called)
+
+    @mock.patch.object(base.LOG, 'error', autospec=True)
+    def test_verify_different(self, mock_log):
+        self.config(verify_object_hydration=True)
+        # simulate a value that does not have the type of the field
+        self.db_node.name = 42
+        node = objects.Node._from_trusted_db_object(self.context,
+                                                    self.db_node)
+        self.assertEqual(u'42', node.name)
+        self.assertTrue(mock_log.called)
+        self.assertIn('name', mock_log.call_args[0][1]['fields'])
+
+
 class TestRegistry(test_base.TestCase):
     @mock.patch('ironic.objects.base.objects')
     def test_hook_chooses_newer_properly(self, mock_objects):
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Audit of the modules imported by the API service.
+
+Builds the API application like an ironic-api worker does, then reports
+the time it took, the number of modules imported and the ironic modules
+that the API service should not need, like the drivers and the conductor
+manager. For example::
+
+    python tools/benchmark/api_imports.py --list
+
+On Python 3.7 and newer, ``python -X importtime`` gives how long each
+module of the same run took to import.
+"""
+
+import argparse
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--list', action='store_true',
+                        help='list the ironic modules imported')
+    args = parser.parse_args()
+
+    modules_before = len(sys.modules)
+    started = time.time()
+
+    from ironic.api import app
+    from ironic.conf import CONF
+    from ironic import objects
+
+    objects.register_all()
+    CONF([], project='ironic')
+    CONF.set_override('auth_strategy', 'noauth')
+    app.setup_app(pecan_config=app.get_pecan_config())
+
+    elapsed = time.time() - started
+    modules = {name for name, module in sys.modules.items()
+               if module is not None}
+    print('API application built in %.3f s, %d modules imported' %
+          (elapsed, len(sys.modules) - modules_before))
+
+    unexpected = sorted(name for name in modules if name.startswith(
+        app.UNEXPECTED_MODULE_PREFIXES))
+    print('Unexpected ironic modules: %s' % (', '.join(unexpected) or 'none'))
+
+    if args.list:
+        for name in sorted(modules):
+            if name.startswith('ironic.'):
+                print(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the downloads of images over HTTP.
+
+Serves an image from memory with a local HTTP server supporting range
+requests, and downloads it with HttpImageService using 1 to --connections
+connections in parallel. Each connection of the server is limited to
+--connection-rate MiB/s, to reproduce the throughput of a single TCP
+stream over a long distance, and can be dropped every --drop-every MiB to
+exercise the resuming of the downloads. For example::
+
+    python tools/benchmark/http_image_download.py --size 512 \\
+        --connection-rate 50 --connections 8 --drop-every 100
+"""
+
+import eventlet
+eventlet.monkey_patch(os=False)
+
+import argparse  # noqa
+import os  # noqa
+import socket  # noqa
+import tempfile  # noqa
+import time  # noqa
+
+from oslo_utils import units  # noqa
+from six.moves import BaseHTTPServer  # noqa
+from six.moves import socketserver  # noqa
+
+from ironic.common import image_service  # noqa
+from ironic.conf import CONF  # noqa
+
+
+def make_handler(data, connection_rate, drop_every):
+
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            start, end = 0, len(data)
+            requested = self.headers.get('Range')
+            if requested:
+                first, last = requested[len('bytes='):].split('-')
+                start, end = int(first), int(last) + 1
+                self.send_response(206)
+                self.send_header('Content-Range', 'bytes %d-%d/%d' %
+                                 (start, end - 1, len(data)))
+            else:
+                self.send_response(200)
+            self.send_header('Content-Length', str(end - start))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+
+            started = time.time()
+            sent = 0
+            while start + sent < end:
+                if drop_every and sent >= drop_every:
+                    # NOTE: close the connection without sending everything
+                    return
+                chunk = data[start + sent:min(end, start + sent + units.Mi)]
+                try:
+                    self.wfile.write(chunk)
+                except socket.error:
+                    # NOTE: the first response is only read up to the end
+                    # of the first segment
+                    return
+                sent += len(chunk)
+                if connection_rate:
+                    delay = started + float(sent) / connection_rate
+                    time.sleep(max(0, delay - time.time()))
+
+    return Handler
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=256,
+                        help='size of the image, in MiB')
+    parser.add_argument('--connections', type=int, default=8,
+                        help='maximum number of connections to test')
+    parser.add_argument('--connection-rate', type=int, default=50,
+                        help='bandwidth of each connection of the server, '
+                             'in MiB/s, 0 for unlimited')
+    parser.add_argument('--bandwidth', type=int, default=0,
+                        help='[DEFAULT]image_download_bandwidth, in MiB/s')
+    parser.add_argument('--drop-every', type=int, default=0,
+                        help='drop the connections after sending this many '
+                             'MiB, 0 to never drop them')
+    args = parser.parse_args()
+
+    CONF([], project='ironic', default_config_files=[])
+    CONF.set_override('image_download_segment_size', 1)
+    CONF.set_override('image_download_bandwidth', args.bandwidth)
+    CONF.set_override('image_download_retries', 1000)
+
+    data = os.urandom(args.size * units.Mi)
+    server = Server(('127.0.0.1', 0), make_handler(
+        data, args.connection_rate * units.Mi, args.drop_every * units.Mi))
+    eventlet.spawn_n(server.serve_forever)
+    href = 'http://127.0.0.1:%d/image.raw' % server.server_address[1]
+
+    service = image_service.HttpImageService()
+    work_dir = tempfile.mkdtemp()
+    path = os.path.join(work_dir, 'image')
+    connections = 1
+    try:
+        while connections <= args.connections:
+            CONF.set_override('image_download_connections', connections)
+            started = time.time()
+            with open(path, 'wb') as image_file:
+                service.download(href, image_file)
+            elapsed = time.time() - started
+            with open(path, 'rb') as image_file:
+                assert image_file.read() == data, 'corrupted download'
+            print('%2d connections: %7.2f s, %8.1f MiB/s' % (
+                connections, elapsed, args.size / elapsed))
+            connections *= 2
+    finally:
+        server.shutdown()
+        os.unlink(path)
+        os.rmdir(work_dir)
+
+
+if __name__ == '__main__':
+    main()
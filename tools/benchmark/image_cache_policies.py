@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Simulation of the eviction policies of the master image cache.
+
+Replays a trace of deployments through an ImageCache for each eviction
+policy, and reports the hit ratio and the amount of data downloaded. The
+images are not downloaded: they are created as sparse files of the size
+given by the trace, in a temporary directory, and the clock is simulated.
+
+Each line of a trace is a deployment, as ``<time> <image> <size>``, the
+time in seconds and the size in bytes; ``#`` starts a comment. A trace
+can be recorded from the conductor logs, or generated::
+
+    python tools/benchmark/image_cache_policies.py --generate 2000 > trace
+    python tools/benchmark/image_cache_policies.py --cache-size 20480 trace
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from oslo_utils import units
+
+from ironic.conf import CONF
+from ironic.drivers.modules import image_cache
+
+
+def generate(count, seed):
+    """Generate a trace of deployments.
+
+    Most deployments use one of a few golden images of 1 to 4 GiB. Some
+    use one of many images of 2 to 10 GiB, used once or twice each, which
+    push the golden images out of a cache which is too small for them all.
+    """
+    rnd = random.Random(seed)
+    golden = [('golden-%d' % i, rnd.randint(1, 4) * units.Gi)
+              for i in range(5)]
+    now = 0
+    for i in range(count):
+        now += rnd.randint(10, 600)
+        if rnd.random() < 0.8:
+            name, size = rnd.choice(golden)
+        else:
+            image = rnd.randint(0, count // 10)
+            name = 'one-off-%d' % image
+            size = random.Random(image).randint(2, 10) * units.Gi
+        print('%d %s %d' % (now, name, size))
+
+
+def load(trace_file):
+    trace = []
+    for line in trace_file:
+        line = line.split('#', 1)[0].strip()
+        if line:
+            when, name, size = line.split()
+            trace.append((float(when), name, int(size)))
+    return trace
+
+
+def replay(trace, policy, cache_size, cache_ttl):
+    """Replay a trace, returning the hits, misses and bytes downloaded."""
+    work_dir = tempfile.mkdtemp()
+    stats = {'hits': 0, 'misses': 0, 'downloaded': 0}
+    clock = [0]
+    sizes = {}
+
+    def fetch(context, image_href, path, force_raw=False, hash_algo=None):
+        with open(path, 'wb') as image:
+            image.truncate(sizes[image_href])
+        stats['downloaded'] += sizes[image_href]
+
+    # NOTE: the clock of the process is simulated while replaying, since
+    # the cache uses it to record the uses of the images
+    real_time = time.time
+    try:
+        cache = image_cache.ImageCache(os.path.join(work_dir, 'master'),
+                                       cache_size, cache_ttl,
+                                       eviction_policy=policy, fetcher=fetch)
+        dest_path = os.path.join(work_dir, 'dest')
+        time.time = lambda: clock[0]
+        try:
+            for when, name, size in trace:
+                clock[0] = when
+                # NOTE: the UUIDs are handled as Glance images, which are
+                # never stale
+                href = str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+                sizes[href] = size
+                downloaded = stats['downloaded']
+                cache.fetch_image(href, dest_path)
+                os.unlink(dest_path)
+                if stats['downloaded'] > downloaded:
+                    stats['misses'] += 1
+                else:
+                    stats['hits'] += 1
+        finally:
+            time.time = real_time
+    finally:
+        image_cache._indexes.pop(os.path.join(work_dir, 'master'), None)
+        shutil.rmtree(work_dir)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('trace', nargs='?', type=argparse.FileType('r'),
+                        help='trace file to replay, - for stdin')
+    parser.add_argument('--generate', type=int, metavar='COUNT',
+                        help='print a trace of COUNT deployments and exit')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='random seed of the generated trace')
+    parser.add_argument('--cache-size', type=int, default=20480,
+                        help='maximum size of the cache, in MiB')
+    parser.add_argument('--cache-ttl', type=int, default=10080,
+                        help='maximum TTL of the images, in minutes')
+    parser.add_argument('--lfu-half-life', type=int, default=1440,
+                        help='half life of the uses with the "lfu" policy, '
+                             'in minutes')
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.generate, args.seed)
+        return
+    if args.trace is None:
+        parser.error('a trace file is required')
+
+    CONF([], project='ironic', default_config_files=[])
+    CONF.set_override('image_cache_lfu_half_life', args.lfu_half_life,
+                      group='pxe')
+    trace = load(args.trace)
+    if not trace:
+        sys.exit('The trace is empty')
+
+    print('%-18s %9s %9s %16s' % ('policy', 'hits', 'hit ratio',
+                                  'downloaded GiB'))
+    for policy in sorted(image_cache.EVICTION_POLICIES):
+        stats = replay(trace, policy, args.cache_size * units.Mi,
+                       args.cache_ttl * 60)
+        print('%-18s %9d %8.1f%% %16.1f' % (
+            policy, stats['hits'], 100.0 * stats['hits'] / len(trace),
+            float(stats['downloaded']) / units.Gi))
+
+
+if __name__ == '__main__':
+    main()
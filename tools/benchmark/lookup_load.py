@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Load test of the ramdisk lookup API.
+
+Simulates many deploy ramdisks looking up their nodes at the same time:
+each client repeatedly looks up a node by the MAC address of one of the
+ports, and the number of lookups served per second is reported at the end.
+
+The MAC addresses are read from a file (one per line), or fetched from the
+API, which requires a token unless the API runs with noauth. For example::
+
+    python tools/benchmark/lookup_load.py --url http://127.0.0.1:6385 \\
+        --token "$(openstack token issue -f value -c id)" \\
+        --concurrency 200 --duration 60
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa
+import itertools  # noqa
+import time  # noqa
+
+import requests  # noqa
+
+# The lookup API was added in 1.22.
+_HEADERS = {'X-OpenStack-Ironic-API-Version': '1.22'}
+
+
+def get_addresses(args):
+    if args.addresses_file:
+        with open(args.addresses_file) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    headers = dict(_HEADERS)
+    if args.token:
+        headers['X-Auth-Token'] = args.token
+    url = '%s/v1/ports?fields=address&limit=0' % args.url
+    response = requests.get(url, headers=headers)
+    response.raise_for_status()
+    return [port['address'] for port in response.json()['ports']]
+
+
+def run_client(args, addresses, deadline, results):
+    session = requests.Session()
+    for address in addresses:
+        if time.time() >= deadline:
+            return
+        started = time.time()
+        try:
+            response = session.get('%s/v1/lookup' % args.url,
+                                   params={'addresses': address},
+                                   headers=_HEADERS)
+        except requests.RequestException:
+            status = 'error'
+        else:
+            status = response.status_code
+        results.append((status, time.time() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:6385',
+                        help='ironic API endpoint')
+    parser.add_argument('--token',
+                        help='token used to list the ports')
+    parser.add_argument('--addresses-file',
+                        help='file with the MAC addresses to look up')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='number of simulated ramdisks')
+    parser.add_argument('--duration', type=int, default=30,
+                        help='duration of the test in seconds')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+
+    addresses = get_addresses(args)
+    if not addresses:
+        parser.error('no MAC addresses to look up')
+
+    results = []
+    pool = eventlet.GreenPool(args.concurrency)
+    started = time.time()
+    deadline = started + args.duration
+    for i in range(args.concurrency):
+        # every client starts with a different address
+        offset = i % len(addresses)
+        client_addresses = itertools.cycle(addresses[offset:] +
+                                           addresses[:offset])
+        pool.spawn_n(run_client, args, client_addresses, deadline, results)
+    pool.waitall()
+    elapsed = time.time() - started
+
+    latencies = sorted(latency for _status, latency in results)
+    statuses = {}
+    for status, _latency in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print('Addresses:          %d' % len(addresses))
+    print('Lookups:            %d' % len(results))
+    print('Lookups per second: %.1f' % (len(results) / elapsed))
+    for status, count in sorted(statuses.items(), key=str):
+        print('  status %-11s %d' % (status, count))
+    if latencies:
+        for percentile in (50, 90, 99):
+            index = min(len(latencies) - 1,
+                        len(latencies) * percentile // 100)
+            print('Latency p%d:        %.1f ms'
+                  % (percentile, latencies[index] * 1000))
+
+
+if __name__ == '__main__':
+    main()
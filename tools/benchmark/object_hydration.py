@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the conversion of database entities to objects.
+
+Converts database models of nodes and ports to objects, once with the
+coercion of every field done by _from_db_object(), and once with the
+trusted conversion used by _from_db_object_list(). No database is needed,
+the models are built in memory. For example::
+
+    python tools/benchmark/object_hydration.py --nodes 10000 --ports 40000
+"""
+
+import argparse
+import time
+
+from oslo_utils import uuidutils
+
+from ironic.common import context as ironic_context
+from ironic.db.sqlalchemy import models
+from ironic import objects
+from ironic.tests.unit.db import utils as db_utils
+
+
+def make_nodes(count):
+    nodes = []
+    for i in range(count):
+        values = db_utils.get_test_node(
+            id=i + 1, uuid=uuidutils.generate_uuid(), name='node-%d' % i,
+            driver_internal_info={'clean_steps': [{'step': 'erase_devices',
+                                                   'priority': 10}] * 5,
+                                  'is_whole_disk_image': False})
+        nodes.append(models.Node(**values))
+    return nodes
+
+
+def make_ports(count, node_count):
+    ports = []
+    for i in range(count):
+        values = db_utils.get_test_port(
+            id=i + 1, uuid=uuidutils.generate_uuid(),
+            node_id=i % max(node_count, 1) + 1,
+            address='52:54:%02x:%02x:%02x:%02x' % (
+                i >> 24 & 0xff, i >> 16 & 0xff, i >> 8 & 0xff, i & 0xff))
+        ports.append(models.Port(**values))
+    return ports
+
+
+def measure(func, repeat):
+    best = None
+    for _i in range(repeat):
+        started = time.time()
+        func()
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=10000,
+                        help='number of nodes to convert')
+    parser.add_argument('--ports', type=int, default=40000,
+                        help='number of ports to convert')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    objects.register_all()
+    context = ironic_context.get_admin_context()
+    db_nodes = make_nodes(args.nodes)
+    db_ports = make_ports(args.ports, args.nodes)
+
+    for cls, db_objects in ((objects.Node, db_nodes),
+                            (objects.Port, db_ports)):
+        coerced = measure(
+            lambda: [cls._from_db_object(cls(context), db_obj)
+                     for db_obj in db_objects], args.repeat)
+        trusted = measure(
+            lambda: cls._from_db_object_list(context, db_objects),
+            args.repeat)
+        print('%-6s %7d objects: coerced %7.3f s, trusted %7.3f s, '
+              'speedup %.1fx' % (cls.obj_name(), len(db_objects), coerced,
+                                 trusted, coerced / trusted))
+
+
+if __name__ == '__main__':
+    main()